@@ -1,9 +1,12 @@
 import datetime
-from collections import defaultdict
-from typing import DefaultDict
+import time
+from itertools import batched, groupby
+from operator import attrgetter
 
 import waffle
 from asgiref.sync import async_to_sync
+from django.core.management import CommandError
+from django.db.models.functions import Mod
 
 from cl.alerts.models import (
     SCHEDULED_ALERT_HIT_STATUS,
@@ -11,21 +14,17 @@ from cl.alerts.models import (
     ScheduledAlertHit,
 )
 from cl.alerts.tasks import send_search_alert_emails
-from cl.alerts.utils import InvalidDateError, override_alert_query
+from cl.alerts.utils import (
+    InvalidDateError,
+    json_date_parser,
+    override_alert_query,
+)
 from cl.lib.command_utils import VerboseCommand, logger
 from cl.stats.utils import tally_stat
 
 DAYS_TO_DELETE = 90
-
-
-def json_date_parser(dct):
-    for key, value in dct.items():
-        if isinstance(value, str):
-            try:
-                dct[key] = datetime.datetime.fromisoformat(value)
-            except ValueError:
-                pass
-    return dct
+# The maximum number of users whose emails are sent by a single task.
+USERS_PER_EMAIL_TASK = 50
 
 
 def get_cut_off_date(rate: str, d: datetime.date) -> datetime.date | None:
@@ -50,44 +49,81 @@ def get_cut_off_date(rate: str, d: datetime.date) -> datetime.date | None:
     return cut_off_date
 
 
-def query_and_send_alerts_by_rate(rate: str) -> None:
-    """Query and send alerts per user.
+def get_scheduled_users_batch(
+    rate: str,
+    after_user_id: int,
+    batch_size: int,
+    shards: int = 1,
+    shard: int = 0,
+) -> list[int]:
+    """Get the next batch of users with scheduled hits for a rate, in user ID
+    order.
 
     :param rate: The alert rate to send Alerts.
-    :return: None
+    :param after_user_id: The last user ID of the previous batch.
+    :param batch_size: The maximum number of users in the batch.
+    :param shards: The number of shards the users are split into.
+    :param shard: The shard to get the users of, the user ID modulo shards.
+    :return: A list of user IDs.
     """
 
-    alerts_sent_count = 0
-    now_time = datetime.datetime.now()
-    alerts_to_update = []
-    scheduled_hits_rate = ScheduledAlertHit.objects.filter(
-        alert__rate=rate, hit_status=SCHEDULED_ALERT_HIT_STATUS.SCHEDULED
-    ).select_related("user", "alert")
+    scheduled_hits = ScheduledAlertHit.objects.filter(
+        alert__rate=rate,
+        hit_status=SCHEDULED_ALERT_HIT_STATUS.SCHEDULED,
+        user_id__gt=after_user_id,
+    )
+    if shards > 1:
+        scheduled_hits = scheduled_hits.annotate(
+            user_shard=Mod("user_id", shards)
+        ).filter(user_shard=shard)
+    return list(
+        scheduled_hits.order_by("user_id")
+        .values_list("user_id", flat=True)
+        .distinct()[:batch_size]
+    )
 
-    # Create a nested dictionary structure to hold the groups.
-    grouped_hits: DefaultDict[
-        int, DefaultDict[Alert, list[ScheduledAlertHit]]
-    ] = defaultdict(lambda: defaultdict(list))
 
-    # Group scheduled hits by User and Alert.
-    for hit in scheduled_hits_rate:
-        user_id = hit.user.pk
-        alert = hit.alert
-        grouped_hits[user_id][alert].append(hit)
+def send_alerts_to_users(
+    rate: str, user_ids: list[int], now_time: datetime.datetime
+) -> tuple[int, int]:
+    """Send the scheduled hits of a batch of users and mark exactly the hits
+    sent as SENT, so hits scheduled in the meantime are sent in the next run.
 
-    for user_id, alerts in grouped_hits.items():
+    :param rate: The alert rate to send Alerts.
+    :param user_ids: The IDs of the users to send the alerts to.
+    :param now_time: The time the alerts are run.
+    :return: A two tuple, the number of emails and hits sent.
+    """
+
+    scheduled_hits = (
+        ScheduledAlertHit.objects.filter(
+            alert__rate=rate,
+            hit_status=SCHEDULED_ALERT_HIT_STATUS.SCHEDULED,
+            user_id__in=user_ids,
+        )
+        .select_related("alert")
+        .order_by("user_id", "alert_id", "pk")
+    )
+    cut_off_date = get_cut_off_date(rate, now_time.date())
+    alerts_to_update = []
+    hits_sent = []
+    email_alerts_to_send = []
+    # Group scheduled hits by User and Alert.
+    for user_id, user_hits in groupby(
+        scheduled_hits, key=attrgetter("user_id")
+    ):
         hits = []
-        for alert, results in alerts.items():
+        for alert, results in groupby(user_hits, key=attrgetter("alert")):
             search_type = alert.alert_type
             documents = []
             for result in results:
                 documents.append(json_date_parser(result.document_content))
+                hits_sent.append(result.pk)
 
             alerts_to_update.append(alert.pk)
 
             # Override order_by to show the latest items when clicking the
             # "View Full Results" button.
-            cut_off_date = get_cut_off_date(rate, now_time.date())
             qd = override_alert_query(alert, cut_off_date)
             alert.query_run = qd.urlencode()  # type: ignore
             hits.append(
@@ -99,39 +135,87 @@ def query_and_send_alerts_by_rate(rate: str) -> None:
                 )
             )
         if hits:
-            send_search_alert_emails.delay([(user_id, hits)])
-            alerts_sent_count += 1
+            email_alerts_to_send.append((user_id, hits))
+
+    # Send the emails of the batch of users in a few tasks.
+    for email_alerts_chunk in batched(
+        email_alerts_to_send, USERS_PER_EMAIL_TASK
+    ):
+        send_search_alert_emails.delay(list(email_alerts_chunk))
 
     # Update Alert's date_last_hit in bulk.
     Alert.objects.filter(id__in=alerts_to_update).update(
         date_last_hit=now_time
     )
 
-    # Update Scheduled alert hits status to "SENT".
-    scheduled_hits_rate.update(hit_status=SCHEDULED_ALERT_HIT_STATUS.SENT)
+    # Update the Scheduled alert hits sent status to "SENT".
+    ScheduledAlertHit.objects.filter(pk__in=hits_sent).update(
+        hit_status=SCHEDULED_ALERT_HIT_STATUS.SENT
+    )
+    return len(email_alerts_to_send), len(hits_sent)
+
+
+def query_and_send_alerts_by_rate(
+    rate: str,
+    batch_size: int = 1000,
+    shards: int = 1,
+    shard: int = 0,
+) -> None:
+    """Query and send alerts per user, in batches of users.
+
+    :param rate: The alert rate to send Alerts.
+    :param batch_size: The number of users whose hits are loaded at a time.
+    :param shards: The number of shards the users are split into, to send
+    the alerts in parallel processes.
+    :param shard: The shard of users to send the alerts to.
+    :return: None
+    """
+
+    alerts_sent_count = 0
+    hits_sent_count = 0
+    now_time = datetime.datetime.now()
+    started = time.monotonic()
+    last_user_id = 0
+    while True:
+        user_ids = get_scheduled_users_batch(
+            rate, last_user_id, batch_size, shards, shard
+        )
+        if not user_ids:
+            break
+        emails_sent, hits_sent = send_alerts_to_users(rate, user_ids, now_time)
+        alerts_sent_count += emails_sent
+        hits_sent_count += hits_sent
+        last_user_id = user_ids[-1]
+        logger.info(
+            f"Sent {alerts_sent_count} {rate} email alerts with "
+            f"{hits_sent_count} hits, up to user ID {last_user_id}."
+        )
 
     # Remove old Scheduled alert hits sent, daily.
-    if rate == Alert.DAILY:
+    if rate == Alert.DAILY and shard == 0:
         scheduled_alerts_deleted = delete_old_scheduled_alerts()
         logger.info(
             f"Removed {scheduled_alerts_deleted} Scheduled Alert Hits."
         )
 
+    elapsed = time.monotonic() - started
+    logger.info(
+        f"Sent {hits_sent_count} {rate} hits in {elapsed:.1f}s, "
+        f"{hits_sent_count / elapsed if elapsed else 0.0:.1f} hits/s."
+    )
     async_to_sync(tally_stat)(f"alerts.sent.{rate}", inc=alerts_sent_count)
     logger.info(f"Sent {alerts_sent_count} {rate} email alerts.")
 
 
-def send_scheduled_alerts(rate: str) -> None:
-    if rate == Alert.DAILY:
-        query_and_send_alerts_by_rate(Alert.DAILY)
-    elif rate == Alert.WEEKLY:
-        query_and_send_alerts_by_rate(Alert.WEEKLY)
-    elif rate == Alert.MONTHLY:
-        if datetime.date.today().day > 28:
-            raise InvalidDateError(
-                "Monthly alerts cannot be run on the 29th, 30th or 31st."
-            )
-        query_and_send_alerts_by_rate(Alert.MONTHLY)
+def send_scheduled_alerts(
+    rate: str, batch_size: int = 1000, shards: int = 1, shard: int = 0
+) -> None:
+    if rate == Alert.MONTHLY and datetime.date.today().day > 28:
+        raise InvalidDateError(
+            "Monthly alerts cannot be run on the 29th, 30th or 31st."
+        )
+    if rate in (Alert.DAILY, Alert.WEEKLY, Alert.MONTHLY):
+        query_and_send_alerts_by_rate(rate, batch_size, shards, shard)
 
 
 def delete_old_scheduled_alerts() -> int:
@@ -173,10 +257,39 @@ class Command(VerboseCommand):
             choices=Alert.ALL_FREQUENCIES,
             help=f"The rate to send emails ({', '.join(Alert.ALL_FREQUENCIES)})",
         )
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=1000,
+            help="The number of users whose alerts are sent at a time.",
+        )
+        parser.add_argument(
+            "--shards",
+            type=int,
+            default=1,
+            help="Split the users into this many shards by user ID, to send "
+            "the alerts from parallel processes, one per shard.",
+        )
+        parser.add_argument(
+            "--shard",
+            type=int,
+            default=0,
+            help="The shard of users to send the alerts to, from 0 to "
+            "shards - 1.",
+        )
 
     def handle(self, *args, **options):
         super().handle(*args, **options)
         if not waffle.switch_is_active("oa-es-alerts-active"):
             logger.info("ES OA Alerts are disabled.")
             return None
-        send_scheduled_alerts(options["rate"])
+        if options["batch_size"] < 1:
+            raise CommandError("--batch-size must be at least 1.")
+        if not 0 <= options["shard"] < options["shards"]:
+            raise CommandError("--shard must be between 0 and --shards - 1.")
+        send_scheduled_alerts(
+            options["rate"],
+            options["batch_size"],
+            options["shards"],
+            options["shard"],
+        )
@@ -1,7 +1,9 @@
-import copy
+import functools
+from collections import defaultdict
 from dataclasses import dataclass
 from datetime import datetime
 from importlib import import_module
+from itertools import batched
 from typing import Dict, List, Tuple, Union, cast
 from urllib.parse import urlencode
 
@@ -10,33 +12,41 @@ from celery import Task
 from django.conf import settings
 from django.contrib.auth.models import User
 from django.core.mail import EmailMultiAlternatives, get_connection, send_mail
+from django.core.mail.backends.base import BaseEmailBackend
 from django.db import transaction
 from django.template import loader
+from django.template.backends.django import Template
 from django.urls import reverse
 from django.utils.timezone import now
 from elasticsearch.exceptions import ConnectionError
 
 from cl.alerts.models import Alert, DocketAlert, ScheduledAlertHit
 from cl.alerts.utils import (
-    alert_hits_limit_reached,
+    get_alerts_hits_limit_reached,
     override_alert_query,
     percolate_document,
+    percolate_documents,
+    pop_percolator_documents,
+    push_percolator_document,
+    split_percolator_hits,
 )
-from cl.api.models import WebhookEventType
+from cl.api.models import Webhook, WebhookEventType
 from cl.api.tasks import (
     send_docket_alert_webhook_events,
-    send_es_search_alert_webhook,
+    send_es_search_alert_webhooks,
 )
 from cl.celery_init import app
 from cl.custom_filters.templatetags.text_filters import best_case_name
 from cl.favorites.models import Note, UserTag
 from cl.lib.command_utils import logger
 from cl.lib.elasticsearch_utils import fetch_all_search_results
+from cl.lib.email_backends import EmergencyBrakeEngaged
 from cl.lib.redis_utils import create_redis_semaphore, delete_redis_semaphore
 from cl.lib.string_utils import trunc
 from cl.recap.constants import COURT_TIMEZONES
 from cl.search.models import Docket, DocketEntry
 from cl.search.types import (
+    ESDictDocument,
     ESDocumentNameType,
     PercolatorResponseType,
     SaveDocumentResponseType,
@@ -443,26 +453,79 @@ def send_recap_email_user_not_found(recap_email_recipients: list[str]) -> None:
 
 
 def send_webhook_alert_hits(
-    alert_user: UserProfile.user, hits: list[SearchAlertHitType]
+    hits_by_user: dict[int, list[SearchAlertHitType]],
 ) -> None:
-    """Send webhook alerts for search hits.
+    """Send webhook alerts for search hits of many users. The webhooks of all
+    the users are fetched in a single query and their events sent in bulk.
 
-    :param alert_user: The user profile object associated with the webhooks.
-    :param hits: A list of tuples, each containing information about an alert,
-    its associated search type, documents found, and the number of documents.
+    :param hits_by_user: A dict mapping user IDs to a list of tuples, each
+    containing information about an alert, its associated search type,
+    documents found, and the number of documents.
     :return: None
     """
 
-    for alert, search_type, documents, num_docs in hits:
-        user_webhooks = alert_user.webhooks.filter(
-            event_type=WebhookEventType.SEARCH_ALERT, enabled=True
-        )
-        for user_webhook in user_webhooks:
-            send_es_search_alert_webhook.delay(
-                documents,
-                user_webhook.pk,
-                alert,
-            )
+    user_webhooks = Webhook.objects.filter(
+        user_id__in=hits_by_user.keys(),
+        event_type=WebhookEventType.SEARCH_ALERT,
+        enabled=True,
+    ).values_list("pk", "user_id")
+    webhook_hits = [
+        (documents, webhook_pk, alert)
+        for webhook_pk, user_id in user_webhooks
+        for alert, search_type, documents, num_docs in hits_by_user[user_id]
+    ]
+    if webhook_hits:
+        send_es_search_alert_webhooks.delay(webhook_hits)
+
+
+@functools.cache
+def get_search_alert_email_templates() -> tuple[Template, Template]:
+    """Load the search alert email templates once per worker process.
+
+    :return: A two tuple, the txt and html templates.
+    """
+    return (
+        loader.get_template("alert_email_es.txt"),
+        loader.get_template("alert_email_es.html"),
+    )
+
+
+# The email backend connection search alerts are sent through, kept open
+# across tasks by every worker process, and the backend it belongs to.
+search_alert_email_connection: tuple[str, BaseEmailBackend] | None = None
+
+
+def get_search_alert_email_connection() -> BaseEmailBackend:
+    """Get the email backend connection of this worker process, opening it
+    the first time, so all the search alert emails it sends reuse it.
+
+    :return: An open email backend connection.
+    """
+    global search_alert_email_connection
+    if (
+        search_alert_email_connection is None
+        or search_alert_email_connection[0] != settings.EMAIL_BACKEND
+    ):
+        connection = get_connection()
+        connection.open()
+        search_alert_email_connection = (settings.EMAIL_BACKEND, connection)
+    return search_alert_email_connection[1]
+
+
+def reset_search_alert_email_connection() -> None:
+    """Close the email backend connection of this worker process.
+
+    :return: None
+    """
+    global search_alert_email_connection
+    if search_alert_email_connection is None:
+        return
+    _, connection = search_alert_email_connection
+    search_alert_email_connection = None
+    try:
+        connection.close()
+    except Exception:
+        logger.warning("Error closing the search alert email connection.")
 
 
 @app.task(ignore_result=True)
@@ -479,15 +542,19 @@ def send_search_alert_emails(
 
     messages = []
     subject = "New hits for your alerts"
-    txt_template = loader.get_template("alert_email_es.txt")
-    html_template = loader.get_template("alert_email_es.html")
+    txt_template, html_template = get_search_alert_email_templates()
+    users = User.objects.only("email").in_bulk(
+        [user_id for user_id, hits in email_alerts_to_send if hits]
+    )
 
     for email_to_send in email_alerts_to_send:
         user_id, hits = email_to_send
         if not len(hits) > 0:
             continue
 
-        alert_user: UserProfile.user = User.objects.get(pk=user_id)
+        alert_user = users.get(user_id)
+        if not alert_user:
+            continue
         context = {
             "hits": hits,
             "hits_limit": settings.SCHEDULED_ALERT_HITS_LIMIT,
@@ -518,10 +585,22 @@ def send_search_alert_emails(
             headers=headers,
         )
         msg.attach_alternative(html, "text/html")
-        messages.append(msg)
+        messages.append((user_id, msg))
 
-    connection = get_connection()
-    connection.send_messages(messages)
+    for user_id, msg in messages:
+        try:
+            get_search_alert_email_connection().send_messages([msg])
+        except EmergencyBrakeEngaged:
+            # Stop sending when the email quota is about to run out.
+            raise
+        except Exception:
+            # Don't let one failed email drop the alerts of the other users,
+            # their hits are already marked as sent. Open a new connection
+            # for the next email, in case this one broke.
+            logger.exception(
+                "Failed to send the search alert email of user %s.", user_id
+            )
+            reset_search_alert_email_connection()
 
 
 @app.task(ignore_result=True)
@@ -540,25 +619,33 @@ def process_percolator_response(response: PercolatorResponseType) -> None:
     scheduled_hits_to_create = []
     email_alerts_to_send = []
     rt_alerts_to_send = []
+    webhook_hits_by_user: dict[int, list[SearchAlertHitType]] = defaultdict(
+        list
+    )
     alerts_triggered, document_content = response
+    # Fetch all the alerts triggered and their users at once, and count the
+    # hits stored for the scheduled ones in a single query.
+    alerts = Alert.objects.select_related(
+        "user", "user__profile", "user__membership"
+    ).in_bulk([int(hit.meta.id) for hit in alerts_triggered])
+    alerts_hits_limit_reached = get_alerts_hits_limit_reached(
+        alert for alert in alerts.values() if alert.rate != Alert.REAL_TIME
+    )
     for hit in alerts_triggered:
-        # Create a deep copy of the original 'document_content' to allow
-        # independent highlighting for each alert triggered.
-        document_content_copy = copy.deepcopy(document_content)
-
-        alert_triggered = (
-            Alert.objects.filter(pk=hit.meta.id).select_related("user").first()
-        )
+        alert_triggered = alerts.get(int(hit.meta.id))
         if not alert_triggered:
             continue
 
+        # Shallow copy the original 'document_content' to allow independent
+        # highlighting for each alert triggered. The highlights are the only
+        # values that differ between alerts.
+        document_content_copy = {**document_content}
         alert_user: UserProfile.user = alert_triggered.user
         # Set highlight if available in response.
         if hasattr(hit.meta, "highlight"):
-            document_content_copy["meta"] = {}
-            document_content_copy["meta"][
-                "highlight"
-            ] = hit.meta.highlight.to_dict()
+            document_content_copy["meta"] = {
+                "highlight": hit.meta.highlight.to_dict()
+            }
 
         # Override order_by to show the latest items when clicking the
         # "View Full Results" button.
@@ -576,7 +663,7 @@ def process_percolator_response(response: PercolatorResponseType) -> None:
         ]
         # Send real time Webhooks for all users regardless of alert rate and
         # user's donations.
-        send_webhook_alert_hits(alert_user, hits)
+        webhook_hits_by_user[alert_user.pk].extend(hits)
 
         # Send RT Alerts
         if alert_triggered.rate == Alert.REAL_TIME:
@@ -589,9 +676,10 @@ def process_percolator_response(response: PercolatorResponseType) -> None:
 
         else:
             # Schedule DAILY, WEEKLY and MONTHLY Alerts
-            if alert_hits_limit_reached(
-                alert_triggered.pk, alert_triggered.user.pk
-            ):
+            if (
+                alert_triggered.pk,
+                alert_triggered.user.pk,
+            ) in alerts_hits_limit_reached:
                 # Skip storing hits for this alert-user combination because
                 # the SCHEDULED_ALERT_HITS_LIMIT has been reached.
                 continue
@@ -603,6 +691,8 @@ def process_percolator_response(response: PercolatorResponseType) -> None:
                 )
             )
 
+    if webhook_hits_by_user:
+        send_webhook_alert_hits(webhook_hits_by_user)
     # Create scheduled DAILY, WEEKLY and MONTHLY Alerts in bulk.
     if scheduled_hits_to_create:
         ScheduledAlertHit.objects.bulk_create(scheduled_hits_to_create)
@@ -655,6 +745,15 @@ def send_or_schedule_alerts(
         return None
 
     document_id, document_content = response
+    window = settings.ELASTICSEARCH_PERCOLATOR_BATCH_WINDOW
+    if window:
+        # Percolate the document along with the documents indexed in the
+        # next window seconds.
+        if push_percolator_document(document_content):
+            flush_percolator_buffer.apply_async(countdown=window)
+        self.request.chain = None
+        return None
+
     # Perform an initial percolator query and process its response.
     percolator_response = percolate_document(document_id, document_index)
     if not percolator_response:
@@ -675,6 +774,52 @@ def send_or_schedule_alerts(
     return alerts_triggered, document_content
 
 
+@app.task(ignore_result=True)
+def flush_percolator_buffer() -> None:
+    """Percolate the documents buffered by send_or_schedule_alerts, in
+    batches of ELASTICSEARCH_PERCOLATOR_BATCH_SIZE documents.
+
+    :return: None
+    """
+
+    documents = pop_percolator_documents()
+    for batch in batched(
+        documents, settings.ELASTICSEARCH_PERCOLATOR_BATCH_SIZE
+    ):
+        send_or_schedule_alerts_in_batch.delay(list(batch))
+
+
+@app.task(
+    bind=True,
+    autoretry_for=(ConnectionError,),
+    max_retries=3,
+    interval_start=5,
+    ignore_result=True,
+)
+def send_or_schedule_alerts_in_batch(
+    self: Task, documents: list[ESDictDocument]
+) -> None:
+    """Percolate many documents in a single request and process the alerts
+    triggered by every document, see send_or_schedule_alerts.
+
+    :param self: The celery task
+    :param documents: The data of the documents to percolate.
+    :return: None
+    """
+
+    percolator_response = percolate_documents(documents)
+    if not percolator_response:
+        return None
+
+    alerts_triggered = fetch_all_search_results(
+        percolate_documents,
+        percolator_response,
+        documents,
+    )
+    for response in split_percolator_hits(alerts_triggered, documents):
+        process_percolator_response(response)
+
+
 # New task
 @app.task(
     bind=True,
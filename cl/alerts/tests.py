@@ -11,11 +11,14 @@ from django.contrib.auth.hashers import make_password
 from django.contrib.auth.models import User
 from django.core import mail
 from django.core.mail import send_mail
-from django.core.management import call_command
+from django.core.management import CommandError, call_command
+from django.db import connection
 from django.test import AsyncClient, override_settings
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
 from django.utils import timezone
 from django.utils.timezone import now
+from elasticsearch_dsl.response import Hit
 from lxml import html
 from selenium.webdriver.common.by import By
 from timeout_decorator import timeout_decorator
@@ -38,10 +41,17 @@ from cl.alerts.models import (
     ScheduledAlertHit,
 )
 from cl.alerts.tasks import (
+    flush_percolator_buffer,
     get_docket_notes_and_tags_by_user,
+    process_percolator_response,
     send_alert_and_webhook,
+    send_search_alert_emails,
+)
+from cl.alerts.utils import (
+    InvalidDateError,
+    percolate_document,
+    percolate_documents,
 )
-from cl.alerts.utils import InvalidDateError, percolate_document
 from cl.api.factories import WebhookFactory
 from cl.api.models import (
     WEBHOOK_EVENT_STATUS,
@@ -53,6 +63,7 @@ from cl.audio.factories import AudioWithParentsFactory
 from cl.audio.models import Audio
 from cl.donate.models import NeonMembership
 from cl.favorites.factories import NoteFactory, UserTagFactory
+from cl.lib.email_backends import EmergencyBrakeEngaged
 from cl.lib.test_helpers import SimpleUserDataMixin, opinion_v3_search_api_keys
 from cl.people_db.factories import PersonFactory
 from cl.search.documents import AudioDocument, AudioPercolator
@@ -1943,6 +1954,114 @@ class SearchAlertsOAESTests(ESIndexTestCase, TestCase):
         self.assertEqual(r.json()["count"], 1)
         rt_oral_argument.delete()
 
+    def test_process_percolator_response_queries(self, mock_abort_audio):
+        """Confirm the queries run to process the alerts triggered by a
+        document don't grow with the number of alerts triggered.
+        """
+
+        def percolator_hits(alerts):
+            return [
+                Hit({"_id": str(alert.pk), "_source": {}}) for alert in alerts
+            ]
+
+        few_alerts = [self.search_alert, self.search_alert_3]
+        many_alerts = few_alerts + [
+            self.search_alert_2,
+            self.search_alert_5,
+            self.search_alert_6,
+            self.search_alert_7,
+        ]
+        document_content = {"id": 1, "caseName": "Test OA"}
+        with mock.patch(
+            "cl.alerts.tasks.send_search_alert_emails.delay"
+        ), mock.patch(
+            "cl.alerts.tasks.send_es_search_alert_webhooks.delay"
+        ) as mock_webhooks:
+            # Tally the RT alerts stat once, so the runs below update it.
+            process_percolator_response(
+                (percolator_hits(few_alerts), document_content)
+            )
+            with CaptureQueriesContext(connection) as few_alerts_queries:
+                process_percolator_response(
+                    (percolator_hits(few_alerts), document_content)
+                )
+            with CaptureQueriesContext(connection) as many_alerts_queries:
+                process_percolator_response(
+                    (percolator_hits(many_alerts), document_content)
+                )
+
+        self.assertEqual(len(few_alerts_queries), len(many_alerts_queries))
+        # The webhook events of all the alerts of the user with a webhook are
+        # sent at once.
+        webhook_hits = mock_webhooks.call_args.args[0]
+        self.assertEqual(len(webhook_hits), 5)
+        self.assertEqual(
+            {webhook_pk for _, webhook_pk, _ in webhook_hits},
+            {self.webhook_enabled.pk},
+        )
+
+    @override_settings(ELASTICSEARCH_PERCOLATOR_BATCH_WINDOW=5)
+    def test_percolate_documents_in_batch(self, mock_abort_audio):
+        """Confirm the documents indexed in the percolator batch window are
+        percolated in a single request, and the alerts they trigger are
+        sent for every document.
+        """
+
+        with mock.patch(
+            "cl.alerts.tasks.flush_percolator_buffer.apply_async"
+        ) as mock_flush, self.captureOnCommitCallbacks(execute=True):
+            rt_oral_argument = AudioWithParentsFactory.create(
+                case_name="RT Test OA",
+                docket__court=self.court_1,
+                docket__date_argued=now().date(),
+                docket__docket_number="19-5735",
+            )
+            rt_oral_argument_2 = AudioWithParentsFactory.create(
+                case_name="RT Test OA",
+                docket__court=self.court_1,
+                docket__date_argued=now().date(),
+                docket__docket_number="19-5736",
+            )
+        # A single flush is scheduled for both documents.
+        mock_flush.assert_called_once_with(countdown=5)
+        self.assertEqual(len(mail.outbox), 0)
+
+        with mock.patch(
+            "cl.alerts.tasks.percolate_documents",
+            wraps=percolate_documents,
+        ) as mock_percolate, mock.patch(
+            "cl.api.webhooks.requests.post",
+            side_effect=lambda *args, **kwargs: MockResponse(
+                200, mock_raw=True
+            ),
+        ):
+            flush_percolator_buffer()
+        self.assertEqual(mock_percolate.call_count, 1)
+
+        # Both documents trigger search_alert_2, only the first one triggers
+        # search_alert.
+        self.assertEqual(len(mail.outbox), 3)
+        self.assertEqual(
+            [email.to[0] for email in mail.outbox].count(
+                self.user_profile_2.user.email
+            ),
+            2,
+        )
+        # Both documents trigger the daily, weekly and monthly alerts.
+        self.assertEqual(
+            ScheduledAlertHit.objects.filter(
+                alert__in=[
+                    self.search_alert_3,
+                    self.search_alert_5,
+                    self.search_alert_6,
+                ]
+            ).count(),
+            6,
+        )
+
+        rt_oral_argument.delete()
+        rt_oral_argument_2.delete()
+
     def test_send_oa_search_alert_webhooks(self, mock_abort_audio):
         """Can we send RT OA search alerts?"""
 
@@ -2394,6 +2513,126 @@ class SearchAlertsOAESTests(ESIndexTestCase, TestCase):
         wly_oral_argument.delete()
         mly_oral_argument.delete()
 
+    def test_send_scheduled_alerts_in_shards(self, mock_abort_audio):
+        """Confirm scheduled alerts are sent in batches of users, split in
+        shards by user ID, and that only the hits sent are marked as SENT.
+        """
+
+        search_alert_2_daily = AlertFactory(
+            user=self.user_profile_2.user,
+            rate=Alert.DAILY,
+            name="Test Alert OA Daily User 2",
+            query="q=Test+OA&type=oa",
+        )
+        for alert in (self.search_alert_3, search_alert_2_daily):
+            ScheduledAlertHit.objects.create(
+                user=alert.user,
+                alert=alert,
+                document_content={"caseName": "Test OA"},
+            )
+        user_ids = sorted(
+            [self.user_profile.user.pk, self.user_profile_2.user.pk]
+        )
+        with mock.patch(
+            "cl.alerts.management.commands.cl_send_scheduled_alerts.send_search_alert_emails.delay"
+        ) as mock_send:
+            call_command(
+                "cl_send_scheduled_alerts",
+                rate=Alert.DAILY,
+                batch_size=1,
+                shards=2,
+                shard=0,
+            )
+            shard_0_users = [pk for pk in user_ids if pk % 2 == 0]
+            self.assertEqual(
+                [
+                    user_id
+                    for call in mock_send.call_args_list
+                    for user_id, _ in call.args[0]
+                ],
+                shard_0_users,
+            )
+            self.assertEqual(
+                ScheduledAlertHit.objects.filter(
+                    hit_status=SCHEDULED_ALERT_HIT_STATUS.SENT
+                ).count(),
+                len(shard_0_users),
+            )
+
+            call_command(
+                "cl_send_scheduled_alerts",
+                rate=Alert.DAILY,
+                batch_size=1,
+                shards=2,
+                shard=1,
+            )
+
+        self.assertEqual(
+            sorted(
+                user_id
+                for call in mock_send.call_args_list
+                for user_id, _ in call.args[0]
+            ),
+            user_ids,
+        )
+        self.assertFalse(
+            ScheduledAlertHit.objects.filter(
+                hit_status=SCHEDULED_ALERT_HIT_STATUS.SCHEDULED
+            ).exists()
+        )
+
+        with self.assertRaises(CommandError):
+            call_command(
+                "cl_send_scheduled_alerts", rate=Alert.DAILY, batch_size=0
+            )
+
+    @mock.patch("cl.alerts.tasks.logger")
+    @mock.patch("cl.alerts.tasks.reset_search_alert_email_connection")
+    @mock.patch("cl.alerts.tasks.get_search_alert_email_connection")
+    @mock.patch("cl.alerts.tasks.get_search_alert_email_templates")
+    def test_send_search_alert_emails_failure(
+        self,
+        mock_templates,
+        mock_get_connection,
+        mock_reset,
+        mock_logger,
+        mock_abort_audio,
+    ):
+        """Does a failed email leave the emails of the other users in the
+        task unaffected, unless the emergency brake is engaged?
+        """
+        template = mock.MagicMock()
+        template.render.return_value = "Alert"
+        mock_templates.return_value = (template, template)
+        connection = mock_get_connection.return_value
+        connection.send_messages.side_effect = [ValueError("Bad email"), 1]
+        email_alerts_to_send = [
+            (
+                alert.user.pk,
+                [(alert, SEARCH_TYPES.ORAL_ARGUMENT, [{"id": 1}], 1)],
+            )
+            for alert in (self.search_alert, self.search_alert_2)
+        ]
+        send_search_alert_emails(email_alerts_to_send)
+
+        self.assertEqual(connection.send_messages.call_count, 2)
+        self.assertEqual(
+            connection.send_messages.call_args.args[0][0].to,
+            [self.user_profile_2.user.email],
+        )
+        mock_reset.assert_called_once()
+        mock_logger.exception.assert_called_once()
+
+        # The emergency brake stops the emails of the rest of the users.
+        connection.send_messages.reset_mock()
+        connection.send_messages.side_effect = [
+            EmergencyBrakeEngaged("Emergency brake engaged"),
+            1,
+        ]
+        with self.assertRaises(EmergencyBrakeEngaged):
+            send_search_alert_emails(email_alerts_to_send)
+        self.assertEqual(connection.send_messages.call_count, 1)
+
     @mock.patch(
         "cl.alerts.management.commands.cl_send_scheduled_alerts.logger"
     )
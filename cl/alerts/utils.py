@@ -1,21 +1,27 @@
+import json
 from dataclasses import dataclass
-from datetime import date
+from datetime import date, datetime
+from typing import Iterable
 
 from django.conf import settings
+from django.db.models import Count
 from django.http import QueryDict
 from elasticsearch_dsl import Q, Search
-from elasticsearch_dsl.response import Response
+from elasticsearch_dsl.response import Hit, Response
 
 from cl.alerts.models import (
     SCHEDULED_ALERT_HIT_STATUS,
     Alert,
+    DateJSONEncoder,
     DocketAlert,
     ScheduledAlertHit,
 )
 from cl.lib.command_utils import logger
 from cl.lib.elasticsearch_utils import add_es_highlighting
+from cl.lib.redis_utils import get_redis_interface
 from cl.search.documents import AudioPercolator
 from cl.search.models import SEARCH_TYPES, Docket
+from cl.search.types import ESDictDocument, PercolatorResponseType
 from cl.users.models import UserProfile
 
 
@@ -55,6 +61,39 @@ class InvalidDateError(Exception):
     pass
 
 
+PERCOLATOR_BUFFER_KEY = "percolator:buffer"
+PERCOLATOR_FLUSH_SCHEDULED_KEY = "percolator:flush_scheduled"
+
+
+def build_percolator_search(
+    percolate_query: Q, search_after: int = 0
+) -> Search:
+    """Build the search of the alerts matched by a percolate query.
+
+    :param percolate_query: The ES percolate query.
+    :param search_after: The ES search_after param for deep pagination.
+    :return: The ES search.
+    """
+
+    s = Search(index=AudioPercolator._index._name)
+    exclude_rate_off = Q("term", rate=Alert.OFF)
+    final_query = Q(
+        "bool",
+        must=[percolate_query],
+        must_not=[exclude_rate_off],
+    )
+    s = s.query(final_query)
+    s = add_es_highlighting(
+        s, {"type": SEARCH_TYPES.ORAL_ARGUMENT}, alerts=True
+    )
+    s = s.source(excludes=["percolator_query"])
+    s = s.sort("date_created")
+    s = s[: settings.ELASTICSEARCH_PAGINATION_BATCH_SIZE]
+    if search_after:
+        s = s.extra(search_after=search_after)
+    return s
+
+
 def percolate_document(
     document_id: str,
     document_index: str,
@@ -68,29 +107,126 @@ def percolate_document(
     :return: The response from the Elasticsearch query.
     """
 
-    s = Search(index=AudioPercolator._index._name)
     percolate_query = Q(
         "percolate",
         field="percolator_query",
         index=document_index,
         id=document_id,
     )
-    exclude_rate_off = Q("term", rate=Alert.OFF)
-    final_query = Q(
-        "bool",
-        must=[percolate_query],
-        must_not=[exclude_rate_off],
+    return build_percolator_search(percolate_query, search_after).execute()
+
+
+def percolate_documents(
+    documents: list[ESDictDocument],
+    search_after: int = 0,
+) -> Response:
+    """Percolate many documents at once against a defined Elasticsearch
+    Percolator query.
+
+    :param documents: The content of the documents to be percolated.
+    :param search_after: The ES search_after param for deep pagination.
+    :return: The response from the Elasticsearch query. Every hit lists the
+    documents it matched in its _percolator_document_slot field.
+    """
+
+    percolate_query = Q(
+        "percolate",
+        field="percolator_query",
+        documents=documents,
     )
-    s = s.query(final_query)
-    s = add_es_highlighting(
-        s, {"type": SEARCH_TYPES.ORAL_ARGUMENT}, alerts=True
+    return build_percolator_search(percolate_query, search_after).execute()
+
+
+def split_percolator_hits(
+    hits: list[Hit], documents: list[ESDictDocument]
+) -> list[PercolatorResponseType]:
+    """Split the alerts matched by a multi-document percolation by the
+    document they matched.
+
+    :param hits: The alerts returned by percolate_documents.
+    :param documents: The documents percolated.
+    :return: A list of two tuples, the alerts triggered by a document and the
+    document, for every document that triggered an alert.
+    """
+
+    hits_by_slot: list[list[Hit]] = [[] for _ in documents]
+    for hit in hits:
+        highlights = (
+            hit.meta.highlight.to_dict()
+            if hasattr(hit.meta, "highlight")
+            else {}
+        )
+        for slot in hit.meta.fields["_percolator_document_slot"]:
+            document_hit = {"_id": hit.meta.id, "_source": hit.to_dict()}
+            if len(documents) > 1:
+                # The highlighted fields of every document are prefixed
+                # with its slot.
+                prefix = f"{slot}_"
+                highlight = {
+                    field.removeprefix(prefix): fragments
+                    for field, fragments in highlights.items()
+                    if field.startswith(prefix)
+                }
+            else:
+                highlight = highlights
+            if highlight:
+                document_hit["highlight"] = highlight
+            hits_by_slot[slot].append(Hit(document_hit))
+    return [
+        (document_hits, document)
+        for document_hits, document in zip(hits_by_slot, documents)
+        if document_hits
+    ]
+
+
+def json_date_parser(dct):
+    for key, value in dct.items():
+        if isinstance(value, str):
+            try:
+                dct[key] = datetime.fromisoformat(value)
+            except ValueError:
+                pass
+    return dct
+
+
+def push_percolator_document(document_content: ESDictDocument) -> bool:
+    """Push a document to the Redis buffer, to be percolated along with the
+    documents pushed in the next ELASTICSEARCH_PERCOLATOR_BATCH_WINDOW
+    seconds.
+
+    :param document_content: The document data to percolate.
+    :return: True if no flush of the buffer was scheduled yet, so the caller
+    has to schedule it.
+    """
+
+    window = settings.ELASTICSEARCH_PERCOLATOR_BATCH_WINDOW
+    pipe = get_redis_interface("CACHE").pipeline()
+    pipe.rpush(
+        PERCOLATOR_BUFFER_KEY,
+        json.dumps(document_content, cls=DateJSONEncoder),
     )
-    s = s.source(excludes=["percolator_query"])
-    s = s.sort("date_created")
-    s = s[: settings.ELASTICSEARCH_PAGINATION_BATCH_SIZE]
-    if search_after:
-        s = s.extra(search_after=search_after)
-    return s.execute()
+    # Expire the flag in case the flush task is lost, so a new one is
+    # scheduled.
+    pipe.set(PERCOLATOR_FLUSH_SCHEDULED_KEY, 1, nx=True, ex=window * 10)
+    _, schedule_flush = pipe.execute()
+    return bool(schedule_flush)
+
+
+def pop_percolator_documents() -> list[ESDictDocument]:
+    """Pop all the documents in the Redis buffer.
+
+    :return: The documents to percolate, in the order they were pushed.
+    """
+
+    pipe = get_redis_interface("CACHE").pipeline()
+    # Let the next document pushed schedule a new flush.
+    pipe.delete(PERCOLATOR_FLUSH_SCHEDULED_KEY)
+    pipe.lrange(PERCOLATOR_BUFFER_KEY, 0, -1)
+    pipe.delete(PERCOLATOR_BUFFER_KEY)
+    _, buffered, _ = pipe.execute()
+    return [
+        json.loads(data, object_hook=json_date_parser) for data in buffered
+    ]
 
 
 def override_alert_query(
@@ -117,24 +253,32 @@ def override_alert_query(
     return qd
 
 
-def alert_hits_limit_reached(alert_pk: int, user_pk: int) -> bool:
-    """Check if the alert hits limit has been reached for a specific alert-user
-     combination.
+def get_alerts_hits_limit_reached(
+    alerts: Iterable[Alert],
+) -> set[tuple[int, int]]:
+    """Get the alert-user combinations that reached the alert hits limit,
+    counting the stored hits of all the alerts in a single query.
 
-    :param alert_pk: The alert_id.
-    :param user_pk: The user_id.
-    :return: True if the limit has been reached, otherwise False.
+    :param alerts: The alerts to check.
+    :return: A set of (alert_id, user_id) tuples that reached the limit.
     """
 
-    stored_hits = ScheduledAlertHit.objects.filter(
-        alert_id=alert_pk,
-        user_id=user_pk,
-        hit_status=SCHEDULED_ALERT_HIT_STATUS.SCHEDULED,
+    alert_pks = [alert.pk for alert in alerts]
+    if not alert_pks:
+        return set()
+    hits_counts = (
+        ScheduledAlertHit.objects.filter(
+            alert_id__in=alert_pks,
+            hit_status=SCHEDULED_ALERT_HIT_STATUS.SCHEDULED,
+        )
+        .values("alert_id", "user_id")
+        .annotate(hits_count=Count("pk"))
+        .filter(hits_count__gte=settings.SCHEDULED_ALERT_HITS_LIMIT)
     )
-    hits_count = stored_hits.count()
-    if hits_count >= settings.SCHEDULED_ALERT_HITS_LIMIT:
+    limit_reached = set()
+    for hits in hits_counts:
         logger.info(
-            f"Skipping hit for Alert ID: {alert_pk}, there are {hits_count} hits stored for this alert."
+            f"Skipping hit for Alert ID: {hits['alert_id']}, there are {hits['hits_count']} hits stored for this alert."
         )
-        return True
-    return False
+        limit_reached.add((hits["alert_id"], hits["user_id"]))
+    return limit_reached
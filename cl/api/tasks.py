@@ -1,13 +1,14 @@
 import json
 from typing import Any
 
+from django.conf import settings
 from rest_framework.renderers import JSONRenderer
 
 from cl.alerts.api_serializers import SearchAlertSerializerModel
 from cl.alerts.models import Alert
 from cl.api.models import Webhook, WebhookEvent, WebhookEventType
 from cl.api.utils import generate_webhook_key_content
-from cl.api.webhooks import send_webhook_event
+from cl.api.webhooks import send_webhook_event, send_webhook_events
 from cl.celery_init import app
 from cl.corpus_importer.api_serializers import DocketEntrySerializer
 from cl.search.api_serializers import V3OAESResultSerializer
@@ -57,6 +58,8 @@ def send_docket_alert_webhook_events(
     for de in docket_entries:
         serialized_docket_entries.append(DocketEntrySerializer(de).data)
 
+    renderer = JSONRenderer()
+    webhook_events = []
     for webhook in webhooks:
         post_content = {
             "webhook": generate_webhook_key_content(webhook),
@@ -64,7 +67,6 @@ def send_docket_alert_webhook_events(
                 "results": serialized_docket_entries,
             },
         }
-        renderer = JSONRenderer()
         json_bytes = renderer.render(
             post_content,
             accepted_media_type="application/json;",
@@ -74,38 +76,61 @@ def send_docket_alert_webhook_events(
             webhook=webhook,
             content=post_content,
         )
-        send_webhook_event(webhook_event, json_bytes)
+        if not settings.WEBHOOK_ASYNC_DISPATCH:
+            send_webhook_event(webhook_event, json_bytes)
+            continue
+        webhook_events.append((webhook_event, json_bytes))
+    send_webhook_events(webhook_events)
 
 
-@app.task()
-def send_es_search_alert_webhook(
+def build_es_search_alert_webhook_content(
     results: list[dict[str, Any]],
-    webhook_pk: int,
+    webhook: Webhook,
     alert: Alert,
-) -> None:
-    """Send a search alert webhook event containing search results from a
-    search alert object.
+) -> dict[str, Any]:
+    """Build the content of a search alert webhook event.
 
-    :param results: The search results returned by SOLR for this alert.
-    :param webhook_pk: The webhook endpoint ID object to send the event to.
+    :param results: The search results returned by ES for this alert.
+    :param webhook: The webhook endpoint to send the event to.
     :param alert: The search alert object.
+    :return: The webhook event content.
     """
 
-    webhook = Webhook.objects.get(pk=webhook_pk)
     serialized_alert = SearchAlertSerializerModel(alert).data
     es_results = []
     for result in results:
         result["snippet"] = result["text"]
         es_results.append(ResultObject(initial=result))
     serialized_results = V3OAESResultSerializer(es_results, many=True).data
-
-    post_content = {
+    return {
         "webhook": generate_webhook_key_content(webhook),
         "payload": {
             "results": serialized_results,
             "alert": serialized_alert,
         },
     }
+
+
+# Superseded by send_es_search_alert_webhooks. It stays only to drain the
+# messages already queued under this name, and can be removed after that.
+@app.task()
+def send_es_search_alert_webhook(
+    results: list[dict[str, Any]],
+    webhook_pk: int,
+    alert: Alert,
+) -> None:
+    """Send a search alert webhook event containing search results from a
+    search alert object.
+
+    :param results: The search results returned by SOLR for this alert.
+    :param webhook_pk: The webhook endpoint ID object to send the event to.
+    :param alert: The search alert object.
+    """
+
+    webhook = Webhook.objects.get(pk=webhook_pk)
+    post_content = build_es_search_alert_webhook_content(
+        results, webhook, alert
+    )
     renderer = JSONRenderer()
     json_bytes = renderer.render(
         post_content,
@@ -116,3 +141,49 @@ def send_es_search_alert_webhook(
         content=post_content,
     )
     send_webhook_event(webhook_event, json_bytes)
+
+
+@app.task()
+def send_es_search_alert_webhooks(
+    webhook_hits: list[tuple[list[dict[str, Any]], int, Alert]],
+) -> None:
+    """Send the search alert webhook events of many alerts. The webhooks are
+    fetched and the events created in bulk.
+
+    :param webhook_hits: A list of three-tuples: the search results returned
+    by ES for an alert, the webhook endpoint ID to send them to and the
+    search alert object.
+    :return: None
+    """
+
+    webhooks = Webhook.objects.in_bulk(
+        {webhook_pk for _, webhook_pk, _ in webhook_hits}
+    )
+    webhook_events = []
+    for results, webhook_pk, alert in webhook_hits:
+        webhook = webhooks.get(webhook_pk)
+        if not webhook:
+            continue
+        webhook_events.append(
+            WebhookEvent(
+                webhook=webhook,
+                content=build_es_search_alert_webhook_content(
+                    results, webhook, alert
+                ),
+            )
+        )
+    if not webhook_events:
+        return None
+
+    renderer = JSONRenderer()
+    webhook_events_to_send = []
+    for webhook_event in WebhookEvent.objects.bulk_create(webhook_events):
+        json_bytes = renderer.render(
+            webhook_event.content,
+            accepted_media_type="application/json;",
+        )
+        if not settings.WEBHOOK_ASYNC_DISPATCH:
+            send_webhook_event(webhook_event, json_bytes)
+            continue
+        webhook_events_to_send.append((webhook_event, json_bytes))
+    send_webhook_events(webhook_events_to_send)
@@ -5,6 +5,7 @@ from typing import Any, Dict
 from unittest import mock
 from urllib.parse import parse_qs, urlparse
 
+import httpx
 from asgiref.sync import async_to_sync, sync_to_async
 from django.contrib.auth.hashers import make_password
 from django.contrib.auth.models import Permission
@@ -12,7 +13,7 @@ from django.contrib.humanize.templatetags.humanize import intcomma, ordinal
 from django.db import connection
 from django.http import HttpRequest, JsonResponse
 from django.test.client import AsyncClient, AsyncRequestFactory
-from django.test.utils import CaptureQueriesContext
+from django.test.utils import CaptureQueriesContext, override_settings
 from django.urls import reverse
 from django.utils.timezone import now
 from rest_framework.exceptions import NotFound
@@ -25,7 +26,11 @@ from cl.api.factories import WebhookEventFactory, WebhookFactory
 from cl.api.models import WEBHOOK_EVENT_STATUS, WebhookEvent, WebhookEventType
 from cl.api.pagination import VersionBasedPagination
 from cl.api.views import coverage_data
-from cl.api.webhooks import send_webhook_event
+from cl.api.webhooks import (
+    WEBHOOK_CIRCUIT_BREAKER_PREFIX,
+    send_webhook_event,
+    send_webhook_events,
+)
 from cl.audio.api_views import AudioViewSet
 from cl.audio.factories import AudioFactory
 from cl.disclosures.api_views import (
@@ -2155,6 +2160,178 @@ class WebhooksProxySecurityTest(TestCase):
         )
 
 
+@override_settings(
+    WEBHOOK_ASYNC_DISPATCH=True,
+    EGRESS_PROXY_HOSTS=["http://proxy-1:9090", "http://proxy-2:9090"],
+    WEBHOOK_ENDPOINT_CONCURRENCY=1,
+    WEBHOOK_CIRCUIT_BREAKER_THRESHOLD=2,
+)
+class WebhooksAsyncDispatchTest(TestCase):
+    """Test sending webhook events concurrently"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user_profile = UserProfileWithParentsFactory()
+        cls.webhook_ok = WebhookFactory(
+            user=cls.user_profile.user,
+            event_type=WebhookEventType.DOCKET_ALERT,
+            url="https://example.com/ok",
+            enabled=True,
+        )
+        cls.webhook_failing = WebhookFactory(
+            user=cls.user_profile.user,
+            event_type=WebhookEventType.DOCKET_ALERT,
+            url="https://example.com/failing",
+            enabled=True,
+        )
+
+    def setUp(self) -> None:
+        self.r = get_redis_interface("CACHE")
+        self.circuit_keys = [
+            f"{WEBHOOK_CIRCUIT_BREAKER_PREFIX}:{self.webhook_ok.pk}",
+            f"{WEBHOOK_CIRCUIT_BREAKER_PREFIX}:{self.webhook_failing.pk}",
+        ]
+        self.r.delete(*self.circuit_keys)
+
+    def tearDown(self) -> None:
+        self.r.delete(*self.circuit_keys)
+        super().tearDown()
+
+    def test_send_webhook_events(self) -> None:
+        """Are webhook events sent concurrently, their outcome saved in bulk
+        and the events of a failing endpoint held back by its circuit breaker?
+        """
+        sent_requests = []
+
+        def handler(request: httpx.Request) -> httpx.Response:
+            sent_requests.append(request)
+            if request.url.path == "/ok":
+                return httpx.Response(200, text="OK")
+            return httpx.Response(500, text="Server Error")
+
+        webhook_events: list[tuple[WebhookEvent, bytes | None]] = []
+        for webhook in [
+            self.webhook_ok,
+            self.webhook_failing,
+            self.webhook_failing,
+            self.webhook_failing,
+        ]:
+            webhook_event = WebhookEventFactory(
+                webhook=webhook,
+                content={"message": "ok"},
+                event_status=WEBHOOK_EVENT_STATUS.IN_PROGRESS,
+                next_retry_date=None,
+            )
+            webhook_events.append((webhook_event, b'{"message":"ok"}'))
+
+        with (
+            mock.patch(
+                "cl.api.webhooks.get_webhook_transport",
+                side_effect=lambda proxy_host: httpx.MockTransport(handler),
+            ),
+            CaptureQueriesContext(connection) as queries,
+        ):
+            send_webhook_events(webhook_events)
+
+        # The event of the failing endpoint after its circuit breaker opened
+        # isn't sent.
+        self.assertEqual(len(sent_requests), 3)
+        ok_request = next(
+            request for request in sent_requests if request.url.path == "/ok"
+        )
+        self.assertEqual(ok_request.url, "http://example.com/ok")
+        self.assertEqual(ok_request.content, b'{"message":"ok"}')
+        self.assertEqual(
+            ok_request.headers["Idempotency-Key"],
+            str(webhook_events[0][0].event_id),
+        )
+        # The events are updated in a single query.
+        self.assertEqual(
+            len(
+                [
+                    query
+                    for query in queries.captured_queries
+                    if query["sql"].startswith('UPDATE "api_webhookevent"')
+                ]
+            ),
+            1,
+        )
+
+        ok_event, *failing_events = [
+            WebhookEvent.objects.get(pk=webhook_event.pk)
+            for webhook_event, _ in webhook_events
+        ]
+        self.assertEqual(
+            ok_event.event_status, WEBHOOK_EVENT_STATUS.SUCCESSFUL
+        )
+        self.assertEqual(ok_event.status_code, HTTPStatus.OK)
+        self.assertEqual(ok_event.response, "OK")
+        for failing_event in failing_events[:2]:
+            self.assertEqual(
+                failing_event.event_status,
+                WEBHOOK_EVENT_STATUS.ENQUEUED_RETRY,
+            )
+            self.assertEqual(
+                failing_event.status_code, HTTPStatus.INTERNAL_SERVER_ERROR
+            )
+            self.assertEqual(failing_event.retry_counter, 1)
+
+        # The event held back is enqueued for retry without counting as an
+        # attempt.
+        self.assertEqual(
+            failing_events[2].event_status,
+            WEBHOOK_EVENT_STATUS.ENQUEUED_RETRY,
+        )
+        self.assertIsNone(failing_events[2].status_code)
+        self.assertEqual(failing_events[2].retry_counter, 0)
+        self.assertIsNotNone(failing_events[2].next_retry_date)
+
+        # The circuit breaker stays open for the next events.
+        self.assertFalse(self.r.exists(self.circuit_keys[0]))
+        self.assertTrue(self.r.exists(self.circuit_keys[1]))
+
+    def test_send_webhook_events_request_errors(self) -> None:
+        """Is an error raised by a request saved as the error of its event,
+        without failing the other events in the batch?
+        """
+
+        def handler(request: httpx.Request) -> httpx.Response:
+            if request.url.path == "/failing":
+                raise httpx.DecodingError("Malformed response")
+            return httpx.Response(200, text="OK")
+
+        webhook_events: list[tuple[WebhookEvent, bytes | None]] = [
+            (
+                WebhookEventFactory(
+                    webhook=webhook,
+                    content={"message": "ok"},
+                    event_status=WEBHOOK_EVENT_STATUS.IN_PROGRESS,
+                ),
+                None,
+            )
+            for webhook in [self.webhook_failing, self.webhook_ok]
+        ]
+        with mock.patch(
+            "cl.api.webhooks.get_webhook_transport",
+            side_effect=lambda proxy_host: httpx.MockTransport(handler),
+        ):
+            send_webhook_events(webhook_events)
+
+        failing_event, ok_event = [
+            WebhookEvent.objects.get(pk=webhook_event.pk)
+            for webhook_event, _ in webhook_events
+        ]
+        self.assertEqual(
+            failing_event.event_status, WEBHOOK_EVENT_STATUS.ENQUEUED_RETRY
+        )
+        self.assertEqual(
+            failing_event.error_message, "DecodingError: Malformed response"
+        )
+        self.assertEqual(
+            ok_event.event_status, WEBHOOK_EVENT_STATUS.SUCCESSFUL
+        )
+
+
 class WebhooksMilestoneEventsTest(TestCase):
     """Test Webhook milestone events tracking"""
 
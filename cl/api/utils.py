@@ -1,4 +1,6 @@
 import logging
+import math
+import uuid
 from collections import OrderedDict, defaultdict
 from datetime import date, datetime, timedelta, timezone
 from typing import Dict, List, Set, TypedDict, Union
@@ -17,7 +19,6 @@ from django.utils.timezone import now
 from django.views.decorators.cache import cache_page
 from django.views.decorators.vary import vary_on_headers
 from django_ratelimit.core import get_header
-from eyecite.tokenizers import HyperscanTokenizer
 from requests import Response
 from rest_framework import serializers
 from rest_framework.exceptions import Throttled
@@ -29,13 +30,13 @@ from rest_framework_filters import FilterSet, RelatedFilter
 from rest_framework_filters.backends import RestFrameworkFilterBackend
 
 from cl.api.models import WEBHOOK_EVENT_STATUS, Webhook, WebhookEvent
+from cl.citations.tokenizers import HYPERSCAN_TOKENIZER
 from cl.citations.utils import filter_out_non_case_law_and_non_valid_citations
 from cl.lib.redis_utils import get_redis_interface
 from cl.stats.models import Event
 from cl.stats.utils import MILESTONES_FLAT, get_milestone_range
 from cl.users.tasks import notify_failing_webhook
 
-HYPERSCAN_TOKENIZER = HyperscanTokenizer(cache_dir=".hyperscan")
 BOOLEAN_LOOKUPS = ["exact"]
 DATETIME_LOOKUPS = [
     "exact",
@@ -222,8 +223,9 @@ class LoggingMixin:
             request, response, *args, **kwargs
         )
 
-        if not response.exception:
-            # Don't log things like 401, 403, etc.,
+        if not getattr(response, "exception", False):
+            # Don't log things like 401, 403, etc. Streaming responses don't
+            # have the attribute.
             # noinspection PyBroadException
             try:
                 results = self._log_request(request)
@@ -318,12 +320,136 @@ class CacheListMixin:
         return super().list(*args, **kwargs)
 
 
+# Shared by the throttle scripts below. Trims a sorted set of request
+# timestamps to the throttle duration and adds the current request if there's
+# room for it. Returns the timestamp of the oldest request in the window if
+# the request must be throttled, or false otherwise.
+REQUEST_WINDOW_LUA = """
+local function check_request_window(key, now, max_requests, duration, member)
+    redis.call("ZREMRANGEBYSCORE", key, "-inf", now - duration)
+    if redis.call("ZCARD", key) >= max_requests then
+        return redis.call("ZRANGE", key, 0, 0, "WITHSCORES")[2]
+    end
+    redis.call("ZADD", key, now, member)
+    redis.call("EXPIRE", key, math.ceil(duration))
+    return false
+end
+"""
+
+# KEYS[1]: The request count window.
+# ARGV: now, max requests, duration and a unique id for the request.
+REQUEST_THROTTLE_LUA = (
+    REQUEST_WINDOW_LUA
+    + """
+return check_request_window(
+    KEYS[1], tonumber(ARGV[1]), tonumber(ARGV[2]), tonumber(ARGV[3]), ARGV[4]
+)
+"""
+)
+
+CITATION_THROTTLE_CITATIONS_EXCEEDED = 1
+CITATION_THROTTLE_REQUESTS_EXCEEDED = 2
+
+# KEYS[1]: The citation count window, a sorted set of
+#   "<timestamp>:<citation count>:<uuid>" members scored by expiration time.
+# KEYS[2]: The request count window.
+# ARGV: now, citation count, citation expiration, max citations,
+#   max requests (-1 to skip the request window), request window duration
+#   and a unique id for the request.
+CITATION_THROTTLE_LUA = (
+    REQUEST_WINDOW_LUA
+    + """
+local now = tonumber(ARGV[1])
+local citation_count = tonumber(ARGV[2])
+local expiration = tonumber(ARGV[3])
+local max_citations = tonumber(ARGV[4])
+local max_requests = tonumber(ARGV[5])
+local duration = tonumber(ARGV[6])
+local member = ARGV[7]
+
+redis.call("ZREMRANGEBYSCORE", KEYS[1], "-inf", now)
+local entries = redis.call("ZRANGE", KEYS[1], 0, -1, "WITHSCORES")
+local total = 0
+for i = 1, #entries, 2 do
+    total = total + tonumber(string.match(entries[i], "^[^:]+:(%d+):"))
+end
+if total >= max_citations then
+    return {1, entries}
+end
+
+if citation_count > 0 then
+    redis.call(
+        "ZADD", KEYS[1], now + expiration,
+        ARGV[1] .. ":" .. citation_count .. ":" .. member
+    )
+    if redis.call("TTL", KEYS[1]) < expiration then
+        redis.call("EXPIRE", KEYS[1], math.ceil(expiration))
+    end
+end
+
+if max_requests >= 0 then
+    local oldest = check_request_window(
+        KEYS[2], now, max_requests, duration, member
+    )
+    if oldest then
+        return {2, oldest}
+    end
+end
+return {0, 0}
+"""
+)
+request_throttle_script = get_redis_interface("CACHE").register_script(
+    REQUEST_THROTTLE_LUA
+)
+# KEYS[1]: The exported rows window, a sorted set of
+#   "<timestamp>:<row count>:<uuid>" members scored by expiration time.
+# ARGV: now, the max rows, the rows to reserve, the duration and a uuid.
+# Reserves as many of the rows requested as are left in the window.
+# Returns the number of rows in the window before the reservation, the rows
+# reserved and the soonest expiration time.
+EXPORT_ROWS_LUA = """
+redis.call("ZREMRANGEBYSCORE", KEYS[1], "-inf", ARGV[1])
+local entries = redis.call("ZRANGE", KEYS[1], 0, -1, "WITHSCORES")
+local total = 0
+for i = 1, #entries, 2 do
+    total = total + tonumber(string.match(entries[i], "^[^:]+:(%d+):"))
+end
+local reserved = math.min(tonumber(ARGV[3]), tonumber(ARGV[2]) - total)
+if reserved > 0 then
+    redis.call(
+        "ZADD", KEYS[1], ARGV[1] + ARGV[4],
+        ARGV[1] .. ":" .. reserved .. ":" .. ARGV[5]
+    )
+    redis.call("EXPIRE", KEYS[1], math.ceil(tonumber(ARGV[4])))
+else
+    reserved = 0
+end
+return {total, reserved, entries[2] or false}
+"""
+citation_throttle_script = get_redis_interface("CACHE").register_script(
+    CITATION_THROTTLE_LUA
+)
+export_rows_script = get_redis_interface("CACHE").register_script(
+    EXPORT_ROWS_LUA
+)
+
+
 class ExceptionalUserRateThrottle(UserRateThrottle):
-    def allow_request(self, request, view):
+    def set_override_rate(self, request) -> None:
         """
         Give special access to a few special accounts.
+        """
+        override_rate = settings.REST_FRAMEWORK["OVERRIDE_THROTTLE_RATES"].get(
+            request.user.username, None
+        )
+        if override_rate is not None:
+            self.num_requests, self.duration = self.parse_rate(override_rate)
 
-        Mirrors code in super class with minor tweaks.
+    def allow_request(self, request, view):
+        """
+        Mirrors code in super class, but keeps the request history in a
+        Redis sorted set that is trimmed, checked and updated atomically by
+        REQUEST_THROTTLE_LUA in a single round trip.
         """
         if self.rate is None:
             return True
@@ -332,23 +458,28 @@ class ExceptionalUserRateThrottle(UserRateThrottle):
         if self.key is None:
             return True
 
-        self.history = self.cache.get(self.key, [])
         self.now = self.timer()
-
-        # Adjust if user has special privileges.
-        override_rate = settings.REST_FRAMEWORK["OVERRIDE_THROTTLE_RATES"].get(
-            request.user.username, None
+        self.set_override_rate(request)
+        oldest_request = request_throttle_script(
+            keys=[self.key],
+            args=[
+                self.now,
+                self.num_requests,
+                self.duration,
+                uuid.uuid4().hex,
+            ],
         )
-        if override_rate is not None:
-            self.num_requests, self.duration = self.parse_rate(override_rate)
-
-        # Drop any requests from the history which have now passed the
-        # throttle duration
-        while self.history and self.history[-1] <= self.now - self.duration:
-            self.history.pop()
-        if len(self.history) >= self.num_requests:
+        if oldest_request is not None:
+            self.oldest_request = float(oldest_request)
             return self.throttle_failure()
-        return self.throttle_success()
+        return True
+
+    def wait(self):
+        """
+        Returns the recommended number of seconds to wait before the oldest
+        request in the window expires.
+        """
+        return max(self.duration - (self.now - self.oldest_request), 0)
 
 
 class CitationCountRateThrottle(ExceptionalUserRateThrottle):
@@ -406,59 +537,88 @@ class CitationCountRateThrottle(ExceptionalUserRateThrottle):
         ].get(request.user.username, None)
         return custom_rate or default_rate
 
-    def throttle_request_by_citation_count(self, request, view):
-        max_num_citations, _ = self.parse_rate(
-            self.get_citations_rate(request)
-        )
-
-        self.key = self.get_cache_key_for_citations(request, view)
-        self.history = self.cache.get(self.key, [])
-        self.request_timestamp = self.timer()
-
-        # Drop any requests from the history which have now passed the
-        # throttle duration
-        while self.history and self.history[-1][-1] <= self.request_timestamp:
-            self.history.pop()
-
-        citations_in_history = sum(
-            citation_count for citation_count, timestamps in self.history
-        )
-
-        if citations_in_history >= max_num_citations:
-            self.throttle_request(request)
+    def get_citation_expiration(self, request, citation_count: int) -> float:
+        """
+        Computes how long the citations of a request count against the rate
+        limit. Requests with more citations than allowed by the rate limit
+        are kept in the history proportionally longer.
 
-        self.save_citation_count(request, view)
+        Args:
+            request: The request object with the user's data.
+            citation_count (int): The number of citations in the request.
 
-    def save_citation_count(self, request, view):
-        """
-        Inserts the number of citations and the expiration time along with
-        the key into the cache.
+        Returns:
+            float: The number of seconds the citations count against the
+            rate limit.
         """
-        citation_count = self.get_citation_count_from_request(request, view)
-        if not citation_count:
-            return
-
         max_num_citations, duration = self.parse_rate(
             self.get_citations_rate(request)
         )
-        expiration = (
+        return (
             citation_count * (duration / max_num_citations)
             if citation_count > max_num_citations
             else duration
         )
-        self.history.insert(
-            0,
-            [
-                citation_count,
-                self.request_timestamp + expiration,
-            ],
+
+    def allow_request(self, request, view):
+        """
+        Checks the citation count and the request count windows in a single
+        atomic round trip to Redis.
+
+        The citation count window is stored in a sorted set scored by the
+        expiration time of each request, and the request count window in a
+        sorted set scored by the time of each request. Both are trimmed,
+        checked and updated by CITATION_THROTTLE_LUA, so concurrent
+        requests from the same user can't lose updates.
+
+        Raises:
+            Throttled: If the user exceeded the citation count rate limit.
+        """
+        max_num_citations, _ = self.parse_rate(
+            self.get_citations_rate(request)
         )
+        citation_count = self.get_citation_count_from_request(request, view)
+        self.key = self.get_cache_key_for_citations(request, view)
+        self.now = self.timer()
 
-        self.cache.set(self.key, self.history, expiration)
+        requests_key = self.get_cache_key(request, view)
+        if self.rate is None or requests_key is None:
+            # Only throttle by citation count.
+            requests_key, num_requests = self.key, -1
+        else:
+            self.set_override_rate(request)
+            num_requests = self.num_requests
 
-    def allow_request(self, request, view):
-        self.throttle_request_by_citation_count(request, view)
-        return super().allow_request(request, view)
+        status, data = citation_throttle_script(
+            keys=[self.key, requests_key],
+            args=[
+                self.now,
+                citation_count,
+                self.get_citation_expiration(request, citation_count),
+                max_num_citations,
+                num_requests,
+                self.duration if num_requests >= 0 else 0,
+                uuid.uuid4().hex,
+            ],
+        )
+        if status == CITATION_THROTTLE_CITATIONS_EXCEEDED:
+            # Entries are returned as [member, expiration] pairs. Rebuild the
+            # history from newest to oldest request.
+            entries = []
+            for member, expiration in zip(data[::2], data[1::2]):
+                timestamp, count, _ = member.split(":")
+                entries.append(
+                    (float(timestamp), int(count), float(expiration))
+                )
+            entries.sort(reverse=True)
+            self.history = [
+                [count, expiration] for _, count, expiration in entries
+            ]
+            self.throttle_request(request)
+        if status == CITATION_THROTTLE_REQUESTS_EXCEEDED:
+            self.oldest_request = float(data)
+            return self.throttle_failure()
+        return True
 
     def throttle_request(self, request):
         """
@@ -500,6 +660,118 @@ class CitationCountRateThrottle(ExceptionalUserRateThrottle):
         )
 
 
+class ExportRowRateThrottle(ExceptionalUserRateThrottle):
+    """
+    Limits the number of search results users can export, instead of the
+    number of requests they make, since a single export request can stream
+    the whole result set of a search.
+
+    Requests are allowed while the user has rows left in the window. The
+    throttle is stored in the view, which reserves the rows of every batch
+    with reserve_rows before fetching it and stops the export when none are
+    left, so concurrent exports share the rows left.
+    """
+
+    scope = "export_rows"
+
+    def set_override_rate(self, request) -> None:
+        override_rate = settings.REST_FRAMEWORK[
+            "EXPORT_ROWS_OVERRIDE_THROTTLE_RATES"
+        ].get(request.user.username, None)
+        if override_rate is not None:
+            self.num_requests, self.duration = self.parse_rate(override_rate)
+
+    def run_export_rows_script(
+        self, row_count: int
+    ) -> tuple[int, int, float, str]:
+        """Trim and sum the rows exported by the user in the window and
+        reserve some more, atomically with EXPORT_ROWS_LUA.
+
+        :param row_count: The number of rows to reserve.
+        :return: A four-tuple: the rows in the window before the reservation,
+        the rows reserved, the soonest expiration time in the window or 0 if
+        it's empty, and the member of the reservation in the window.
+        """
+        now = self.timer()
+        reservation_id = uuid.uuid4().hex
+        exported_rows, reserved, soonest_expiration = export_rows_script(
+            keys=[self.key],
+            args=[
+                now,
+                self.num_requests,
+                row_count,
+                self.duration,
+                reservation_id,
+            ],
+        )
+        return (
+            int(exported_rows),
+            int(reserved),
+            float(soonest_expiration or 0),
+            f"{now}:{reserved}:{reservation_id}",
+        )
+
+    def allow_request(self, request, view):
+        """
+        Checks the rows exported by the user in the window, trimmed and
+        summed by EXPORT_ROWS_LUA in a single round trip to Redis.
+        """
+        if self.rate is None:
+            return True
+
+        self.key = self.get_cache_key(request, view)
+        if self.key is None:
+            return True
+
+        self.now = self.timer()
+        self.set_override_rate(request)
+        exported_rows, _, soonest_expiration, _ = self.run_export_rows_script(
+            0
+        )
+        if exported_rows >= self.num_requests:
+            # The rows of the oldest export count until it expires.
+            self.oldest_request = soonest_expiration - self.duration
+            return self.throttle_failure()
+        view.export_throttle = self
+        return True
+
+    def reserve_rows(self, row_count: int) -> tuple[int, str]:
+        """Reserve rows to export against the rate limit of the user.
+
+        :param row_count: The number of rows to reserve.
+        :return: A two-tuple: the number of rows reserved, fewer than the
+        rows requested or 0 if the user is running out of them, and the
+        reservation to pass to release_rows.
+        """
+        if self.rate is None or self.key is None:
+            return row_count, ""
+        _, reserved, _, reservation = self.run_export_rows_script(row_count)
+        return reserved, reservation
+
+    def release_rows(self, reservation: str, rows_used: int) -> None:
+        """Give back the reserved rows that weren't exported.
+
+        :param reservation: The reservation returned by reserve_rows.
+        :param rows_used: The number of reserved rows that were exported.
+        :return: None
+        """
+        if not reservation:
+            return
+        reserved_at, reserved, reservation_id = reservation.split(":")
+        if rows_used >= int(reserved):
+            return
+        r = get_redis_interface("CACHE")
+        expiration = r.zscore(self.key, reservation)
+        pipe = r.pipeline()
+        pipe.zrem(self.key, reservation)
+        if rows_used and expiration is not None:
+            pipe.zadd(
+                self.key,
+                {f"{reserved_at}:{rows_used}:{reservation_id}": expiration},
+            )
+        pipe.execute()
+
+
 class RECAPUsersReadOnly(DjangoModelPermissions):
     """Provides access to users with the right permissions.
 
@@ -819,7 +1091,6 @@ def update_webhook_event_after_request(
     :return: None
     """
 
-    failed_request = False
     data = ""
     status_code = None
     if response is not None:
@@ -831,10 +1102,32 @@ def update_webhook_event_after_request(
             break
         response.close()
         status_code = response.status_code
-        # If the response status code is not 2xx. It's considered a failed
-        # attempt, and it'll be enqueued for retry.
-        if not 200 <= response.status_code < 300:
-            failed_request = True
+    set_webhook_event_result(webhook_event, status_code, data, error)
+    webhook_event.save()
+
+
+def set_webhook_event_result(
+    webhook_event: WebhookEvent,
+    status_code: int | None,
+    data: str,
+    error: str | None = "",
+) -> None:
+    """Set the outcome of a webhook event request on the event without saving
+    it, so events sent together can be saved in bulk. Failures increase the
+    parent webhook failure count and successes are logged, as in
+    update_webhook_event_after_request.
+
+    :param webhook_event: The WebhookEvent to update.
+    :param status_code: The HTTP status code of the response, or None if no
+    response was received.
+    :param data: The first chunk of the response body.
+    :param error: Optional, the error raised if no response was received.
+    :return: None
+    """
+
+    # If the response status code is not 2xx. It's considered a failed
+    # attempt, and it'll be enqueued for retry.
+    failed_request = status_code is not None and not 200 <= status_code < 300
     webhook_event.status_code = status_code
     webhook_event.response = data
 
@@ -847,7 +1140,6 @@ def update_webhook_event_after_request(
             # If the webhook has reached the max retry counter, mark as failed
             webhook_event.event_status = WEBHOOK_EVENT_STATUS.FAILED
             webhook_event.retry_counter = F("retry_counter") + 1
-            webhook_event.save()
             return
 
         webhook_event.next_retry_date = get_next_webhook_retry_date(
@@ -864,7 +1156,6 @@ def update_webhook_event_after_request(
             # Only log successful webhook events and not debug.
             results = log_webhook_event(webhook_event.webhook.user.pk)
             handle_webhook_events(results, webhook_event.webhook.user)
-    webhook_event.save()
 
 
 class WebhookKeyType(TypedDict):
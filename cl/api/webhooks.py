@@ -1,8 +1,15 @@
-import json
+import asyncio
 import random
+from collections import defaultdict
+from contextlib import AsyncExitStack
+from datetime import timedelta
+from typing import Sequence
 
+import httpx
 import requests
+from asgiref.sync import async_to_sync
 from django.conf import settings
+from django.utils.timezone import now
 from elasticsearch_dsl.response import Response
 from rest_framework.renderers import JSONRenderer
 from scorched.response import SolrResponse
@@ -13,11 +20,18 @@ from cl.alerts.api_serializers import (
 )
 from cl.alerts.models import Alert
 from cl.alerts.utils import OldAlertReport
-from cl.api.models import Webhook, WebhookEvent, WebhookEventType
+from cl.api.models import (
+    WEBHOOK_EVENT_STATUS,
+    Webhook,
+    WebhookEvent,
+    WebhookEventType,
+)
 from cl.api.utils import (
     generate_webhook_key_content,
+    set_webhook_event_result,
     update_webhook_event_after_request,
 )
+from cl.lib.redis_utils import get_redis_interface
 from cl.lib.scorched_utils import ExtraSolrInterface
 from cl.lib.string_utils import trunc
 from cl.recap.api_serializers import PacerFetchQueueSerializer
@@ -28,6 +42,57 @@ from cl.search.api_serializers import (
 )
 from cl.search.api_utils import ResultObject
 
+WEBHOOK_CIRCUIT_BREAKER_PREFIX = "webhook:circuit_open"
+
+
+def get_webhook_event_payload(
+    webhook_event: WebhookEvent, content_bytes: bytes | None = None
+) -> bytes:
+    """Get the JSON bytes to POST for a webhook event. The bytes rendered when
+    the event was created are sent as they are, rather than parsed and
+    serialized again.
+
+    :param webhook_event: The WebhookEvent to send.
+    :param content_bytes: Optional, the bytes JSON content to send the first
+    time the webhook is sent.
+    :return: The JSON bytes to POST.
+    """
+    if not webhook_event.content:
+        raise ValueError("Webhook payload is empty.")
+    if content_bytes:
+        return content_bytes
+    renderer = JSONRenderer()
+    return renderer.render(
+        webhook_event.content,
+        accepted_media_type="application/json;",
+    )
+
+
+def get_webhook_event_headers(webhook_event: WebhookEvent) -> dict[str, str]:
+    """Get the headers of the POST request of a webhook event.
+
+    :param webhook_event: The WebhookEvent to send.
+    :return: The request headers.
+    """
+    return {
+        "Content-type": "application/json",
+        "Idempotency-Key": str(webhook_event.event_id),
+        "X-WhSentry-TLS": "true",
+    }
+
+
+def get_webhook_proxy_url(url: str) -> str:
+    """Get the URL to POST a webhook event to through webhook-sentry.
+
+    To send a POST to an HTTPS target and using webhook-sentry as proxy,
+    you needed to change the protocol to HTTP and set the X-WhSentry-TLS
+    header to true. See https://github.com/juggernaut/webhook-sentry#https-target
+
+    :param url: The webhook endpoint URL.
+    :return: The URL to POST to.
+    """
+    return url.replace("https://", "http://")
+
 
 def send_webhook_event(
     webhook_event: WebhookEvent, content_bytes: bytes | None = None
@@ -41,34 +106,14 @@ def send_webhook_event(
     proxy_server = {
         "http": random.choice(settings.EGRESS_PROXY_HOSTS),  # type: ignore
     }
-    headers = {
-        "Content-type": "application/json",
-        "Idempotency-Key": str(webhook_event.event_id),
-        "X-WhSentry-TLS": "true",
-    }
-    if content_bytes:
-        json_bytes = content_bytes
-    else:
-        renderer = JSONRenderer()
-        json_bytes = renderer.render(
-            webhook_event.content,
-            accepted_media_type="application/json;",
-        )
-
-    json_data = json.loads(json_bytes)
-    if json_data == {}:
-        raise ValueError("Webhook payload is empty.")
+    json_bytes = get_webhook_event_payload(webhook_event, content_bytes)
     try:
-        # To send a POST to an HTTPS target and using webhook-sentry as proxy,
-        # you needed to change the protocol to HTTP and set the X-WhSentry-TLS
-        # header to true. See https://github.com/juggernaut/webhook-sentry#https-target
-        url = webhook_event.webhook.url.replace("https://", "http://")
         response = requests.post(
-            url,
+            get_webhook_proxy_url(webhook_event.webhook.url),
             proxies=proxy_server,
-            json=json_data,
+            data=json_bytes,
             timeout=(3, 3),
-            headers=headers,
+            headers=get_webhook_event_headers(webhook_event),
             allow_redirects=False,
         )
         update_webhook_event_after_request(webhook_event, response)
@@ -78,6 +123,208 @@ def send_webhook_event(
         update_webhook_event_after_request(webhook_event, error=error_str)
 
 
+def get_webhook_transport(proxy_host: str) -> httpx.AsyncBaseTransport:
+    """Get the pooled transport of the async client of an egress proxy.
+
+    :param proxy_host: The egress proxy URL.
+    :return: An async transport through the proxy.
+    """
+    return httpx.AsyncHTTPTransport(
+        proxy=proxy_host,
+        limits=httpx.Limits(max_connections=settings.WEBHOOK_MAX_CONNECTIONS),
+    )
+
+
+async def post_webhook_events(
+    webhook_requests: list[tuple[int, str, dict[str, str], bytes]],
+    open_circuits: set[int],
+) -> tuple[list[tuple[int | None, str, str] | None], set[int]]:
+    """POST webhook events concurrently, with a client per egress proxy. The
+    requests to every endpoint are limited to WEBHOOK_ENDPOINT_CONCURRENCY at a
+    time, and an endpoint's circuit breaker opens after
+    WEBHOOK_CIRCUIT_BREAKER_THRESHOLD consecutive failures, so a slow or
+    failing endpoint doesn't hold up the events of the others.
+
+    This only makes HTTP requests, the events are updated by the caller.
+
+    :param webhook_requests: A list of four-tuples: the webhook ID, the URL,
+    the headers and the JSON bytes of every request.
+    :param open_circuits: The IDs of the webhooks whose circuit breaker is
+    already open. Their events aren't sent.
+    :return: A two-tuple: a list with the result of every event, in order,
+    and the IDs of the webhooks whose circuit breaker opened. The result of an
+    event is a three-tuple of the response status code, the first chunk of
+    the response and the request error, or None if it wasn't sent because
+    the circuit breaker of its webhook is open.
+    """
+
+    endpoint_limits: defaultdict[int, asyncio.Semaphore] = defaultdict(
+        lambda: asyncio.Semaphore(settings.WEBHOOK_ENDPOINT_CONCURRENCY)
+    )
+    consecutive_failures: defaultdict[int, int] = defaultdict(int)
+    tripped_circuits: set[int] = set()
+
+    async def post_webhook_event(
+        client: httpx.AsyncClient,
+        webhook_id: int,
+        url: str,
+        headers: dict[str, str],
+        json_bytes: bytes,
+    ) -> tuple[int | None, str, str] | None:
+        async with endpoint_limits[webhook_id]:
+            if webhook_id in open_circuits or webhook_id in tripped_circuits:
+                return None
+            status_code, data, error = None, "", ""
+            try:
+                async with client.stream(
+                    "POST", url, content=json_bytes, headers=headers
+                ) as response:
+                    status_code = response.status_code
+                    # Only read and store the first 4KB of the response.
+                    async for chunk in response.aiter_text(1024 * 4):
+                        data = chunk
+                        break
+            except (httpx.HTTPError, httpx.InvalidURL) as exc:
+                # Recorded as the error of the event, so the outcome of the
+                # other events in the batch is still saved.
+                error = trunc(f"{type(exc).__name__}: {exc}", 500)
+
+            if error or not 200 <= status_code < 300:  # type: ignore
+                consecutive_failures[webhook_id] += 1
+                if (
+                    consecutive_failures[webhook_id]
+                    >= settings.WEBHOOK_CIRCUIT_BREAKER_THRESHOLD
+                ):
+                    tripped_circuits.add(webhook_id)
+            else:
+                consecutive_failures[webhook_id] = 0
+            return status_code, data, error
+
+    async with AsyncExitStack() as stack:
+        clients = [
+            await stack.enter_async_context(
+                httpx.AsyncClient(
+                    transport=get_webhook_transport(proxy_host),
+                    timeout=httpx.Timeout(3),
+                    follow_redirects=False,
+                )
+            )
+            for proxy_host in settings.EGRESS_PROXY_HOSTS
+        ]
+        results = await asyncio.gather(
+            *(
+                post_webhook_event(random.choice(clients), *webhook_request)
+                for webhook_request in webhook_requests
+            )
+        )
+    return results, tripped_circuits
+
+
+def get_open_webhook_circuits(webhook_ids: set[int]) -> set[int]:
+    """Get the webhooks whose circuit breaker is open.
+
+    :param webhook_ids: The IDs of the webhooks to check.
+    :return: The IDs of the webhooks with an open circuit breaker.
+    """
+    if not webhook_ids:
+        return set()
+    webhook_ids_list = list(webhook_ids)
+    r = get_redis_interface("CACHE")
+    circuits = r.mget(
+        [
+            f"{WEBHOOK_CIRCUIT_BREAKER_PREFIX}:{webhook_id}"
+            for webhook_id in webhook_ids_list
+        ]
+    )
+    return {
+        webhook_id
+        for webhook_id, circuit in zip(webhook_ids_list, circuits)
+        if circuit
+    }
+
+
+def open_webhook_circuits(webhook_ids: set[int]) -> None:
+    """Open the circuit breaker of webhooks for
+    WEBHOOK_CIRCUIT_BREAKER_COOLDOWN seconds.
+
+    :param webhook_ids: The IDs of the webhooks.
+    :return: None
+    """
+    if not webhook_ids:
+        return None
+    r = get_redis_interface("CACHE")
+    pipe = r.pipeline()
+    for webhook_id in webhook_ids:
+        pipe.set(
+            f"{WEBHOOK_CIRCUIT_BREAKER_PREFIX}:{webhook_id}",
+            "True",
+            ex=settings.WEBHOOK_CIRCUIT_BREAKER_COOLDOWN,
+        )
+    pipe.execute()
+
+
+def send_webhook_events(
+    webhook_events: Sequence[tuple[WebhookEvent, bytes | None]],
+) -> None:
+    """Send many webhook events concurrently and save their outcome in bulk.
+
+    The events of webhooks whose circuit breaker is open aren't sent. They're
+    enqueued for retry after the cool down, without counting as an attempt.
+
+    :param webhook_events: A list of two-tuples: the WebhookEvent to send and
+    optionally the bytes JSON content to send the first time it's sent.
+    :return: None
+    """
+    if not webhook_events:
+        return None
+
+    webhook_requests = [
+        (
+            webhook_event.webhook_id,
+            get_webhook_proxy_url(webhook_event.webhook.url),
+            get_webhook_event_headers(webhook_event),
+            get_webhook_event_payload(webhook_event, content_bytes),
+        )
+        for webhook_event, content_bytes in webhook_events
+    ]
+    open_circuits = get_open_webhook_circuits(
+        {webhook_event.webhook_id for webhook_event, _ in webhook_events}
+    )
+    results, tripped_circuits = async_to_sync(post_webhook_events)(
+        webhook_requests, open_circuits
+    )
+    open_webhook_circuits(tripped_circuits)
+
+    date_modified = now()
+    events_to_update = []
+    for (webhook_event, _), result in zip(webhook_events, results):
+        if result is None:
+            webhook_event.error_message = (
+                "Not sent, the endpoint is failing. Enqueued for retry."
+            )
+            webhook_event.event_status = WEBHOOK_EVENT_STATUS.ENQUEUED_RETRY
+            webhook_event.next_retry_date = date_modified + timedelta(
+                seconds=settings.WEBHOOK_CIRCUIT_BREAKER_COOLDOWN
+            )
+        else:
+            set_webhook_event_result(webhook_event, *result)
+        webhook_event.date_modified = date_modified
+        events_to_update.append(webhook_event)
+
+    WebhookEvent.objects.bulk_update(
+        events_to_update,
+        [
+            "event_status",
+            "status_code",
+            "response",
+            "error_message",
+            "next_retry_date",
+            "retry_counter",
+            "date_modified",
+        ],
+    )
+
+
 def send_old_alerts_webhook_event(
     webhook: Webhook, report: OldAlertReport
 ) -> None:
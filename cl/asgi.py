@@ -5,3 +5,9 @@ from django.core.asgi import get_asgi_application
 os.environ.setdefault("DJANGO_SETTINGS_MODULE", "cl.settings")
 
 application = get_asgi_application()
+
+# Load the citation tokenizer when the worker boots, instead of on the first
+# request that extracts citations.
+from cl.citations.tokenizers import warm_hyperscan_tokenizer  # noqa: E402
+
+warm_hyperscan_tokenizer()
@@ -2,6 +2,7 @@ import os
 import sys
 
 from celery import Celery
+from celery.signals import worker_init
 
 from cl.lib.celery_utils import throttle_task
 
@@ -20,6 +21,16 @@ app.config_from_object("django.conf:settings", namespace="CELERY")
 app.autodiscover_tasks()
 
 
+@worker_init.connect
+def warm_tokenizer(**kwargs) -> None:
+    """Load the citation tokenizer before the pool forks, so every worker
+    process inherits it instead of loading it on its first citation task.
+    """
+    from cl.citations.tokenizers import warm_hyperscan_tokenizer
+
+    warm_hyperscan_tokenizer()
+
+
 @app.task(bind=True)
 @throttle_task("2/4s")
 def debug_task(self) -> None:
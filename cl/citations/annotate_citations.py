@@ -7,6 +7,27 @@ from cl.citations.match_citations import NO_MATCH_RESOURCE
 from cl.citations.types import MatchedResourceType, SupportedCitationType
 from cl.search.models import Opinion, RECAPDocument
 
+# The HTML versions of an opinion's text, from the most to the least preferred
+# one. The plain text is used when none of them is available.
+OPINION_HTML_FIELDS = [
+    "html_anon_2020",
+    "html_columbia",
+    "html_lawbox",
+    "html",
+]
+
+
+def clean_opinion_text(text: str, is_html: bool) -> str:
+    """Clean an opinion's text the way citation extraction expects it.
+
+    :param text: The source text of the opinion
+    :param is_html: Whether the text is HTML
+    :return: The cleaned text
+    """
+    if is_html:
+        return clean_text(text, ["html", "all_whitespace"])
+    return clean_text(text, ["all_whitespace"])
+
 
 def get_and_clean_opinion_text(document: Opinion | RECAPDocument) -> None:
     """Memoize useful versions of an opinion's text as additional properties
@@ -15,20 +36,18 @@ def get_and_clean_opinion_text(document: Opinion | RECAPDocument) -> None:
 
     :param document: The Opinion or RECAPDocument whose text should be parsed
     """
-    for attr in ["html_anon_2020", "html_columbia", "html_lawbox", "html"]:
+    for attr in OPINION_HTML_FIELDS:
         text = getattr(document, attr, None)
         if text:
             document.source_text = text
-            document.cleaned_text = clean_text(
-                text, ["html", "all_whitespace"]
-            )
+            document.cleaned_text = clean_opinion_text(text, is_html=True)
             document.source_is_html = True
             break
     else:
         # Didn't hit the break; use plain text
         text = getattr(document, "plain_text")
         document.source_text = text
-        document.cleaned_text = clean_text(text, ["all_whitespace"])
+        document.cleaned_text = clean_opinion_text(text, is_html=False)
         document.source_is_html = False
 
 
@@ -72,21 +91,43 @@ def create_cited_html(
     :param citation_resolutions: A map of lists of citations in the opinion
     :return The new HTML containing citations
     """
-    if opinion.source_is_html:  # If opinion was originally HTML...
+    return annotate_opinion_text(
+        opinion.source_text,
+        opinion.cleaned_text,
+        opinion.source_is_html,
+        generate_annotations(citation_resolutions),
+    )
+
+
+def annotate_opinion_text(
+    source_text: str,
+    cleaned_text: str,
+    source_is_html: bool,
+    annotations: List[List],
+) -> str:
+    """Insert the citation annotations into an opinion's text.
+
+    :param source_text: The source text of the opinion
+    :param cleaned_text: The cleaned text the citations were found in
+    :param source_is_html: Whether the source text is HTML
+    :param annotations: The annotations from generate_annotations
+    :return The new HTML containing citations
+    """
+    if source_is_html:  # If opinion was originally HTML...
         new_html = annotate_citations(
-            plain_text=opinion.cleaned_text,
-            annotations=generate_annotations(citation_resolutions),
-            source_text=opinion.source_text,
+            plain_text=cleaned_text,
+            annotations=annotations,
+            source_text=source_text,
             unbalanced_tags="skip",  # Don't risk overwriting existing tags
         )
     else:  # Else, present `source_text` wrapped in <pre> HTML tags...
         new_html = annotate_citations(
-            plain_text=opinion.cleaned_text,
+            plain_text=cleaned_text,
             annotations=[
                 [a[0], f"</pre>{a[1]}", f'{a[2]}<pre class="inline">']
-                for a in generate_annotations(citation_resolutions)
+                for a in annotations
             ],
-            source_text=f'<pre class="inline">{html.escape(opinion.source_text)}</pre>',
+            source_text=f'<pre class="inline">{html.escape(source_text)}</pre>',
         )
 
     # Return the newly-annotated text
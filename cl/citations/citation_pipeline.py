@@ -0,0 +1,369 @@
+"""A pipeline to find the citations of many opinions at once, used by the
+find_citations command to re-run the citator over large parts of the corpus.
+
+Opinions are processed in batches, in pk order. For every batch:
+
+ 1. Only the text field that citation extraction will use is loaded.
+ 2. The texts are cleaned and their citations extracted in a process pool,
+    while the previous batch is still being resolved and stored.
+ 3. The citations are resolved in the main process, since that needs the DB.
+ 4. The citation links are inserted in the opinions' HTML in the pool.
+ 5. The OpinionsCited and Parenthetical rows of the whole batch are written
+    with COPY in a single transaction.
+
+The last opinion id of every stored batch is checkpointed in Redis, so a
+crashed run can be resumed from there.
+"""
+
+import logging
+import multiprocessing
+from collections import Counter, defaultdict
+from concurrent.futures import Executor, ProcessPoolExecutor
+from typing import Any, Callable, Iterable, Iterator, List, Tuple
+
+from django.db import connection, connections, transaction
+from django.db.models import Case, F, Model, QuerySet, TextField, Value, When
+from django.db.models.functions import Coalesce, NullIf
+from django.utils.timezone import now
+from eyecite import get_citations
+from eyecite.models import CitationBase
+
+from cl.citations.annotate_citations import (
+    OPINION_HTML_FIELDS,
+    annotate_opinion_text,
+    clean_opinion_text,
+    generate_annotations,
+)
+from cl.citations.tasks import (
+    OpinionCitationChanges,
+    get_opinion_citation_changes,
+    schedule_parenthetical_regroup,
+)
+from cl.citations.tokenizers import (
+    HYPERSCAN_TOKENIZER,
+    warm_hyperscan_tokenizer,
+)
+from cl.citations.utils import mark_citing_opinion_for_pagerank
+from cl.lib.redis_utils import get_redis_interface
+from cl.search.models import (
+    Opinion,
+    OpinionCluster,
+    OpinionsCited,
+    Parenthetical,
+)
+from cl.search.tasks import add_items_to_solr, index_related_cites_fields
+
+logger = logging.getLogger(__name__)
+
+CHECKPOINT_KEY = "find_citations:pipeline_checkpoint"
+# The number of opinions sent to a worker at a time.
+POOL_CHUNK_SIZE = 10
+
+
+def get_opinion_batch(
+    query: QuerySet, after_pk: int, batch_size: int
+) -> List[Opinion]:
+    """Load a batch of opinions with only the text that citation extraction
+    will use, picked in the same order as get_and_clean_opinion_text does.
+
+    :param query: The Opinion queryset to process.
+    :param after_pk: Only load opinions with a greater pk than this.
+    :param batch_size: The maximum number of opinions to load.
+    :return: A list of opinions with source_html and source_plain set. The
+    former is None when the opinion has no HTML.
+    """
+    source_html = Coalesce(
+        *(NullIf(field, Value("")) for field in OPINION_HTML_FIELDS),
+        output_field=TextField(),
+    )
+    return list(
+        query.filter(pk__gt=after_pk)
+        .select_related("cluster")
+        .only("pk", "cluster")
+        .annotate(source_html=source_html)
+        .annotate(
+            source_plain=Case(
+                When(source_html__isnull=True, then=F("plain_text")),
+                default=Value(""),
+                output_field=TextField(),
+            )
+        )
+        .order_by("pk")[:batch_size]
+    )
+
+
+def extract_citations(
+    source_html: str | None, source_plain: str
+) -> Tuple[str, List[CitationBase]]:
+    """Clean an opinion's text and extract its citations. Runs in the pool.
+
+    :param source_html: The HTML of the opinion, if any.
+    :param source_plain: The plain text of the opinion.
+    :return: A two tuple, the cleaned text and the citations found in it.
+    """
+    if source_html is not None:
+        cleaned_text = clean_opinion_text(source_html, is_html=True)
+    else:
+        cleaned_text = clean_opinion_text(source_plain, is_html=False)
+    return cleaned_text, get_citations(
+        cleaned_text, tokenizer=HYPERSCAN_TOKENIZER
+    )
+
+
+def pool_map(
+    executor: Executor | None, fn: Callable, *iterables: Iterable
+) -> Iterator[Any]:
+    """Map a function over some iterables in the pool, or in this process if
+    there's no pool.
+
+    Work is submitted to the pool right away and the results are returned in
+    order.
+    """
+    if executor is None:
+        return map(fn, *iterables)
+    return executor.map(fn, *iterables, chunksize=POOL_CHUNK_SIZE)
+
+
+def copy_rows(
+    model: type[Model], fields: List[str], rows: Iterable[Tuple]
+) -> None:
+    """Write rows into a model's table with COPY.
+
+    :param model: The model whose table to write to.
+    :param fields: The names of the fields in every row.
+    :param rows: The rows to write.
+    :return: None
+    """
+    quote_name = connection.ops.quote_name
+    columns = ", ".join(
+        quote_name(model._meta.get_field(field).column) for field in fields
+    )
+    with connection.cursor() as cursor:
+        with cursor.copy(
+            f"COPY {quote_name(model._meta.db_table)} ({columns}) FROM STDIN"
+        ) as copy:
+            for row in rows:
+                copy.write_row(row)
+
+
+def store_citation_changes(
+    batch: List[Tuple[Opinion, OpinionCitationChanges]], index: bool
+) -> None:
+    """Store the citations found in a batch of opinions in a single
+    transaction, like store_opinion_citations_and_update_parentheticals does
+    for one opinion.
+
+    :param batch: A list of citing opinions and their citation changes.
+    :param index: Whether to add the items to Solr.
+    :return: None
+    """
+    opinion_ids = [opinion.pk for opinion, _ in batch]
+    cite_counts = Counter(
+        cluster_id
+        for _, changes in batch
+        for cluster_id in changes.cited_clusters_to_update
+    )
+    clusters_by_increment = defaultdict(list)
+    for cluster_id, increment in cite_counts.items():
+        clusters_by_increment[increment].append(cluster_id)
+
+    with transaction.atomic():
+        for increment, cluster_ids in clusters_by_increment.items():
+            OpinionCluster.objects.filter(pk__in=cluster_ids).update(
+                citation_count=F("citation_count") + increment
+            )
+
+        # Nuke existing citations and parentheticals
+        OpinionsCited.objects.filter(
+            citing_opinion_id__in=opinion_ids
+        ).delete()
+        Parenthetical.objects.filter(
+            describing_opinion_id__in=opinion_ids
+        ).delete()
+
+        # Create the new ones.
+        copy_rows(
+            OpinionsCited,
+            ["citing_opinion_id", "cited_opinion_id", "depth"],
+            (
+                (c.citing_opinion_id, c.cited_opinion_id, c.depth)
+                for _, changes in batch
+                for c in changes.opinions_cited
+            ),
+        )
+        copy_rows(
+            Parenthetical,
+            ["describing_opinion_id", "described_opinion_id", "text", "score"],
+            (
+                (
+                    p.describing_opinion_id,
+                    p.described_opinion_id,
+                    p.text,
+                    p.score,
+                )
+                for _, changes in batch
+                for p in changes.parentheticals
+            ),
+        )
+
+        opinions = [opinion for opinion, _ in batch]
+        date_modified = now()
+        for opinion in opinions:
+            opinion.date_modified = date_modified
+        Opinion.objects.bulk_update(
+            opinions, ["html_with_citations", "date_modified"], batch_size=100
+        )
+
+    schedule_parenthetical_regroup(
+        {
+            cluster_id
+            for _, changes in batch
+            for cluster_id in changes.clusters_to_update_par_groups_for
+        }
+    )
+    for opinion, changes in batch:
+        mark_citing_opinion_for_pagerank(opinion.pk)
+        index_related_cites_fields.delay(
+            OpinionsCited.__name__,
+            opinion.pk,
+            list(changes.cited_clusters_to_update),
+        )
+    if index:
+        add_items_to_solr.delay(list(cite_counts), "search.OpinionCluster")
+        add_items_to_solr.delay(opinion_ids, "search.Opinion")
+
+
+def process_opinion_batch(
+    opinions: List[Opinion],
+    extracted: Iterable[Tuple[str, List[CitationBase]]],
+    executor: Executor | None,
+    index: bool,
+) -> int:
+    """Resolve, annotate and store the citations extracted from a batch of
+    opinions.
+
+    :param opinions: The batch of opinions.
+    :param extracted: The cleaned text and citations of every opinion.
+    :param executor: The process pool, or None to work in this process.
+    :param index: Whether to add the items to Solr.
+    :return: The number of opinions with citations.
+    """
+    currently_cited = defaultdict(set)
+    for citing_id, cited_id in OpinionsCited.objects.filter(
+        citing_opinion_id__in=[opinion.pk for opinion in opinions]
+    ).values_list("citing_opinion_id", "cited_opinion_id"):
+        currently_cited[citing_id].add(cited_id)
+
+    batch = []
+    for opinion, (cleaned_text, citations) in zip(opinions, extracted):
+        # If no citations are found, then there is nothing else to do.
+        if not citations:
+            continue
+        opinion.source_is_html = opinion.source_html is not None
+        opinion.source_text = (
+            opinion.source_html
+            if opinion.source_is_html
+            else opinion.source_plain
+        )
+        opinion.cleaned_text = cleaned_text
+        changes = get_opinion_citation_changes(
+            opinion, citations, currently_cited[opinion.pk]
+        )
+        batch.append((opinion, changes))
+    if not batch:
+        return 0
+
+    annotated_html = pool_map(
+        executor,
+        annotate_opinion_text,
+        [opinion.source_text for opinion, _ in batch],
+        [opinion.cleaned_text for opinion, _ in batch],
+        [opinion.source_is_html for opinion, _ in batch],
+        [
+            generate_annotations(changes.citation_resolutions)
+            for _, changes in batch
+        ],
+    )
+    for (opinion, _), html_with_citations in zip(batch, annotated_html):
+        opinion.html_with_citations = html_with_citations
+
+    store_citation_changes(batch, index)
+    return len(batch)
+
+
+def find_citations_pipeline(
+    query: QuerySet,
+    batch_size: int = 500,
+    workers: int = 0,
+    index: bool = False,
+    resume: bool = False,
+) -> int:
+    """Find and store the citations of every opinion in a queryset.
+
+    :param query: The Opinion queryset to process.
+    :param batch_size: The number of opinions processed at a time.
+    :param workers: The number of processes extracting citations. Use 0 to
+    do everything in this process.
+    :param index: Whether to add the items to Solr as they are processed.
+    :param resume: Whether to resume from the checkpoint of a previous run.
+    :return: The number of opinions processed.
+    """
+    r = get_redis_interface("CACHE")
+    after_pk = 0
+    if resume:
+        after_pk = int(r.get(CHECKPOINT_KEY) or 0)
+        logger.info("Resuming after opinion %s.", after_pk)
+    else:
+        r.delete(CHECKPOINT_KEY)
+
+    executor = None
+    if workers:
+        # Load the tokenizer once, for the forked workers to inherit it.
+        warm_hyperscan_tokenizer()
+        # Forked workers must not share the DB connections of this process.
+        # All of them are started on the first submit, so do it before this
+        # process connects again.
+        connections.close_all()
+        executor = ProcessPoolExecutor(
+            max_workers=workers, mp_context=multiprocessing.get_context("fork")
+        )
+        executor.submit(int).result()
+
+    def extract(opinions: List[Opinion]) -> Iterator:
+        return pool_map(
+            executor,
+            extract_citations,
+            [opinion.source_html for opinion in opinions],
+            [opinion.source_plain for opinion in opinions],
+        )
+
+    processed = 0
+    try:
+        opinions = get_opinion_batch(query, after_pk, batch_size)
+        extracted = extract(opinions)
+        while opinions:
+            # Start extracting the next batch while this one is stored.
+            next_opinions = get_opinion_batch(
+                query, opinions[-1].pk, batch_size
+            )
+            next_extracted = extract(next_opinions)
+
+            with_citations = process_opinion_batch(
+                opinions, extracted, executor, index
+            )
+            r.set(CHECKPOINT_KEY, opinions[-1].pk)
+            processed += len(opinions)
+            logger.info(
+                "Processed %s opinions, %s with citations in the last batch. "
+                "Last id: %s",
+                processed,
+                with_citations,
+                opinions[-1].pk,
+            )
+            opinions, extracted = next_opinions, next_extracted
+    finally:
+        if executor is not None:
+            executor.shutdown(cancel_futures=True)
+
+    r.delete(CHECKPOINT_KEY)
+    return processed
@@ -16,8 +16,14 @@ Implementation-wise, we are doing an approximation of Jaccard similarity
 (https://en.wikipedia.org/wiki/Jaccard_index) between the tokens of every
 parenthetical and every other and group together those parentheticals that
 are above a certain threshold of similarity to each other. To do this
-efficiently, we make use of the datasketch library's implementation of MinHash,
-an algorithm known as a locality-sensitive hashing (LSH) algorithm.
+efficiently, we make use of MinHash, an algorithm known as a
+locality-sensitive hashing (LSH) algorithm.
+
+The MinHash signatures of all the parentheticals of a case are computed at once
+as a numpy matrix, using the same permutations and LSH bands as the datasketch
+library's MinHash and MinHashLSH, so both produce the same groups. The original
+datasketch implementation is kept in :compute_parenthetical_groups_datasketch
+to benchmark against.
 
 For information about MinHash, here are a couple of good resources:
 https://medium.com/@jonathankoren/near-duplicate-detection-b6694e807f7a
@@ -33,15 +39,21 @@ import re
 from copy import deepcopy
 from dataclasses import dataclass
 from math import ceil
-from typing import Dict, List, Set
+from typing import Dict, List, Mapping, Set, Sized
 
+import numpy as np
 from datasketch import MinHash, MinHashLSH
+from scipy import sparse
+from scipy.sparse.csgraph import connected_components
 from Stemmer import Stemmer
 
 from cl.lib.stop_words import STOP_WORDS
 from cl.search.models import Parenthetical
 
 Graph = Dict[str, List[str]]
+# The neighbors of every node, as a list of IDs or a numpy array of the
+# indices of the similar parentheticals. Only their number is used.
+Neighbors = Mapping[str, Sized]
 
 GERUND_WORD = re.compile(r"(?:\S+ing)", re.IGNORECASE)
 
@@ -57,6 +69,10 @@ _EMPTY_SIMILARITY_INDEX = MinHashLSH(
 )
 _EMPTY_MHASH = MinHash(num_perm=64)
 
+# The constants datasketch's MinHash uses to apply its permutations.
+_MERSENNE_PRIME = np.uint64((1 << 61) - 1)
+_MAX_HASH = np.uint64((1 << 32) - 1)
+
 # We initialize the stemmer once and reuse it because it internally caches
 # frequently seen tokens, giving us a performance benefit if we reuse it.
 stemmer = Stemmer("english")
@@ -86,6 +102,130 @@ def compute_parenthetical_groups(
     them into three ComputedParentheticalGroups (one for each point of law).
     From there, we put those in a list and return the list of groups.
 
+    :param parentheticals: A list of parentheticals to organize into groups
+    :return: A list of ComputedParentheticalGroup's containing the given parentheticals
+    """
+    if len(parentheticals) == 0:
+        return []
+
+    signatures = get_minhash_signatures(
+        [get_parenthetical_tokens(par.text) for par in parentheticals]
+    )
+    neighbors = get_similarity_matrix(signatures)
+    _, labels = connected_components(neighbors, directed=False)
+
+    parenthetical_objects: Dict[str, Parenthetical] = {}
+    similarity_graph: Dict[str, np.ndarray] = {}
+    components: Dict[int, List[str]] = {}
+    for i, par in enumerate(parentheticals):
+        par_key = str(par.id)
+        parenthetical_objects[par_key] = par
+        similarity_graph[par_key] = neighbors.indices[
+            neighbors.indptr[i] : neighbors.indptr[i + 1]
+        ]
+        # Components are kept in order of first appearance.
+        components.setdefault(labels[i], []).append(par_key)
+
+    parenthetical_groups = [
+        get_group_from_component(
+            component, parenthetical_objects, similarity_graph
+        )
+        for component in components.values()
+    ]
+    return sorted(
+        parenthetical_groups, key=lambda group: group.score, reverse=True
+    )
+
+
+def get_minhash_signatures(token_lists: List[List[str]]) -> np.ndarray:
+    """
+    Compute the MinHash signatures of many token lists at once.
+
+    The token hashes of every list are permuted together in a single matrix
+    and reduced to their per-list minima, which gives the same hash values
+    as calling update_batch on a datasketch MinHash for every list.
+
+    :param token_lists: A list of token lists, one per parenthetical
+    :return: A (number of lists, number of permutations) matrix of hash values
+    """
+    a, b = _EMPTY_MHASH.permutations
+    hashfunc = _EMPTY_MHASH.hashfunc
+    counts = np.fromiter((len(tokens) for tokens in token_lists), dtype=int)
+    token_hashes = np.fromiter(
+        (
+            hashfunc(token.encode("utf-8"))
+            for tokens in token_lists
+            for token in tokens
+        ),
+        dtype=np.uint64,
+        count=counts.sum(),
+    )
+    permuted = np.bitwise_and(
+        (token_hashes[:, np.newaxis] * a + b) % _MERSENNE_PRIME, _MAX_HASH
+    )
+
+    signatures = np.full((len(token_lists), len(a)), _MAX_HASH)
+    # Lists without tokens keep the initial hash values, and can't be part
+    # of reduceat's segments.
+    has_tokens = counts > 0
+    if has_tokens.any():
+        starts = (np.cumsum(counts) - counts)[has_tokens]
+        signatures[has_tokens] = np.minimum.reduceat(permuted, starts, axis=0)
+    return signatures
+
+
+def get_similarity_matrix(signatures: np.ndarray) -> sparse.csr_matrix:
+    """
+    Band the MinHash signatures the same way the MinHashLSH index does and
+    build the sparse similarity matrix between them.
+
+    Two parentheticals are neighbors if all the hash values of at least one
+    band are equal. Like the MinHashLSH query results, every parenthetical is
+    a neighbor of itself.
+
+    :param signatures: A matrix of MinHash signatures, one row per
+    parenthetical
+    :return: A boolean CSR matrix where entry [i, j] is set if parentheticals
+    i and j are neighbors
+    """
+    num_bands, rows = _EMPTY_SIMILARITY_INDEX.b, _EMPTY_SIMILARITY_INDEX.r
+    num_pars = len(signatures)
+    bucket_ids = []
+    offset = 0
+    for band in range(num_bands):
+        _, inverse = np.unique(
+            signatures[:, band * rows : (band + 1) * rows],
+            axis=0,
+            return_inverse=True,
+        )
+        inverse = inverse.ravel()
+        bucket_ids.append(inverse + offset)
+        offset += inverse.max() + 1
+
+    # A parenthetical by bucket incidence matrix. Its product with its
+    # transpose links every pair of parentheticals sharing a bucket.
+    incidence = sparse.csr_matrix(
+        (
+            np.ones(num_pars * num_bands, dtype=bool),
+            (
+                np.tile(np.arange(num_pars), num_bands),
+                np.concatenate(bucket_ids),
+            ),
+        ),
+        shape=(num_pars, offset),
+    )
+    return (incidence @ incidence.T).tocsr()
+
+
+def compute_parenthetical_groups_datasketch(
+    parentheticals: List[Parenthetical],
+) -> List[ComputedParentheticalGroup]:
+    """
+    The original implementation of compute_parenthetical_groups, which
+    builds a datasketch MinHash for every parenthetical and queries them one
+    by one against a MinHashLSH index. Kept to benchmark and validate the
+    batched implementation against.
+
     :param parentheticals: A list of parentheticals to organize into groups
     :return: A list of ComputedParentheticalGroup's containing the given parentheticals
     """
@@ -180,7 +320,7 @@ def get_graph_component(
 def get_group_from_component(
     component: List[str],
     parenthetical_objects: Dict[str, Parenthetical],
-    similarity_graph: Graph,
+    similarity_graph: Neighbors,
 ) -> ComputedParentheticalGroup:
     """
     Given a list of parenthetical IDs representing a component, create a
@@ -221,7 +361,7 @@ BEST_PARENTHETICAL_SEARCH_THRESHOLD = 0.2
 
 
 def get_representative_parenthetical(
-    parentheticals: List[Parenthetical], similarity_graph: Graph
+    parentheticals: List[Parenthetical], similarity_graph: Neighbors
 ) -> Parenthetical:
     """
     Takes a list of parentheticals sorted by score and returns the parenthetical
@@ -0,0 +1,252 @@
+"""An in-memory index of reporter/volume/page citations for the citation
+lookup API.
+
+The index is built periodically from the Citation table by the
+build_citation_lookup_index command and written to disk as numpy arrays, so
+every gunicorn worker can mmap the same files and share them through the OS
+page cache. Within each reporter/volume book the pages are natsorted, which
+lets us answer exact lookups and "closest preceding page" lookups with a
+binary search instead of a DB query.
+
+Citations saved or deleted after the index was built mark their book as
+dirty in Redis. Lookups for dirty books fall back to the DB until the next
+rebuild.
+"""
+
+import json
+import logging
+import os
+import shutil
+import time
+from bisect import bisect_left
+from dataclasses import dataclass
+from itertools import groupby
+from pathlib import Path
+
+import numpy as np
+from django.conf import settings
+from natsort import natsort_keygen
+
+from cl.lib.redis_utils import get_redis_interface
+from cl.search.models import Citation
+
+logger = logging.getLogger(__name__)
+
+DIRTY_BOOKS_KEY = "citation_lookup_index:dirty"
+BUILDING_DIRTY_BOOKS_KEY = "citation_lookup_index:dirty:building"
+MANIFEST_NAME = "current.json"
+
+natsort_key = natsort_keygen()
+
+
+def make_book_key(reporter: str, volume: int | str) -> str:
+    """Build the key used to identify a reporter volume in the index.
+
+    :param reporter: The canonical reporter abbreviation.
+    :param volume: The volume number.
+    :return: A string key for the book.
+    """
+    return f"{reporter}|{int(volume)}"
+
+
+@dataclass
+class CitationLookupResult:
+    """The result of looking up a citation in the index.
+
+    exact_cluster_ids holds the clusters cited exactly at the requested page.
+    When it's empty, preceding_cluster_id holds the cluster cited at the
+    closest page before the requested one in the same book, if any.
+    """
+
+    exact_cluster_ids: list[int]
+    preceding_cluster_id: int | None = None
+
+
+class CitationLookupIndex:
+    """A read-only view of one version of the index on disk."""
+
+    def __init__(self, path: Path) -> None:
+        self.path = path
+        with open(path / "books.json") as f:
+            self.books: dict[str, list[int]] = json.load(f)
+        self.pages = np.load(path / "pages.npy", mmap_mode="r")
+        self.cluster_ids = np.load(path / "cluster_ids.npy", mmap_mode="r")
+
+    def lookup(
+        self, reporter: str, volume: int | str, page: str
+    ) -> CitationLookupResult:
+        """Look up a citation in the index.
+
+        :param reporter: The canonical reporter abbreviation.
+        :param volume: The volume number.
+        :param page: The page of the citation.
+        :return: A CitationLookupResult.
+        """
+        start, end = self.books.get(make_book_key(reporter, volume), (0, 0))
+        pages = self.pages[start:end]
+        position = bisect_left(
+            pages, natsort_key(page), key=lambda p: natsort_key(str(p))
+        )
+        exact_cluster_ids = []
+        i = position
+        # Different page strings can have the same natsort key, so compare
+        # the raw strings of every candidate with the same key.
+        while i < len(pages) and natsort_key(str(pages[i])) == natsort_key(
+            page
+        ):
+            if str(pages[i]) == page:
+                exact_cluster_ids.append(int(self.cluster_ids[start + i]))
+            i += 1
+        if exact_cluster_ids:
+            return CitationLookupResult(exact_cluster_ids)
+
+        preceding_cluster_id = None
+        if position > 0:
+            preceding_cluster_id = int(self.cluster_ids[start + position - 1])
+        return CitationLookupResult([], preceding_cluster_id)
+
+
+_index: CitationLookupIndex | None = None
+_dirty_books: set[str] = set()
+_last_checked = 0.0
+_manifest_mtime = 0.0
+
+
+def get_citation_lookup_index() -> CitationLookupIndex | None:
+    """Get the current version of the index for this process, reloading it
+    from disk and refreshing the dirty books at most once every
+    CITATION_LOOKUP_INDEX_RELOAD_INTERVAL seconds.
+
+    :return: The CitationLookupIndex or None if it's disabled or hasn't been
+    built yet.
+    """
+    global _index, _dirty_books, _last_checked, _manifest_mtime
+
+    if not settings.CITATION_LOOKUP_INDEX_DIR:
+        return None
+    now = time.monotonic()
+    if now - _last_checked < settings.CITATION_LOOKUP_INDEX_RELOAD_INTERVAL:
+        return _index
+    _last_checked = now
+
+    manifest = Path(settings.CITATION_LOOKUP_INDEX_DIR) / MANIFEST_NAME
+    try:
+        mtime = manifest.stat().st_mtime
+        if mtime != _manifest_mtime:
+            with open(manifest) as f:
+                version = json.load(f)["version"]
+            _index = CitationLookupIndex(manifest.parent / version)
+            _manifest_mtime = mtime
+        r = get_redis_interface("CACHE")
+        _dirty_books = r.sunion(DIRTY_BOOKS_KEY, BUILDING_DIRTY_BOOKS_KEY)
+    except Exception as e:
+        logger.warning("Unable to load the citation lookup index: %s", e)
+        _index = None
+        _manifest_mtime = 0.0
+    return _index
+
+
+def lookup_citation(
+    reporter: str, volume: int | str, page: str
+) -> CitationLookupResult | None:
+    """Look up a citation in the in-memory index.
+
+    :param reporter: The canonical reporter abbreviation.
+    :param volume: The volume number.
+    :param page: The page of the citation.
+    :return: A CitationLookupResult, or None if the index can't answer the
+    lookup and the caller should query the DB.
+    """
+    index = get_citation_lookup_index()
+    if index is None:
+        return None
+    try:
+        book_key = make_book_key(reporter, volume)
+    except ValueError:
+        return None
+    if book_key in _dirty_books:
+        return None
+    return index.lookup(reporter, volume, page)
+
+
+def mark_citation_book_dirty(reporter: str, volume: int) -> None:
+    """Flag a reporter volume whose citations changed after the index was
+    built, so lookups in it fall back to the DB until the next rebuild.
+
+    :param reporter: The canonical reporter abbreviation.
+    :param volume: The volume number.
+    :return: None
+    """
+    if not settings.CITATION_LOOKUP_INDEX_DIR:
+        return
+    r = get_redis_interface("CACHE")
+    r.sadd(DIRTY_BOOKS_KEY, make_book_key(reporter, volume))
+
+
+def build_citation_lookup_index(
+    index_dir: str, versions_to_keep: int = 2
+) -> int:
+    """Build a new version of the index from the Citation table and publish
+    it for the workers to pick up.
+
+    :param index_dir: The directory where the index versions are stored.
+    :param versions_to_keep: How many of the latest versions to keep on disk.
+    Old versions are kept for a while because workers may still have them
+    mmapped.
+    :return: The number of citations indexed.
+    """
+    r = get_redis_interface("CACHE")
+    # Books changed from now on are flagged in a fresh set, while the ones
+    # flagged before remain dirty until the new version is published.
+    pipe = r.pipeline()
+    pipe.sunionstore(
+        BUILDING_DIRTY_BOOKS_KEY, [BUILDING_DIRTY_BOOKS_KEY, DIRTY_BOOKS_KEY]
+    )
+    pipe.delete(DIRTY_BOOKS_KEY)
+    pipe.execute()
+
+    pages: list[str] = []
+    cluster_ids: list[int] = []
+    books: dict[str, list[int]] = {}
+    citations = (
+        Citation.objects.order_by("reporter", "volume")
+        .values_list("reporter", "volume", "page", "cluster_id")
+        .iterator(chunk_size=100_000)
+    )
+    # Rows come sorted by book, so only one book at a time is natsorted.
+    for book_key, book_rows in groupby(
+        citations, key=lambda row: make_book_key(row[0], row[1])
+    ):
+        start = len(pages)
+        for _, _, page, cluster_id in sorted(
+            book_rows, key=lambda row: natsort_key(row[2])
+        ):
+            pages.append(page)
+            cluster_ids.append(cluster_id)
+        books[book_key] = [start, len(pages)]
+
+    version = str(int(time.time()))
+    version_path = Path(index_dir) / version
+    version_path.mkdir(parents=True, exist_ok=True)
+    np.save(version_path / "pages.npy", np.array(pages, dtype=np.str_))
+    np.save(
+        version_path / "cluster_ids.npy", np.array(cluster_ids, dtype=np.int32)
+    )
+    with open(version_path / "books.json", "w") as f:
+        json.dump(books, f)
+
+    # Publish the new version atomically.
+    manifest = Path(index_dir) / MANIFEST_NAME
+    tmp_manifest = manifest.with_suffix(".tmp")
+    with open(tmp_manifest, "w") as f:
+        json.dump({"version": version}, f)
+    os.replace(tmp_manifest, manifest)
+    r.delete(BUILDING_DIRTY_BOOKS_KEY)
+
+    versions = sorted(
+        (p for p in Path(index_dir).iterdir() if p.is_dir()),
+        key=lambda p: int(p.name),
+    )
+    for old_version in versions[:-versions_to_keep]:
+        shutil.rmtree(old_version, ignore_errors=True)
+    return len(pages)
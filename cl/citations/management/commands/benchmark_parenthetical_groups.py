@@ -0,0 +1,96 @@
+import time
+
+from django.db.models import Count
+
+from cl.citations.group_parentheticals import (
+    compute_parenthetical_groups,
+    compute_parenthetical_groups_datasketch,
+)
+from cl.lib.command_utils import VerboseCommand, logger
+from cl.search.models import OpinionCluster, Parenthetical
+
+
+def get_group_sets(groups) -> set[frozenset[int]]:
+    return {frozenset(p.pk for p in group.parentheticals) for group in groups}
+
+
+class Command(VerboseCommand):
+    help = (
+        "Time the batched parenthetical grouping against the datasketch "
+        "implementation on real clusters and check they produce the same "
+        "groups."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--cluster-ids",
+            type=int,
+            nargs="*",
+            help="The clusters to benchmark. Defaults to the clusters with "
+            "the most parentheticals.",
+        )
+        parser.add_argument(
+            "--count",
+            type=int,
+            default=20,
+            help="How many clusters to benchmark when no ids are given.",
+        )
+        parser.add_argument(
+            "--repeat",
+            type=int,
+            default=3,
+            help="How many times to group every cluster. The best time is "
+            "reported.",
+        )
+
+    def handle(self, *args, **options):
+        super().handle(*args, **options)
+        cluster_ids = options["cluster_ids"]
+        if not cluster_ids:
+            cluster_ids = list(
+                Parenthetical.objects.values_list(
+                    "described_opinion__cluster_id", flat=True
+                )
+                .annotate(count=Count("id"))
+                .order_by("-count")[: options["count"]]
+            )
+
+        total_batched = total_datasketch = 0.0
+        for cluster in OpinionCluster.objects.filter(pk__in=cluster_ids):
+            parentheticals = list(cluster.parentheticals)
+            timings = {}
+            results = {}
+            for compute in (
+                compute_parenthetical_groups,
+                compute_parenthetical_groups_datasketch,
+            ):
+                best = float("inf")
+                for _ in range(options["repeat"]):
+                    start = time.perf_counter()
+                    results[compute] = compute(parentheticals)
+                    best = min(best, time.perf_counter() - start)
+                timings[compute] = best
+
+            batched = timings[compute_parenthetical_groups]
+            datasketch = timings[compute_parenthetical_groups_datasketch]
+            total_batched += batched
+            total_datasketch += datasketch
+            same_groups = get_group_sets(
+                results[compute_parenthetical_groups]
+            ) == get_group_sets(
+                results[compute_parenthetical_groups_datasketch]
+            )
+            logger.info(
+                "Cluster %s: %s parentheticals, batched %.4fs, datasketch "
+                "%.4fs, same groups: %s",
+                cluster.pk,
+                len(parentheticals),
+                batched,
+                datasketch,
+                same_groups,
+            )
+        logger.info(
+            "Total: batched %.4fs, datasketch %.4fs",
+            total_batched,
+            total_datasketch,
+        )
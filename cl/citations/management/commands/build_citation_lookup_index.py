@@ -0,0 +1,39 @@
+from django.conf import settings
+from django.core.management import CommandError
+
+from cl.citations.lookup_index import build_citation_lookup_index
+from cl.lib.command_utils import VerboseCommand, logger
+
+
+class Command(VerboseCommand):
+    help = (
+        "Build the in-memory reporter/volume/page index used by the citation "
+        "lookup API. Run it periodically to pick up new citations."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--index-dir",
+            type=str,
+            default=settings.CITATION_LOOKUP_INDEX_DIR,
+            help="The directory where the index is stored. Defaults to "
+            "the CITATION_LOOKUP_INDEX_DIR setting.",
+        )
+        parser.add_argument(
+            "--versions-to-keep",
+            type=int,
+            default=2,
+            help="How many of the latest index versions to keep on disk.",
+        )
+
+    def handle(self, *args, **options):
+        super().handle(*args, **options)
+        if not options["index_dir"]:
+            raise CommandError(
+                "No index directory provided and CITATION_LOOKUP_INDEX_DIR "
+                "is not set."
+            )
+        count = build_citation_lookup_index(
+            options["index_dir"], options["versions_to_keep"]
+        )
+        logger.info("Indexed %s citations.", count)
@@ -1,3 +1,4 @@
+import os
 import sys
 import time
 from typing import Iterable, List, cast
@@ -6,12 +7,13 @@ from django.conf import settings
 from django.core.management import CommandError, call_command
 from django.core.management.base import CommandParser
 
+from cl.citations.citation_pipeline import find_citations_pipeline
 from cl.citations.tasks import (
     find_citations_and_parentheticals_for_opinion_by_pks,
 )
 from cl.lib.argparse_types import valid_date_time
 from cl.lib.celery_utils import CeleryThrottle
-from cl.lib.command_utils import VerboseCommand
+from cl.lib.command_utils import VerboseCommand, logger
 from cl.lib.types import OptionsType
 from cl.search.models import Opinion
 
@@ -86,6 +88,35 @@ class Command(VerboseCommand):
             default="batch1",
             help="The celery queue where the tasks should be processed.",
         )
+        parser.add_argument(
+            "--pipeline",
+            action="store_true",
+            default=False,
+            help="Process the opinions in this process instead of in Celery, "
+            "extracting citations in a process pool and storing them in "
+            "bulk. Best for re-running the citator over large ranges.",
+        )
+        parser.add_argument(
+            "--workers",
+            type=int,
+            default=os.cpu_count(),
+            help="With --pipeline, the number of processes extracting "
+            "citations. Use 0 to do everything in a single process.",
+        )
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=500,
+            help="With --pipeline, the number of opinions processed at a "
+            "time.",
+        )
+        parser.add_argument(
+            "--resume",
+            action="store_true",
+            default=False,
+            help="With --pipeline, resume after the last opinion stored by a "
+            "previous run that didn't finish.",
+        )
 
     def handle(self, *args: List[str], **options: OptionsType) -> None:
         super().handle(*args, **options)
@@ -136,6 +167,18 @@ class Command(VerboseCommand):
             query = query.filter(date_modified__gte=options["modified_after"])
         if options.get("all"):
             query = Opinion.objects.all()
+        if options["pipeline"]:
+            processed = find_citations_pipeline(
+                query,
+                batch_size=cast(int, options["batch_size"]),
+                workers=cast(int, options["workers"]),
+                index=self.index == "concurrently",
+                resume=cast(bool, options["resume"]),
+            )
+            logger.info("Processed %s opinions.", processed)
+            self.add_to_solr(cast(str, options["queue"]))
+            return
+
         self.count = query.count()
         self.average_per_s = 0.0
         self.timings: List[float] = []
@@ -0,0 +1,19 @@
+from django.conf import settings
+
+from cl.citations.tokenizers import warm_hyperscan_tokenizer
+from cl.lib.command_utils import VerboseCommand, logger
+
+
+class Command(VerboseCommand):
+    help = (
+        "Compile the Hyperscan database of the citation tokenizer into "
+        "HYPERSCAN_CACHE_DIR. Run it when building the image, so processes "
+        "load the database instead of compiling it."
+    )
+
+    def handle(self, *args, **options):
+        super().handle(*args, **options)
+        warm_hyperscan_tokenizer()
+        logger.info(
+            "Hyperscan database cached in %s.", settings.HYPERSCAN_CACHE_DIR
+        )
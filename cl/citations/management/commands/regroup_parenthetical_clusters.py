@@ -0,0 +1,16 @@
+from cl.citations.tasks import regroup_queued_parenthetical_clusters
+from cl.lib.command_utils import VerboseCommand, logger
+
+
+class Command(VerboseCommand):
+    help = (
+        "Drain the queue of clusters whose parenthetical groups need to be "
+        "recomputed. The drains scheduled when clusters are queued normally "
+        "empty it, run this from cron to pick up anything a lost task left "
+        "behind."
+    )
+
+    def handle(self, *args, **options):
+        super().handle(*args, **options)
+        regrouped = regroup_queued_parenthetical_clusters()
+        logger.info("Regrouped %s clusters.", regrouped)
@@ -1,7 +1,7 @@
 #!/usr/bin/env python
 
 from datetime import datetime
-from typing import Dict, Iterable, List, Optional, no_type_check
+from typing import Callable, Dict, Iterable, List, Optional, no_type_check
 
 import waffle
 from django.conf import settings
@@ -21,7 +21,11 @@ from eyecite.utils import strip_punct
 from requests import Session
 from scorched.response import SolrResponse
 
-from cl.citations.match_citations_queries import es_search_db_for_full_citation
+from cl.citations.match_citations_queries import (
+    es_resolve_full_citations,
+    es_search_db_for_full_citation,
+    get_full_citation_cache_key,
+)
 from cl.citations.types import (
     MatchedResourceType,
     ResolvedFullCites,
@@ -270,6 +274,40 @@ def resolve_supra_citation(
     )
 
 
+def make_batched_fullcase_resolver(
+    citations: List[CitationBase],
+) -> Callable[[FullCaseCitation], MatchedResourceType]:
+    """Resolve all the FullCaseCitations of a citing document up front and
+    return a resolve_full_citation callable for eyecite that only reads the
+    precomputed results.
+
+    The citation field lookups are deduplicated, served from the worker
+    cache when possible and sent to ES in a single multi search request.
+    Matched opinions are then fetched from the DB in a single query.
+
+    :param citations: The list of citations found in the citing document.
+    :return: A callable that resolves a full citation to an Opinion or to
+    NO_MATCH_RESOURCE.
+    """
+    full_citations = [c for c in citations if type(c) is FullCaseCitation]
+    resolved_ids = (
+        es_resolve_full_citations(full_citations) if full_citations else {}
+    )
+    opinions = Opinion.objects.in_bulk(set(resolved_ids.values()))
+
+    def resolve_batched_fullcase_citation(
+        full_citation: FullCaseCitation,
+    ) -> MatchedResourceType:
+        if type(full_citation) is not FullCaseCitation:
+            # FullLawCitation and FullJournalCitation are not supported yet.
+            return NO_MATCH_RESOURCE
+        key = get_full_citation_cache_key(full_citation)
+        opinion = opinions.get(resolved_ids.get(key))
+        return opinion if opinion is not None else NO_MATCH_RESOURCE
+
+    return resolve_batched_fullcase_citation
+
+
 @no_type_check
 def do_resolve_citations(
     citations: List[CitationBase], citing_object: Opinion | RECAPDocument
@@ -286,10 +324,15 @@ def do_resolve_citations(
             else:
                 raise "Unknown citing type."
 
+    resolve_full_citation = resolve_fullcase_citation
+    if waffle.switch_is_active("es_resolve_citations"):
+        # Batch all the ES lookups for the citing document.
+        resolve_full_citation = make_batched_fullcase_resolver(citations)
+
     # Call and return eyecite's resolve_citations() function
     return resolve_citations(
         citations=citations,
-        resolve_full_citation=resolve_fullcase_citation,
+        resolve_full_citation=resolve_full_citation,
         resolve_shortcase_citation=resolve_shortcase_citation,
         resolve_supra_citation=resolve_supra_citation,
     )
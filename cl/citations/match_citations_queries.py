@@ -1,13 +1,16 @@
 #!/usr/bin/env python
 
+from collections import OrderedDict
+
+from django.conf import settings
 from django_elasticsearch_dsl.search import Search
-from elasticsearch_dsl import Q
+from elasticsearch_dsl import MultiSearch, Q
 from elasticsearch_dsl.query import Query
 from elasticsearch_dsl.response import Hit, Response
 from eyecite import get_citations
 from eyecite.models import FullCaseCitation
-from eyecite.tokenizers import HyperscanTokenizer
 
+from cl.citations.tokenizers import HYPERSCAN_TOKENIZER
 from cl.citations.types import SupportedCitationType
 from cl.citations.utils import (
     QUERY_LENGTH,
@@ -18,8 +21,6 @@ from cl.lib.types import CleanData
 from cl.search.documents import OpinionDocument
 from cl.search.models import Opinion
 
-HYPERSCAN_TOKENIZER = HyperscanTokenizer(cache_dir=".hyperscan")
-
 
 def fetch_citations(search_query: Search) -> list[Hit]:
     """Fetches citation matches from Elasticsearch based on the provided
@@ -130,21 +131,22 @@ def es_case_name_query(
     return new_response
 
 
-def es_search_db_for_full_citation(
+def build_full_citation_filters(
     full_citation: FullCaseCitation, query_citation: bool = False
-) -> tuple[list[Hit], bool]:
-    """For a citation object, try to match it to an item in the database using
-    a variety of heuristics.
+) -> list[Query]:
+    """Build the filters used to look up a full citation in the citation
+    field of the opinions index.
+
+    The self-cite exclusion is not part of these filters so that the same
+    filters can be shared by every opinion citing the same case.
+
     :param full_citation: A FullCaseCitation instance.
     :param query_citation: Whether this is related to es_get_query_citation
     resolution
-    return: A two tuple, the ElasticSearch Result object with the results, or an empty list if
-     no hits and a boolean indicating whether the citation was found.
+    :return: A list of ES filter queries.
     """
-
     if not hasattr(full_citation, "citing_opinion"):
         full_citation.citing_opinion = None
-    search_query = OpinionDocument.search()
     filters = [
         Q(
             "term", **{"status.raw": "Published"}
@@ -158,25 +160,8 @@ def es_search_db_for_full_citation(
     else:
         filters.append(Q("match", cluster_child="opinion"))
 
-    must_not = []
-    if full_citation.citing_opinion is not None:
-        # Eliminate self-cites.
-        must_not.append(Q("match", id=full_citation.citing_opinion.pk))
-
     # Set up filter parameters
-    if full_citation.year:
-        start_year = end_year = full_citation.year
-    else:
-        start_year, end_year = get_years_from_reporter(full_citation)
-        if (
-            full_citation.citing_opinion is not None
-            and full_citation.citing_opinion.cluster.date_filed
-        ):
-            end_year = min(
-                end_year,
-                full_citation.citing_opinion.cluster.date_filed.year,
-            )
-
+    start_year, end_year = get_full_citation_year_range(full_citation)
     filters.append(
         Q(
             "range",
@@ -198,6 +183,117 @@ def es_search_db_for_full_citation(
             **{"citation.exact": full_citation.corrected_citation()},
         )
     )
+    return filters
+
+
+def get_full_citation_year_range(
+    full_citation: FullCaseCitation,
+) -> tuple[int, int]:
+    """Compute the range of years a full citation can be matched against.
+
+    :param full_citation: A FullCaseCitation instance.
+    :return: A two tuple, the start year and the end year.
+    """
+    if full_citation.year:
+        return full_citation.year, full_citation.year
+
+    start_year, end_year = get_years_from_reporter(full_citation)
+    citing_opinion = getattr(full_citation, "citing_opinion", None)
+    if citing_opinion is not None and citing_opinion.cluster.date_filed:
+        end_year = min(end_year, citing_opinion.cluster.date_filed.year)
+    return start_year, end_year
+
+
+def get_full_citation_cache_key(
+    full_citation: FullCaseCitation,
+) -> tuple[str, int, int, str | None]:
+    """Build the key used to share the lookup of a full citation across
+    citing documents.
+
+    Two citations with the same key produce the same ES citation lookup,
+    apart from the self-cite exclusion.
+
+    :param full_citation: A FullCaseCitation instance.
+    :return: A tuple of the corrected citation, the year range and the court.
+    """
+    start_year, end_year = get_full_citation_year_range(full_citation)
+    return (
+        full_citation.corrected_citation(),
+        start_year,
+        end_year,
+        full_citation.metadata.court,
+    )
+
+
+class CitationLookupCache:
+    """A small LRU cache of citation lookups, shared by every resolution
+    done in a worker process.
+
+    It maps a citation cache key to the ids of up to
+    CITATION_CANDIDATES_SIZE opinions that matched the citation field
+    lookup. The self-cite exclusion is applied after reading the cache.
+    Citations that matched no opinion aren't cached, so they resolve once
+    the opinion they cite is added.
+    """
+
+    def __init__(self, max_size: int) -> None:
+        self.max_size = max_size
+        self._data: OrderedDict[tuple, tuple[int, ...]] = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: tuple) -> tuple[int, ...] | None:
+        if key not in self._data:
+            self.misses += 1
+            return None
+        self.hits += 1
+        self._data.move_to_end(key)
+        return self._data[key]
+
+    def set(self, key: tuple, value: tuple[int, ...]) -> None:
+        if self.max_size <= 0:
+            return
+        self._data[key] = value
+        self._data.move_to_end(key)
+        while len(self._data) > self.max_size:
+            self._data.popitem(last=False)
+
+    def clear(self) -> None:
+        self._data.clear()
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+
+# Fetching one more candidate than we need lets us drop the citing opinion
+# from the candidates and still tell a single match from an ambiguous one.
+CITATION_CANDIDATES_SIZE = 3
+citation_lookup_cache = CitationLookupCache(
+    settings.CITATION_RESOLUTION_CACHE_SIZE
+)
+
+
+def es_search_db_for_full_citation(
+    full_citation: FullCaseCitation, query_citation: bool = False
+) -> tuple[list[Hit], bool]:
+    """For a citation object, try to match it to an item in the database using
+    a variety of heuristics.
+    :param full_citation: A FullCaseCitation instance.
+    :param query_citation: Whether this is related to es_get_query_citation
+    resolution
+    return: A two tuple, the ElasticSearch Result object with the results, or an empty list if
+     no hits and a boolean indicating whether the citation was found.
+    """
+
+    search_query = OpinionDocument.search()
+    filters = build_full_citation_filters(full_citation, query_citation)
+    must_not = []
+    if full_citation.citing_opinion is not None:
+        # Eliminate self-cites.
+        must_not.append(Q("match", id=full_citation.citing_opinion.pk))
+
     query = Q("bool", must_not=must_not, filter=filters)
     citations_query = search_query.query(query)
     results = fetch_citations(citations_query)
@@ -219,6 +315,99 @@ def es_search_db_for_full_citation(
     return [], citation_found
 
 
+def es_lookup_full_citations_candidates(
+    full_citations: list[FullCaseCitation],
+) -> dict[tuple, tuple[int, ...]]:
+    """Look up the citation field candidates for many full citations at once.
+
+    Citations sharing a cache key are only looked up once, keys already in
+    the worker cache are not looked up at all, and the remaining ones are
+    sent to ES in a single multi search request.
+
+    :param full_citations: A list of FullCaseCitation instances.
+    :return: A dict mapping each citation cache key to the ids of the
+    opinions that matched its citation field lookup.
+    """
+    candidates: dict[tuple, tuple[int, ...]] = {}
+    pending: dict[tuple, FullCaseCitation] = {}
+    for full_citation in full_citations:
+        key = get_full_citation_cache_key(full_citation)
+        if key in candidates or key in pending:
+            continue
+        cached = citation_lookup_cache.get(key)
+        if cached is not None:
+            candidates[key] = cached
+        else:
+            pending[key] = full_citation
+
+    if not pending:
+        return candidates
+
+    multi_search = MultiSearch()
+    for full_citation in pending.values():
+        search_query = OpinionDocument.search().query(
+            Q("bool", filter=build_full_citation_filters(full_citation))
+        )
+        search_query = search_query.sort("id").source(includes=["id"])
+        search_query = search_query.extra(size=CITATION_CANDIDATES_SIZE)
+        multi_search = multi_search.add(search_query)
+    responses = multi_search.execute()
+
+    for key, response in zip(pending.keys(), responses):
+        opinion_ids = tuple(hit["id"] for hit in response.hits)
+        if opinion_ids:
+            citation_lookup_cache.set(key, opinion_ids)
+        candidates[key] = opinion_ids
+    return candidates
+
+
+def es_resolve_full_citations(
+    full_citations: list[FullCaseCitation],
+) -> dict[tuple, int]:
+    """Resolve many full citations from the same citing document to opinion
+    ids, batching the citation field lookups into a single ES request.
+
+    Citations that match more than one opinion are refined with the same
+    case name and reverse match heuristics used by
+    es_search_db_for_full_citation.
+
+    :param full_citations: A list of FullCaseCitation instances, all of them
+    with the same citing_opinion set.
+    :return: A dict mapping the cache key of each resolved citation to the
+    matched opinion id. Unresolved citations are not included.
+    """
+    candidates = es_lookup_full_citations_candidates(full_citations)
+    resolved: dict[tuple, int] = {}
+    for full_citation in full_citations:
+        key = get_full_citation_cache_key(full_citation)
+        if key in resolved:
+            continue
+        citing_opinion = getattr(full_citation, "citing_opinion", None)
+        # Eliminate self-cites.
+        opinion_ids = [
+            opinion_id
+            for opinion_id in candidates[key]
+            if citing_opinion is None or opinion_id != citing_opinion.pk
+        ]
+        if len(opinion_ids) == 1:
+            resolved[key] = opinion_ids[0]
+            continue
+        if (
+            len(opinion_ids) > 1
+            and citing_opinion is not None
+            and full_citation.metadata.defendant
+        ):
+            query = Q(
+                "bool",
+                must_not=[Q("match", id=citing_opinion.pk)],
+                filter=build_full_citation_filters(full_citation),
+            )
+            results = es_case_name_query(query, full_citation, citing_opinion)
+            if len(results) == 1:
+                resolved[key] = results[0]["id"]
+    return resolved
+
+
 def es_get_query_citation(
     cd: CleanData,
 ) -> tuple[Hit | None, list[FullCaseCitation]]:
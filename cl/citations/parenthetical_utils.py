@@ -1,10 +1,17 @@
+from typing import Iterable
+
 from asgiref.sync import sync_to_async
+from django.conf import settings
 from django.db import transaction
 from django.db.models import QuerySet
 
 from cl.citations.group_parentheticals import compute_parenthetical_groups
+from cl.lib.redis_utils import get_redis_interface
 from cl.search.models import OpinionCluster, ParentheticalGroup
 
+PARENTHETICAL_REGROUP_KEY = "parenthetical_groups:dirty_clusters"
+PARENTHETICAL_REGROUP_SCHEDULED_KEY = "parenthetical_groups:drain_scheduled"
+
 
 async def get_or_create_parenthetical_groups(
     cluster: OpinionCluster,
@@ -47,3 +54,61 @@ def create_parenthetical_groups(cluster: OpinionCluster) -> None:
         )
         group_to_create.save()
         group_to_create.parentheticals.set(cg.parentheticals)
+
+
+def mark_clusters_for_parenthetical_regroup(
+    cluster_ids: Iterable[int],
+) -> bool:
+    """Queue clusters whose parentheticals changed to have their groups
+    recomputed in the background. A cluster queued many times before the
+    queue is drained is only regrouped once.
+
+    :param cluster_ids: The ids of the clusters to regroup.
+    :return: True if no drain is scheduled yet and the caller should schedule
+    one, False otherwise.
+    """
+    cluster_ids = list(cluster_ids)
+    if not cluster_ids:
+        return False
+    r = get_redis_interface("CACHE")
+    pipe = r.pipeline()
+    pipe.sadd(PARENTHETICAL_REGROUP_KEY, *cluster_ids)
+    pipe.set(
+        PARENTHETICAL_REGROUP_SCHEDULED_KEY,
+        1,
+        nx=True,
+        ex=settings.PARENTHETICAL_REGROUP_DELAY * 10,
+    )
+    return bool(pipe.execute()[-1])
+
+
+def take_clusters_to_regroup(count: int) -> list[int]:
+    """Pop a batch of cluster ids from the regroup queue.
+
+    :param count: The maximum number of ids to pop.
+    :return: A list of cluster ids.
+    """
+    r = get_redis_interface("CACHE")
+    return [int(pk) for pk in r.spop(PARENTHETICAL_REGROUP_KEY, count)]
+
+
+def requeue_clusters_to_regroup(cluster_ids: Iterable[int]) -> None:
+    """Put back cluster ids whose regroup failed, so the next drain retries
+    them.
+
+    :param cluster_ids: The ids of the clusters to requeue.
+    :return: None
+    """
+    cluster_ids = list(cluster_ids)
+    if cluster_ids:
+        r = get_redis_interface("CACHE")
+        r.sadd(PARENTHETICAL_REGROUP_KEY, *cluster_ids)
+
+
+def clear_regroup_drain_scheduled() -> None:
+    """Allow the next flagged cluster to schedule a new drain.
+
+    :return: None
+    """
+    r = get_redis_interface("CACHE")
+    r.delete(PARENTHETICAL_REGROUP_SCHEDULED_KEY)
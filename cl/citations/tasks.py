@@ -1,12 +1,13 @@
+from dataclasses import dataclass
 from http.client import ResponseNotReady
-from typing import Dict, List, Set, Tuple
+from typing import Dict, Iterable, List, Set, Tuple
 
+from django.conf import settings
 from django.db import transaction
 from django.db.models import F
 from django.db.models.query import QuerySet
 from eyecite import get_citations
 from eyecite.models import CitationBase
-from eyecite.tokenizers import HyperscanTokenizer
 
 from cl.celery_init import app
 from cl.citations.annotate_citations import (
@@ -21,10 +22,18 @@ from cl.citations.match_citations import (
     NO_MATCH_RESOURCE,
     do_resolve_citations,
 )
-from cl.citations.parenthetical_utils import create_parenthetical_groups
+from cl.citations.parenthetical_utils import (
+    clear_regroup_drain_scheduled,
+    create_parenthetical_groups,
+    mark_clusters_for_parenthetical_regroup,
+    requeue_clusters_to_regroup,
+    take_clusters_to_regroup,
+)
 from cl.citations.recap_citations import store_recap_citations
 from cl.citations.score_parentheticals import parenthetical_score
+from cl.citations.tokenizers import HYPERSCAN_TOKENIZER
 from cl.citations.types import MatchedResourceType, SupportedCitationType
+from cl.citations.utils import mark_citing_opinion_for_pagerank
 from cl.search.models import (
     Opinion,
     OpinionCluster,
@@ -38,7 +47,6 @@ from cl.search.tasks import add_items_to_solr, index_related_cites_fields
 # they are considered parallel reporters. For example,
 # "22 U.S. 44, 46 (13 Atl. 33)" would have a distance of 6.
 PARALLEL_DISTANCE = 6
-HYPERSCAN_TOKENIZER = HyperscanTokenizer(cache_dir=".hyperscan")
 
 
 @app.task
@@ -134,62 +142,62 @@ def find_citations_and_parentheticals_for_opinion_by_pks(
         add_items_to_solr.delay(opinion_pks, "search.Opinion")
 
 
-def store_opinion_citations_and_update_parentheticals(
-    opinion: Opinion, index: bool
-) -> None:
+@dataclass
+class OpinionCitationChanges:
+    """The citations found in a citing opinion, resolved and ready to be
+    stored.
     """
-    Updates counts of citations to other opinions within a given court opinion, as well as parenthetical info for the cited opinions.
 
-    :param opinion: A search.Opinion object.
-    :param index: Whether to add the item to Solr
-    :return: None
+    citation_resolutions: Dict[
+        MatchedResourceType, List[SupportedCitationType]
+    ]
+    # The clusters newly cited by the opinion, whose citation count goes up
+    cited_clusters_to_update: Set[int]
+    opinions_cited: List[OpinionsCited]
+    parentheticals: List[Parenthetical]
+    clusters_to_update_par_groups_for: Set[int]
+
+
+def get_opinion_citation_changes(
+    opinion: Opinion,
+    citations: List[CitationBase],
+    currently_cited_opinions: Iterable[int],
+) -> OpinionCitationChanges:
+    """Resolve the citations found in an opinion and build the citation
+    objects and parentheticals to store for it.
+
+    :param opinion: A search.Opinion object, with its cleaned text memoized.
+    :param citations: The citations found in the opinion's text.
+    :param currently_cited_opinions: The ids of the opinions currently
+    stored as cited by the opinion.
+    :return: An OpinionCitationChanges object.
     """
-
-    # Memoize parsed versions of the opinion's text
-    get_and_clean_opinion_text(opinion)
-
-    # Extract the citations from the opinion's text
-    citations: List[CitationBase] = get_citations(
-        opinion.cleaned_text, tokenizer=HYPERSCAN_TOKENIZER
-    )
-
-    # If no citations are found, then there is nothing else to do for now.
-    if not citations:
-        return
-
     # Resolve all those different citation objects to Opinion objects,
     # using a variety of heuristics.
     citation_resolutions: Dict[
         MatchedResourceType, List[SupportedCitationType]
     ] = do_resolve_citations(citations, opinion)
 
-    # Generate the citing opinion's new HTML with inline citation links
-    opinion.html_with_citations = create_cited_html(
-        opinion, citation_resolutions
-    )
-
-    # Delete the unmatched citations
-    citation_resolutions.pop(NO_MATCH_RESOURCE, None)
+    # Ignore the unmatched citations from here on
+    matched_resolutions = {
+        o: c
+        for o, c in citation_resolutions.items()
+        if o is not NO_MATCH_RESOURCE
+    }
 
     # Increase the citation count for the cluster of each matched opinion
-    # if that cluster has not already been cited by this opinion. First,
-    # calculate a list of the IDs of every opinion whose cluster will need
-    # updating.
-
-    currently_cited_opinions = opinion.opinions_cited.all().values_list(
-        "pk", flat=True
-    )
-
-    opinion_ids_to_update = {
-        o.pk
-        for o in citation_resolutions.keys()
+    # if that cluster has not already been cited by this opinion.
+    currently_cited_opinions = set(currently_cited_opinions)
+    cited_clusters_to_update = {
+        o.cluster_id
+        for o in matched_resolutions.keys()
         if o.pk not in currently_cited_opinions
     }
 
     clusters_to_update_par_groups_for = set()
     parentheticals: List[Parenthetical] = []
 
-    for _opinion, _citations in citation_resolutions.items():
+    for _opinion, _citations in matched_resolutions.items():
         # Currently, eyecite has a bug where parallel citations are
         # detected individually. We avoid creating duplicate parentheticals
         # because of that by keeping track of what we've seen so far.
@@ -213,12 +221,76 @@ def store_opinion_citations_and_update_parentheticals(
                     )
                 )
 
+    opinions_cited = [
+        OpinionsCited(
+            citing_opinion_id=opinion.pk,
+            cited_opinion_id=_opinion.pk,
+            depth=len(_citations),
+        )
+        for _opinion, _citations in matched_resolutions.items()
+    ]
+    return OpinionCitationChanges(
+        citation_resolutions=citation_resolutions,
+        cited_clusters_to_update=cited_clusters_to_update,
+        opinions_cited=opinions_cited,
+        parentheticals=parentheticals,
+        clusters_to_update_par_groups_for=clusters_to_update_par_groups_for,
+    )
+
+
+def schedule_parenthetical_regroup(cluster_ids: Iterable[int]) -> None:
+    """Queue clusters to have their parenthetical groups recomputed, and
+    schedule a drain of the queue if none is pending.
+
+    :param cluster_ids: The ids of the clusters to regroup.
+    :return: None
+    """
+    if mark_clusters_for_parenthetical_regroup(cluster_ids):
+        regroup_queued_parenthetical_clusters.apply_async(
+            countdown=settings.PARENTHETICAL_REGROUP_DELAY
+        )
+
+
+def store_opinion_citations_and_update_parentheticals(
+    opinion: Opinion, index: bool
+) -> None:
+    """
+    Updates counts of citations to other opinions within a given court opinion, as well as parenthetical info for the cited opinions.
+
+    :param opinion: A search.Opinion object.
+    :param index: Whether to add the item to Solr
+    :return: None
+    """
+
+    # Memoize parsed versions of the opinion's text
+    get_and_clean_opinion_text(opinion)
+
+    # Extract the citations from the opinion's text
+    citations: List[CitationBase] = get_citations(
+        opinion.cleaned_text, tokenizer=HYPERSCAN_TOKENIZER
+    )
+
+    # If no citations are found, then there is nothing else to do for now.
+    if not citations:
+        return
+
+    changes = get_opinion_citation_changes(
+        opinion,
+        citations,
+        opinion.opinions_cited.all().values_list("pk", flat=True),
+    )
+
+    # Generate the citing opinion's new HTML with inline citation links
+    opinion.html_with_citations = create_cited_html(
+        opinion, changes.citation_resolutions
+    )
+
     # Finally, commit these changes to the database in a single
     # transcation block. Trigger a single Solr update as well, if
     # required.
     with transaction.atomic():
         opinion_clusters_to_update = OpinionCluster.objects.filter(
-            sub_opinions__pk__in=opinion_ids_to_update
+            pk__in=changes.cited_clusters_to_update
         )
         opinion_clusters_to_update.update(
             citation_count=F("citation_count") + 1
@@ -234,28 +306,21 @@ def store_opinion_citations_and_update_parentheticals(
         Parenthetical.objects.filter(describing_opinion_id=opinion.pk).delete()
 
         # Create the new ones.
-        OpinionsCited.objects.bulk_create(
-            [
-                OpinionsCited(
-                    citing_opinion_id=opinion.pk,
-                    cited_opinion_id=_opinion.pk,
-                    depth=len(_citations),
-                )
-                for _opinion, _citations in citation_resolutions.items()
-            ]
-        )
-        Parenthetical.objects.bulk_create(parentheticals)
-
-        # Update parenthetical groups for clusters that we have added
-        # parentheticals for from this opinion
-        for cluster_id in clusters_to_update_par_groups_for:
-            create_parenthetical_groups(
-                OpinionCluster.objects.get(pk=cluster_id)
-            )
+        OpinionsCited.objects.bulk_create(changes.opinions_cited)
+        Parenthetical.objects.bulk_create(changes.parentheticals)
 
         # Save all the changes to the citing opinion (send to solr later)
         opinion.save(index=False)
 
+    # Queue the parenthetical groups of the clusters that we have added
+    # parentheticals for from this opinion, so they're recomputed once in
+    # the background instead of on every citing opinion.
+    schedule_parenthetical_regroup(changes.clusters_to_update_par_groups_for)
+
+    # The opinion's outgoing citations were replaced, flag it for the next
+    # incremental PageRank run.
+    mark_citing_opinion_for_pagerank(opinion.pk)
+
     # Update changes in ES.
     cluster_ids_to_update = list(
         opinion_clusters_to_update.values_list("id", flat=True)
@@ -263,3 +328,34 @@ def store_opinion_citations_and_update_parentheticals(
     index_related_cites_fields.delay(
         OpinionsCited.__name__, opinion.pk, cluster_ids_to_update
     )
+
+
+@app.task(ignore_result=True)
+def regroup_queued_parenthetical_clusters() -> int:
+    """Drain the queue of clusters whose parentheticals changed, recomputing
+    the parenthetical groups of each cluster once, in batches.
+
+    It's scheduled when the first cluster is queued after a drain. The
+    regroup_parenthetical_clusters command also runs it from cron to pick up
+    anything a lost task left behind.
+
+    :return: The number of clusters regrouped.
+    """
+    # Clusters queued from now on schedule a new drain.
+    clear_regroup_drain_scheduled()
+    regrouped = 0
+    while cluster_ids := take_clusters_to_regroup(
+        settings.PARENTHETICAL_REGROUP_BATCH_SIZE
+    ):
+        # Deleted clusters are just dropped from the queue.
+        clusters = list(OpinionCluster.objects.filter(pk__in=cluster_ids))
+        for i, cluster in enumerate(clusters):
+            try:
+                with transaction.atomic():
+                    create_parenthetical_groups(cluster)
+            except Exception:
+                # Put back the rest of the batch for the next drain.
+                requeue_clusters_to_regroup(c.pk for c in clusters[i:])
+                raise
+            regrouped += 1
+    return regrouped
@@ -1,5 +1,6 @@
 import itertools
 import json
+import tempfile
 from dataclasses import dataclass
 from datetime import date, datetime, timedelta, timezone
 from http import HTTPStatus
@@ -13,6 +14,7 @@ from django.core.cache import cache as default_cache
 from django.core.management import call_command
 from django.test import override_settings
 from django.urls import reverse
+from elasticsearch_dsl import MultiSearch
 from eyecite import get_citations
 from eyecite.test_factories import (
     case_citation,
@@ -25,21 +27,29 @@ from eyecite.test_factories import (
 from eyecite.tokenizers import HyperscanTokenizer
 from factory import RelatedFactory
 from lxml import etree
+from waffle.testutils import override_switch
 
 from cl.citations.annotate_citations import (
     create_cited_html,
     get_and_clean_opinion_text,
 )
+from cl.citations.citation_pipeline import CHECKPOINT_KEY
 from cl.citations.filter_parentheticals import (
     clean_parenthetical_text,
     is_parenthetical_descriptive,
 )
 from cl.citations.group_parentheticals import (
     compute_parenthetical_groups,
+    compute_parenthetical_groups_datasketch,
     get_graph_component,
     get_parenthetical_tokens,
     get_representative_parenthetical,
 )
+from cl.citations.lookup_index import (
+    DIRTY_BOOKS_KEY,
+    build_citation_lookup_index,
+    lookup_citation,
+)
 from cl.citations.management.commands.add_parallel_citations import (
     identify_parallel_citations,
     make_edge_list,
@@ -49,11 +59,21 @@ from cl.citations.match_citations import (
     do_resolve_citations,
     resolve_fullcase_citation,
 )
+from cl.citations.match_citations_queries import (
+    CitationLookupCache,
+    citation_lookup_cache,
+)
+from cl.citations.parenthetical_utils import (
+    PARENTHETICAL_REGROUP_KEY,
+    PARENTHETICAL_REGROUP_SCHEDULED_KEY,
+)
 from cl.citations.score_parentheticals import parenthetical_score
 from cl.citations.tasks import (
     find_citations_and_parentheticals_for_opinion_by_pks,
+    regroup_queued_parenthetical_clusters,
     store_recap_citations,
 )
+from cl.lib.redis_utils import get_redis_interface
 from cl.lib.test_helpers import (
     CourtTestCase,
     IndexedSolrTestCase,
@@ -79,6 +99,7 @@ from cl.search.models import (
     ParentheticalGroup,
     RECAPDocument,
 )
+from cl.search.selectors import get_clusters_from_citation_str
 from cl.tests.cases import ESIndexTestCase, SimpleTestCase, TestCase
 from cl.users.factories import UserProfileWithParentsFactory
 
@@ -803,6 +824,114 @@ class CitationObjectTest(ESIndexTestCase, TestCase):
                     msg=f"\n{citation_resolutions}\n\n    !=\n\n{expected_resolutions}",
                 )
 
+    @override_switch("es_resolve_citations", active=True)
+    def test_batched_citation_resolution(self) -> None:
+        """Are full citations resolved through a single multi search request
+        and is the lookup cache reused by later resolutions?
+        """
+        citation_lookup_cache.clear()
+        opinion1 = Opinion.objects.get(cluster__pk=self.citation1.cluster_id)
+        opinion2 = Opinion.objects.get(cluster__pk=self.citation2.cluster_id)
+        opinion5 = Opinion.objects.get(cluster__pk=self.citation5.cluster_id)
+        full1 = case_citation(
+            volume="1",
+            reporter="U.S.",
+            page="1",
+            index=1,
+            reporter_found="U.S.",
+            metadata={"court": "scotus"},
+        )
+        full1_repeated = case_citation(
+            volume="1",
+            reporter="U.S.",
+            page="1",
+            index=2,
+            reporter_found="U.S.",
+            metadata={"court": "scotus"},
+        )
+        full2 = case_citation(
+            volume="2",
+            reporter="F.3d",
+            page="2",
+            index=3,
+            reporter_found="F.3d",
+            metadata={"court": "ca1"},
+        )
+        expected_resolutions = {
+            opinion1: [full1, full1_repeated],
+            opinion2: [full2],
+        }
+        with patch(
+            "cl.citations.match_citations_queries.MultiSearch.execute",
+            side_effect=MultiSearch.execute,
+            autospec=True,
+        ) as msearch_mock:
+            citation_resolutions = do_resolve_citations(
+                [full1, full1_repeated, full2], opinion5
+            )
+            self.assertEqual(citation_resolutions, expected_resolutions)
+            self.assertEqual(msearch_mock.call_count, 1)
+            # Duplicated citations are only looked up once.
+            self.assertEqual(len(citation_lookup_cache), 2)
+
+            # A second resolution is served from the cache.
+            citation_resolutions = do_resolve_citations(
+                [full1, full2], opinion5
+            )
+            self.assertEqual(
+                citation_resolutions, {opinion1: [full1], opinion2: [full2]}
+            )
+            self.assertEqual(msearch_mock.call_count, 1)
+
+        # Self-cites are excluded after reading the cache.
+        citation_resolutions = do_resolve_citations([full1], opinion1)
+        self.assertEqual(citation_resolutions, {NO_MATCH_RESOURCE: [full1]})
+
+    @override_switch("es_resolve_citations", active=True)
+    def test_unresolved_citations_are_not_cached(self) -> None:
+        """Does a citation that matched no opinion resolve once the opinion
+        it cites is added?
+        """
+        citation_lookup_cache.clear()
+        citing_opinion = Opinion.objects.get(
+            cluster__pk=self.citation5.cluster_id
+        )
+        full_citation = case_citation(
+            volume="4",
+            reporter="U.S.",
+            page="444",
+            index=1,
+            reporter_found="U.S.",
+            metadata={"court": "scotus"},
+        )
+        citation_resolutions = do_resolve_citations(
+            [full_citation], citing_opinion
+        )
+        self.assertEqual(
+            citation_resolutions, {NO_MATCH_RESOURCE: [full_citation]}
+        )
+        self.assertEqual(len(citation_lookup_cache), 0)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            citation = CitationWithParentsFactory.create(
+                volume="4",
+                reporter="U.S.",
+                page="444",
+                cluster=OpinionClusterFactoryWithChildrenAndParents(
+                    docket=DocketFactory(court=self.court_scotus),
+                    case_name="Dolor v. Sit",
+                    date_filed=date(2000, 1, 1),
+                ),
+            )
+        cited_opinion = Opinion.objects.get(cluster__pk=citation.cluster_id)
+
+        citation_resolutions = do_resolve_citations(
+            [full_citation], citing_opinion
+        )
+        self.assertEqual(
+            citation_resolutions, {cited_opinion: [full_citation]}
+        )
+
     def test_citation_matching_issue621(self) -> None:
         """Make sure that a citation like 1 Wheat 9 doesn't match 9 Wheat 1"""
         # citation2a is 9 F. 1, so we expect no results.
@@ -914,6 +1043,51 @@ class CitationObjectTest(ESIndexTestCase, TestCase):
             1,
         )
 
+    def test_parenthetical_regroup_queue(self) -> None:
+        """Are the parenthetical groups of a cluster cited by many opinions
+        recomputed once, by a single drain of the queue?
+        """
+        r = get_redis_interface("CACHE")
+        r.delete(
+            PARENTHETICAL_REGROUP_KEY, PARENTHETICAL_REGROUP_SCHEDULED_KEY
+        )
+        cited = Opinion.objects.get(cluster__pk=self.citation1.cluster_id)
+        citing_pks = [
+            Opinion.objects.get(cluster__pk=citation.cluster_id).pk
+            for citation in (self.citation4, self.citation5)
+        ]
+        with patch(
+            "cl.citations.tasks.regroup_queued_parenthetical_clusters.apply_async"
+        ) as mock_apply_async:
+            find_citations_and_parentheticals_for_opinion_by_pks.delay(
+                citing_pks
+            )
+
+        # Both citing opinions describe the cluster, but only one drain is
+        # scheduled and nothing is regrouped before it runs.
+        mock_apply_async.assert_called_once()
+        self.assertIn(
+            str(cited.cluster_id), r.smembers(PARENTHETICAL_REGROUP_KEY)
+        )
+        self.assertFalse(
+            ParentheticalGroup.objects.filter(opinion=cited).exists()
+        )
+
+        regrouped = regroup_queued_parenthetical_clusters()
+
+        # The clusters of Foo and Qwerty were regrouped.
+        self.assertEqual(regrouped, 2)
+        self.assertEqual(r.scard(PARENTHETICAL_REGROUP_KEY), 0)
+        self.assertFalse(r.exists(PARENTHETICAL_REGROUP_SCHEDULED_KEY))
+        self.assertTrue(
+            ParentheticalGroup.objects.filter(opinion=cited).exists()
+        )
+
+        # The command run from cron drains what a lost task left behind.
+        r.sadd(PARENTHETICAL_REGROUP_KEY, cited.cluster_id)
+        call_command("regroup_parenthetical_clusters")
+        self.assertEqual(r.scard(PARENTHETICAL_REGROUP_KEY), 0)
+
 
 class CitationFeedTest(
     ESIndexTestCase, CourtTestCase, PeopleTestCase, SearchTestCase, TestCase
@@ -1090,6 +1264,45 @@ class CitationCommandTest(ESIndexTestCase, TestCase):
         ]
         self.call_command_and_test_it(args)
 
+    def test_pipeline(self) -> None:
+        args = [
+            "--start-id",
+            f"{min(self.opinion_id2, self.opinion_id3)}",
+            "--pipeline",
+            "--workers",
+            "0",
+            "--batch-size",
+            "1",
+            "--index",
+            "False",
+        ]
+        self.call_command_and_test_it(args)
+        citing = Opinion.objects.get(pk=self.opinion_id2)
+        self.assertIn('class="citation"', citing.html_with_citations)
+        self.assertEqual(
+            OpinionsCited.objects.filter(citing_opinion=citing).count(), 1
+        )
+        # The checkpoint is cleared once the run is done.
+        self.assertIsNone(get_redis_interface("CACHE").get(CHECKPOINT_KEY))
+
+    def test_pipeline_resumes_from_checkpoint(self) -> None:
+        """Are the opinions stored by the previous run skipped?"""
+        r = get_redis_interface("CACHE")
+        r.set(CHECKPOINT_KEY, max(self.opinion_id2, self.opinion_id3))
+        call_command(
+            "find_citations",
+            "--all",
+            "--pipeline",
+            "--workers",
+            "0",
+            "--resume",
+            "--index",
+            "False",
+        )
+        cited = Opinion.objects.get(cluster__pk=self.citation1.cluster_id)
+        self.assertEqual(cited.cluster.citation_count, 0)
+        self.assertIsNone(r.get(CHECKPOINT_KEY))
+
 
 class ParallelCitationTest(SimpleTestCase):
     databases = "__all__"
@@ -1437,6 +1650,29 @@ class DescriptionScoreTest(SimpleTestCase):
         return output
 
 
+class CitationLookupCacheTest(SimpleTestCase):
+    def test_lru_eviction(self) -> None:
+        """Does the citation lookup cache evict the least recently used
+        entries once it's full?
+        """
+        lookup_cache = CitationLookupCache(max_size=2)
+        lookup_cache.set(("1 U.S. 1", 1790, 1800, "scotus"), (1,))
+        lookup_cache.set(("2 U.S. 2", 1790, 1800, "scotus"), (2, 3))
+        # Touch the first key so the second one is the oldest.
+        self.assertEqual(
+            lookup_cache.get(("1 U.S. 1", 1790, 1800, "scotus")), (1,)
+        )
+        lookup_cache.set(("3 U.S. 3", 1790, 1800, "scotus"), ())
+
+        self.assertEqual(len(lookup_cache), 2)
+        self.assertIsNone(lookup_cache.get(("2 U.S. 2", 1790, 1800, "scotus")))
+        self.assertEqual(
+            lookup_cache.get(("3 U.S. 3", 1790, 1800, "scotus")), ()
+        )
+        self.assertEqual(lookup_cache.hits, 2)
+        self.assertEqual(lookup_cache.misses, 1)
+
+
 @dataclass(frozen=True)
 class DummyParenthetical:
     """
@@ -1580,6 +1816,44 @@ class GroupParentheticalsTest(SimpleTestCase):
                     f"Got incorrect result from get_parenthetical_groups for: {groups}",
                 )
 
+    def test_batched_groups_match_datasketch_groups(self):
+        """Does the batched MinHash implementation group parentheticals the
+        same way the datasketch one does?
+        """
+        texts = [
+            "Holding that a prisoner must show an actual injury to state a claim for denial of access to courts",
+            "Holding that an inmate must show an actual injury to state a claim for denial of access to the courts",
+            "Holding that inmate must establish actual injury with legal library or legal assistance program",
+            'Finding that forfeitures are fines "if they constitute punishment for an offense"',
+            "Finding that forfeitures are fines if they constitute punishment",
+            "Applying medium scrutiny to a law that prohibited the sale of beer",
+            "Holding public employees could not be fired because of their politics",
+            # Parentheticals without tokens are grouped on their own.
+            "the",
+            "",
+        ]
+        parentheticals = [
+            DummyParenthetical(text=text, id=i, score=i / 10)
+            for i, text in enumerate(texts * 3)
+        ]
+        expected = compute_parenthetical_groups_datasketch(parentheticals)
+        output = compute_parenthetical_groups(parentheticals)
+
+        self.assertEqual(
+            {
+                (frozenset(g.parentheticals), g.representative, g.score)
+                for g in expected
+            },
+            {
+                (frozenset(g.parentheticals), g.representative, g.score)
+                for g in output
+            },
+        )
+        self.assertEqual(
+            [g.score for g in output],
+            sorted([g.score for g in output], reverse=True),
+        )
+
     def test_get_representative_parenthetical(self):
         """
         Tests whether get_representative parenthetical identifies the correct
@@ -1772,6 +2046,10 @@ class CitationLookUpApiTest(
         await default_cache.adelete_many(
             ["citations_tests", "citation_throttle_test"]
         )
+        # The throttle windows are stored as Redis sorted sets.
+        get_redis_interface("CACHE").delete(
+            "citations_tests", "citation_throttle_test"
+        )
 
     async def test_can_handle_requests_with_no_citation_or_reporter(
         self, cache_key_mock
@@ -2440,3 +2718,84 @@ class CitationLookUpApiTest(
             # times the allowed number of citations.
             expected_time = test_date + timedelta(minutes=3)
             self.assertEqual(data["wait_until"], expected_time.isoformat())
+
+
+class CitationLookupIndexTest(
+    CourtTestCase, PeopleTestCase, SearchTestCase, TestCase
+):
+    def setUp(self) -> None:
+        self.index_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.index_dir.cleanup)
+        settings_override = override_settings(
+            CITATION_LOOKUP_INDEX_DIR=self.index_dir.name,
+            CITATION_LOOKUP_INDEX_RELOAD_INTERVAL=0,
+        )
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+        get_redis_interface("CACHE").delete(DIRTY_BOOKS_KEY)
+        build_citation_lookup_index(self.index_dir.name)
+
+    def test_lookup_exact_and_preceding_pages(self) -> None:
+        """Can we look up exact citations and the closest preceding citation
+        in the same book using natural sort on pages?
+        """
+        result = lookup_citation("F.2d", "56", "9")
+        assert result is not None
+        self.assertEqual(result.exact_cluster_ids, [self.opinion_cluster_2.pk])
+
+        # Both clusters share the same citation.
+        result = lookup_citation("state", "33", "1")
+        assert result is not None
+        self.assertEqual(
+            sorted(result.exact_cluster_ids),
+            sorted([self.opinion_cluster_1.pk, self.opinion_cluster_2.pk]),
+        )
+
+        # Page 10 is a pincite of 56 F.2d 9, not 56 F.2d 11.
+        result = lookup_citation("F.2d", "56", "10")
+        assert result is not None
+        self.assertEqual(result.exact_cluster_ids, [])
+        self.assertEqual(
+            result.preceding_cluster_id, self.opinion_cluster_2.pk
+        )
+
+        result = lookup_citation("F.2d", "56", "1")
+        assert result is not None
+        self.assertEqual(result.exact_cluster_ids, [])
+        self.assertIsNone(result.preceding_cluster_id)
+
+        result = lookup_citation("F.2d", "999", "1")
+        assert result is not None
+        self.assertEqual(result.exact_cluster_ids, [])
+        self.assertIsNone(result.preceding_cluster_id)
+
+    async def test_selector_uses_index(self) -> None:
+        """Does get_clusters_from_citation_str return the same clusters when
+        answering from the index?
+        """
+        clusters, count = await get_clusters_from_citation_str(
+            "F.2d", "56", "10"
+        )
+        self.assertEqual(count, 1)
+        self.assertEqual(
+            [c.pk async for c in clusters], [self.opinion_cluster_2.pk]
+        )
+
+    def test_changed_books_fall_back_to_db(self) -> None:
+        """Are lookups in a book with citations saved after the build
+        answered by the DB until the index is rebuilt?
+        """
+        CitationWithParentsFactory.create(
+            volume=56,
+            reporter="F.2d",
+            page="10",
+            type=1,
+            cluster=self.opinion_cluster_3,
+        )
+        self.assertIsNone(lookup_citation("F.2d", "56", "10"))
+        self.assertIsNotNone(lookup_citation("state", "33", "1"))
+
+        build_citation_lookup_index(self.index_dir.name)
+        result = lookup_citation("F.2d", "56", "10")
+        assert result is not None
+        self.assertEqual(result.exact_cluster_ids, [self.opinion_cluster_3.pk])
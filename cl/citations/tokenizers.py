@@ -0,0 +1,35 @@
+"""The Hyperscan tokenizer shared by everything that extracts citations.
+
+Compiling eyecite's patterns into a Hyperscan database takes seconds, so the
+compiled database is cached on disk, in the HYPERSCAN_CACHE_DIR absolute
+path. The precompile_hyperscan_db command fills the cache when the image is
+built, and the web and Celery workers load it when they boot, so the first
+request that extracts citations doesn't stall.
+"""
+
+import logging
+import time
+
+from django.conf import settings
+from eyecite.tokenizers import HyperscanTokenizer
+
+logger = logging.getLogger(__name__)
+
+HYPERSCAN_TOKENIZER = HyperscanTokenizer(
+    cache_dir=str(settings.HYPERSCAN_CACHE_DIR)
+)
+
+
+def warm_hyperscan_tokenizer() -> None:
+    """Load the tokenizer's Hyperscan database, compiling and caching it if
+    it isn't cached yet.
+
+    :return: None
+    """
+    start = time.monotonic()
+    HYPERSCAN_TOKENIZER.hyperscan_db
+    logger.info(
+        "Loaded the Hyperscan database from %s in %.2fs.",
+        settings.HYPERSCAN_CACHE_DIR,
+        time.monotonic() - start,
+    )
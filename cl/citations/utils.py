@@ -10,6 +10,8 @@ from eyecite.models import CitationBase, FullCaseCitation, ShortCaseCitation
 from eyecite.utils import strip_punct
 from reporters_db import EDITIONS, VARIATIONS_ONLY
 
+from cl.lib.redis_utils import get_redis_interface
+
 QUERY_LENGTH = 10
 SLUGIFIED_EDITIONS: dict[str, str] = {
     str(slugify(item)): item for item in EDITIONS.keys()
@@ -150,3 +152,17 @@ def filter_out_non_case_law_and_non_valid_citations(
         and c.groups.get("volume", None)
         and c.groups.get("page", None)
     ]
+
+
+PAGERANK_DIRTY_OPINIONS_KEY = "pagerank:dirty_citing_opinions"
+
+
+def mark_citing_opinion_for_pagerank(opinion_id: int) -> None:
+    """Flag an opinion whose outgoing citations changed, so the next
+    incremental PageRank run reloads its edges.
+
+    :param opinion_id: The id of the citing opinion.
+    :return: None
+    """
+    r = get_redis_interface("CACHE")
+    r.sadd(PAGERANK_DIRTY_OPINIONS_KEY, opinion_id)
@@ -8,19 +8,17 @@ from bs4 import BeautifulSoup as bs4
 from django.db import transaction
 from eyecite.find import get_citations
 from eyecite.models import CitationBase as FoundCitation
-from eyecite.tokenizers import HyperscanTokenizer
 from eyecite.utils import clean_text
 from juriscraper.lib.string_utils import CaseNameTweaker, harmonize
 from reporters_db import REPORTERS
 
+from cl.citations.tokenizers import HYPERSCAN_TOKENIZER
 from cl.citations.utils import map_reporter_db_cite_type
 from cl.lib.command_utils import VerboseCommand, logger
 from cl.lib.string_utils import trunc
 from cl.search.models import SOURCES, Citation, Docket, Opinion, OpinionCluster
 from cl.search.tasks import add_items_to_solr
 
-HYPERSCAN_TOKENIZER = HyperscanTokenizer(cache_dir=".hyperscan")
-
 cnt = CaseNameTweaker()
 
 
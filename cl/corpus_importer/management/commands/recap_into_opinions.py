@@ -2,7 +2,6 @@ from asgiref.sync import async_to_sync
 from django.conf import settings
 from django.core.management import BaseCommand
 from django.db.models import Q
-from eyecite.tokenizers import HyperscanTokenizer
 from httpx import (
     HTTPStatusError,
     NetworkError,
@@ -11,6 +10,7 @@ from httpx import (
     TimeoutException,
 )
 
+from cl.citations.tokenizers import HYPERSCAN_TOKENIZER
 from cl.corpus_importer.tasks import ingest_recap_document
 from cl.lib.celery_utils import CeleryThrottle
 from cl.lib.command_utils import logger
@@ -18,8 +18,6 @@ from cl.lib.decorators import retry
 from cl.lib.microservice_utils import microservice
 from cl.search.models import SOURCES, Court, OpinionCluster, RECAPDocument
 
-HYPERSCAN_TOKENIZER = HyperscanTokenizer(cache_dir=".hyperscan")
-
 
 @retry(
     ExceptionToCheck=(
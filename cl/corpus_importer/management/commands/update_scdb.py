@@ -25,14 +25,12 @@ from django.core.management import CommandError
 from django.db import IntegrityError
 from django.utils.encoding import force_bytes
 from eyecite.find import get_citations
-from eyecite.tokenizers import HyperscanTokenizer
 
+from cl.citations.tokenizers import HYPERSCAN_TOKENIZER
 from cl.lib.command_utils import VerboseCommand, logger
 from cl.lib.string_diff import gen_diff_ratio
 from cl.search.models import Citation, OpinionCluster
 
-HYPERSCAN_TOKENIZER = HyperscanTokenizer(cache_dir=".hyperscan")
-
 # Relevant numbers:
 #  - 7907: After this point we don't seem to have any citations for items.
 
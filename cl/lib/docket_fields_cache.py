@@ -0,0 +1,215 @@
+"""A cache of the docket fields merged into search results from the DB.
+
+merge_unavailable_fields_on_parent_document adds fields that aren't indexed
+in ES to the results of front end RECAP and dockets searches, like the
+initial document button of every docket. Looking them up took a DB query for
+every results page, so they're cached in Redis per docket and read for a
+whole page with a single MGET. Only the dockets missing from the cache are
+looked up in the DB.
+
+The signal receivers in cl.search.signals delete the entry of a docket when
+the docket or its initial document are saved or deleted. Entries expire
+after DOCKET_FIELDS_TIMEOUT seconds, for changes made without signals.
+
+Deleting an entry also bumps a version number of the docket. Entries looked
+up in the DB are only stored if the version didn't change meanwhile, so a
+lookup that raced with a change can't store stale fields after they were
+deleted.
+"""
+
+import json
+from typing import Iterable
+
+from django.db.models import Q
+
+from cl.lib.redis_utils import get_redis_interface
+from cl.search.models import Court, RECAPDocument
+
+DOCKET_FIELDS_PREFIX = "docket_fields"
+DOCKET_FIELDS_TIMEOUT = 60 * 60 * 6
+
+# KEYS[1]: The fields key of a docket.
+# KEYS[2]: The version key of the docket.
+# ARGV: The fields JSON, the version read before the DB lookup or an empty
+#   string if there was none, and the timeout.
+# Stores the fields only if the version is unchanged.
+SET_DOCKET_FIELDS_LUA = """
+if (redis.call("GET", KEYS[2]) or "") == ARGV[2] then
+    redis.call("SET", KEYS[1], ARGV[1], "EX", ARGV[3])
+end
+return 0
+"""
+set_docket_fields_script = get_redis_interface("CACHE").register_script(
+    SET_DOCKET_FIELDS_LUA
+)
+
+# The initial document URL, the URL to buy it and the text of the button.
+InitialDocument = tuple[str | None, str | None, str]
+NO_INITIAL_DOCUMENT: InitialDocument = (None, None, "")
+
+
+def get_docket_fields_key(docket_id: int) -> str:
+    """Get the Redis key of the cached fields of a docket.
+
+    :param docket_id: The docket ID.
+    :return: The key.
+    """
+    return f"{DOCKET_FIELDS_PREFIX}:{docket_id}"
+
+
+def get_docket_fields_version_key(docket_id: int) -> str:
+    """Get the Redis key of the version of the cached fields of a docket.
+
+    :param docket_id: The docket ID.
+    :return: The key.
+    """
+    return f"{DOCKET_FIELDS_PREFIX}:version:{docket_id}"
+
+
+def fetch_initial_documents(
+    docket_ids: Iterable[int],
+) -> dict[int, InitialDocument]:
+    """Look up the initial documents of dockets in the DB.
+
+    :param docket_ids: The IDs of the dockets.
+    :return: A dict mapping the ID of every docket with an initial document
+    to its InitialDocument tuple.
+    """
+    # This query retrieves initial documents considering two
+    # possibilities:
+    # 1. For district, bankruptcy, and appellate entries where we don't know
+    #    if the entry contains attachments, it considers:
+    #    document_number=1 and attachment_number=None and document_type=PACER_DOCUMENT
+    #    This represents the main document with document_number 1.
+    # 2. For appellate entries where the attachment page has already been
+    #    merged, it considers:
+    #    document_number=1 and attachment_number=1 and document_type=ATTACHMENT
+    #    This represents document_number 1 that has been converted to an attachment.
+
+    appellate_court_ids = (
+        Court.federal_courts.appellate_pacer_courts().values_list(
+            "pk", flat=True
+        )
+    )
+    initial_documents = (
+        RECAPDocument.objects.filter(
+            Q(
+                Q(
+                    attachment_number=None,
+                    document_type=RECAPDocument.PACER_DOCUMENT,
+                )
+                | Q(
+                    attachment_number=1,
+                    document_type=RECAPDocument.ATTACHMENT,
+                    docket_entry__docket__court_id__in=appellate_court_ids,
+                )
+            ),
+            docket_entry__docket_id__in=docket_ids,
+            document_number="1",
+        )
+        .select_related(
+            "docket_entry",
+            "docket_entry__docket",
+            "docket_entry__docket__court",
+        )
+        .only(
+            "pk",
+            "document_type",
+            "document_number",
+            "attachment_number",
+            "pacer_doc_id",
+            "is_available",
+            "filepath_local",
+            "docket_entry__docket_id",
+            "docket_entry__docket__slug",
+            "docket_entry__docket__pacer_case_id",
+            "docket_entry__docket__court__jurisdiction",
+            "docket_entry__docket__court_id",
+        )
+    )
+
+    initial_documents_in_page: dict[int, InitialDocument] = {}
+    for initial_document in initial_documents:
+        if initial_document.has_valid_pdf:
+            # Initial Document available
+            initial_documents_in_page[
+                initial_document.docket_entry.docket_id
+            ] = (
+                initial_document.get_absolute_url(),
+                None,
+                "Initial Document",
+            )
+        else:
+            # Initial Document not available. Buy button.
+            initial_documents_in_page[
+                initial_document.docket_entry.docket_id
+            ] = (
+                None,
+                initial_document.pacer_url,
+                "Buy Initial Document",
+            )
+    return initial_documents_in_page
+
+
+def get_initial_documents(
+    docket_ids: Iterable[int],
+) -> dict[int, InitialDocument]:
+    """Get the initial documents of dockets, from the cache or the DB.
+
+    :param docket_ids: The IDs of the dockets.
+    :return: A dict mapping every docket ID to its InitialDocument tuple, or
+    to NO_INITIAL_DOCUMENT if it has none.
+    """
+    docket_ids = list(docket_ids)
+    if not docket_ids:
+        return {}
+    r = get_redis_interface("CACHE")
+    # Read the versions along with the fields, before the DB lookup.
+    cached = r.mget(
+        [get_docket_fields_key(pk) for pk in docket_ids]
+        + [get_docket_fields_version_key(pk) for pk in docket_ids]
+    )
+    versions = dict(zip(docket_ids, cached[len(docket_ids) :]))
+    initial_documents: dict[int, InitialDocument] = {
+        pk: tuple(json.loads(fields)["initial_document"])
+        for pk, fields in zip(docket_ids, cached)
+        if fields is not None
+    }
+    missing_ids = [pk for pk in docket_ids if pk not in initial_documents]
+    if not missing_ids:
+        return initial_documents
+
+    fetched = fetch_initial_documents(missing_ids)
+    pipe = r.pipeline()
+    for pk in missing_ids:
+        initial_documents[pk] = fetched.get(pk, NO_INITIAL_DOCUMENT)
+        set_docket_fields_script(
+            keys=[
+                get_docket_fields_key(pk),
+                get_docket_fields_version_key(pk),
+            ],
+            args=[
+                json.dumps({"initial_document": initial_documents[pk]}),
+                versions[pk] or "",
+                DOCKET_FIELDS_TIMEOUT,
+            ],
+            client=pipe,
+        )
+    pipe.execute()
+    return initial_documents
+
+
+def invalidate_docket_fields(*docket_ids: int) -> None:
+    """Delete the cached fields of dockets and bump their versions.
+
+    :param docket_ids: The IDs of the dockets that changed.
+    :return: None
+    """
+    if not docket_ids:
+        return
+    pipe = get_redis_interface("CACHE").pipeline()
+    for pk in docket_ids:
+        pipe.delete(get_docket_fields_key(pk))
+        pipe.incr(get_docket_fields_version_key(pk))
+        pipe.expire(get_docket_fields_version_key(pk), DOCKET_FIELDS_TIMEOUT)
+    pipe.execute()
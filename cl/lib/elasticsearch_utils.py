@@ -30,6 +30,7 @@ from elasticsearch_dsl.utils import AttrDict
 from cl.audio.models import Audio
 from cl.custom_filters.templatetags.text_filters import html_decode
 from cl.lib.date_time import midnight_pt
+from cl.lib.docket_fields_cache import get_initial_documents
 from cl.lib.string_utils import trunc
 from cl.lib.types import (
     ApiPositionMapping,
@@ -1421,12 +1422,28 @@ def get_facet_dict_for_search_query(
     :param search_form: The form displayed in the user interface
     """
 
+    return make_facet_fields(
+        search_form, get_status_facet_counts(search_query, cd)
+    )
+
+
+def get_status_facet_counts(
+    search_query: Search, cd: CleanData
+) -> dict[str, int]:
+    """Count the clusters matching a search query by status, omitting the
+    stat_ filter so the counts consider clusters of all statuses.
+
+    :param search_query: The Elasticsearch search query object.
+    :param cd: The user input CleanedData
+    :return: A dict mapping every status to its number of clusters.
+    """
+
     cd["just_facets_query"] = True
     search_query, _ = build_es_base_query(search_query, cd)
     search_query.aggs.bucket("status", A("terms", field="status.raw"))
     search_query = search_query.extra(size=0)
     response = search_query.execute()
-    return make_es_stats_variable(search_form, response)
+    return get_status_facet_values(response)
 
 
 def build_es_main_query(
@@ -1854,80 +1871,9 @@ def merge_unavailable_fields_on_parent_document(
             SEARCH_TYPES.RECAP | SEARCH_TYPES.DOCKETS
         ) if request_type == "frontend":
             # Merge initial document button to the frontend search results.
-            docket_ids = {doc["docket_id"] for doc in results}
-            # This query retrieves initial documents considering two
-            # possibilities:
-            # 1. For district, bankruptcy, and appellate entries where we don't know
-            #    if the entry contains attachments, it considers:
-            #    document_number=1 and attachment_number=None and document_type=PACER_DOCUMENT
-            #    This represents the main document with document_number 1.
-            # 2. For appellate entries where the attachment page has already been
-            #    merged, it considers:
-            #    document_number=1 and attachment_number=1 and document_type=ATTACHMENT
-            #    This represents document_number 1 that has been converted to an attachment.
-
-            appellate_court_ids = (
-                Court.federal_courts.appellate_pacer_courts().values_list(
-                    "pk", flat=True
-                )
+            initial_documents_in_page = get_initial_documents(
+                {doc["docket_id"] for doc in results}
             )
-            initial_documents = (
-                RECAPDocument.objects.filter(
-                    QObject(
-                        QObject(
-                            attachment_number=None,
-                            document_type=RECAPDocument.PACER_DOCUMENT,
-                        )
-                        | QObject(
-                            attachment_number=1,
-                            document_type=RECAPDocument.ATTACHMENT,
-                            docket_entry__docket__court_id__in=appellate_court_ids,
-                        )
-                    ),
-                    docket_entry__docket_id__in=docket_ids,
-                    document_number="1",
-                )
-                .select_related(
-                    "docket_entry",
-                    "docket_entry__docket",
-                    "docket_entry__docket__court",
-                )
-                .only(
-                    "pk",
-                    "document_type",
-                    "document_number",
-                    "attachment_number",
-                    "pacer_doc_id",
-                    "is_available",
-                    "filepath_local",
-                    "docket_entry__docket_id",
-                    "docket_entry__docket__slug",
-                    "docket_entry__docket__pacer_case_id",
-                    "docket_entry__docket__court__jurisdiction",
-                    "docket_entry__docket__court_id",
-                )
-            )
-
-            initial_documents_in_page = {}
-            for initial_document in initial_documents:
-                if initial_document.has_valid_pdf:
-                    # Initial Document available
-                    initial_documents_in_page[
-                        initial_document.docket_entry.docket_id
-                    ] = (
-                        initial_document.get_absolute_url(),
-                        None,
-                        "Initial Document",
-                    )
-                else:
-                    # Initial Document not available. Buy button.
-                    initial_documents_in_page[
-                        initial_document.docket_entry.docket_id
-                    ] = (
-                        None,
-                        initial_document.pacer_url,
-                        "Buy Initial Document",
-                    )
 
             for result in results:
                 document_url, buy_document_url, text_button = (
@@ -2828,18 +2774,36 @@ def make_es_stats_variable(
     :param results: The Page or Response containing the results to add the
     status aggregations.
     """
+    return make_facet_fields(search_form, get_status_facet_values(results))
 
-    facet_fields = []
+
+def get_status_facet_values(results: Page | Response) -> dict[str, int]:
+    """Get the status counts from the aggregations of some results.
+
+    :param results: The Page or Response containing the status aggregations.
+    :return: A dict mapping every status to its count.
+    """
     try:
         if isinstance(results, Page):
             aggregations = results.paginator.aggregations.to_dict()  # type: ignore
             buckets = aggregations["status"]["buckets"]
         else:
             buckets = results.aggregations.status.buckets
-        facet_values = {group["key"]: group["doc_count"] for group in buckets}
+        return {group["key"]: group["doc_count"] for group in buckets}
     except (KeyError, AttributeError):
-        facet_values = {}
+        return {}
+
+
+def make_facet_fields(
+    search_form: SearchForm, facet_values: dict[str, int]
+) -> list[BoundField]:
+    """Set the status counts on the stat_ fields of the search form.
 
+    :param search_form: The form displayed in the user interface
+    :param facet_values: A dict mapping every status to its count.
+    :return: The stat_ fields of the form, with their count set.
+    """
+    facet_fields = []
     for field in search_form:
         if not field.html_name.startswith("stat_"):
             continue
@@ -11,6 +11,7 @@ from django.core.mail.backends.base import BaseEmailBackend
 from redis import Redis
 from redis.client import Pipeline
 
+from cl.lib.ratelimiter import parse_rate
 from cl.lib.redis_utils import get_redis_interface
 from cl.users.email_handlers import (
     add_bcc_random,
@@ -99,10 +100,16 @@ def get_email_count(r: Redis) -> int:
     )
 
 
+class EmergencyBrakeEngaged(ValueError):
+    """Raised when the emails sent in the last 24 hours reach the emergency
+    threshold, so no more emails are sent.
+    """
+
+
 def check_emergency_brake(r: Redis) -> None:
     """
-    Checks the emails sent in the last 24 hours. Raises ValueError
-    if our threshold is exceeded.
+    Checks the emails sent in the last 24 hours. Raises EmergencyBrakeEngaged,
+    a ValueError, if our threshold is exceeded.
 
     AWS SES uses a sliding window to calculate our email sending quota.
     When it runs out, we cannot recover without waiting ~24 hours, so
@@ -134,15 +141,71 @@ def check_emergency_brake(r: Redis) -> None:
         r (Redis): The Redis DB to connect to as a connection interface
 
     Raises:
-        ValueError: if the counter is bigger than the threshold from the settings.
+        EmergencyBrakeEngaged: if the counter is bigger than the threshold from
+        the settings.
     """
     current_email_count = get_email_count(r)
     if current_email_count >= settings.EMAIL_EMERGENCY_THRESHOLD:
-        raise ValueError(
+        raise EmergencyBrakeEngaged(
             "Emergency brake engaged to prevent email quota exhaustion"
         )
 
 
+# KEYS[1]: The token bucket, a hash with the tokens left and the time they
+#   were last refilled.
+# ARGV: capacity, tokens refilled per second and now.
+# Takes a token if there's one left. Returns the seconds to wait for the next
+# token otherwise, as a string since Lua numbers are truncated to integers.
+SEND_RATE_BUCKET_LUA = """
+local capacity = tonumber(ARGV[1])
+local refill_rate = tonumber(ARGV[2])
+local now = tonumber(ARGV[3])
+local bucket = redis.call("HMGET", KEYS[1], "tokens", "updated")
+local tokens = tonumber(bucket[1]) or capacity
+local updated = tonumber(bucket[2]) or now
+tokens = math.min(capacity, tokens + math.max(now - updated, 0) * refill_rate)
+local wait = 0
+if tokens >= 1 then
+    tokens = tokens - 1
+else
+    wait = (1 - tokens) / refill_rate
+end
+redis.call("HSET", KEYS[1], "tokens", tostring(tokens), "updated", ARGV[3])
+redis.call("EXPIRE", KEYS[1], math.ceil(capacity / refill_rate) + 1)
+return tostring(wait)
+"""
+send_rate_bucket_script = get_redis_interface("CACHE").register_script(
+    SEND_RATE_BUCKET_LUA
+)
+
+
+def wait_for_send_rate() -> None:
+    """
+    Blocks until sending one more email is allowed by the EMAIL_SEND_RATE
+    setting, e.g. the SES maximum send rate.
+
+    The rate is enforced with a token bucket in Redis shared by all the
+    processes sending emails, so it holds however many Celery workers send
+    emails at the same time. The bucket holds up to a second's worth of
+    tokens, so short bursts are allowed.
+    """
+    if not settings.EMAIL_SEND_RATE:
+        return
+    num_emails, duration = parse_rate(settings.EMAIL_SEND_RATE)
+    refill_rate = num_emails / duration
+    capacity = max(refill_rate, 1)
+    while True:
+        wait = float(
+            send_rate_bucket_script(
+                keys=[f"{get_email_prefix()}:send_rate_bucket"],
+                args=[capacity, refill_rate, time.time()],
+            )
+        )
+        if not wait:
+            return
+        time.sleep(wait)
+
+
 class EmailBackend(BaseEmailBackend):
     """This is a custom email backend to handle sending an email with some
     extra functions before the email is sent.
@@ -158,77 +221,113 @@ class EmailBackend(BaseEmailBackend):
     - Verifies if the recipient's email address is under a backoff event
     waiting period.
     - Compose messages according to available content types
+    - Waits for the EMAIL_SEND_RATE before sending every message.
+
+    The connection to the BASE_BACKEND is kept while this backend is open,
+    so it can be reused to send many batches of messages.
     """
 
+    def __init__(self, fail_silently=False, **kwargs):
+        super().__init__(fail_silently=fail_silently, **kwargs)
+        self.connection = None
+
+    def open(self) -> bool:
+        """Open a connection to the BASE_BACKEND set in settings (e.g: SES).
+
+        Returns:
+            bool: True if a new connection was opened.
+        """
+        if self.connection is not None:
+            return False
+        self.connection = get_connection(
+            settings.BASE_BACKEND, fail_silently=self.fail_silently
+        )
+        self.connection.open()
+        return True
+
+    def close(self) -> None:
+        """Close the BASE_BACKEND connection."""
+        if self.connection is None:
+            return
+        try:
+            self.connection.close()
+        finally:
+            self.connection = None
+
     def send_messages(
         self,
         email_messages: Sequence[EmailMessage | EmailMultiAlternatives],
     ) -> int:
         if not email_messages:
             return 0
-        # Open a connection to the BASE_BACKEND set in settings (e.g: SES).
-        base_backend = settings.BASE_BACKEND
-        connection = get_connection(base_backend)
-        connection.open()
+        new_conn_created = self.open()
+        connection = self.connection
         r = get_redis_interface("CACHE")
         msg_count = 0
-        for email_message in email_messages:
-            original_recipients = normalize_addresses(email_message.to)
-            recipient_list = []
-
-            # Verify a recipient's email address is banned.
-            for email_address in original_recipients:
-                if is_not_email_banned(email_address):
-                    recipient_list.append(email_address)
-
-            # If all recipients are banned, the message is discarded
-            if not recipient_list:
-                continue
-
-            email = email_message
-
-            # Verify if email addresses are under a backoff waiting period
-            final_recipient_list = []
-            backoff_recipient_list = []
-            for email_address in recipient_list:
-                if under_backoff_waiting_period(email_address):
-                    # If an email address is under a waiting period
-                    # add to a backoff recipient list to queue the message
-                    backoff_recipient_list.append(email_address)
-                else:
-                    # If an email address is not under a waiting period
-                    # add to the final recipients list
-                    final_recipient_list.append(email_address)
-
-            # check the emergency brake before sending an email
-            check_emergency_brake(r)
-            # Store message in DB and obtain the unique
-            # message_id to add in headers to identify the message
-            stored_id = store_message(email_message)
-
-            if backoff_recipient_list:
-                # Enqueue message for recipients under a waiting backoff period
-                enqueue_email(backoff_recipient_list, stored_id)
-
-            # Add header with unique message_id to identify message
-            email.extra_headers["X-CL-ID"] = stored_id
-            # Use base backend connection to send the message
-            email.connection = connection
-
-            # Call add_bcc_random function to BCC the message based on the
-            # EMAIL_BCC_COPY_RATE set
-            email = add_bcc_random(email, settings.EMAIL_BCC_COPY_RATE)
-
-            # If we have recipients to send the message to, we send it.
-            if final_recipient_list:
-                # Update message with the final recipient list
-                email.to = final_recipient_list
-                email.send()
-                # update the counters
-                prefix = get_email_prefix()
-                r.transaction(incr_email_counters, f"{prefix}:temp_counter")
-                msg_count += 1
-
-        # Close base backend connection
-        connection.close()
+        try:
+            for email_message in email_messages:
+                original_recipients = normalize_addresses(email_message.to)
+                recipient_list = []
+
+                # Verify a recipient's email address is banned.
+                for email_address in original_recipients:
+                    if is_not_email_banned(email_address):
+                        recipient_list.append(email_address)
+
+                # If all recipients are banned, the message is discarded
+                if not recipient_list:
+                    continue
+
+                email = email_message
+
+                # Verify if email addresses are under a backoff waiting period
+                final_recipient_list = []
+                backoff_recipient_list = []
+                for email_address in recipient_list:
+                    if under_backoff_waiting_period(email_address):
+                        # If an email address is under a waiting period
+                        # add to a backoff recipient list to queue the message
+                        backoff_recipient_list.append(email_address)
+                    else:
+                        # If an email address is not under a waiting period
+                        # add to the final recipients list
+                        final_recipient_list.append(email_address)
+
+                # check the emergency brake before sending an email
+                check_emergency_brake(r)
+                # Store message in DB and obtain the unique
+                # message_id to add in headers to identify the message
+                stored_id = store_message(email_message)
+
+                if backoff_recipient_list:
+                    # Enqueue message for recipients under a waiting backoff
+                    # period
+                    enqueue_email(backoff_recipient_list, stored_id)
+
+                # Add header with unique message_id to identify message
+                email.extra_headers["X-CL-ID"] = stored_id
+                # Use base backend connection to send the message
+                email.connection = connection
+
+                # Call add_bcc_random function to BCC the message based on the
+                # EMAIL_BCC_COPY_RATE set
+                email = add_bcc_random(email, settings.EMAIL_BCC_COPY_RATE)
+
+                # If we have recipients to send the message to, we send it.
+                if final_recipient_list:
+                    # Update message with the final recipient list
+                    email.to = final_recipient_list
+                    wait_for_send_rate()
+                    email.send()
+                    # update the counters
+                    prefix = get_email_prefix()
+                    r.transaction(
+                        incr_email_counters, f"{prefix}:temp_counter"
+                    )
+                    msg_count += 1
+        finally:
+            # Close base backend connection, unless it was opened to send
+            # many batches of messages.
+            if new_conn_created:
+                self.close()
         return msg_count
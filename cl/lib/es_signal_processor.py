@@ -1,8 +1,12 @@
+import threading
 from functools import partial
+from typing import Callable
 
 from celery.canvas import chain
+from django.conf import settings
 from django.core.exceptions import FieldDoesNotExist, ObjectDoesNotExist
 from django.db import transaction
+from django.db.models import Exists, OuterRef
 from django.db.models.signals import m2m_changed, post_delete, post_save
 from model_utils.tracker import FieldInstanceTracker
 
@@ -12,6 +16,15 @@ from cl.alerts.tasks import (
 )
 from cl.audio.models import Audio
 from cl.lib.elasticsearch_utils import elasticsearch_enabled
+from cl.lib.es_update_buffer import (
+    ESUpdateBatch,
+    push_es_update_batch,
+    tally_es_updates,
+)
+from cl.lib.search_cache import (
+    DOCUMENT_SEARCH_TYPES,
+    invalidate_search_results_cache,
+)
 from cl.people_db.models import (
     ABARating,
     Education,
@@ -34,6 +47,7 @@ from cl.search.models import (
     BankruptcyInformation,
     Citation,
     Docket,
+    DocketEntry,
     Opinion,
     OpinionCluster,
     ParentheticalGroup,
@@ -41,10 +55,13 @@ from cl.search.models import (
 )
 from cl.search.tasks import (
     es_save_document,
+    flush_es_update_buffer,
     get_es_doc_id_and_parent_id,
     remove_document_from_es_index,
     update_children_docs_by_query,
+    update_children_docs_by_query_in_bulk,
     update_es_document,
+    update_es_documents_in_bulk,
 )
 from cl.search.types import ESDocumentClassType, ESModelType
 
@@ -58,6 +75,103 @@ def compose_app_label(instance: ESModelType) -> str:
     return f"{instance._meta.app_label}.{instance.__class__.__name__}"
 
 
+# The batch coalescing the ES updates of the transaction running in every
+# thread, and the on_commit callback that sends it.
+transaction_es_updates = threading.local()
+
+
+def send_es_update_batch(batch: ESUpdateBatch) -> None:
+    """Enqueue the tasks to apply a batch of coalesced ES updates.
+
+    Document updates are sent in bulk tasks of up to
+    ELASTICSEARCH_BULK_BATCH_SIZE updates, or in an update_es_document task
+    if there's only one. The children of the parents that changed the same
+    fields are updated by update_children_docs_by_query_in_bulk tasks of up to
+    ELASTICSEARCH_UBQ_PARENTS_BATCH_SIZE parents, or by
+    update_children_docs_by_query if there's only one.
+
+    :param batch: The batch of updates to send.
+    :return: None
+    """
+    batch_size = int(settings.ELASTICSEARCH_BULK_BATCH_SIZE)
+    document_updates = list(batch.document_updates.values())
+    for i in range(0, len(document_updates), batch_size):
+        chunk = document_updates[i : i + batch_size]
+        if len(chunk) == 1:
+            update_es_document.delay(*chunk[0])
+        else:
+            update_es_documents_in_bulk.delay(chunk)
+    parents_batch_size = settings.ELASTICSEARCH_UBQ_PARENTS_BATCH_SIZE
+    for (
+        es_document_name,
+        parent_ids,
+        fields_to_update,
+        fields_map,
+    ) in batch.group_children_updates():
+        if len(parent_ids) == 1:
+            update_children_docs_by_query.delay(
+                es_document_name, parent_ids[0], fields_to_update, fields_map
+            )
+            continue
+        for i in range(0, len(parent_ids), parents_batch_size):
+            update_children_docs_by_query_in_bulk.delay(
+                es_document_name,
+                parent_ids[i : i + parents_batch_size],
+                fields_to_update,
+                fields_map,
+            )
+    tally_es_updates(queued=batch.queued, sent=len(batch))
+
+
+def send_es_updates_on_commit(batch: ESUpdateBatch) -> None:
+    """Send the ES updates coalesced during a transaction, once committed.
+
+    If ELASTICSEARCH_UPDATES_COALESCING_WINDOW is set, the batch is buffered
+    in Redis to be merged with the batches of other transactions, and the
+    flush of the buffer scheduled if it's not yet.
+
+    :param batch: The batch of updates of the transaction.
+    :return: None
+    """
+    batch.sent = True
+    if not batch:
+        return
+    window = settings.ELASTICSEARCH_UPDATES_COALESCING_WINDOW
+    if not window:
+        send_es_update_batch(batch)
+    elif push_es_update_batch(batch):
+        flush_es_update_buffer.apply_async(countdown=window)
+
+
+def coalesce_es_update(add_update: Callable[[ESUpdateBatch], None]) -> None:
+    """Add an ES update to the batch of the current transaction, so all the
+    updates of the same documents are merged and sent together on commit.
+
+    :param add_update: A callable that adds the update to a batch.
+    :return: None
+    """
+    connection = transaction.get_connection()
+    batch = getattr(transaction_es_updates, "batch", None)
+    callback = getattr(transaction_es_updates, "callback", None)
+    if (
+        batch is not None
+        and not batch.sent
+        and connection.in_atomic_block
+        # The callback is gone if the transaction was rolled back.
+        and any(func is callback for _, func, _ in connection.run_on_commit)
+    ):
+        add_update(batch)
+        return
+
+    batch = ESUpdateBatch()
+    add_update(batch)
+    callback = partial(send_es_updates_on_commit, batch)
+    transaction_es_updates.batch = batch
+    transaction_es_updates.callback = callback
+    # Out of a transaction, the batch is sent right away.
+    transaction.on_commit(callback)
+
+
 def check_fields_that_changed(
     current_instance: ESModelType,
     tracked_set: FieldInstanceTracker,
@@ -190,9 +304,8 @@ def update_es_documents(
             case RECAPDocument() | Docket() | ParentheticalGroup() | Audio() | Person() | Position() | OpinionCluster() | Opinion() if mapping_fields.get("self", None):  # type: ignore
                 # Update main document in ES, including fields to be
                 # extracted from a related instance.
-                transaction.on_commit(
-                    partial(
-                        update_es_document.delay,
+                coalesce_es_update(
+                    lambda batch: batch.add_document_update(
                         es_document.__name__,
                         fields_to_update,
                         (
@@ -204,9 +317,8 @@ def update_es_documents(
                     )
                 )
             case OpinionCluster() if es_document is OpinionDocument:  # type: ignore
-                transaction.on_commit(
-                    partial(
-                        update_children_docs_by_query.delay,
+                coalesce_es_update(
+                    lambda batch: batch.add_children_update(
                         es_document.__name__,
                         instance.pk,
                         fields_to_update,
@@ -216,17 +328,15 @@ def update_es_documents(
             case Docket() if es_document is OpinionDocument:  # type: ignore
                 related_record = OpinionCluster.objects.filter(
                     **{query: instance}
-                )
-                for cluster in related_record:
-                    transaction.on_commit(
-                        partial(
-                            update_children_docs_by_query.delay,
-                            es_document.__name__,
-                            cluster.pk,
-                            fields_to_update,
-                            fields_map,
-                        )
+                ).values_list("pk", flat=True)
+                coalesce_es_update(
+                    lambda batch: batch.add_children_updates(
+                        es_document.__name__,
+                        related_record,
+                        fields_to_update,
+                        fields_map,
                     )
+                )
             case Person() if es_document is PositionDocument and query == "person":  # type: ignore
                 """
                 This case handles the update of one or more fields that belongs to
@@ -236,9 +346,8 @@ def update_es_documents(
                 # doesn't have any positions or is not a Judge.
                 if not instance.positions.exists() or not instance.is_judge:
                     continue
-                transaction.on_commit(
-                    partial(
-                        update_children_docs_by_query.delay,
+                coalesce_es_update(
+                    lambda batch: batch.add_children_update(
                         es_document.__name__,
                         instance.pk,
                         fields_to_update,
@@ -253,29 +362,30 @@ def update_es_documents(
                 First, we get the list of all the Person objects related to the instance object
                 and then we use the update_children_docs_by_query method to update their positions.
                 """
-                related_record = Person.objects.filter(**{query: instance})
-                for person in related_record:
-                    # Avoid calling update_children_docs_by_query if the Person
-                    # doesn't have any positions or is not a Judge.
-                    if not person.positions.exists() or not person.is_judge:
-                        continue
-                    transaction.on_commit(
-                        partial(
-                            update_children_docs_by_query.delay,
-                            es_document.__name__,
-                            person.pk,
-                            fields_to_update,
-                            fields_map,
-                        )
+                related_record = Person.objects.filter(
+                    **{query: instance}
+                ).prefetch_related("positions")
+                # Avoid updating the children of a Person that doesn't have
+                # any positions or is not a Judge.
+                coalesce_es_update(
+                    lambda batch: batch.add_children_updates(
+                        es_document.__name__,
+                        [
+                            person.pk
+                            for person in related_record
+                            if person.positions.exists() and person.is_judge
+                        ],
+                        fields_to_update,
+                        fields_map,
                     )
+                )
             case Docket() if es_document is ESRECAPDocument:  # type: ignore
                 # Avoid calling update_children_docs_by_query if the Docket
                 # doesn't have any docket entries.
                 if not instance.docket_entries.exists():
                     continue
-                transaction.on_commit(
-                    partial(
-                        update_children_docs_by_query.delay,
+                coalesce_es_update(
+                    lambda batch: batch.add_children_update(
                         es_document.__name__,
                         instance.pk,
                         fields_to_update,
@@ -283,30 +393,35 @@ def update_es_documents(
                     )
                 )
             case Person() if es_document is ESRECAPDocument:  # type: ignore
-                related_dockets = Docket.objects.filter(**{query: instance})
-                for rel_docket in related_dockets:
-                    # Avoid calling update_children_docs_by_query if the Docket
-                    # doesn't have any docket entries.
-                    if not rel_docket.docket_entries.exists():
-                        continue
-                    transaction.on_commit(
-                        partial(
-                            update_children_docs_by_query.delay,
-                            es_document.__name__,
-                            rel_docket.pk,
-                            fields_to_update,
-                            fields_map,
+                # Avoid updating the children of a Docket that doesn't have
+                # any docket entries.
+                related_dockets = (
+                    Docket.objects.filter(**{query: instance})
+                    .filter(
+                        Exists(
+                            DocketEntry.objects.filter(
+                                docket_id=OuterRef("pk")
+                            )
                         )
                     )
+                    .values_list("pk", flat=True)
+                )
+                coalesce_es_update(
+                    lambda batch: batch.add_children_updates(
+                        es_document.__name__,
+                        related_dockets,
+                        fields_to_update,
+                        fields_map,
+                    )
+                )
             case _:
                 main_objects = main_model.objects.filter(**{query: instance})
                 for main_object in main_objects:
                     if fields_to_update:
                         # Update main document in ES, including fields to be
                         # extracted from a related instance.
-                        transaction.on_commit(
-                            partial(
-                                update_es_document.delay,
+                        coalesce_es_update(
+                            lambda batch: batch.add_document_update(
                                 es_document.__name__,
                                 fields_to_update,
                                 (
@@ -362,9 +477,8 @@ def update_m2m_field_in_es_document(
     relationships with the instance.
     :return: None
     """
-    transaction.on_commit(
-        partial(
-            update_es_document.delay,
+    coalesce_es_update(
+        lambda batch: batch.add_document_update(
             es_document.__name__,
             [
                 affected_field,
@@ -378,9 +492,8 @@ def update_m2m_field_in_es_document(
     if es_document is OpinionClusterDocument and isinstance(
         instance, OpinionCluster
     ):
-        transaction.on_commit(
-            partial(
-                update_children_docs_by_query.delay,
+        coalesce_es_update(
+            lambda batch: batch.add_children_update(
                 es_document.__name__,
                 instance.pk,
                 [
@@ -426,9 +539,8 @@ def update_reverse_related_documents(
         # Avoid calling update_es_document if the Person is not a Judge.
         if isinstance(main_object, Person) and not main_object.is_judge:
             continue
-        transaction.on_commit(
-            partial(
-                update_es_document.delay,
+        coalesce_es_update(
+            lambda batch: batch.add_document_update(
                 es_document.__name__,
                 affected_fields,
                 (compose_app_label(main_object), main_object.pk),
@@ -440,25 +552,25 @@ def update_reverse_related_documents(
     match instance:
         case ABARating() | PoliticalAffiliation() | Education() if es_document is PersonDocument:  # type: ignore
             # bulk update position documents when a reverse related record is created/updated.
-            related_record = Person.objects.filter(**{query_string: instance})
-            for person in related_record:
-                # Avoid calling update_children_docs_by_query if the Person
-                # doesn't have any positions or is not a Judge.
-                if not person.positions.exists() or not person.is_judge:
-                    continue
-
-                transaction.on_commit(
-                    partial(
-                        update_children_docs_by_query.delay,
-                        PositionDocument.__name__,
-                        person.pk,
-                        affected_fields,
-                    )
+            related_record = Person.objects.filter(
+                **{query_string: instance}
+            ).prefetch_related("positions")
+            # Avoid updating the children of a Person that doesn't have any
+            # positions or is not a Judge.
+            coalesce_es_update(
+                lambda batch: batch.add_children_updates(
+                    PositionDocument.__name__,
+                    [
+                        person.pk
+                        for person in related_record
+                        if person.positions.exists() and person.is_judge
+                    ],
+                    affected_fields,
                 )
+            )
         case Citation() | Opinion() if es_document is OpinionClusterDocument:  # type: ignore
-            transaction.on_commit(
-                partial(
-                    update_children_docs_by_query.delay,
+            coalesce_es_update(
+                lambda batch: batch.add_children_update(
                     OpinionDocument.__name__,
                     instance.cluster.pk,
                     affected_fields,
@@ -471,9 +583,8 @@ def update_reverse_related_documents(
             # doesn't have any entries.
             if not instance.docket.docket_entries.exists():
                 return
-            transaction.on_commit(
-                partial(
-                    update_children_docs_by_query.delay,
+            coalesce_es_update(
+                lambda batch: batch.add_children_update(
                     ESRECAPDocument.__name__,
                     instance.docket.pk,
                     affected_fields,
@@ -504,9 +615,8 @@ def delete_reverse_related_documents(
         case Person() if es_document is PersonDocument:  # type: ignore
             # Update the Person document after the reverse instanced is deleted
             # Update parent document in ES.
-            transaction.on_commit(
-                partial(
-                    update_es_document.delay,
+            coalesce_es_update(
+                lambda batch: batch.add_document_update(
                     es_document.__name__,
                     affected_fields,
                     (compose_app_label(instance), instance.pk),
@@ -519,9 +629,8 @@ def delete_reverse_related_documents(
             if not instance.positions.exists() or not instance.is_judge:
                 return
             # Then update all their child documents (Positions)
-            transaction.on_commit(
-                partial(
-                    update_children_docs_by_query.delay,
+            coalesce_es_update(
+                lambda batch: batch.add_children_update(
                     PositionDocument.__name__,
                     instance.pk,
                     affected_fields,
@@ -531,9 +640,8 @@ def delete_reverse_related_documents(
             # Update the Docket document after the reverse instanced is deleted
 
             # Update parent document in ES.
-            transaction.on_commit(
-                partial(
-                    update_es_document.delay,
+            coalesce_es_update(
+                lambda batch: batch.add_document_update(
                     es_document.__name__,
                     affected_fields,
                     (compose_app_label(instance), instance.pk),
@@ -546,9 +654,8 @@ def delete_reverse_related_documents(
             if not instance.docket_entries.exists():
                 return
             # Then update all their child documents (RECAPDocuments)
-            transaction.on_commit(
-                partial(
-                    update_children_docs_by_query.delay,
+            coalesce_es_update(
+                lambda batch: batch.add_children_update(
                     ESRECAPDocument.__name__,
                     instance.pk,
                     affected_fields,
@@ -556,9 +663,8 @@ def delete_reverse_related_documents(
             )
         case OpinionCluster() if es_document is OpinionClusterDocument:  # type: ignore
             # Update parent document in ES.
-            transaction.on_commit(
-                partial(
-                    update_es_document.delay,
+            coalesce_es_update(
+                lambda batch: batch.add_document_update(
                     es_document.__name__,
                     affected_fields,
                     (compose_app_label(instance), instance.pk),
@@ -567,9 +673,8 @@ def delete_reverse_related_documents(
                 )
             )
             # Then update all their child documents (Positions)
-            transaction.on_commit(
-                partial(
-                    update_children_docs_by_query.delay,
+            coalesce_es_update(
+                lambda batch: batch.add_children_update(
                     OpinionDocument.__name__,
                     instance.pk,
                     affected_fields,
@@ -581,9 +686,8 @@ def delete_reverse_related_documents(
             )
             for main_object in main_objects:
                 # Update main document in ES.
-                transaction.on_commit(
-                    partial(
-                        update_es_document.delay,
+                coalesce_es_update(
+                    lambda batch: batch.add_document_update(
                         es_document.__name__,
                         affected_fields,
                         (compose_app_label(main_object), main_object.pk),
@@ -660,6 +764,9 @@ class ESSignalProcessor:
         self.main_model = main_model
         self.es_document = es_document
         self.documents_model_mapping = documents_model_mapping
+        # The search types whose cached results are invalidated when
+        # documents are added to or removed from the index.
+        self.search_types = DOCUMENT_SEARCH_TYPES.get(es_document, [])
 
         self.setup()
 
@@ -774,6 +881,9 @@ class ESSignalProcessor:
                     process_percolator_response.s(),
                 ).apply_async()
             )
+            transaction.on_commit(
+                partial(invalidate_search_results_cache, self.search_types)
+            )
             return
 
         update_es_documents(
@@ -794,6 +904,9 @@ class ESSignalProcessor:
         remove_document_from_es_index.delay(
             self.es_document.__name__, doc_id, routing_id
         )
+        transaction.on_commit(
+            partial(invalidate_search_results_cache, self.search_types)
+        )
 
         # If a Position is removed and the Person is not a Judge anymore,
         # remove it from the index with all the other positions.
@@ -0,0 +1,266 @@
+"""Coalesce the partial ES updates triggered by DB changes.
+
+ESSignalProcessor used to enqueue one update_es_document or
+update_children_docs_by_query task per save and per field mapping. A RECAP
+upload that touches a docket and hundreds of its entries enqueued hundreds of
+updates of the same documents. Now the updates of a transaction are merged in
+an ESUpdateBatch by the document they update, merging their fields, and sent
+on commit, as a single bulk task for the documents.
+
+If ELASTICSEARCH_UPDATES_COALESCING_WINDOW is set, batches are pushed to
+Redis instead, and a task scheduled that many seconds later merges all the
+batches pushed in the meantime before sending them.
+
+The number of updates queued, sent and saved by merging are tallied in the
+STATS Redis DB, see get_es_update_stats.
+"""
+
+import json
+from datetime import date
+from typing import Any, Iterable
+
+from django.conf import settings
+
+from cl.lib.redis_utils import get_redis_interface
+
+ES_UPDATES_PREFIX = "es_updates"
+ES_UPDATES_BUFFER_KEY = f"{ES_UPDATES_PREFIX}:buffer"
+ES_UPDATES_FLUSH_SCHEDULED_KEY = f"{ES_UPDATES_PREFIX}:flush_scheduled"
+
+
+class ESUpdateBatch:
+    """Partial ES updates merged by the document they update."""
+
+    def __init__(self) -> None:
+        # The updates of single documents, in update_es_document params
+        # order: es_document_name, fields_to_update, main_instance_data,
+        # related_instance_data and fields_map.
+        self.document_updates: dict[str, list[Any]] = {}
+        # The updates of the child documents of a parent, in
+        # update_children_docs_by_query params order: es_document_name,
+        # parent_instance_id, fields_to_update and fields_map.
+        self.children_updates: dict[str, list[Any]] = {}
+        self.queued = 0
+        self.sent = False
+
+    def __len__(self) -> int:
+        return len(self.document_updates) + len(self.children_updates)
+
+    @staticmethod
+    def merge_fields(fields: list[str], new_fields: list[str]) -> None:
+        fields.extend(field for field in new_fields if field not in fields)
+
+    def add_document_update(
+        self,
+        es_document_name: str,
+        fields_to_update: list[str],
+        main_instance_data: tuple[str, int] | list,
+        related_instance_data: tuple[str, int] | list | None = None,
+        fields_map: dict | None = None,
+    ) -> None:
+        """Add the update of a document, see update_es_document.
+
+        :param es_document_name: The Elasticsearch document type name.
+        :param fields_to_update: The fields to update.
+        :param main_instance_data: The app label and ID of the main instance.
+        :param related_instance_data: The app label and ID of the related
+        instance to take the values from, if any.
+        :param fields_map: The fields map of the update, if any.
+        :return: None
+        """
+        main_instance_data = list(main_instance_data)
+        if related_instance_data is not None:
+            related_instance_data = list(related_instance_data)
+        key = json.dumps(
+            [
+                es_document_name,
+                main_instance_data,
+                related_instance_data,
+                fields_map,
+            ],
+            sort_keys=True,
+        )
+        update = self.document_updates.setdefault(
+            key,
+            [
+                es_document_name,
+                [],
+                main_instance_data,
+                related_instance_data,
+                fields_map,
+            ],
+        )
+        self.merge_fields(update[1], fields_to_update)
+        self.queued += 1
+
+    def add_children_update(
+        self,
+        es_document_name: str,
+        parent_instance_id: int,
+        fields_to_update: list[str],
+        fields_map: dict | None = None,
+    ) -> None:
+        """Add the update of the child documents of a parent, see
+        update_children_docs_by_query.
+
+        :param es_document_name: The Elasticsearch document type name.
+        :param parent_instance_id: The ID of the parent instance.
+        :param fields_to_update: The fields to update.
+        :param fields_map: The fields map of the update, if any.
+        :return: None
+        """
+        key = json.dumps(
+            [es_document_name, parent_instance_id, fields_map], sort_keys=True
+        )
+        update = self.children_updates.setdefault(
+            key, [es_document_name, parent_instance_id, [], fields_map]
+        )
+        self.merge_fields(update[2], fields_to_update)
+        self.queued += 1
+
+    def add_children_updates(
+        self,
+        es_document_name: str,
+        parent_instance_ids: Iterable[int],
+        fields_to_update: list[str],
+        fields_map: dict | None = None,
+    ) -> None:
+        """Add the same update of the child documents of many parents.
+
+        :param es_document_name: The Elasticsearch document type name.
+        :param parent_instance_ids: The IDs of the parent instances.
+        :param fields_to_update: The fields to update.
+        :param fields_map: The fields map of the update, if any.
+        :return: None
+        """
+        for parent_instance_id in parent_instance_ids:
+            self.add_children_update(
+                es_document_name,
+                parent_instance_id,
+                fields_to_update,
+                fields_map,
+            )
+
+    def merge(self, other: "ESUpdateBatch") -> None:
+        """Merge the updates of another batch into this one.
+
+        :param other: The batch to merge.
+        :return: None
+        """
+        for update in other.document_updates.values():
+            self.add_document_update(*update)
+        for update in other.children_updates.values():
+            self.add_children_update(*update)
+        self.queued += other.queued - len(other)
+
+    def group_children_updates(
+        self,
+    ) -> list[tuple[str, list[int], list[str], dict | None]]:
+        """Group the children updates of the parents that changed the same
+        fields, so their children can be updated together.
+
+        :return: A list of four-tuples: the ES document name, the parent IDs,
+        the fields to update and the fields map of every group.
+        """
+        groups: dict[str, tuple[str, list[int], list[str], dict | None]] = {}
+        for (
+            es_document_name,
+            parent_instance_id,
+            fields_to_update,
+            fields_map,
+        ) in self.children_updates.values():
+            key = json.dumps(
+                [es_document_name, sorted(fields_to_update), fields_map],
+                sort_keys=True,
+            )
+            group = groups.setdefault(
+                key, (es_document_name, [], fields_to_update, fields_map)
+            )
+            group[1].append(parent_instance_id)
+        return list(groups.values())
+
+    def to_json(self) -> str:
+        return json.dumps(
+            {
+                "document_updates": list(self.document_updates.values()),
+                "children_updates": list(self.children_updates.values()),
+                "queued": self.queued,
+            }
+        )
+
+    @classmethod
+    def from_json(cls, data: str) -> "ESUpdateBatch":
+        loaded = json.loads(data)
+        batch = cls()
+        for update in loaded["document_updates"]:
+            batch.add_document_update(*update)
+        for update in loaded["children_updates"]:
+            batch.add_children_update(*update)
+        batch.queued = loaded["queued"]
+        return batch
+
+
+def push_es_update_batch(batch: ESUpdateBatch) -> bool:
+    """Push a batch to the Redis buffer, to be merged with the batches pushed
+    in the next ELASTICSEARCH_UPDATES_COALESCING_WINDOW seconds.
+
+    :param batch: The batch to push.
+    :return: True if no flush of the buffer was scheduled yet, so the caller
+    has to schedule it.
+    """
+    window = settings.ELASTICSEARCH_UPDATES_COALESCING_WINDOW
+    pipe = get_redis_interface("CACHE").pipeline()
+    pipe.rpush(ES_UPDATES_BUFFER_KEY, batch.to_json())
+    # Expire the flag in case the flush task is lost, so a new one is
+    # scheduled.
+    pipe.set(ES_UPDATES_FLUSH_SCHEDULED_KEY, 1, nx=True, ex=window * 10)
+    _, schedule_flush = pipe.execute()
+    return bool(schedule_flush)
+
+
+def pop_es_update_batches() -> ESUpdateBatch:
+    """Pop all the batches in the Redis buffer and merge them.
+
+    :return: The merged batch.
+    """
+    pipe = get_redis_interface("CACHE").pipeline()
+    # Let the next batch pushed schedule a new flush.
+    pipe.delete(ES_UPDATES_FLUSH_SCHEDULED_KEY)
+    pipe.lrange(ES_UPDATES_BUFFER_KEY, 0, -1)
+    pipe.delete(ES_UPDATES_BUFFER_KEY)
+    _, buffered, _ = pipe.execute()
+    batch = ESUpdateBatch()
+    for data in buffered:
+        batch.merge(ESUpdateBatch.from_json(data))
+    return batch
+
+
+def tally_es_updates(queued: int, sent: int) -> None:
+    """Count ES updates queued and sent.
+
+    :param queued: The number of updates queued by signals.
+    :param sent: The number of updates sent after merging them.
+    :return: None
+    """
+    d = date.today().isoformat()
+    pipe = get_redis_interface("STATS").pipeline()
+    for outcome, count in (("queued", queued), ("sent", sent)):
+        if count:
+            pipe.incrby(f"{ES_UPDATES_PREFIX}.{outcome}", count)
+            pipe.incrby(f"{ES_UPDATES_PREFIX}.d:{d}.{outcome}", count)
+    pipe.execute()
+
+
+def get_es_update_stats(day: date | None = None) -> dict[str, int]:
+    """Get the counters of ES updates queued, sent and saved by merging.
+
+    :param day: The day to get the counters of. Defaults to all time.
+    :return: A dict with the queued, sent and saved counts.
+    """
+    day_part = f".d:{day.isoformat()}" if day else ""
+    queued, sent = get_redis_interface("STATS").mget(
+        f"{ES_UPDATES_PREFIX}{day_part}.queued",
+        f"{ES_UPDATES_PREFIX}{day_part}.sent",
+    )
+    queued, sent = int(queued or 0), int(sent or 0)
+    return {"queued": queued, "sent": sent, "saved": queued - sent}
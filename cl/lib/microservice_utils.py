@@ -1,12 +1,90 @@
+import asyncio
+from contextlib import AsyncExitStack, asynccontextmanager
+from contextvars import ContextVar
 from io import BufferedReader
+from typing import IO, Any, AsyncIterator, Iterable
 
 from django.conf import settings
-from httpx import AsyncClient, Response
+from httpx import AsyncClient, Limits, Response
 
 from cl.audio.models import Audio
 from cl.lib.search_utils import clean_up_recap_document_file
 from cl.search.models import Opinion, RECAPDocument
 
+# The pooled clients of the running pooled_microservice_clients block, by
+# service. None outside of it.
+_pooled_clients: ContextVar[dict[str, AsyncClient] | None] = ContextVar(
+    "pooled_microservice_clients", default=None
+)
+
+
+def make_microservice_client(service: str) -> AsyncClient:
+    """Make an HTTP/2 client for a microservice.
+
+    The connection limits of a service can be set with the max_connections
+    and max_keepalive_connections keys of its MICROSERVICE_URLS entry.
+
+    :param service: The service to make the client for.
+    :return: The client.
+    """
+    config = settings.MICROSERVICE_URLS[service]
+    return AsyncClient(
+        follow_redirects=True,
+        http2=True,
+        limits=Limits(
+            max_connections=config.get(
+                "max_connections", settings.MICROSERVICE_MAX_CONNECTIONS
+            ),
+            max_keepalive_connections=config.get(
+                "max_keepalive_connections",
+                settings.MICROSERVICE_MAX_KEEPALIVE_CONNECTIONS,
+            ),
+            keepalive_expiry=settings.MICROSERVICE_KEEPALIVE_EXPIRY,
+        ),
+    )
+
+
+def get_pooled_microservice_client(service: str) -> AsyncClient | None:
+    """Get the pooled client of a microservice, if called within a
+    pooled_microservice_clients block.
+
+    :param service: The service to get the client of.
+    :return: The client, or None outside of a pooled_microservice_clients
+    block.
+    """
+    clients = _pooled_clients.get()
+    if clients is None:
+        return None
+    if service not in clients:
+        clients[service] = make_microservice_client(service)
+    return clients[service]
+
+
+@asynccontextmanager
+async def pooled_microservice_clients() -> AsyncIterator[None]:
+    """Reuse the connections of the microservice calls made within the block,
+    and close them when it exits.
+
+    Calls made outside of a block, like the ones through async_to_sync that
+    run in a new event loop every time, use a client of their own that's
+    closed once the call completes.
+
+    :return: None
+    """
+    if _pooled_clients.get() is not None:
+        # Nested, the outer block closes the clients.
+        yield
+        return
+
+    clients: dict[str, AsyncClient] = {}
+    token = _pooled_clients.set(clients)
+    try:
+        yield
+    finally:
+        _pooled_clients.reset(token)
+        for client in clients.values():
+            await client.aclose()
+
 
 async def microservice(
     service: str,
@@ -39,57 +117,63 @@ async def microservice(
 
     services = settings.MICROSERVICE_URLS
 
-    files = None
-    # Add file from filepath
-    if filepath:
-        files = {"file": (filepath, open(filepath, "rb"))}
-
-    # Handle our documents based on the type of model object
-    # Sadly these are not uniform
-    if item:
-        if type(item) == RECAPDocument:
-            try:
-                files = {
-                    "file": (
+    async with AsyncExitStack() as stack:
+
+        def open_file(name: str, f: IO) -> dict[str, tuple[str, IO]]:
+            # Files are streamed from storage while the request is sent, and
+            # closed once it's done.
+            return {"file": (name, stack.enter_context(f))}
+
+        files = None
+        # Add file from filepath
+        if filepath:
+            files = open_file(filepath, open(filepath, "rb"))
+
+        # Handle our documents based on the type of model object
+        # Sadly these are not uniform
+        if item:
+            if type(item) == RECAPDocument:
+                try:
+                    files = open_file(
                         item.filepath_local.name,
                         item.filepath_local.open(mode="rb"),
                     )
-                }
-            except FileNotFoundError:
-                # The file is no longer available, clean it up in DB
-                await clean_up_recap_document_file(item)
-        elif type(item) == Opinion:
-            files = {
-                "file": (
+                except FileNotFoundError:
+                    # The file is no longer available, clean it up in DB
+                    await clean_up_recap_document_file(item)
+            elif type(item) == Opinion:
+                files = open_file(
                     item.local_path.name,
                     item.local_path.open(mode="rb"),
                 )
-            }
-        elif type(item) == Audio:
-            match service:
-                case "downsize-audio":
-                    files = {
-                        "file": (
+            elif type(item) == Audio:
+                match service:
+                    case "downsize-audio":
+                        files = open_file(
                             item.local_path_mp3.name,
                             item.local_path_mp3.open(mode="rb"),
                         )
-                    }
-                case _:
-                    files = {
-                        "file": (
+                    case _:
+                        files = open_file(
                             item.local_path_original_file.name,
                             item.local_path_original_file.open(mode="rb"),
                         )
-                    }
-    # Sometimes we will want to pass in a filename and the file bytes
-    # to avoid writing them to disk. Filename can often be generic
-    # and is used to identify the file extension for our microservices
-    if file and file_type:
-        files = {"file": (f"dummy.{file_type}", file)}
-    elif file:
-        files = {"file": ("filename", file)}
-
-    async with AsyncClient(follow_redirects=True, http2=True) as client:
+        # Sometimes we will want to pass in a filename and the file bytes
+        # to avoid writing them to disk. Filename can often be generic
+        # and is used to identify the file extension for our microservices
+        if file and file_type:
+            files = {"file": (f"dummy.{file_type}", file)}
+        elif file:
+            files = {"file": ("filename", file)}
+
+        pooled_client = get_pooled_microservice_client(service)
+        client: AsyncClient = (
+            pooled_client
+            if pooled_client is not None
+            else await stack.enter_async_context(
+                make_microservice_client(service)
+            )
+        )
         req = client.build_request(
             method=method,
             url=services[service]["url"],  # type: ignore
@@ -98,5 +182,37 @@ async def microservice(
             params=params,
             timeout=services[service]["timeout"],
         )
-
         return await client.send(req)
+
+
+async def microservice_batch(
+    service: str,
+    items: Iterable[RECAPDocument | Opinion | Audio],
+    max_concurrency: int | None = None,
+    **kwargs: Any,
+) -> list[Response | BaseException]:
+    """Send many documents to a microservice concurrently, over pooled
+    connections to the service.
+
+    :param service: The service to call
+    :param items: The documents to send, as db objects
+    :param max_concurrency: The maximum number of requests in flight.
+    Defaults to the max_connections of the service.
+    :param kwargs: Other params for microservice, like data or params.
+    :return: The responses, in the order of the items. The exception raised
+    instead for the items whose request failed.
+    """
+    if max_concurrency is None:
+        max_concurrency = settings.MICROSERVICE_URLS[service].get(
+            "max_connections", settings.MICROSERVICE_MAX_CONNECTIONS
+        )
+    semaphore = asyncio.Semaphore(max_concurrency)
+
+    async def call(item: RECAPDocument | Opinion | Audio) -> Response:
+        async with semaphore:
+            return await microservice(service=service, item=item, **kwargs)
+
+    async with pooled_microservice_clients():
+        return await asyncio.gather(
+            *(call(item) for item in items), return_exceptions=True
+        )
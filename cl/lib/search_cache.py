@@ -0,0 +1,218 @@
+"""A short-lived cache of the front end search results.
+
+Identical searches are very common, mostly from bots and crawlers, so the
+results page and the status facets of a search are cached for
+SEARCH_RESULTS_MICRO_CACHE seconds when ELASTICSEARCH_MICRO_CACHE_ENABLED is
+set. They're keyed on a canonical form of the GET params, so requests that
+only differ in the order or the whitespace of their params share an entry.
+
+Keys include a generation number per search type. ESSignalProcessor bumps the
+generation of the search types whose documents changed, which invalidates all
+their cached results at once. Orphaned entries just expire. Documents change
+all the time, so a search type's generation is bumped at most once every
+SEARCH_CACHE_INVALIDATION_INTERVAL seconds. Changes made in between show up
+when their entries expire, as they'd do without invalidation.
+
+Hits and misses are tallied per search type in the STATS Redis DB, see
+get_search_cache_stats.
+"""
+
+import pickle
+from datetime import date
+from typing import Any, Iterable
+
+from django.conf import settings
+from django.core.cache import cache
+from django.http import QueryDict
+
+from cl.lib.crypto import sha256
+from cl.lib.redis_utils import get_redis_interface
+from cl.search.documents import (
+    AudioDocument,
+    DocketDocument,
+    ESRECAPDocument,
+    OpinionClusterDocument,
+    OpinionDocument,
+    ParentheticalGroupDocument,
+    PersonDocument,
+    PositionDocument,
+)
+from cl.search.models import SEARCH_TYPES
+
+SEARCH_CACHE_PREFIX = "search_results_cache"
+SEARCH_CACHE_GENERATIONS_KEY = f"{SEARCH_CACHE_PREFIX}:generations"
+SEARCH_CACHE_INVALIDATED_PREFIX = f"{SEARCH_CACHE_PREFIX}:invalidated"
+
+# The search types whose results change when a document is indexed.
+DOCUMENT_SEARCH_TYPES = {
+    OpinionClusterDocument: [SEARCH_TYPES.OPINION],
+    OpinionDocument: [SEARCH_TYPES.OPINION],
+    DocketDocument: [SEARCH_TYPES.RECAP, SEARCH_TYPES.DOCKETS],
+    ESRECAPDocument: [SEARCH_TYPES.RECAP, SEARCH_TYPES.DOCKETS],
+    AudioDocument: [SEARCH_TYPES.ORAL_ARGUMENT],
+    PersonDocument: [SEARCH_TYPES.PEOPLE],
+    PositionDocument: [SEARCH_TYPES.PEOPLE],
+    ParentheticalGroupDocument: [SEARCH_TYPES.PARENTHETICAL],
+}
+
+
+def canonicalize_search_params(
+    get_params: QueryDict,
+) -> list[tuple[str, list[str]]]:
+    """Build a canonical form of the search GET params.
+
+    Params are sorted, whitespace in values is normalized, and empty values
+    are dropped, since the search form treats them as missing. The page is
+    left out, it's part of the key on its own.
+
+    :param get_params: The GET params of the search request.
+    :return: A sorted list of (param, values) pairs.
+    """
+    canonical = []
+    for param, values in sorted(get_params.lists()):
+        if param == "page":
+            continue
+        values = sorted(
+            value for value in (" ".join(v.split()) for v in values) if value
+        )
+        if values:
+            canonical.append((param, values))
+    return canonical
+
+
+def make_search_cache_key(
+    get_params: QueryDict, page: int | str | None
+) -> str:
+    """Make the cache key of a search.
+
+    :param get_params: The GET params of the search request.
+    :param page: The results page requested, or None for the keys of data
+    that doesn't depend on the page, like facets.
+    :return: The cache key.
+    """
+    if page is not None:
+        try:
+            page = int(page)
+        except ValueError:
+            page = 1
+    search_type = get_params.get("type") or SEARCH_TYPES.OPINION
+    r = get_redis_interface("CACHE")
+    generation = r.hget(SEARCH_CACHE_GENERATIONS_KEY, search_type) or 0
+    params_hash = sha256(
+        pickle.dumps(
+            (
+                canonicalize_search_params(get_params),
+                page,
+                # Relative dates in queries are resolved against the day of
+                # the request, so don't share entries across days.
+                date.today().isoformat(),
+            )
+        )
+    )
+    return f"{SEARCH_CACHE_PREFIX}:{search_type}:{generation}:{params_hash}"
+
+
+def tally_search_cache_lookup(search_type: str, hit: bool) -> None:
+    """Count a lookup in the search cache.
+
+    :param search_type: The search type looked up.
+    :param hit: Whether the lookup was a hit.
+    :return: None
+    """
+    d = date.today().isoformat()
+    outcome = "hits" if hit else "misses"
+    r = get_redis_interface("STATS")
+    pipe = r.pipeline()
+    pipe.incr(f"{SEARCH_CACHE_PREFIX}.{search_type}.{outcome}")
+    pipe.incr(f"{SEARCH_CACHE_PREFIX}.{search_type}.d:{d}.{outcome}")
+    pipe.execute()
+
+
+def get_cached_search_results(cache_key: str, search_type: str) -> Any:
+    """Get cached search results and tally the lookup.
+
+    :param cache_key: The key from make_search_cache_key.
+    :param search_type: The search type, for the hit and miss counters.
+    :return: The cached results or None if there's no entry.
+    """
+    cached = cache.get(cache_key)
+    tally_search_cache_lookup(search_type, hit=cached is not None)
+    if cached is None:
+        return None
+    return pickle.loads(cached)
+
+
+def set_cached_search_results(cache_key: str, results: Any) -> None:
+    """Cache search results.
+
+    :param cache_key: The key from make_search_cache_key.
+    :param results: The results to cache.
+    :return: None
+    """
+    cache.set(
+        cache_key, pickle.dumps(results), settings.SEARCH_RESULTS_MICRO_CACHE
+    )
+
+
+def invalidate_search_results_cache(search_types: Iterable[str]) -> None:
+    """Invalidate all the cached results of some search types, unless they
+    were invalidated in the last SEARCH_CACHE_INVALIDATION_INTERVAL seconds.
+
+    :param search_types: The search types to invalidate.
+    :return: None
+    """
+    if not settings.ELASTICSEARCH_MICRO_CACHE_ENABLED:
+        return
+    search_types = list(search_types)
+    if not search_types:
+        return
+    r = get_redis_interface("CACHE")
+    pipe = r.pipeline()
+    for search_type in search_types:
+        pipe.set(
+            f"{SEARCH_CACHE_INVALIDATED_PREFIX}:{search_type}",
+            1,
+            nx=True,
+            ex=settings.SEARCH_CACHE_INVALIDATION_INTERVAL,
+        )
+    due = [
+        search_type
+        for search_type, was_set in zip(search_types, pipe.execute())
+        if was_set
+    ]
+    if not due:
+        return
+    pipe = r.pipeline()
+    for search_type in due:
+        pipe.hincrby(SEARCH_CACHE_GENERATIONS_KEY, search_type, 1)
+    pipe.execute()
+
+
+def get_search_cache_stats(
+    day: date | None = None,
+) -> dict[str, dict[str, int | float]]:
+    """Get the hit and miss counters of the search cache, to tune its TTL.
+
+    :param day: The day to get the counters of. Defaults to all time.
+    :return: A dict mapping each search type to its hits, misses and hit
+    ratio.
+    """
+    r = get_redis_interface("STATS")
+    day_part = f".d:{day.isoformat()}" if day else ""
+    search_types = [search_type for search_type, _ in SEARCH_TYPES.NAMES]
+    keys = [
+        f"{SEARCH_CACHE_PREFIX}.{search_type}{day_part}.{outcome}"
+        for search_type in search_types
+        for outcome in ("hits", "misses")
+    ]
+    values = iter(r.mget(keys))
+    stats = {}
+    for search_type in search_types:
+        hits, misses = int(next(values) or 0), int(next(values) or 0)
+        total = hits + misses
+        stats[search_type] = {
+            "hits": hits,
+            "misses": misses,
+            "hit_ratio": hits / total if total else 0.0,
+        }
+    return stats
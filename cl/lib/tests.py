@@ -5,13 +5,25 @@ from unittest.mock import patch
 
 from asgiref.sync import async_to_sync
 from django.conf import settings
+from django.core.cache import cache
 from django.core.files.base import ContentFile
+from django.http import QueryDict
 from django.test import override_settings
 from requests.cookies import RequestsCookieJar
 
 from cl.lib.date_time import midnight_pt
+from cl.lib.docket_fields_cache import (
+    NO_INITIAL_DOCUMENT,
+    fetch_initial_documents,
+    get_initial_documents,
+    invalidate_docket_fields,
+)
 from cl.lib.elasticsearch_utils import append_query_conjunctions
 from cl.lib.filesizes import convert_size_to_bytes
+from cl.lib.microservice_utils import (
+    get_pooled_microservice_client,
+    pooled_microservice_clients,
+)
 from cl.lib.mime_types import lookup_mime_type
 from cl.lib.model_helpers import (
     clean_docket_number,
@@ -40,6 +52,16 @@ from cl.lib.redis_utils import (
     get_redis_interface,
     release_redis_lock,
 )
+from cl.lib.search_cache import (
+    SEARCH_CACHE_GENERATIONS_KEY,
+    SEARCH_CACHE_INVALIDATED_PREFIX,
+    SEARCH_CACHE_PREFIX,
+    get_cached_search_results,
+    get_search_cache_stats,
+    invalidate_search_results_cache,
+    make_search_cache_key,
+    set_cached_search_results,
+)
 from cl.lib.search_utils import make_fq
 from cl.lib.string_utils import normalize_dashes, trunc
 from cl.lib.utils import (
@@ -53,10 +75,19 @@ from cl.people_db.models import Role
 from cl.recap.models import UPLOAD_TYPE, PacerHtmlFiles
 from cl.search.factories import (
     CourtFactory,
+    DocketEntryWithParentsFactory,
     DocketFactory,
     OpinionClusterFactoryMultipleOpinions,
+    RECAPDocumentFactory,
+)
+from cl.search.models import (
+    SEARCH_TYPES,
+    Court,
+    Docket,
+    Opinion,
+    OpinionCluster,
+    RECAPDocument,
 )
-from cl.search.models import Court, Docket, Opinion, OpinionCluster
 from cl.tests.cases import SimpleTestCase, TestCase
 
 
@@ -1226,6 +1257,219 @@ class TestRedisUtils(SimpleTestCase):
         self.assertEqual(result, 1)
 
 
+@override_settings(ELASTICSEARCH_MICRO_CACHE_ENABLED=True)
+class TestSearchCache(SimpleTestCase):
+    """Test the search results micro-cache helpers."""
+
+    def setUp(self) -> None:
+        self.r = get_redis_interface("CACHE")
+        self.r.delete(
+            SEARCH_CACHE_GENERATIONS_KEY,
+            *self.r.keys(f"{SEARCH_CACHE_INVALIDATED_PREFIX}:*"),
+        )
+        self.stats = get_redis_interface("STATS")
+        keys = self.stats.keys(f"{SEARCH_CACHE_PREFIX}.*")
+        if keys:
+            self.stats.delete(*keys)
+
+    def test_equivalent_searches_share_a_key(self) -> None:
+        """Are params order, whitespace, empty params and the first page
+        normalized?
+        """
+        key = make_search_cache_key(
+            QueryDict("type=r&q=foo+bar&available_only=on"), 1
+        )
+        searches: list[tuple[str, int | str]] = [
+            ("available_only=on&q=foo+bar&type=r", 1),
+            ("type=r&q=++foo+++bar+&available_only=on", "1"),
+            ("type=r&q=foo+bar&available_only=on&case_name=", 1),
+            ("type=r&q=foo+bar&available_only=on&page=3", 1),
+        ]
+        for query_string, page in searches:
+            with self.subTest(query_string=query_string):
+                self.assertEqual(
+                    key, make_search_cache_key(QueryDict(query_string), page)
+                )
+
+        self.assertNotEqual(
+            key,
+            make_search_cache_key(
+                QueryDict("type=r&q=foo+bar&available_only=on"), 2
+            ),
+        )
+        self.assertNotEqual(
+            key,
+            make_search_cache_key(
+                QueryDict("type=r&q=foo+bar&available_only=on"), None
+            ),
+        )
+        self.assertNotEqual(
+            key, make_search_cache_key(QueryDict("type=r&q=foo"), 1)
+        )
+
+    def test_invalidation_changes_the_keys(self) -> None:
+        """Does invalidating a search type only change its own keys?"""
+        recap_params = QueryDict("type=r&q=foo")
+        oa_params = QueryDict("type=oa&q=foo")
+        recap_key = make_search_cache_key(recap_params, 1)
+        oa_key = make_search_cache_key(oa_params, 1)
+
+        invalidate_search_results_cache([SEARCH_TYPES.RECAP])
+        self.assertNotEqual(recap_key, make_search_cache_key(recap_params, 1))
+        self.assertEqual(oa_key, make_search_cache_key(oa_params, 1))
+
+        with override_settings(ELASTICSEARCH_MICRO_CACHE_ENABLED=False):
+            recap_key = make_search_cache_key(recap_params, 1)
+            invalidate_search_results_cache([SEARCH_TYPES.RECAP])
+            self.assertEqual(recap_key, make_search_cache_key(recap_params, 1))
+
+    def test_invalidation_is_throttled(self) -> None:
+        """Is a search type invalidated at most once per interval?"""
+        recap_params = QueryDict("type=r&q=foo")
+        invalidate_search_results_cache([SEARCH_TYPES.RECAP])
+        recap_key = make_search_cache_key(recap_params, 1)
+        invalidate_search_results_cache(
+            [SEARCH_TYPES.RECAP, SEARCH_TYPES.ORAL_ARGUMENT]
+        )
+        self.assertEqual(recap_key, make_search_cache_key(recap_params, 1))
+        self.assertEqual(
+            self.r.hget(
+                SEARCH_CACHE_GENERATIONS_KEY, SEARCH_TYPES.ORAL_ARGUMENT
+            ),
+            "1",
+        )
+
+        self.r.delete(
+            f"{SEARCH_CACHE_INVALIDATED_PREFIX}:{SEARCH_TYPES.RECAP}"
+        )
+        invalidate_search_results_cache([SEARCH_TYPES.RECAP])
+        self.assertNotEqual(recap_key, make_search_cache_key(recap_params, 1))
+
+    def test_hits_and_misses_are_counted(self) -> None:
+        """Are cache lookups tallied per search type?"""
+        key = make_search_cache_key(QueryDict("type=oa&q=foo"), 1)
+        cache.delete(key)
+        self.assertIsNone(
+            get_cached_search_results(key, SEARCH_TYPES.ORAL_ARGUMENT)
+        )
+        set_cached_search_results(key, {"main_total": 0})
+        for _ in range(3):
+            self.assertEqual(
+                get_cached_search_results(key, SEARCH_TYPES.ORAL_ARGUMENT),
+                {"main_total": 0},
+            )
+
+        stats = get_search_cache_stats()
+        self.assertEqual(
+            stats[SEARCH_TYPES.ORAL_ARGUMENT],
+            {"hits": 3, "misses": 1, "hit_ratio": 0.75},
+        )
+        self.assertEqual(
+            get_search_cache_stats(datetime.date.today()),
+            stats,
+        )
+        self.assertEqual(stats[SEARCH_TYPES.RECAP]["hits"], 0)
+
+
+class TestDocketFieldsCache(TestCase):
+    """Test the cache of the docket fields merged into search results."""
+
+    @classmethod
+    def setUpTestData(cls) -> None:
+        court = CourtFactory(id="canb", jurisdiction="FB")
+        cls.docket = DocketFactory(court=court, source=Docket.RECAP)
+        cls.docket_without_documents = DocketFactory(
+            court=court, source=Docket.RECAP
+        )
+        cls.initial_document = RECAPDocumentFactory(
+            docket_entry=DocketEntryWithParentsFactory(docket=cls.docket),
+            document_number="1",
+            document_type=RECAPDocument.PACER_DOCUMENT,
+            pacer_doc_id="04505578698",
+            is_available=False,
+        )
+
+    def setUp(self) -> None:
+        invalidate_docket_fields(
+            self.docket.pk, self.docket_without_documents.pk
+        )
+
+    def test_initial_documents_are_cached(self) -> None:
+        """Are initial documents looked up in the DB only once, including
+        the dockets without one, until they change?
+        """
+        docket_ids = [self.docket.pk, self.docket_without_documents.pk]
+        expected = {
+            self.docket.pk: (
+                None,
+                self.initial_document.pacer_url,
+                "Buy Initial Document",
+            ),
+            self.docket_without_documents.pk: NO_INITIAL_DOCUMENT,
+        }
+        with self.assertNumQueries(1):
+            self.assertEqual(get_initial_documents(docket_ids), expected)
+        with self.assertNumQueries(0):
+            self.assertEqual(get_initial_documents(docket_ids), expected)
+
+        # Saving the initial document deletes the entry of its docket.
+        self.initial_document.description = "Complaint"
+        self.initial_document.save()
+        with self.assertNumQueries(1):
+            self.assertEqual(get_initial_documents(docket_ids), expected)
+
+    def test_fields_changed_during_lookup_are_not_cached(self) -> None:
+        """Are fields looked up before a docket changed left out of the
+        cache, so the next lookup doesn't get stale fields?
+        """
+        docket_ids = [self.docket.pk]
+
+        def change_docket_during_lookup(ids):
+            fields = fetch_initial_documents(ids)
+            invalidate_docket_fields(self.docket.pk)
+            return fields
+
+        with patch(
+            "cl.lib.docket_fields_cache.fetch_initial_documents",
+            side_effect=change_docket_during_lookup,
+        ):
+            get_initial_documents(docket_ids)
+        with self.assertNumQueries(1):
+            get_initial_documents(docket_ids)
+        with self.assertNumQueries(0):
+            get_initial_documents(docket_ids)
+
+
+class TestMicroserviceClients(SimpleTestCase):
+    """Test the pooled microservice clients."""
+
+    def test_clients_are_pooled_within_a_block(self) -> None:
+        """Is a client reused within a pooled_microservice_clients block, but
+        not across services, and closed when the block exits?
+        """
+
+        async def get_clients():
+            self.assertIsNone(get_pooled_microservice_client("page-count"))
+            async with pooled_microservice_clients():
+                clients = (
+                    get_pooled_microservice_client("page-count"),
+                    get_pooled_microservice_client("page-count"),
+                    get_pooled_microservice_client("mime-type"),
+                )
+                for client in clients:
+                    assert client is not None
+                    self.assertFalse(client.is_closed)
+            self.assertIsNone(get_pooled_microservice_client("page-count"))
+            return clients
+
+        first, second, other_service = async_to_sync(get_clients)()
+        assert first is not None and other_service is not None
+        self.assertIs(first, second)
+        self.assertIsNot(first, other_service)
+        self.assertTrue(first.is_closed)
+        self.assertTrue(other_service.is_closed)
+
+
 class TestLinkifyOrigDocketNumber(SimpleTestCase):
     def test_linkify_orig_docket_number(self):
         test_pairs = [
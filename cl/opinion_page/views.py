@@ -26,7 +26,6 @@ from django.urls import reverse
 from django.utils.timezone import now
 from django.views.decorators.cache import never_cache
 from django.views.decorators.csrf import csrf_exempt, ensure_csrf_cookie
-from eyecite.tokenizers import HyperscanTokenizer
 from reporters_db import (
     EDITIONS,
     NAMES_TO_EDITIONS,
@@ -36,6 +35,7 @@ from reporters_db import (
 from seal_rookery.search import ImageSizes, seal
 
 from cl.citations.parenthetical_utils import get_or_create_parenthetical_groups
+from cl.citations.tokenizers import HYPERSCAN_TOKENIZER
 from cl.citations.utils import (
     SLUGIFIED_EDITIONS,
     filter_out_non_case_law_citations,
@@ -93,8 +93,6 @@ from cl.search.models import (
 from cl.search.selectors import get_clusters_from_citation_str
 from cl.search.views import do_es_search, do_search
 
-HYPERSCAN_TOKENIZER = HyperscanTokenizer(cache_dir=".hyperscan")
-
 
 async def court_homepage(request: HttpRequest, pk: str) -> HttpResponse:
     """Individual Court Home Pages"""
@@ -0,0 +1,137 @@
+"""A short-lived cache of the dockets matched by find_docket_object.
+
+The same dockets are looked up over and over by RSS polling, recap.email and
+extension uploads, so the pk of the docket each lookup matched is cached for
+a few minutes.
+
+Lookups with a PACER case ID are cached in a Redis hash per court and case
+ID, and the rest in a hash per court and docket number core. The fields of
+the hashes identify the rest of the lookup params. Saving a docket deletes
+the hashes its lookups would use. Cached matches are also checked against
+the docket before using them, so a docket whose identifiers changed is never
+returned for its old ones.
+
+Hits of the cache and of every lookup of find_docket_object are tallied in
+the STATS Redis DB, see get_docket_lookup_stats.
+"""
+
+import json
+from datetime import date
+
+from cl.lib.crypto import sha256
+from cl.lib.redis_utils import get_redis_interface
+from cl.search.models import Docket
+
+DOCKET_LOOKUP_PREFIX = "docket_lookup"
+DOCKET_LOOKUP_TIMEOUT = 60 * 5
+
+# The names of the lookups of find_docket_object, in the order they're tried.
+DOCKET_LOOKUP_TIERS = [
+    "pacer_case_id_and_core",
+    "pacer_case_id",
+    "core_without_pacer_case_id",
+    "core",
+    "docket_number",
+]
+
+
+def get_docket_lookup_key(
+    court_id: str, pacer_case_id: str | None, docket_number_core: str
+) -> str:
+    """Get the key of the Redis hash that caches a docket lookup.
+
+    :param court_id: The court of the lookup.
+    :param pacer_case_id: The PACER case ID of the lookup, if any.
+    :param docket_number_core: The docket number core of the lookup.
+    :return: The key.
+    """
+    if pacer_case_id:
+        return f"{DOCKET_LOOKUP_PREFIX}:{court_id}:{pacer_case_id}"
+    return f"{DOCKET_LOOKUP_PREFIX}:{court_id}::{docket_number_core}"
+
+
+def get_docket_lookup_field(*params: str | int | None) -> str:
+    """Get the field that identifies a lookup in its Redis hash.
+
+    :param params: The rest of the params of the lookup.
+    :return: The field.
+    """
+    return sha256(json.dumps(params))
+
+
+def get_cached_docket_lookup(key: str, field: str) -> tuple[int, int] | None:
+    """Get a cached docket lookup.
+
+    :param key: The key from get_docket_lookup_key.
+    :param field: The field from get_docket_lookup_field.
+    :return: A two tuple, the pk of the docket matched and the index of the
+    lookup that matched it, or None if the lookup isn't cached.
+    """
+    cached = get_redis_interface("CACHE").hget(key, field)
+    if cached is None:
+        return None
+    pk, tier = cached.split(":")
+    return int(pk), int(tier)
+
+
+def cache_docket_lookup(key: str, field: str, pk: int, tier: int) -> None:
+    """Cache the docket matched by a lookup.
+
+    :param key: The key from get_docket_lookup_key.
+    :param field: The field from get_docket_lookup_field.
+    :param pk: The pk of the docket matched.
+    :param tier: The index of the lookup that matched it.
+    :return: None
+    """
+    pipe = get_redis_interface("CACHE").pipeline()
+    pipe.hset(key, field, f"{pk}:{tier}")
+    pipe.expire(key, DOCKET_LOOKUP_TIMEOUT)
+    pipe.execute()
+
+
+def invalidate_docket_lookups(docket: Docket) -> None:
+    """Delete the cached lookups that could match a docket.
+
+    :param docket: The docket that changed.
+    :return: None
+    """
+    keys = [
+        get_docket_lookup_key(
+            docket.court_id, None, docket.docket_number_core or ""
+        )
+    ]
+    if docket.pacer_case_id:
+        keys.append(
+            get_docket_lookup_key(docket.court_id, docket.pacer_case_id, "")
+        )
+    get_redis_interface("CACHE").delete(*keys)
+
+
+def tally_docket_lookup(outcome: str) -> None:
+    """Count a docket lookup by what matched it.
+
+    :param outcome: The name of the lookup that matched, "cache" or "new".
+    :return: None
+    """
+    d = date.today().isoformat()
+    pipe = get_redis_interface("STATS").pipeline()
+    pipe.incr(f"{DOCKET_LOOKUP_PREFIX}.{outcome}")
+    pipe.incr(f"{DOCKET_LOOKUP_PREFIX}.d:{d}.{outcome}")
+    pipe.execute()
+
+
+def get_docket_lookup_stats(day: date | None = None) -> dict[str, int]:
+    """Get the counts of docket lookups by what matched them.
+
+    :param day: The day to get the counts of. Defaults to all time.
+    :return: A dict mapping every lookup name, "cache" and "new" to its
+    count.
+    """
+    day_part = f".d:{day.isoformat()}" if day else ""
+    outcomes = ["cache", *DOCKET_LOOKUP_TIERS, "new"]
+    counts = get_redis_interface("STATS").mget(
+        [f"{DOCKET_LOOKUP_PREFIX}{day_part}.{outcome}" for outcome in outcomes]
+    )
+    return {
+        outcome: int(count or 0) for outcome, count in zip(outcomes, counts)
+    }
@@ -1,11 +1,15 @@
 # Code for merging PACER content into the DB
 import logging
 import re
+from collections import Counter, defaultdict
 from copy import deepcopy
+from dataclasses import dataclass, field
 from datetime import date, timedelta
+from functools import partial
 from typing import Any, Dict, List, Optional, Tuple, Union
 
 from asgiref.sync import async_to_sync, sync_to_async
+from django.conf import settings
 from django.core.exceptions import ValidationError
 from django.core.files.base import ContentFile
 from django.db import IntegrityError, OperationalError, transaction
@@ -16,6 +20,7 @@ from juriscraper.pacer import AppellateAttachmentPage, AttachmentPage
 
 from cl.corpus_importer.utils import mark_ia_upload_needed
 from cl.lib.decorators import retry
+from cl.lib.docket_fields_cache import invalidate_docket_fields
 from cl.lib.filesizes import convert_size_to_bytes
 from cl.lib.model_helpers import clean_docket_number, make_docket_number_core
 from cl.lib.pacer import (
@@ -39,6 +44,14 @@ from cl.people_db.models import (
     PartyType,
     Role,
 )
+from cl.recap.docket_lookup import (
+    DOCKET_LOOKUP_TIERS,
+    cache_docket_lookup,
+    get_cached_docket_lookup,
+    get_docket_lookup_field,
+    get_docket_lookup_key,
+    tally_docket_lookup,
+)
 from cl.recap.models import (
     PROCESSING_STATUS,
     UPLOAD_TYPE,
@@ -46,6 +59,7 @@ from cl.recap.models import (
     ProcessingQueue,
 )
 from cl.search.models import (
+    SEARCH_TYPES,
     BankruptcyInformation,
     Claim,
     ClaimHistory,
@@ -56,10 +70,17 @@ from cl.search.models import (
     RECAPDocument,
     Tag,
 )
-from cl.search.tasks import add_items_to_solr, index_docket_parties_in_es
+from cl.search.tasks import (
+    add_items_to_solr,
+    index_docket_parties_in_es,
+    index_parent_or_child_docs,
+)
 
 logger = logging.getLogger(__name__)
 
+# Uploads with at least this many docket entries are merged in bulk.
+BULK_MERGE_MIN_ENTRIES = 100
+
 cnt = CaseNameTweaker()
 
 
@@ -110,6 +131,125 @@ def confirm_docket_number_core_lookup_match(
     return docket
 
 
+def docket_matches_lookup(docket: Docket, lookup: dict[str, Any]) -> bool:
+    """Check if a docket matches the field lookups of a query, comparing the
+    values the way the DB would.
+
+    :param docket: The docket to check.
+    :param lookup: A dict of exact field lookups, like {"pacer_case_id": "1"}
+    :return: True if the docket matches every lookup, otherwise False.
+    """
+    for field_name, value in lookup.items():
+        field = Docket._meta.get_field(field_name)
+        if field.get_prep_value(value) != getattr(docket, field.attname):
+            return False
+    return True
+
+
+def is_docket_number_core_lookup(lookup: dict[str, Any]) -> bool:
+    """Check if the matches of a docket lookup have to be confirmed with
+    confirm_docket_number_core_lookup_match.
+
+    :param lookup: The field lookups of the query.
+    :return: True if the lookup is by docket_number_core and not by
+    pacer_case_id.
+    """
+    return lookup.get("pacer_case_id") is None and bool(
+        lookup.get("docket_number_core")
+    )
+
+
+def match_docket_lookups(
+    candidates: list[Docket],
+    lookups: list[dict[str, Any]],
+    docket_number: str,
+    dn_components: dict[str, str | None],
+) -> tuple[Docket | None, int | None]:
+    """Run the lookups of find_docket_object over dockets already loaded from
+    the DB.
+
+    :param candidates: The dockets that match any of the lookups.
+    :param lookups: The field lookups to try, in order.
+    :param docket_number: The incoming docket_number to lookup.
+    :param dn_components: The incoming docket_number components, to refine
+    lookups that match several dockets.
+    :return: A two tuple, the docket matched and the index of the lookup that
+    matched it, or (None, None) if no lookup matched.
+    """
+    for tier, kwargs in enumerate(lookups):
+        ds = [d for d in candidates if docket_matches_lookup(d, kwargs)]
+        if not ds:
+            continue  # Try a looser lookup.
+        if len(ds) == 1:
+            d = ds[0]
+            if is_docket_number_core_lookup(kwargs):
+                d = confirm_docket_number_core_lookup_match(
+                    d, docket_number, **dn_components
+                )
+        else:
+            # If more than one docket matches, try refining the results using
+            # available docket_number components.
+            dn_lookup = {
+                dn_key: dn_value
+                for dn_key, dn_value in dn_components.items()
+                if dn_value
+            }
+            dn_ds = [d for d in ds if docket_matches_lookup(d, dn_lookup)]
+            if len(dn_ds) == 1:
+                d = dn_ds[0]
+            else:
+                # Choose the oldest one and live with it.
+                d = min(ds, key=lambda d: (d.date_created, d.pk))
+                if is_docket_number_core_lookup(kwargs):
+                    d = confirm_docket_number_core_lookup_match(
+                        d, docket_number
+                    )
+        if d:
+            return d, tier  # Nailed it!
+    return None, None
+
+
+async def get_cached_docket_match(
+    court_id: str,
+    cache_key: str,
+    cache_field: str,
+    lookups: list[dict[str, Any]],
+    docket_number: str,
+    dn_components: dict[str, str | None],
+) -> Docket | None:
+    """Get the docket a lookup matched recently, if it still matches it.
+
+    :param court_id: The CourtListener court_id to lookup.
+    :param cache_key: The key of the lookup in the cache.
+    :param cache_field: The field of the lookup in the cache.
+    :param lookups: The field lookups of find_docket_object.
+    :param docket_number: The incoming docket_number to lookup.
+    :param dn_components: The incoming docket_number components.
+    :return: The docket, from the default DB, or None.
+    """
+    cached = await sync_to_async(get_cached_docket_lookup)(
+        cache_key, cache_field
+    )
+    if cached is None:
+        return None
+    pk, tier = cached
+    d = await Docket.objects.filter(pk=pk).afirst()
+    if (
+        d is None
+        or tier >= len(lookups)
+        or d.court_id != court_id
+        or not docket_matches_lookup(d, lookups[tier])
+    ):
+        return None
+    if is_docket_number_core_lookup(
+        lookups[tier]
+    ) and not confirm_docket_number_core_lookup_match(
+        d, docket_number, **dn_components
+    ):
+        return None
+    return d
+
+
 async def find_docket_object(
     court_id: str,
     pacer_case_id: str | None,
@@ -122,6 +262,10 @@ async def find_docket_object(
     """Attempt to find the docket based on the parsed docket data. If cannot be
     found, create a new docket. If multiple are found, return the oldest.
 
+    The dockets matched are cached for a few minutes, see
+    cl.recap.docket_lookup. Otherwise, the dockets matching any of the lookups
+    are loaded in a single query and the lookups are tried over them.
+
     :param court_id: The CourtListener court_id to lookup
     :param pacer_case_id: The PACER case ID for the docket
     :param docket_number: The docket number to lookup.
@@ -136,12 +280,17 @@ async def find_docket_object(
     """
     # Attempt several lookups of decreasing specificity. Note that
     # pacer_case_id is required for Docket and Docket History uploads.
-    d = None
     docket_number_core = make_docket_number_core(docket_number)
+    dn_components = {
+        "federal_defendant_number": federal_defendant_number,
+        "federal_dn_judge_initials_assigned": federal_dn_judge_initials_assigned,
+        "federal_dn_judge_initials_referred": federal_dn_judge_initials_referred,
+    }
     lookups = []
     if pacer_case_id:
         # Appellate RSS feeds don't contain a pacer_case_id, avoid lookups by
         # blank pacer_case_id values.
+        tier_names = DOCKET_LOOKUP_TIERS[:2]
         lookups = [
             {
                 "pacer_case_id": pacer_case_id,
@@ -153,6 +302,7 @@ async def find_docket_object(
         # Sometimes we don't know how to make core docket numbers. If that's
         # the case, we will have a blank value for the field. We must not do
         # lookups by blank values. See: freelawproject/courtlistener#1531
+        tier_names = DOCKET_LOOKUP_TIERS[2:4]
         lookups.extend(
             [
                 {
@@ -166,59 +316,52 @@ async def find_docket_object(
         # Finally, as a last resort, we can try the docket number. It might not
         # match b/c of punctuation or whatever, but we can try. Avoid lookups
         # by blank docket_number values.
+        tier_names = DOCKET_LOOKUP_TIERS[4:]
         lookups.append(
             {"pacer_case_id": None, "docket_number": docket_number},
         )
 
-    for kwargs in lookups:
-        ds = Docket.objects.filter(court_id=court_id, **kwargs).using(using)
-        count = await ds.acount()
-        if count == 0:
-            continue  # Try a looser lookup.
-        if count == 1:
-            d = await ds.afirst()
-            if kwargs.get("pacer_case_id") is None and kwargs.get(
-                "docket_number_core"
-            ):
-                d = confirm_docket_number_core_lookup_match(
-                    d,
-                    docket_number,
-                    federal_defendant_number,
-                    federal_dn_judge_initials_assigned,
-                    federal_dn_judge_initials_referred,
-                )
-            if d:
-                break  # Nailed it!
-        elif count > 1:
-            # If more than one docket matches, try refining the results using
-            # available docket_number components.
-            dn_components = {
-                "federal_defendant_number": federal_defendant_number,
-                "federal_dn_judge_initials_assigned": federal_dn_judge_initials_assigned,
-                "federal_dn_judge_initials_referred": federal_dn_judge_initials_referred,
-            }
-            dn_lookup = {
-                dn_key: dn_value
-                for dn_key, dn_value in dn_components.items()
-                if dn_value
-            }
-            dn_queryset = ds.filter(**dn_lookup).using(using)
-            count = await dn_queryset.acount()
-            if count == 1:
-                d = await dn_queryset.afirst()
-            else:
-                # Choose the oldest one and live with it.
-                d = await ds.aearliest("date_created")
-                if kwargs.get("pacer_case_id") is None and kwargs.get(
-                    "docket_number_core"
-                ):
-                    d = confirm_docket_number_core_lookup_match(
-                        d, docket_number
-                    )
-            if d:
-                break
+    d = None
+    if lookups:
+        cache_key = get_docket_lookup_key(
+            court_id, pacer_case_id, docket_number_core
+        )
+        cache_field = get_docket_lookup_field(
+            docket_number_core, docket_number, *dn_components.values()
+        )
+        d = await get_cached_docket_match(
+            court_id,
+            cache_key,
+            cache_field,
+            lookups,
+            docket_number,
+            dn_components,
+        )
+        if d is not None:
+            await sync_to_async(tally_docket_lookup)("cache")
+            return d
+
+        lookup_q = Q()
+        for kwargs in lookups:
+            lookup_q |= Q(**kwargs)
+        candidates = [
+            candidate
+            async for candidate in Docket.objects.filter(
+                lookup_q, court_id=court_id
+            ).using(using)
+        ]
+        d, tier = match_docket_lookups(
+            candidates, lookups, docket_number, dn_components
+        )
+        if d is not None:
+            await sync_to_async(cache_docket_lookup)(
+                cache_key, cache_field, d.pk, tier
+            )
+            await sync_to_async(tally_docket_lookup)(tier_names[tier])
+
     if d is None:
         # Couldn't find a docket. Return a new one.
+        await sync_to_async(tally_docket_lookup)("new")
         return Docket(
             source=Docket.RECAP,
             pacer_case_id=pacer_case_id,
@@ -813,6 +956,296 @@ async def get_or_make_docket_entry(
     return de, de_created
 
 
+def update_docket_entry_fields(
+    d: Docket, de: DocketEntry, docket_entry: dict[str, Any]
+) -> None:
+    """Update a docket entry with the data of the scraped one.
+
+    :param d: The docket of the entry.
+    :param de: The DocketEntry to update.
+    :param docket_entry: The scraped dict from Juriscraper for the docket
+    entry.
+    :return: None, the docket entry is updated in place.
+    """
+    de.description = docket_entry["description"] or de.description
+    date_filed, time_filed = localize_date_and_time(
+        d.court_id, docket_entry["date_filed"]
+    )
+    if not time_filed:
+        # If not time data is available, compare if date_filed changed if
+        # so restart time_filed to None, otherwise keep the current time.
+        if de.date_filed != docket_entry["date_filed"]:
+            de.time_filed = None
+    else:
+        de.time_filed = time_filed
+    de.date_filed = date_filed
+    pacer_seq_no = docket_entry.get("pacer_seq_no")
+    if pacer_seq_no:
+        # Juriscraper returns the sequence number as a string.
+        de.pacer_sequence_number = int(pacer_seq_no)
+    de.recap_sequence_number = docket_entry["recap_sequence_number"]
+
+
+@dataclass
+class BulkMergeResult:
+    """The outcome of bulk_merge_docket_entries."""
+
+    des_returned: list[DocketEntry] = field(default_factory=list)
+    rds_updated: list[RECAPDocument] = field(default_factory=list)
+    rds_created: list[RECAPDocument] = field(default_factory=list)
+    content_updated: bool = False
+    filing_dates: list[date] = field(default_factory=list)
+    # The entries that must be merged one at a time.
+    remaining_entries: list[dict[str, Any]] = field(default_factory=list)
+
+
+DOCKET_ENTRY_MERGE_FIELDS = [
+    "description",
+    "time_filed",
+    "date_filed",
+    "pacer_sequence_number",
+    "recap_sequence_number",
+]
+RECAP_DOCUMENT_MERGE_FIELDS = [
+    "pacer_doc_id",
+    "description",
+    "document_number",
+]
+
+
+def get_docket_entry_key(
+    docket_entry: dict[str, Any],
+) -> tuple[int, int | None] | None:
+    """Get the entry number and the PACER sequence number of a scraped docket
+    entry, as stored in the DB.
+
+    :param docket_entry: The scraped dict from Juriscraper for the docket
+    entry.
+    :return: A two tuple of the entry number and the PACER sequence number,
+    or None if the entry can't be matched by number.
+    """
+    if not docket_entry["document_number"]:
+        return None
+    pacer_seq_no = docket_entry.get("pacer_seq_no")
+    try:
+        return int(docket_entry["document_number"]), (
+            int(pacer_seq_no) if pacer_seq_no is not None else None
+        )
+    except (TypeError, ValueError):
+        return None
+
+
+@sync_to_async
+def bulk_merge_docket_entries(
+    d: Docket,
+    docket_entries: list[dict[str, Any]],
+    tags: list[Tag] | None,
+    appellate_court_id_exists: bool,
+) -> BulkMergeResult:
+    """Merge the docket entries of a big upload with a few queries.
+
+    The existing entries and documents of the docket are loaded at once and
+    the scraped entries are matched against them in memory, following the
+    same rules as get_or_make_docket_entry and add_docket_entries. New and
+    changed rows are then written with bulk queries, and their documents are
+    indexed in ES in batches.
+
+    Entries whose match isn't clear cut, like unnumbered entries, entries
+    with attachments, or entries that match duplicates, are left for
+    add_docket_entries to merge one at a time.
+
+    :param d: The docket object to add things to.
+    :param docket_entries: A list of dicts containing docket entry data,
+    with their recap_sequence_number already calculated.
+    :param tags: A list of tag objects to apply to the recap documents and
+    docket entries created or updated.
+    :param appellate_court_id_exists: Whether the docket is from an appellate
+    court.
+    :return: A BulkMergeResult.
+    """
+    result = BulkMergeResult()
+    keys = [
+        get_docket_entry_key(docket_entry) for docket_entry in docket_entries
+    ]
+    key_counts = Counter(key[0] for key in keys if key is not None)
+
+    with transaction.atomic():
+        Docket.objects.select_for_update().get(pk=d.pk)
+        des_by_number = defaultdict(list)
+        for de in DocketEntry.objects.filter(docket=d).prefetch_related(
+            "recap_documents"
+        ):
+            des_by_number[de.entry_number].append(de)
+
+        des_to_create, rds_to_create = [], []
+        des_to_update, rds_to_update = [], []
+        rd_ids_to_index = set()
+        for docket_entry, key in zip(docket_entries, keys):
+            if (
+                key is None
+                or key_counts[key[0]] > 1
+                or docket_entry.get("attachment_number")
+                or docket_entry.get("attachments") is not None
+            ):
+                result.remaining_entries.append(docket_entry)
+                continue
+
+            entry_number, pacer_seq_no = key
+            matches = des_by_number[entry_number]
+            if pacer_seq_no is not None:
+                if any(de.pacer_sequence_number is None for de in matches):
+                    # Entries without a sequence number have to be merged.
+                    result.remaining_entries.append(docket_entry)
+                    continue
+                matches = [
+                    de
+                    for de in matches
+                    if de.pacer_sequence_number == pacer_seq_no
+                ]
+            if len(matches) > 1:
+                result.remaining_entries.append(docket_entry)
+                continue
+
+            description = docket_entry.get("short_description")
+            document_number = docket_entry["document_number"] or ""
+            if not matches:
+                de = DocketEntry(docket=d, entry_number=entry_number)
+                update_docket_entry_fields(d, de, docket_entry)
+                rd = RECAPDocument(
+                    docket_entry=de,
+                    document_type=RECAPDocument.PACER_DOCUMENT,
+                    pacer_doc_id=docket_entry["pacer_doc_id"] or "",
+                    document_number=str(document_number),
+                    is_available=False,
+                )
+                if description:
+                    rd.description = description
+                des_to_create.append(de)
+                rds_to_create.append(rd)
+                result.des_returned.append(de)
+                result.filing_dates.append(de.date_filed)
+                continue
+
+            de = matches[0]
+            rds = list(de.recap_documents.all())
+            if appellate_court_id_exists:
+                if any(
+                    rd.document_type == RECAPDocument.ATTACHMENT for rd in rds
+                ):
+                    result.remaining_entries.append(docket_entry)
+                    continue
+                rd_matches = [
+                    rd
+                    for rd in rds
+                    if rd.document_type == RECAPDocument.PACER_DOCUMENT
+                ]
+            else:
+                rd_matches = [
+                    rd
+                    for rd in rds
+                    if rd.pacer_doc_id == docket_entry["pacer_doc_id"]
+                ]
+            if (
+                len(rd_matches) != 1
+                or rd_matches[0].document_type != RECAPDocument.PACER_DOCUMENT
+                or any(
+                    other.attachment_number is None
+                    and other.document_number == str(document_number)
+                    for other in rds
+                    if other.pk != rd_matches[0].pk
+                )
+            ):
+                # Creating the document or clearing duplicates takes the
+                # checks done by RECAPDocument.save.
+                result.remaining_entries.append(docket_entry)
+                continue
+
+            rd = rd_matches[0]
+            de_fields = [getattr(de, f) for f in DOCKET_ENTRY_MERGE_FIELDS]
+            update_docket_entry_fields(d, de, docket_entry)
+            if de_fields != [
+                getattr(de, f) for f in DOCKET_ENTRY_MERGE_FIELDS
+            ]:
+                des_to_update.append(de)
+                rd_ids_to_index.update(rd.pk for rd in rds)
+
+            rd_fields = [getattr(rd, f) for f in RECAP_DOCUMENT_MERGE_FIELDS]
+            rd.pacer_doc_id = (
+                rd.pacer_doc_id or docket_entry["pacer_doc_id"] or ""
+            )
+            if description:
+                rd.description = description
+            rd.document_number = str(document_number)
+            if rd_fields != [
+                getattr(rd, f) for f in RECAP_DOCUMENT_MERGE_FIELDS
+            ]:
+                rds_to_update.append(rd)
+                rd_ids_to_index.add(rd.pk)
+            result.des_returned.append(de)
+            result.rds_updated.append(rd)
+
+        DocketEntry.objects.bulk_create(des_to_create, batch_size=1000)
+        result.rds_created = RECAPDocument.objects.bulk_create(
+            rds_to_create, batch_size=1000
+        )
+        date_modified = now()
+        for obj in des_to_update + rds_to_update:
+            obj.date_modified = date_modified
+        DocketEntry.objects.bulk_update(
+            des_to_update,
+            DOCKET_ENTRY_MERGE_FIELDS + ["date_modified"],
+            batch_size=1000,
+        )
+        RECAPDocument.objects.bulk_update(
+            rds_to_update,
+            RECAP_DOCUMENT_MERGE_FIELDS + ["date_modified"],
+            batch_size=1000,
+        )
+        if tags:
+            for tag in tags:
+                Tag.docket_entries.through.objects.bulk_create(
+                    [
+                        Tag.docket_entries.through(
+                            docketentry_id=de.pk, tag_id=tag.pk
+                        )
+                        for de in result.des_returned
+                    ],
+                    ignore_conflicts=True,
+                )
+                Tag.recap_documents.through.objects.bulk_create(
+                    [
+                        Tag.recap_documents.through(
+                            recapdocument_id=rd.pk, tag_id=tag.pk
+                        )
+                        for rd in result.rds_updated + result.rds_created
+                    ],
+                    ignore_conflicts=True,
+                )
+
+        # Bulk queries skip the save signals, so clear the cached initial
+        # document of the docket and index the documents of the batch here,
+        # once it's committed.
+        if rds_to_create or rds_to_update:
+            invalidate_docket_fields(d.pk)
+            transaction.on_commit(partial(invalidate_docket_fields, d.pk))
+        rd_ids_to_index.update(rd.pk for rd in result.rds_created)
+        if rd_ids_to_index and not settings.ELASTICSEARCH_DISABLED:
+            rd_ids = sorted(rd_ids_to_index)
+            chunk_size = int(settings.ELASTICSEARCH_BULK_BATCH_SIZE)
+            for i in range(0, len(rd_ids), chunk_size):
+                transaction.on_commit(
+                    partial(
+                        index_parent_or_child_docs.delay,
+                        rd_ids[i : i + chunk_size],
+                        SEARCH_TYPES.RECAP,
+                        "child",
+                    )
+                )
+
+    result.content_updated = bool(des_to_create)
+    return result
+
+
 async def add_docket_entries(
     d: Docket,
     docket_entries: list[dict[str, Any]],
@@ -844,6 +1277,25 @@ async def add_docket_entries(
     content_updated = False
     calculate_recap_sequence_numbers(docket_entries, d.court_id)
     known_filing_dates = [d.date_last_filing]
+    appelate_court_id_exists = (
+        await Court.federal_courts.appellate_pacer_courts()
+        .filter(pk=d.court_id)
+        .aexists()
+    )
+    if (
+        not do_not_update_existing
+        and len(docket_entries) >= BULK_MERGE_MIN_ENTRIES
+    ):
+        bulk_result = await bulk_merge_docket_entries(
+            d, docket_entries, tags, appelate_court_id_exists
+        )
+        des_returned.extend(bulk_result.des_returned)
+        rds_updated.extend(bulk_result.rds_updated)
+        rds_created.extend(bulk_result.rds_created)
+        content_updated = bulk_result.content_updated
+        known_filing_dates.extend(bulk_result.filing_dates)
+        docket_entries = bulk_result.remaining_entries
+
     for docket_entry in docket_entries:
         response = await get_or_make_docket_entry(d, docket_entry)
         if response is None:
@@ -851,22 +1303,7 @@ async def add_docket_entries(
         else:
             de, de_created = response[0], response[1]
 
-        de.description = docket_entry["description"] or de.description
-        date_filed, time_filed = localize_date_and_time(
-            d.court_id, docket_entry["date_filed"]
-        )
-        if not time_filed:
-            # If not time data is available, compare if date_filed changed if
-            # so restart time_filed to None, otherwise keep the current time.
-            if de.date_filed != docket_entry["date_filed"]:
-                de.time_filed = None
-        else:
-            de.time_filed = time_filed
-        de.date_filed = date_filed
-        de.pacer_sequence_number = (
-            docket_entry.get("pacer_seq_no") or de.pacer_sequence_number
-        )
-        de.recap_sequence_number = docket_entry["recap_sequence_number"]
+        update_docket_entry_fields(d, de, docket_entry)
         des_returned.append(de)
         if do_not_update_existing and not de_created:
             return (des_returned, rds_updated), rds_created, content_updated
@@ -894,8 +1331,6 @@ async def add_docket_entries(
         else:
             params["document_type"] = RECAPDocument.PACER_DOCUMENT
 
-        appellate_court_ids = Court.federal_courts.appellate_pacer_courts()
-
         # Unlike district and bankr. dockets, where you always have a main
         # RD and can optionally have attachments to the main RD, Appellate
         # docket entries can either they *only* have a main RD (with no
@@ -907,9 +1342,6 @@ async def add_docket_entries(
         # RDs. The check here ensures that if that happens for a particular
         # entry, we avoid creating the main RD a second+ time when we get the
         # docket sheet a second+ time.
-        appelate_court_id_exists = await appellate_court_ids.filter(
-            pk=d.court_id
-        ).aexists()
         if de_created is False and appelate_court_id_exists:
             appellate_rd_att_exists = await de.recap_documents.filter(
                 document_type=RECAPDocument.ATTACHMENT
@@ -53,6 +53,10 @@ from cl.people_db.models import (
     Role,
 )
 from cl.recap.api_serializers import PacerFetchQueueSerializer
+from cl.recap.docket_lookup import (
+    get_docket_lookup_key,
+    get_docket_lookup_stats,
+)
 from cl.recap.factories import (
     AppellateAttachmentFactory,
     AppellateAttachmentPageFactory,
@@ -128,6 +132,7 @@ from cl.search.models import (
     DocketEntry,
     OriginatingCourtInformation,
     RECAPDocument,
+    Tag,
 )
 from cl.tests import fakes
 from cl.tests.cases import SimpleTestCase, TestCase
@@ -2108,6 +2113,139 @@ class RecapMinuteEntriesTest(TestCase):
         expected_item_count = 1
         self.assertEqual(d.docket_entries.count(), expected_item_count)
 
+    @mock.patch("cl.recap.mergers.BULK_MERGE_MIN_ENTRIES", 1)
+    def test_bulk_merge_docket_entries(self) -> None:
+        """Does the bulk merge of big uploads create and update the same
+        entries and documents as the one at a time merge?
+        """
+        date_filed = date(2014, 11, 16)
+        d = Docket.objects.create(source=Docket.RECAP, court_id="scotus")
+        de1 = DocketEntry.objects.create(
+            docket=d, entry_number=1, description="", date_filed=date_filed
+        )
+        rd1 = RECAPDocument.objects.create(
+            docket_entry=de1,
+            document_number="1",
+            pacer_doc_id="1",
+            document_type=RECAPDocument.PACER_DOCUMENT,
+        )
+        tag = Tag.objects.create(name="bulk-merge")
+        docket_entries = [
+            {
+                "date_filed": date_filed,
+                "description": f"Entry {number}",
+                "document_number": number,
+                "pacer_doc_id": number,
+                "pacer_seq_no": None,
+                "short_description": f"Short {number}",
+            }
+            for number in ["1", "2", "3"]
+        ] + [
+            # Unnumbered entries are merged one at a time.
+            {
+                "date_filed": date_filed,
+                "description": "Minute entry",
+                "document_number": None,
+                "pacer_doc_id": "",
+                "pacer_seq_no": None,
+                "short_description": "",
+            }
+        ]
+
+        (des, rds_updated), rds_created, content_updated = async_to_sync(
+            add_docket_entries
+        )(d, deepcopy(docket_entries), tags=[tag])
+        self.assertTrue(content_updated)
+        self.assertEqual(len(des), 4)
+        self.assertEqual([rd.pk for rd in rds_updated], [rd1.pk])
+        self.assertEqual(len(rds_created), 3)
+        self.assertEqual(d.docket_entries.count(), 4)
+        self.assertEqual(
+            RECAPDocument.objects.filter(docket_entry__docket=d).count(), 4
+        )
+        de1.refresh_from_db()
+        rd1.refresh_from_db()
+        self.assertEqual(de1.description, "Entry 1")
+        self.assertEqual(rd1.description, "Short 1")
+        rd3 = RECAPDocument.objects.get(
+            docket_entry__docket=d, pacer_doc_id="3"
+        )
+        self.assertEqual(rd3.document_number, "3")
+        self.assertEqual(rd3.description, "Short 3")
+        self.assertEqual(tag.docket_entries.count(), 4)
+        self.assertEqual(tag.recap_documents.count(), 4)
+
+        # Merging the same entries again doesn't create anything.
+        (des, rds_updated), rds_created, content_updated = async_to_sync(
+            add_docket_entries
+        )(d, deepcopy(docket_entries), tags=[tag])
+        self.assertFalse(content_updated)
+        self.assertEqual(len(des), 4)
+        self.assertEqual(rds_created, [])
+        self.assertEqual(d.docket_entries.count(), 4)
+        self.assertEqual(
+            RECAPDocument.objects.filter(docket_entry__docket=d).count(), 4
+        )
+
+    @mock.patch("cl.recap.mergers.BULK_MERGE_MIN_ENTRIES", 1)
+    def test_bulk_merge_unchanged_entries_with_sequence_numbers(
+        self,
+    ) -> None:
+        """Are entries with the PACER sequence numbers Juriscraper returns
+        as strings left untouched when they're merged again unchanged?
+        """
+        date_filed = date(2014, 11, 16)
+        d = Docket.objects.create(source=Docket.RECAP, court_id="scotus")
+        docket_entries = [
+            {
+                "date_filed": date_filed,
+                "description": f"Entry {number}",
+                "document_number": number,
+                "pacer_doc_id": number,
+                "pacer_seq_no": f"8{number}",
+                "short_description": f"Short {number}",
+            }
+            for number in ["1", "2"]
+        ]
+        with mock.patch(
+            "cl.recap.mergers.invalidate_docket_fields"
+        ) as mock_invalidate:
+            async_to_sync(add_docket_entries)(d, deepcopy(docket_entries))
+        mock_invalidate.assert_called_with(d.pk)
+        self.assertEqual(
+            sorted(
+                d.docket_entries.values_list(
+                    "pacer_sequence_number", flat=True
+                )
+            ),
+            [81, 82],
+        )
+        dates_modified = list(
+            d.docket_entries.order_by("pk").values_list(
+                "date_modified", flat=True
+            )
+        )
+
+        # Merging the same entries again doesn't rewrite them.
+        with mock.patch(
+            "cl.recap.mergers.invalidate_docket_fields"
+        ) as mock_invalidate:
+            (des, rds_updated), rds_created, content_updated = async_to_sync(
+                add_docket_entries
+            )(d, deepcopy(docket_entries))
+        self.assertFalse(content_updated)
+        self.assertEqual(len(des), 2)
+        self.assertEqual(rds_created, [])
+        mock_invalidate.assert_not_called()
+        self.assertEqual(
+            list(
+                d.docket_entries.order_by("pk").values_list(
+                    "date_modified", flat=True
+                )
+            ),
+            dates_modified,
+        )
+
     @mock.patch("cl.recap_rss.tasks.enqueue_docket_alert")
     def test_appellate_rss_feed_ingestion(self, mock_enqueue_de) -> None:
         """Can we ingest Appellate RSS feeds?"""
@@ -2178,6 +2316,67 @@ class RecapMinuteEntriesTest(TestCase):
         self.assertEqual(docket.pacer_case_id, "")
         self.assertEqual(docket.docket_number, "22-2127")
 
+    @mock.patch("cl.recap_rss.tasks.enqueue_docket_alert")
+    def test_merge_rss_feed_skips_cached_items_in_one_query(
+        self, mock_enqueue_de
+    ) -> None:
+        """Are the items already merged from a feed skipped with a single
+        query the next time it's polled?
+        """
+        court_ca10 = CourtFactory(id="ca10", jurisdiction="F")
+        rss_feed = PacerRssFeed(court_ca10.pk)
+        with open(self.make_path("rss_ca10.xml"), "rb") as f:
+            text = f.read().decode()
+        rss_feed._parse_text(text)
+        merge_rss_feed_contents(rss_feed.data, court_ca10.pk)
+        self.assertEqual(Docket.objects.count(), 3)
+
+        with self.assertNumQueries(1):
+            result = merge_rss_feed_contents(rss_feed.data, court_ca10.pk)
+        self.assertEqual(result["rds_for_solr"], [])
+        self.assertEqual(Docket.objects.count(), 3)
+
+    @mock.patch("cl.recap_rss.tasks.enqueue_docket_alert")
+    def test_merge_rss_feed_matches_dockets_by_pacer_case_id(
+        self, mock_enqueue_de
+    ) -> None:
+        """Are the dockets of district feed items matched from the dockets
+        loaded by PACER case ID, falling back to find_docket_object for the
+        items without one?
+        """
+        court_mdb = CourtFactory(id="mdb", jurisdiction="FB")
+        rss_feed = PacerRssFeed(court_mdb.pk)
+        rss_feed.is_bankruptcy = True
+        with open(self.make_path("rss_sample_unnumbered_mdb.xml"), "rb") as f:
+            text = f.read().decode()
+        rss_feed._parse_text(text)
+        matched_item = rss_feed.data[0]
+        new_item = deepcopy(matched_item)
+        new_item["pacer_case_id"] = "711558"
+        new_item["docket_number"] = "18-00080"
+        docket = DocketFactory(
+            court=court_mdb,
+            source=Docket.RECAP,
+            pacer_case_id=matched_item["pacer_case_id"],
+            docket_number=matched_item["docket_number"],
+        )
+
+        with mock.patch(
+            "cl.recap_rss.tasks.find_docket_object",
+            side_effect=find_docket_object,
+        ) as mock_find_docket_object:
+            merge_rss_feed_contents([matched_item, new_item], court_mdb.pk)
+
+        # Only the item without a loaded docket was looked up on its own.
+        mock_find_docket_object.assert_called_once()
+        self.assertEqual(mock_find_docket_object.call_args.args[1], "711558")
+        self.assertEqual(docket.docket_entries.count(), 1)
+        new_docket = Docket.objects.get(
+            court=court_mdb, pacer_case_id="711558"
+        )
+        self.assertEqual(new_docket.docket_entries.count(), 1)
+        self.assertEqual(Docket.objects.filter(court=court_mdb).count(), 2)
+
     @mock.patch("cl.recap_rss.tasks.enqueue_docket_alert")
     def test_retain_existing_values_in_absent_rss_fields(
         self, mock_enqueue_de
@@ -8258,6 +8457,59 @@ class LookupDocketsTest(TestCase):
         # selected instead.
         self.assertEqual(docket_matched.pk, oldest_d_1.pk)
 
+    def test_cached_docket_lookups(self):
+        """Are the dockets matched cached, checked before using them and
+        invalidated when dockets change?
+        """
+        cache_key = get_docket_lookup_key(self.court.pk, "12345", "")
+        r = get_redis_interface("CACHE")
+        r.delete(cache_key)
+        stats = get_docket_lookup_stats(date.today())
+        lookup_args = (
+            self.court.pk,
+            "12345",
+            self.docket_data["docket_number"],
+            None,
+            None,
+            None,
+        )
+
+        d = async_to_sync(find_docket_object)(*lookup_args)
+        self.assertEqual(d.pk, self.docket_case_id.pk)
+        self.assertEqual(r.exists(cache_key), 1)
+
+        # The second lookup only gets the docket by its pk.
+        with self.assertNumQueries(1):
+            d = async_to_sync(find_docket_object)(*lookup_args)
+        self.assertEqual(d.pk, self.docket_case_id.pk)
+
+        new_stats = get_docket_lookup_stats(date.today())
+        self.assertEqual(
+            new_stats["pacer_case_id_and_core"],
+            stats["pacer_case_id_and_core"] + 1,
+        )
+        self.assertEqual(new_stats["cache"], stats["cache"] + 1)
+
+        # A cached docket that no longer matches the lookup is not used, even
+        # if the cache wasn't invalidated.
+        Docket.objects.filter(pk=self.docket_case_id.pk).update(
+            pacer_case_id="99999"
+        )
+        d = async_to_sync(find_docket_object)(*lookup_args)
+        self.assertIsNone(d.pk)
+        self.assertEqual(
+            get_docket_lookup_stats(date.today())["new"], new_stats["new"] + 1
+        )
+
+        # Saving the docket invalidates its cached lookups.
+        async_to_sync(find_docket_object)(
+            self.court.pk, "54321", "4:20-cv-01245", None, None, None
+        )
+        cache_key = get_docket_lookup_key(self.court.pk, "54321", "")
+        self.assertEqual(r.exists(cache_key), 1)
+        self.docket_case_id_2.save()
+        self.assertEqual(r.exists(cache_key), 0)
+
 
 class CleanUpDuplicateAppellateEntries(TestCase):
     """Test clean_up_duplicate_appellate_entries method that finds and clean
@@ -4,8 +4,9 @@ import json
 import logging
 import re
 from calendar import SATURDAY, SUNDAY
+from collections import defaultdict
 from datetime import datetime, timedelta
-from typing import Optional
+from typing import Any, Optional
 
 import requests
 from asgiref.sync import async_to_sync
@@ -22,6 +23,7 @@ from requests import HTTPError
 from cl.alerts.tasks import enqueue_docket_alert
 from cl.celery_init import app
 from cl.lib.crypto import sha256
+from cl.lib.model_helpers import make_docket_number_core
 from cl.lib.pacer import map_cl_to_pacer_id
 from cl.lib.types import EmailType
 from cl.recap.constants import COURT_TIMEZONES
@@ -33,7 +35,7 @@ from cl.recap.mergers import (
 )
 from cl.recap_rss.models import RssFeedData, RssFeedStatus, RssItemCache
 from cl.recap_rss.utils import emails
-from cl.search.models import Court
+from cl.search.models import Court, Docket
 
 logger = logging.getLogger(__name__)
 
@@ -289,6 +291,64 @@ def hash_item(item):
     return item_hash
 
 
+def get_cached_hashes(item_hashes: list[str]) -> set[str]:
+    """Get which of some hashes are in the RSS Item Cache, in one query.
+
+    :param item_hashes: The hashes to check.
+    :return: The hashes that are cached.
+    """
+    return set(
+        RssItemCache.objects.filter(hash__in=item_hashes).values_list(
+            "hash", flat=True
+        )
+    )
+
+
+def get_dockets_by_pacer_case_id(
+    court_pk: str, feed_data: list[dict[str, Any]]
+) -> dict[str, list[Docket]]:
+    """Load the dockets of the items of a feed that have a PACER case ID, in
+    one query.
+
+    :param court_pk: The CourtListener court ID.
+    :param feed_data: The items of the feed.
+    :return: A dict mapping every PACER case ID to its dockets.
+    """
+    pacer_case_ids = {
+        docket["pacer_case_id"]
+        for docket in feed_data
+        if docket["pacer_case_id"]
+    }
+    dockets = defaultdict(list)
+    for d in Docket.objects.filter(
+        court_id=court_pk, pacer_case_id__in=pacer_case_ids
+    ):
+        dockets[d.pacer_case_id].append(d)
+    return dockets
+
+
+def match_feed_docket(
+    dockets: list[Docket], docket_number: str
+) -> Docket | None:
+    """Pick the docket of a feed item among the dockets with its PACER case
+    ID, like the pacer_case_id lookups of find_docket_object do.
+
+    :param dockets: The dockets with the item's PACER case ID.
+    :param docket_number: The docket number of the item.
+    :return: The docket if there's a single match, or None when
+    find_docket_object has to sort it out.
+    """
+    docket_number_core = make_docket_number_core(docket_number)
+    core_matches = [
+        d for d in dockets if d.docket_number_core == docket_number_core
+    ]
+    if len(core_matches) == 1:
+        return core_matches[0]
+    if not core_matches and len(dockets) == 1:
+        return dockets[0]
+    return None
+
+
 async def is_cached(item_hash):
     """Check if a hash is in the RSS Item Cache"""
     return await RssItemCache.objects.filter(hash=item_hash).aexists()
@@ -328,25 +388,38 @@ def merge_rss_feed_contents(self, feed_data, court_pk, metadata_only=False):
     # RSS feeds are a list of normal Juriscraper docket objects.
     all_rds_created = []
     d_pks_to_alert = []
-    for docket in feed_data:
-        item_hash = hash_item(docket)
-        if async_to_sync(is_cached)(item_hash):
-            continue
-
+    # Skip the items seen in previous polls, and look up the dockets of the
+    # rest, with a query each.
+    item_hashes = [hash_item(docket) for docket in feed_data]
+    cached_hashes = get_cached_hashes(item_hashes)
+    new_items = [
+        (docket, item_hash)
+        for docket, item_hash in zip(feed_data, item_hashes)
+        if item_hash not in cached_hashes
+    ]
+    dockets_by_pacer_case_id = get_dockets_by_pacer_case_id(
+        court_pk, [docket for docket, _ in new_items]
+    )
+    for docket, item_hash in new_items:
         with transaction.atomic():
             cached_ok = async_to_sync(cache_hash)(item_hash)
             if not cached_ok:
                 # The item is already in the cache, ergo it's getting processed
                 # in another thread/process and we had a race condition.
                 continue
-            d = async_to_sync(find_docket_object)(
-                court_pk,
-                docket["pacer_case_id"],
+            d = match_feed_docket(
+                dockets_by_pacer_case_id.get(docket["pacer_case_id"], []),
                 docket["docket_number"],
-                docket.get("federal_defendant_number"),
-                docket.get("federal_dn_judge_initials_assigned"),
-                docket.get("federal_dn_judge_initials_referred"),
             )
+            if d is None:
+                d = async_to_sync(find_docket_object)(
+                    court_pk,
+                    docket["pacer_case_id"],
+                    docket["docket_number"],
+                    docket.get("federal_defendant_number"),
+                    docket.get("federal_dn_judge_initials_assigned"),
+                    docket.get("federal_dn_judge_initials_referred"),
+                )
 
             d.add_recap_source()
             async_to_sync(update_docket_metadata)(d, docket)
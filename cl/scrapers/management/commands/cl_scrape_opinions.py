@@ -11,12 +11,12 @@ from django.core.management.base import CommandError
 from django.db import transaction
 from django.utils.encoding import force_bytes
 from eyecite.find import get_citations
-from eyecite.tokenizers import HyperscanTokenizer
 from juriscraper.lib.importer import build_module_list
 from juriscraper.lib.string_utils import CaseNameTweaker
 from sentry_sdk import capture_exception
 
 from cl.alerts.models import RealTimeQueue
+from cl.citations.tokenizers import HYPERSCAN_TOKENIZER
 from cl.citations.utils import map_reporter_db_cite_type
 from cl.lib.command_utils import VerboseCommand, logger
 from cl.lib.crypto import sha1
@@ -46,8 +46,6 @@ from cl.search.models import (
     OpinionCluster,
 )
 
-HYPERSCAN_TOKENIZER = HyperscanTokenizer(cache_dir=".hyperscan")
-
 # for use in catching the SIGINT (Ctrl+4)
 die_now = False
 cnt = CaseNameTweaker()
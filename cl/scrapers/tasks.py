@@ -22,7 +22,7 @@ from cl.citations.tasks import (
 from cl.custom_filters.templatetags.text_filters import best_case_name
 from cl.lib.celery_utils import throttle_task
 from cl.lib.juriscraper_utils import get_scraper_object_by_name
-from cl.lib.microservice_utils import microservice
+from cl.lib.microservice_utils import microservice, microservice_batch
 from cl.lib.pacer import map_cl_to_pacer_id
 from cl.lib.pacer_session import ProxyPacerSession, get_or_cache_pacer_cookies
 from cl.lib.privacy_tools import anonymize, set_blocked_status
@@ -280,6 +280,7 @@ async def extract_recap_pdf_base(
         pks = [pks]
 
     processed: List[int] = []
+    rds = []
     for pk in pks:
         rd = await RECAPDocument.objects.aget(pk=pk)
         if check_if_needed and not rd.needs_extraction:
@@ -287,27 +288,52 @@ async def extract_recap_pdf_base(
             # hasn't disabled early abortion.
             processed.append(pk)
             continue
+        rds.append(rd)
 
-        response = await microservice(
-            service="document-extract",
-            item=rd,
-        )
+    # The documents are sent to doctor over pooled connections, up to
+    # RECAP_EXTRACTION_CONCURRENCY at a time.
+    errors: List[BaseException] = []
+    extractions: List[tuple[RECAPDocument, str, bool, bool]] = []
+    responses = await microservice_batch(
+        service="document-extract",
+        items=rds,
+        max_concurrency=settings.RECAP_EXTRACTION_CONCURRENCY,
+    )
+    for rd, response in zip(rds, responses):
+        if isinstance(response, BaseException):
+            errors.append(response)
+            continue
         if not response.is_success:
             continue
-
         content = response.json()["content"]
         extracted_by_ocr = response.json()["extracted_by_ocr"]
-        ocr_needed = needs_ocr(content)
-        if ocr_available and ocr_needed:
-            response = await microservice(
-                service="document-extract-ocr",
-                item=rd,
-                params={"ocr_available": ocr_available},
-            )
-            if response.is_success:
-                content = response.json()["content"]
-                extracted_by_ocr = True
+        extractions.append((rd, content, extracted_by_ocr, needs_ocr(content)))
 
+    if ocr_available:
+        ocr_indexes = [
+            i
+            for i, (_, _, _, ocr_needed) in enumerate(extractions)
+            if ocr_needed
+        ]
+        ocr_responses = await microservice_batch(
+            service="document-extract-ocr",
+            items=[extractions[i][0] for i in ocr_indexes],
+            max_concurrency=settings.RECAP_EXTRACTION_CONCURRENCY,
+            params={"ocr_available": ocr_available},
+        )
+        for i, response in zip(ocr_indexes, ocr_responses):
+            if isinstance(response, BaseException):
+                errors.append(response)
+            elif response.is_success:
+                rd, _, _, ocr_needed = extractions[i]
+                extractions[i] = (
+                    rd,
+                    response.json()["content"],
+                    True,
+                    ocr_needed,
+                )
+
+    for rd, content, extracted_by_ocr, ocr_needed in extractions:
         has_content = bool(content)
         match has_content, extracted_by_ocr:
             case True, True:
@@ -327,8 +353,12 @@ async def extract_recap_pdf_base(
             do_extraction=False,
             update_fields=["ocr_status", "plain_text"],
         )
-        processed.append(pk)
+        processed.append(rd.pk)
 
+    if errors:
+        # Raise the first failed request once the others are saved, so the
+        # task can be retried.
+        raise errors[0]
     return processed
 
 
@@ -1,10 +1,15 @@
+import csv
+import json
 import logging
 from collections import defaultdict
+from contextlib import contextmanager
+from typing import Any, Iterator
 
 import waffle
 from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
 from elasticsearch.exceptions import ApiError, RequestError, TransportError
-from elasticsearch_dsl import MultiSearch, Q
+from elasticsearch_dsl import MultiSearch, Q, connections
 from elasticsearch_dsl.response import Response
 from elasticsearch_dsl.utils import AttrList
 from rest_framework.exceptions import ParseError
@@ -495,6 +500,164 @@ class CursorESList:
         return default_sorting, unique_sorting
 
 
+class ESExportList(CursorESList):
+    """Walks all the results of a search in batches, for the search export
+    API. Batches are read from a point in time with search_after, so the
+    results don't shift while they're streamed, and no count queries are
+    run, since the client reads until the results are exhausted.
+    """
+
+    def __init__(self, main_query, child_docs_query, clean_data):
+        super().__init__(
+            main_query,
+            child_docs_query,
+            settings.SEARCH_EXPORT_BATCH_SIZE,
+            None,
+            clean_data,
+        )
+        self.client = connections.get_connection()
+        self.keep_alive = settings.SEARCH_EXPORT_PIT_KEEP_ALIVE
+        self.pit_id: str | None = None
+
+    @staticmethod
+    @contextmanager
+    def handle_es_errors() -> Iterator[None]:
+        """Raise the same API errors as get_paginated_results for the errors
+        of ES requests.
+        """
+        try:
+            yield
+        except (TransportError, ConnectionError, RequestError):
+            raise ElasticServerError()
+        except ApiError as e:
+            if "Failed to parse query" in str(e):
+                raise ElasticBadRequestError()
+            else:
+                logger.error("Search export API Error: %s", e)
+                raise ElasticServerError()
+
+    def fetch_batch(self) -> None:
+        """Execute the query for the next batch over the point in time.
+
+        :return: None, the batch is stored in self.results.
+        """
+        # Queries over a point in time can't target an index.
+        query = (
+            self.main_query.index()
+            .extra(
+                pit={"id": self.pit_id, "keep_alive": self.keep_alive},
+                track_total_hits=False,
+            )
+            .sort(*self.get_api_query_sorting())[: self.page_size]
+        )
+        if self.search_after:
+            query = query.extra(search_after=self.search_after)
+        with self.handle_es_errors():
+            self.results = query.execute()
+
+    def open(self) -> None:
+        """Open the point in time and fetch the first batch, so errors in the
+        query are raised before the export starts streaming.
+
+        :return: None
+        """
+        search_document = self.cardinality_base_document[
+            self.clean_data["type"]
+        ]
+        with self.handle_es_errors():
+            self.pit_id = self.client.open_point_in_time(
+                index=search_document._index._name, keep_alive=self.keep_alive
+            )["id"]
+        try:
+            self.fetch_batch()
+        except Exception:
+            self.close()
+            raise
+
+    def close(self) -> None:
+        """Close the point in time, if it's open.
+
+        :return: None
+        """
+        if self.pit_id is None:
+            return
+        try:
+            self.client.close_point_in_time(id=self.pit_id)
+        except (TransportError, ConnectionError, ApiError) as e:
+            # The PIT expires by itself after keep_alive.
+            logger.warning("Error closing search export PIT: %s", e)
+        self.pit_id = None
+
+    def iter_batches(self) -> Iterator[list[defaultdict]]:
+        """Execute the query in batches over a point in time. The point in
+        time is opened first if open() wasn't called, and closed once the
+        results are exhausted.
+
+        :return: A generator of lists of defaultdicts with the results.
+        """
+        if self.pit_id is None:
+            self.open()
+        try:
+            while self.results:
+                # The PIT ID can change between requests.
+                self.pit_id = self.results.pit_id
+                self.search_after = self.results.hits[-1].meta.sort
+                self.process_results(self.results)
+                yield [
+                    defaultdict(lambda: None, result.to_dict(skip_empty=False))
+                    for result in self.results
+                ]
+                if len(self.results) < self.page_size:
+                    break
+                self.fetch_batch()
+        finally:
+            self.close()
+
+
+class EchoBuffer:
+    """A file-like object that returns what's written to it, so csv.writer
+    rows can be streamed.
+    """
+
+    def write(self, value: str) -> str:
+        return value
+
+
+def serialize_export_value(value: Any) -> Any:
+    """Serialize the nested values of a row, like child documents, to JSON,
+    so they fit in a CSV cell.
+    """
+    if isinstance(value, (dict, list)):
+        return json.dumps(value, cls=DjangoJSONEncoder)
+    return value
+
+
+def stream_export_rows(
+    batches: Iterator[list[dict]], export_format: str
+) -> Iterator[str]:
+    """Format batches of serialized results as CSV or JSON lines.
+
+    :param batches: A generator of lists of serialized results.
+    :param export_format: "csv" or "jsonl".
+    :return: A generator of lines of text. The CSV columns are the fields of
+    the first result.
+    """
+    writer = None
+    for batch in batches:
+        for row in batch:
+            if export_format == "jsonl":
+                yield json.dumps(row, cls=DjangoJSONEncoder) + "\n"
+                continue
+            if writer is None:
+                writer = csv.DictWriter(
+                    EchoBuffer(), fieldnames=list(row), extrasaction="ignore"
+                )
+                yield writer.writeheader()
+            yield writer.writerow(
+                {k: serialize_export_value(v) for k, v in row.items()}
+            )
+
+
 class ResultObject:
     def __init__(self, initial=None):
         self.__dict__["_data"] = initial or {}
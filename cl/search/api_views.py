@@ -1,12 +1,22 @@
+import datetime
+from contextlib import closing
 from http import HTTPStatus
 
 import waffle
+from django.http import StreamingHttpResponse
 from rest_framework import pagination, permissions, response, viewsets
+from rest_framework.decorators import action
 from rest_framework.exceptions import NotFound
 from rest_framework.pagination import PageNumberPagination
 
 from cl.api.pagination import ESCursorPagination
-from cl.api.utils import CacheListMixin, LoggingMixin, RECAPUsersReadOnly
+from cl.api.utils import (
+    CacheListMixin,
+    ExceptionalUserRateThrottle,
+    ExportRowRateThrottle,
+    LoggingMixin,
+    RECAPUsersReadOnly,
+)
 from cl.lib.elasticsearch_utils import do_es_api_query
 from cl.search import api_utils
 from cl.search.api_serializers import (
@@ -308,6 +318,11 @@ class SearchV4ViewSet(LoggingMixin, viewsets.ViewSet):
     # but folks will need to log in to get past the thresholds.
     permission_classes = (permissions.AllowAny,)
 
+    export_content_types = {
+        "csv": "text/csv",
+        "jsonl": "application/jsonl",
+    }
+
     supported_search_types = {
         SEARCH_TYPES.RECAP: {
             "document_class": DocketDocument,
@@ -386,3 +401,79 @@ class SearchV4ViewSet(LoggingMixin, viewsets.ViewSet):
         return response.Response(
             search_form.errors, status=HTTPStatus.BAD_REQUEST
         )
+
+    @action(
+        detail=False,
+        methods=["get"],
+        permission_classes=[permissions.IsAuthenticated],
+        throttle_classes=[ExceptionalUserRateThrottle, ExportRowRateThrottle],
+    )
+    def export(self, request, *args, **kwargs):
+        """Stream all the results of a search as CSV or JSON lines.
+
+        Takes the same parameters as the search API, plus export_format,
+        "csv" or "jsonl". Results are read from ES in batches over a point in
+        time instead of in cursor pages, and the export is throttled by the
+        number of rows streamed, see ExportRowRateThrottle.
+        """
+        export_format = request.GET.get("export_format", "jsonl")
+        if export_format not in self.export_content_types:
+            return response.Response(
+                {"export_format": ["Select either csv or jsonl."]},
+                status=HTTPStatus.BAD_REQUEST,
+            )
+        search_form = SearchForm(request.GET, is_es_form=True)
+        if not search_form.is_valid():
+            return response.Response(
+                search_form.errors, status=HTTPStatus.BAD_REQUEST
+            )
+        cd = search_form.cleaned_data
+        supported_search_type = self.supported_search_types.get(cd["type"])
+        if not supported_search_type:
+            raise NotFound(detail="Search type not found or not supported.")
+
+        cd["request_date"] = datetime.date.today()
+        main_query, child_docs_query = do_es_api_query(
+            supported_search_type["document_class"].search(),
+            cd,
+            {},
+            SEARCH_HL_TAG,
+            request.version,
+        )
+        es_list_instance = api_utils.ESExportList(
+            main_query, child_docs_query, cd
+        )
+        # Run the first query before streaming, so errors get a proper status
+        # code instead of a truncated body.
+        es_list_instance.open()
+        serializer_class = supported_search_type["serializer_class"]
+        throttle = getattr(self, "export_throttle", None)
+
+        def serialize_batches():
+            with closing(es_list_instance.iter_batches()) as batches:
+                while True:
+                    # Reserve the rows of the batch before fetching it, so
+                    # concurrent exports of the user share the rows left.
+                    reserved, reservation = es_list_instance.page_size, ""
+                    if throttle:
+                        reserved, reservation = throttle.reserve_rows(
+                            es_list_instance.page_size
+                        )
+                        if not reserved:
+                            break
+                    batch = next(batches, [])[:reserved]
+                    if throttle:
+                        throttle.release_rows(reservation, len(batch))
+                    if not batch:
+                        break
+                    yield serializer_class(batch, many=True).data
+
+        return StreamingHttpResponse(
+            api_utils.stream_export_rows(serialize_batches(), export_format),
+            content_type=self.export_content_types[export_format],
+            headers={
+                "Content-Disposition": (
+                    f'attachment; filename="search.{export_format}"'
+                )
+            },
+        )
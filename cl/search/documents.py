@@ -1,5 +1,6 @@
 from datetime import datetime
 
+from django.db.models import Prefetch
 from django.http import QueryDict
 from django.utils.html import escape, strip_tags
 from django_elasticsearch_dsl import Document, fields
@@ -32,7 +33,6 @@ from cl.search.es_indices import (
 )
 from cl.search.forms import SearchForm
 from cl.search.models import (
-    BankruptcyInformation,
     Citation,
     Docket,
     Opinion,
@@ -96,6 +96,15 @@ class ParentheticalGroupDocument(Document):
         fields = ["score"]
         ignore_signals = True
 
+    index_select_related = [
+        "opinion__cluster__docket__court",
+        "representative__describing_opinion__cluster",
+    ]
+    index_prefetch_related = [
+        "opinion__cluster__citations",
+        "opinion__cluster__panel",
+    ]
+
     def prepare_citation(self, instance):
         return [str(cite) for cite in instance.opinion.cluster.citations.all()]
 
@@ -105,29 +114,17 @@ class ParentheticalGroupDocument(Document):
         )
 
     def prepare_lexisCite(self, instance):
-        try:
-            return str(
-                instance.opinion.cluster.citations.filter(type=Citation.LEXIS)[
-                    0
-                ]
-            )
-        except IndexError:
-            pass
+        for citation in instance.opinion.cluster.citations.all():
+            if citation.type == Citation.LEXIS:
+                return str(citation)
 
     def prepare_neutralCite(self, instance):
-        try:
-            return str(
-                instance.opinion.cluster.citations.filter(
-                    type=Citation.NEUTRAL
-                )[0]
-            )
-        except IndexError:
-            pass
+        for citation in instance.opinion.cluster.citations.all():
+            if citation.type == Citation.NEUTRAL:
+                return str(citation)
 
     def prepare_panel_ids(self, instance):
-        return list(
-            instance.opinion.cluster.panel.all().values_list("id", flat=True)
-        )
+        return [judge.pk for judge in instance.opinion.cluster.panel.all()]
 
     def prepare_status(self, instance):
         return instance.opinion.cluster.precedential_status
@@ -280,6 +277,9 @@ class AudioDocument(AudioDocumentBase):
         model = Audio
         ignore_signals = True
 
+    index_select_related = ["docket__court"]
+    index_prefetch_related = ["panel"]
+
     def prepare_absolute_url(self, instance):
         return instance.get_absolute_url()
 
@@ -287,7 +287,7 @@ class AudioDocument(AudioDocumentBase):
         return best_case_name(instance)
 
     def prepare_panel_ids(self, instance):
-        return list(instance.panel.all().values_list("id", flat=True))
+        return [judge.pk for judge in instance.panel.all()]
 
     def prepare_file_size_mp3(self, instance):
         if instance.local_path_mp3:
@@ -501,6 +501,14 @@ class PersonBaseDocument(Document):
         model = Person
         ignore_signals = True
 
+    index_prefetch_related = [
+        "political_affiliations",
+        "aliases",
+        "aba_ratings",
+        "educations__school",
+        "race",
+    ]
+
     def prepare_timestamp(self, instance):
         return datetime.utcnow()
 
@@ -684,6 +692,21 @@ class PositionDocument(PersonBaseDocument):
         model = Position
         ignore_signals = True
 
+    index_select_related = [
+        "person",
+        "court",
+        "appointer__person",
+        "supervisor",
+        "predecessor",
+    ]
+    index_prefetch_related = [
+        "person__political_affiliations",
+        "person__aliases",
+        "person__aba_ratings",
+        "person__educations__school",
+        "person__race",
+    ]
+
     def prepare_position_type(self, instance):
         return instance.get_position_type_display()
 
@@ -956,6 +979,13 @@ class DocketBaseDocument(Document):
         model = Docket
         ignore_signals = True
 
+    index_select_related = [
+        "court",
+        "assigned_to",
+        "referred_to",
+        "bankruptcy_information",
+    ]
+
     def prepare_timestamp(self, instance):
         return datetime.utcnow()
 
@@ -1033,6 +1063,14 @@ class ESRECAPDocument(DocketBaseDocument):
         model = RECAPDocument
         ignore_signals = True
 
+    index_select_related = [
+        "docket_entry__docket__court",
+        "docket_entry__docket__assigned_to",
+        "docket_entry__docket__referred_to",
+        "docket_entry__docket__bankruptcy_information",
+    ]
+    index_prefetch_related = ["cited_opinions"]
+
     def prepare_document_number(self, instance):
         return instance.document_number or None
 
@@ -1126,11 +1164,9 @@ class ESRECAPDocument(DocketBaseDocument):
         return escape(instance.plain_text.translate(null_map))
 
     def prepare_cites(self, instance):
-        return list(
-            instance.cited_opinions.all().values_list(
-                "cited_opinion_id", flat=True
-            )
-        )
+        return [
+            cited.cited_opinion_id for cited in instance.cited_opinions.all()
+        ]
 
     def prepare_pacer_case_id(self, instance):
         return instance.docket_entry.docket.pacer_case_id
@@ -1202,11 +1238,11 @@ class DocketDocument(DocketBaseDocument):
             return instance.referred_to_str
 
     def prepare_chapter(self, instance):
-        if BankruptcyInformation.objects.filter(docket=instance).exists():
+        if hasattr(instance, "bankruptcy_information"):
             return instance.bankruptcy_information.chapter
 
     def prepare_trustee_str(self, instance):
-        if BankruptcyInformation.objects.filter(docket=instance).exists():
+        if hasattr(instance, "bankruptcy_information"):
             return instance.bankruptcy_information.trustee_str
 
     def prepare_docket_child(self, instance):
@@ -1469,6 +1505,13 @@ class OpinionBaseDocument(Document):
         model = OpinionCluster
         ignore_signals = True
 
+    index_select_related = ["docket__court"]
+    index_prefetch_related = [
+        "panel",
+        "citations",
+        Prefetch("sub_opinions", queryset=Opinion.objects.only("cluster_id")),
+    ]
+
     def prepare_absolute_url(self, instance):
         return instance.get_absolute_url()
 
@@ -1518,10 +1561,10 @@ class OpinionBaseDocument(Document):
         return instance.syllabus
 
     def prepare_sibling_ids(self, instance):
-        return list(instance.sub_opinions.all().values_list("id", flat=True))
+        return [opinion.pk for opinion in instance.sub_opinions.all()]
 
     def prepare_panel_ids(self, instance):
-        return list(instance.panel.all().values_list("id", flat=True))
+        return [judge.pk for judge in instance.panel.all()]
 
     def prepare_dateFiled(self, instance):
         if instance.date_filed is None:
@@ -1572,15 +1615,15 @@ class OpinionBaseDocument(Document):
         return instance.docket.date_reargument_denied
 
     def prepare_neutralCite(self, instance):
-        neutral_citations = instance.citations.filter(type=Citation.NEUTRAL)
-        if neutral_citations.count():
-            return str(neutral_citations[0])
+        for citation in instance.citations.all():
+            if citation.type == Citation.NEUTRAL:
+                return str(citation)
         return ""
 
     def prepare_lexisCite(self, instance):
-        lexis_citations = instance.citations.filter(type=Citation.LEXIS)
-        if lexis_citations.count():
-            return str(lexis_citations[0])
+        for citation in instance.citations.all():
+            if citation.type == Citation.LEXIS:
+                return str(citation)
         return ""
 
     def prepare_timestamp(self, instance):
@@ -1625,6 +1668,18 @@ class OpinionDocument(OpinionBaseDocument):
         model = Opinion
         ignore_signals = True
 
+    index_select_related = ["cluster__docket__court", "author"]
+    index_prefetch_related = [
+        "joined_by",
+        "cited_opinions",
+        "cluster__panel",
+        "cluster__citations",
+        Prefetch(
+            "cluster__sub_opinions",
+            queryset=Opinion.objects.only("cluster_id"),
+        ),
+    ]
+
     def prepare_absolute_url(self, instance):
         return instance.cluster.get_absolute_url()
 
@@ -1642,14 +1697,12 @@ class OpinionDocument(OpinionBaseDocument):
             return instance.local_path.name
 
     def prepare_cites(self, instance):
-        return list(
-            instance.cited_opinions.all().values_list(
-                "cited_opinion_id", flat=True
-            )
-        )
+        return [
+            cited.cited_opinion_id for cited in instance.cited_opinions.all()
+        ]
 
     def prepare_joined_by_ids(self, instance):
-        return list(instance.joined_by.all().values_list("id", flat=True))
+        return [judge.pk for judge in instance.joined_by.all()]
 
     def prepare_text(self, instance):
         if instance.html_columbia:
@@ -1683,12 +1736,10 @@ class OpinionDocument(OpinionBaseDocument):
         return instance.cluster.scdb_id
 
     def prepare_sibling_ids(self, instance):
-        return list(
-            instance.cluster.sub_opinions.all().values_list("id", flat=True)
-        )
+        return [opinion.pk for opinion in instance.cluster.sub_opinions.all()]
 
     def prepare_panel_ids(self, instance):
-        return list(instance.cluster.panel.all().values_list("id", flat=True))
+        return [judge.pk for judge in instance.cluster.panel.all()]
 
     def prepare_dateFiled(self, instance):
         if instance.cluster.date_filed is None:
@@ -1739,19 +1790,15 @@ class OpinionDocument(OpinionBaseDocument):
         return instance.cluster.docket.date_reargument_denied
 
     def prepare_neutralCite(self, instance):
-        neutral_citations = instance.cluster.citations.filter(
-            type=Citation.NEUTRAL
-        )
-        if neutral_citations.count():
-            return str(neutral_citations[0])
+        for citation in instance.cluster.citations.all():
+            if citation.type == Citation.NEUTRAL:
+                return str(citation)
         return ""
 
     def prepare_lexisCite(self, instance):
-        lexis_citations = instance.cluster.citations.filter(
-            type=Citation.LEXIS
-        )
-        if lexis_citations.count():
-            return str(lexis_citations[0])
+        for citation in instance.cluster.citations.all():
+            if citation.type == Citation.LEXIS:
+                return str(citation)
         return ""
 
     def prepare_citeCount(self, instance):
@@ -1825,12 +1872,13 @@ class OpinionClusterDocument(OpinionBaseDocument):
         search_analyzer="search_analyzer",
     )
 
+    index_prefetch_related = [
+        *OpinionBaseDocument.index_prefetch_related,
+        "non_participating_judges",
+    ]
+
     def prepare_non_participating_judge_ids(self, instance):
-        return list(
-            instance.non_participating_judges.all().values_list(
-                "id", flat=True
-            )
-        )
+        return [judge.pk for judge in instance.non_participating_judges.all()]
 
     def prepare_cluster_child(self, instance):
         return "opinion_cluster"
@@ -1,32 +1,205 @@
 import os
+from itertools import batched, islice
+from pathlib import Path
 
-import igraph
+import numpy as np
 from django.conf import settings
+from scipy import sparse
 
-from cl.lib.command_utils import VerboseCommand
+from cl.citations.utils import PAGERANK_DIRTY_OPINIONS_KEY
+from cl.lib.command_utils import VerboseCommand, logger
+from cl.lib.redis_utils import get_redis_interface
 from cl.lib.solr_core_admin import get_data_dir
 from cl.search.models import Opinion, OpinionsCited
 
+DAMPING_FACTOR = 0.85
+EDGES_CHUNK_SIZE = 1_000_000
+DIRTY_OPINIONS_CHUNK_SIZE = 10_000
+PROCESSING_DIRTY_OPINIONS_KEY = f"{PAGERANK_DIRTY_OPINIONS_KEY}:processing"
+PAGERANK_STATE_FILE = "pagerank_state.npz"
 
-def make_and_populate_nx_graph() -> igraph.Graph:
-    """Create a new igraph object and populate it.
 
-    This pulls all of the inter-opinion citations into memory then passes all of
-    them to igraph as a directed graph.
+def load_citation_edges(
+    chunk_size: int = EDGES_CHUNK_SIZE,
+) -> tuple[np.ndarray, np.ndarray]:
+    """Stream all the inter-opinion citations into two int32 numpy arrays.
+
+    Rows are read with a server-side cursor and packed into numpy arrays one
+    chunk at a time, so we never hold a Python tuple per edge in memory.
+
+    :param chunk_size: The number of edges to read from the DB at a time.
+    :return: A two tuple of arrays, the citing and the cited opinion ids.
     """
-    g = igraph.Graph(
-        directed=True,
-        edges=list(
-            OpinionsCited.objects.values_list(
-                "citing_opinion", "cited_opinion"
-            )
-        ),
+    edges = OpinionsCited.objects.values_list(
+        "citing_opinion_id", "cited_opinion_id"
+    ).iterator(chunk_size=chunk_size)
+    citing_chunks, cited_chunks = [], []
+    while True:
+        chunk = np.fromiter(
+            islice(edges, chunk_size), dtype=np.dtype((np.int32, 2))
+        )
+        if not len(chunk):
+            break
+        citing_chunks.append(chunk[:, 0])
+        cited_chunks.append(chunk[:, 1])
+    if not citing_chunks:
+        empty = np.array([], dtype=np.int32)
+        return empty, empty.copy()
+    return np.concatenate(citing_chunks), np.concatenate(cited_chunks)
+
+
+def take_dirty_citing_opinions() -> set[int]:
+    """Take the ids of the opinions whose citations changed since the last
+    run.
+
+    The ids are moved to a processing set, so opinions flagged while this
+    run is in progress are kept for the next one. The processing set is only
+    cleared once the run saves its state, so a crashed run doesn't lose them.
+
+    :return: A set of citing opinion ids.
+    """
+    r = get_redis_interface("CACHE")
+    pipe = r.pipeline()
+    pipe.sunionstore(
+        PROCESSING_DIRTY_OPINIONS_KEY,
+        [PROCESSING_DIRTY_OPINIONS_KEY, PAGERANK_DIRTY_OPINIONS_KEY],
     )
-    return g
+    pipe.delete(PAGERANK_DIRTY_OPINIONS_KEY)
+    pipe.smembers(PROCESSING_DIRTY_OPINIONS_KEY)
+    return {int(pk) for pk in pipe.execute()[-1]}
+
 
+def load_changed_citation_edges(
+    citing: np.ndarray, cited: np.ndarray, dirty_opinion_ids: set[int]
+) -> tuple[np.ndarray, np.ndarray]:
+    """Apply the citations of the dirty opinions to an edges snapshot.
+
+    The snapshot edges of every dirty opinion are dropped and replaced with
+    their current edges from the DB.
+
+    :param citing: The citing opinion ids of the snapshot edges.
+    :param cited: The cited opinion ids of the snapshot edges.
+    :param dirty_opinion_ids: The ids of the opinions whose citations
+    changed since the snapshot was taken.
+    :return: A two tuple of arrays, the citing and the cited opinion ids.
+    """
+    dirty = np.fromiter(dirty_opinion_ids, dtype=np.int32)
+    keep = ~np.isin(citing, dirty)
+    citing_chunks, cited_chunks = [citing[keep]], [cited[keep]]
+    for pks in batched(sorted(dirty_opinion_ids), DIRTY_OPINIONS_CHUNK_SIZE):
+        edges = np.array(
+            OpinionsCited.objects.filter(citing_opinion_id__in=pks)
+            .values_list("citing_opinion_id", "cited_opinion_id")
+            .order_by(),
+            dtype=np.int32,
+        ).reshape(-1, 2)
+        citing_chunks.append(edges[:, 0])
+        cited_chunks.append(edges[:, 1])
+    return np.concatenate(citing_chunks), np.concatenate(cited_chunks)
 
-def make_sorted_pr_file(pr_results, result_file_path):
-    """Convert the pagerank results list into something Solr can use.
+
+def load_pagerank_state(
+    state_dir: Path,
+) -> tuple[np.ndarray, np.ndarray, np.ndarray] | None:
+    """Load the scores and citation edges saved by the last run.
+
+    :param state_dir: The directory where the state is stored.
+    :return: A three tuple of arrays, the scores, the citing and the cited
+    opinion ids, or None if there's no saved state.
+    """
+    try:
+        with np.load(state_dir / PAGERANK_STATE_FILE) as state:
+            return state["scores"], state["citing"], state["cited"]
+    except FileNotFoundError:
+        return None
+
+
+def save_pagerank_state(
+    state_dir: Path, scores: np.ndarray, citing: np.ndarray, cited: np.ndarray
+) -> None:
+    """Atomically save the scores and the citation edges for the next
+    incremental run, and clear the dirty opinions that were applied to them.
+
+    :param state_dir: The directory where the state is stored.
+    :param scores: The PageRank scores.
+    :param citing: The citing opinion ids of every edge.
+    :param cited: The cited opinion ids of every edge.
+    :return: None
+    """
+    state_dir.mkdir(parents=True, exist_ok=True)
+    state_path = state_dir / PAGERANK_STATE_FILE
+    tmp_path = state_path.with_suffix(".tmp")
+    with open(tmp_path, "wb") as f:
+        np.savez(f, scores=scores, citing=citing, cited=cited)
+    os.replace(tmp_path, state_path)
+    get_redis_interface("CACHE").delete(PROCESSING_DIRTY_OPINIONS_KEY)
+
+
+def make_transition_matrix(
+    citing: np.ndarray, cited: np.ndarray, num_nodes: int
+) -> tuple[sparse.csr_matrix, np.ndarray]:
+    """Build the column-stochastic transition matrix of the citation graph.
+
+    Entry [cited, citing] holds the probability of following a citation from
+    the citing opinion to the cited one, i.e. 1 / out degree of the citing
+    opinion.
+
+    :param citing: The citing opinion ids of every edge.
+    :param cited: The cited opinion ids of every edge.
+    :param num_nodes: The number of nodes in the graph. Node ids go from 0 to
+    num_nodes - 1.
+    :return: A two tuple, the CSR transition matrix and a boolean array
+    flagging the dangling nodes, the ones without outgoing citations.
+    """
+    out_degree = np.bincount(citing, minlength=num_nodes)
+    weights = 1.0 / out_degree[citing]
+    matrix = sparse.csr_matrix(
+        (weights, (cited, citing)), shape=(num_nodes, num_nodes)
+    )
+    return matrix, out_degree == 0
+
+
+def compute_pagerank(
+    matrix: sparse.csr_matrix,
+    dangling: np.ndarray,
+    damping: float = DAMPING_FACTOR,
+    tol: float = 1e-10,
+    max_iter: int = 200,
+    initial_scores: np.ndarray | None = None,
+) -> tuple[np.ndarray, int]:
+    """Run the PageRank power iteration.
+
+    Dangling nodes spread their score uniformly over every node, like
+    igraph's PRPACK implementation does.
+
+    :param matrix: The column-stochastic transition matrix.
+    :param dangling: A boolean array flagging the dangling nodes.
+    :param damping: The damping factor.
+    :param tol: Stop once the L1 change between iterations is below this.
+    :param max_iter: The maximum number of iterations to run.
+    :param initial_scores: The scores to start iterating from. Defaults to
+    the uniform distribution.
+    :return: A two tuple, the scores array and the number of iterations run.
+    """
+    num_nodes = matrix.shape[0]
+    if initial_scores is None:
+        scores = np.full(num_nodes, 1.0 / num_nodes)
+    else:
+        scores = initial_scores / initial_scores.sum()
+    teleport = (1.0 - damping) / num_nodes
+    iterations = 0
+    for iterations in range(1, max_iter + 1):
+        dangling_share = damping * scores[dangling].sum() / num_nodes
+        new_scores = damping * (matrix @ scores) + teleport + dangling_share
+        change = np.abs(new_scores - scores).sum()
+        scores = new_scores
+        if change < tol:
+            break
+    return scores, iterations
+
+
+def make_sorted_pr_file(pr_results: np.ndarray, result_file_path: str) -> None:
+    """Convert the pagerank results array into something Solr can use.
 
     Solr uses a file of the form:
 
@@ -34,46 +207,110 @@ def make_sorted_pr_file(pr_results, result_file_path):
         2=0.214810626172
         3=0.397399661529
 
-    The IDs must be sorted for performance, and every ID should be listed. This
-    function takes the pagerank results and converts them into a file like this,
-    using the os's `sort` executable for fastest sorting.
+    The IDs must be sorted for performance, and every ID should be listed.
+    Opinion ids are streamed from the DB in ascending order, so the file is
+    written already sorted.
     """
-    temp_extension = ".tmp"
-    min_value = min(pr_results)
-    with open(result_file_path + temp_extension, "w") as f:
-        # pr_results has a score for every value between 0 and our highest
-        # opinion id that has citations. Write a file that only contains values
-        # matching valid Opinions.
-        for pk in Opinion.objects.values_list("pk", flat=True):
-            try:
-                score = pr_results[pk]
-            except IndexError:
-                # Happens because some items don't have citations, thus aren't
-                # in network.
-                score = min_value
+    min_value = pr_results.min()
+    num_scores = len(pr_results)
+    opinion_pks = (
+        Opinion.objects.order_by("pk")
+        .values_list("pk", flat=True)
+        .iterator(chunk_size=EDGES_CHUNK_SIZE)
+    )
+    with open(result_file_path, "w") as f:
+        for pk in opinion_pks:
+            # Some items don't have citations, thus aren't in the network.
+            score = pr_results[pk] if pk < num_scores else min_value
             f.write(f"{pk}={score}\n")
 
-    # For improved Solr performance, sort the temp file, creating a new file
-    # without the temp_extension value.
-    os.system(
-        f"sort -n {result_file_path}{temp_extension} > {result_file_path}"
-    )
-    os.remove(result_file_path + temp_extension)
+
+def get_num_nodes(citing: np.ndarray, cited: np.ndarray) -> int:
+    """Like igraph did, use the opinion ids as node ids, so there's a node
+    for every id up to the highest one with citations.
+    """
+    return int(max(citing.max(), cited.max())) + 1 if len(citing) else 1
 
 
 class Command(VerboseCommand):
     args = "<args>"
     help = "Calculate pagerank value for every case"
 
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--incremental",
+            action="store_true",
+            default=False,
+            help="Start from the edges and scores saved by the last run and "
+            "only reload the citations of opinions that changed since then. "
+            "Falls back to a full run if there's no saved state.",
+        )
+        parser.add_argument(
+            "--state-dir",
+            type=str,
+            default=settings.PAGERANK_STATE_DIR,
+            help="The directory where the scores and edges are saved for "
+            "incremental runs.",
+        )
+
+    @staticmethod
+    def do_pagerank(state_dir: Path | None = None) -> np.ndarray:
+        # Take the dirty opinions before reading the edges, so citations
+        # changed while we read them are applied by the next run.
+        if state_dir is not None:
+            take_dirty_citing_opinions()
+        citing, cited = load_citation_edges()
+        matrix, dangling = make_transition_matrix(
+            citing, cited, get_num_nodes(citing, cited)
+        )
+        pr_results, iterations = compute_pagerank(matrix, dangling)
+        logger.info(
+            "PageRank converged after %s iterations over %s edges.",
+            iterations,
+            matrix.nnz,
+        )
+        if state_dir is not None:
+            save_pagerank_state(state_dir, pr_results, citing, cited)
+        return pr_results
+
     @staticmethod
-    def do_pagerank():
-        g = make_and_populate_nx_graph()
-        pr_results = g.pagerank()
+    def do_incremental_pagerank(state_dir: Path) -> np.ndarray:
+        state = load_pagerank_state(state_dir)
+        if state is None:
+            logger.info("No saved PageRank state found, doing a full run.")
+            return Command.do_pagerank(state_dir)
+
+        prior_scores, citing, cited = state
+        dirty_opinion_ids = take_dirty_citing_opinions()
+        if dirty_opinion_ids:
+            citing, cited = load_changed_citation_edges(
+                citing, cited, dirty_opinion_ids
+            )
+        num_nodes = max(get_num_nodes(citing, cited), len(prior_scores))
+        matrix, dangling = make_transition_matrix(citing, cited, num_nodes)
+        # Warm start from the prior scores. New nodes start from the lowest
+        # prior score, as they have just entered the network.
+        initial_scores = np.full(num_nodes, prior_scores.min())
+        initial_scores[: len(prior_scores)] = prior_scores
+        pr_results, iterations = compute_pagerank(
+            matrix, dangling, initial_scores=initial_scores
+        )
+        logger.info(
+            "Incremental PageRank converged after %s iterations, with %s "
+            "changed citing opinions.",
+            iterations,
+            len(dirty_opinion_ids),
+        )
+        save_pagerank_state(state_dir, pr_results, citing, cited)
         return pr_results
 
     def handle(self, *args, **options):
         super().handle(*args, **options)
-        pr_results = self.do_pagerank()
+        state_dir = Path(options["state_dir"])
+        if options["incremental"]:
+            pr_results = self.do_incremental_pagerank(state_dir)
+        else:
+            pr_results = self.do_pagerank(state_dir)
         pr_dest_dir = settings.SOLR_PAGERANK_DEST_DIR
         make_sorted_pr_file(pr_results, pr_dest_dir)
         normal_dest_dir = f"{get_data_dir('collection1')}external_pagerank"
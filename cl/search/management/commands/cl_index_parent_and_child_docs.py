@@ -3,6 +3,7 @@ from itertools import batched
 from typing import Iterable, Mapping
 
 from django.conf import settings
+from django.core.management import CommandError
 from django.db.models import QuerySet
 
 from cl.lib.argparse_types import valid_date_time
@@ -33,6 +34,7 @@ from cl.search.models import (
     RECAPDocument,
     RECAPDocumentEvent,
 )
+from cl.search.parallel_indexer import INDEX_TARGETS, index_in_parallel
 from cl.search.signals import recap_document_field_mapping
 from cl.search.tasks import (
     index_parent_and_child_docs,
@@ -342,6 +344,16 @@ class Command(VerboseCommand):
             action="store_true",
             help="Use this flag to only index documents missing in the index.",
         )
+        parser.add_argument(
+            "--workers",
+            type=int,
+            help="Index from this machine in this many processes instead of "
+            "sending tasks to Celery. The pk space is split in one range per "
+            "worker and every range is checkpointed on its own, so "
+            "--auto-resume resumes each of them. Only for RECAP and "
+            "opinions. --chunk-size sets the number of parent documents "
+            "indexed at a time by every worker.",
+        )
 
     def handle(self, *args, **options):
         super().handle(*args, **options)
@@ -364,12 +376,50 @@ class Command(VerboseCommand):
         start_date: date | None = options.get("start_date", None)
         end_date: date | None = options.get("end_date", None)
 
+        workers: int | None = options.get("workers", None)
+        if workers is not None:
+            if workers < 1:
+                raise CommandError("--workers must be at least 1.")
+            if search_type not in INDEX_TARGETS:
+                raise CommandError(
+                    "--workers is only available for RECAP and opinions."
+                )
+            if (
+                update_from_event_tables
+                or options.get("missing", False)
+                or start_date
+                or end_date
+            ):
+                raise CommandError(
+                    "--workers can't be combined with "
+                    "--update-from-event-tables, --missing, --start-date or "
+                    "--end-date."
+                )
+            results = index_in_parallel(
+                search_type,
+                document_type,
+                workers,
+                chunk_size,
+                pk_offset=options["pk_offset"],
+                resume=auto_resume,
+                testing_mode=self.options.get("testing_mode", False),
+            )
+            for result in results:
+                self.stdout.write(
+                    f"Range {result.start_pk}-{result.end_pk}: indexed "
+                    f"{result.documents} documents in {result.seconds:.0f}s, "
+                    f"{result.docs_per_second:.1f} docs/s."
+                )
+            return
+
         es_document = None
         match search_type:
             case SEARCH_TYPES.PEOPLE:
-                queryset = Person.objects.filter(
-                    pk__gte=pk_offset, is_alias_of=None
-                ).order_by("pk")
+                queryset = (
+                    Person.objects.prefetch_related("positions")
+                    .filter(pk__gte=pk_offset, is_alias_of=None)
+                    .order_by("pk")
+                )
                 q = [item.pk for item in queryset if item.is_judge]
                 count = len(q)
                 task_to_use = "index_parent_and_child_docs"
@@ -0,0 +1,358 @@
+"""Index parent and child documents from this process, used by
+cl_index_parent_and_child_docs --workers to reindex a whole search type
+without going through Celery.
+
+The pk space of the documents to index is split into one range per worker.
+Every worker process walks its range in batches of pks. The instances of
+every batch are streamed with server-side cursors and sent to ES with
+parallel_bulk.
+
+The last pk of every batch indexed is checkpointed in Redis, in one key per
+range, so every range resumes on its own. The ranges are stored too, so a
+resumed run splits the pk space the same way.
+"""
+
+import json
+import logging
+import multiprocessing
+import time
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+
+from django.db import connections
+from django.db.models import Max, Min, Model, QuerySet
+
+from cl.lib.redis_utils import get_redis_interface
+from cl.search.documents import (
+    DocketDocument,
+    ESRECAPDocument,
+    OpinionClusterDocument,
+    OpinionDocument,
+)
+from cl.search.models import (
+    SEARCH_TYPES,
+    Docket,
+    Opinion,
+    OpinionCluster,
+    RECAPDocument,
+)
+from cl.search.tasks import index_documents_in_bulk_from_queryset
+from cl.search.types import ESDocumentClassType
+
+logger = logging.getLogger(__name__)
+
+RANGE_LOG_EXPIRATION = 60 * 60 * 24 * 28  # 4 weeks
+
+
+@dataclass
+class IndexTarget:
+    parent_model: type[Model]
+    parent_es_document: ESDocumentClassType
+    child_model: type[Model]
+    child_es_document: ESDocumentClassType
+    child_id_property: str
+    # The lookup from the child model to the pk of its parent.
+    child_parent_lookup: str
+
+
+INDEX_TARGETS = {
+    SEARCH_TYPES.RECAP: IndexTarget(
+        Docket,
+        DocketDocument,
+        RECAPDocument,
+        ESRECAPDocument,
+        "RECAP",
+        "docket_entry__docket_id",
+    ),
+    SEARCH_TYPES.OPINION: IndexTarget(
+        OpinionCluster,
+        OpinionClusterDocument,
+        Opinion,
+        OpinionDocument,
+        "OPINION",
+        "cluster_id",
+    ),
+}
+
+
+@dataclass
+class RangeResult:
+    start_pk: int
+    end_pk: int
+    documents: int
+    seconds: float
+
+    @property
+    def docs_per_second(self) -> float:
+        return self.documents / self.seconds if self.seconds else 0.0
+
+
+def compose_ranges_redis_key(
+    search_type: str, document_type: str | None
+) -> str:
+    """Compose the Redis key of the pk ranges of a parallel reindex.
+
+    :param search_type: The search type being indexed.
+    :param document_type: 'parent', 'child' or None for both.
+    :return: A Redis key as a string.
+    """
+    return f"es_{search_type}_{document_type or 'all'}_indexing:ranges"
+
+
+def compose_range_redis_key(
+    search_type: str, document_type: str | None, start_pk: int, end_pk: int
+) -> str:
+    """Compose the Redis key of the checkpoint of a pk range.
+
+    :param search_type: The search type being indexed.
+    :param document_type: 'parent', 'child' or None for both.
+    :param start_pk: The first pk of the range.
+    :param end_pk: The last pk of the range.
+    :return: A Redis key as a string.
+    """
+    return (
+        f"es_{search_type}_{document_type or 'all'}_indexing:"
+        f"range:{start_pk}-{end_pk}:log"
+    )
+
+
+def get_range_queryset(
+    search_type: str, document_type: str | None
+) -> QuerySet:
+    """Get the queryset whose pk space is split into ranges.
+
+    :param search_type: The search type being indexed.
+    :param document_type: 'parent', 'child' or None for both.
+    :return: The child instances when only child documents are indexed,
+    otherwise the parent instances.
+    """
+    target = INDEX_TARGETS[search_type]
+    if document_type == "child":
+        return target.child_model.objects.all()
+    queryset = target.parent_model.objects.all()
+    if search_type == SEARCH_TYPES.RECAP:
+        queryset = queryset.filter(source__in=Docket.RECAP_SOURCES())
+    return queryset
+
+
+def split_pk_range(
+    min_pk: int, max_pk: int, parts: int
+) -> list[tuple[int, int]]:
+    """Split a range of pks into contiguous ranges of about the same size.
+
+    :param min_pk: The first pk.
+    :param max_pk: The last pk.
+    :param parts: The number of ranges to split it into.
+    :return: A list of (start_pk, end_pk) tuples, both inclusive.
+    """
+    size = max(1, -(-(max_pk - min_pk + 1) // parts))
+    return [
+        (start, min(start + size - 1, max_pk))
+        for start in range(min_pk, max_pk + 1, size)
+    ]
+
+
+def get_pk_ranges(
+    search_type: str,
+    document_type: str | None,
+    workers: int,
+    pk_offset: int,
+    resume: bool,
+) -> list[tuple[int, int]]:
+    """Get the pk ranges to index, one per worker.
+
+    :param search_type: The search type being indexed.
+    :param document_type: 'parent', 'child' or None for both.
+    :param workers: The number of worker processes.
+    :param pk_offset: The pk to start indexing from.
+    :param resume: Whether to reuse the ranges and checkpoints of a previous
+    run.
+    :return: A list of (start_pk, end_pk) tuples, both inclusive.
+    """
+    r = get_redis_interface("CACHE")
+    ranges_key = compose_ranges_redis_key(search_type, document_type)
+    stored_ranges = r.get(ranges_key)
+    if resume and stored_ranges:
+        return [tuple(pk_range) for pk_range in json.loads(stored_ranges)]
+
+    if stored_ranges:
+        # Start over, dropping the checkpoints of the previous run.
+        r.delete(
+            *(
+                compose_range_redis_key(search_type, document_type, *pk_range)
+                for pk_range in json.loads(stored_ranges)
+            )
+        )
+    pks = (
+        get_range_queryset(search_type, document_type)
+        .filter(pk__gte=pk_offset)
+        .aggregate(min_pk=Min("pk"), max_pk=Max("pk"))
+    )
+    if pks["min_pk"] is None:
+        return []
+    pk_ranges = split_pk_range(pks["min_pk"], pks["max_pk"], workers)
+    r.set(ranges_key, json.dumps(pk_ranges), ex=RANGE_LOG_EXPIRATION)
+    return pk_ranges
+
+
+def index_batch(
+    search_type: str,
+    document_type: str | None,
+    pks: list[int],
+    testing_mode: bool,
+) -> int:
+    """Index the documents of a batch of pks.
+
+    :param search_type: The search type being indexed.
+    :param document_type: 'parent', 'child' or None for both.
+    :param pks: The parent pks of the batch, or the child pks when only child
+    documents are indexed.
+    :param testing_mode: Whether to use streaming_bulk, for tests.
+    :return: The number of documents sent to ES.
+    """
+    target = INDEX_TARGETS[search_type]
+    base_doc = {
+        "_op_type": "index",
+        "_index": target.parent_es_document._index._name,
+    }
+    documents = 0
+    failed_docs = []
+    if document_type != "child":
+        documents += len(pks)
+        failed_docs.extend(
+            index_documents_in_bulk_from_queryset(
+                target.parent_model.objects.filter(pk__in=pks),
+                target.parent_es_document,
+                base_doc,
+                testing_mode=testing_mode,
+            )
+        )
+    if document_type != "parent":
+        if document_type == "child":
+            children: QuerySet = target.child_model.objects.filter(pk__in=pks)
+        else:
+            children = target.child_model.objects.filter(
+                **{f"{target.child_parent_lookup}__in": pks}
+            )
+        documents += children.count()
+        failed_docs.extend(
+            index_documents_in_bulk_from_queryset(
+                children,
+                target.child_es_document,
+                base_doc,
+                child_id_property=target.child_id_property,
+                testing_mode=testing_mode,
+            )
+        )
+    if failed_docs:
+        logger.error(
+            "Error indexing %s documents, failed Doc IDs are: %s",
+            search_type,
+            failed_docs,
+        )
+    return documents - len(failed_docs)
+
+
+def index_pk_range(
+    search_type: str,
+    document_type: str | None,
+    start_pk: int,
+    end_pk: int,
+    batch_size: int,
+    testing_mode: bool = False,
+) -> RangeResult:
+    """Index the documents of a range of pks, resuming after its checkpoint.
+    Runs in the worker processes.
+
+    :param search_type: The search type being indexed.
+    :param document_type: 'parent', 'child' or None for both.
+    :param start_pk: The first pk of the range.
+    :param end_pk: The last pk of the range.
+    :param batch_size: The number of pks indexed at a time.
+    :param testing_mode: Whether to use streaming_bulk, for tests.
+    :return: The number of documents indexed and the time it took.
+    """
+    r = get_redis_interface("CACHE")
+    log_key = compose_range_redis_key(
+        search_type, document_type, start_pk, end_pk
+    )
+    last_pk = int(r.hget(log_key, "last_document_id") or start_pk - 1)
+    queryset = get_range_queryset(search_type, document_type).order_by("pk")
+
+    documents = 0
+    started = time.monotonic()
+    while True:
+        pks = list(
+            queryset.filter(pk__gt=last_pk, pk__lte=end_pk).values_list(
+                "pk", flat=True
+            )[:batch_size]
+        )
+        if not pks:
+            break
+        documents += index_batch(search_type, document_type, pks, testing_mode)
+        last_pk = pks[-1]
+        pipe = r.pipeline()
+        pipe.hset(log_key, "last_document_id", last_pk)
+        pipe.expire(log_key, RANGE_LOG_EXPIRATION)
+        pipe.execute()
+        elapsed = time.monotonic() - started
+        logger.info(
+            "Range %s-%s: indexed %s documents up to pk %s, %.1f docs/s.",
+            start_pk,
+            end_pk,
+            documents,
+            last_pk,
+            documents / elapsed if elapsed else 0.0,
+        )
+    return RangeResult(start_pk, end_pk, documents, time.monotonic() - started)
+
+
+def index_in_parallel(
+    search_type: str,
+    document_type: str | None,
+    workers: int,
+    batch_size: int,
+    pk_offset: int = 0,
+    resume: bool = False,
+    testing_mode: bool = False,
+) -> list[RangeResult]:
+    """Index the documents of a search type in a pool of processes, one pk
+    range per process.
+
+    :param search_type: The search type to index, RECAP or opinions.
+    :param document_type: 'parent', 'child' or None to index both.
+    :param workers: The number of worker processes.
+    :param batch_size: The number of pks every worker indexes at a time.
+    :param pk_offset: The pk to start indexing from.
+    :param resume: Whether to resume every range from its checkpoint.
+    :param testing_mode: Index the ranges in this process, one after the
+    other, using streaming_bulk. For TestCase based tests.
+    :return: The results of every range.
+    """
+    pk_ranges = get_pk_ranges(
+        search_type, document_type, workers, pk_offset, resume
+    )
+    if testing_mode:
+        return [
+            index_pk_range(
+                search_type, document_type, *pk_range, batch_size, True
+            )
+            for pk_range in pk_ranges
+        ]
+
+    # Forked workers must not share the DB connections of this process.
+    connections.close_all()
+    with ProcessPoolExecutor(
+        max_workers=workers, mp_context=multiprocessing.get_context("fork")
+    ) as executor:
+        futures = [
+            executor.submit(
+                index_pk_range,
+                search_type,
+                document_type,
+                *pk_range,
+                batch_size,
+            )
+            for pk_range in pk_ranges
+        ]
+        return [future.result() for future in futures]
@@ -1,6 +1,8 @@
 import natsort
+from asgiref.sync import sync_to_async
 from django.db.models import F, Prefetch, QuerySet
 
+from cl.citations.lookup_index import CitationLookupResult, lookup_citation
 from cl.search.models import OpinionCluster
 
 
@@ -26,6 +28,12 @@ async def get_clusters_from_citation_str(
             - An integer representing the number of matching opinion clusters
             found.
     """
+    # Reading the index manifest and the dirty books from Redis blocks.
+    indexed = await sync_to_async(lookup_citation)(reporter, volume, page)
+    if indexed is not None:
+        # The in-memory index answered the lookup, skip the DB queries.
+        return await get_clusters_from_index_lookup(indexed, page)
+
     citation_str = " ".join([volume, reporter, page])
     clusters = None
     try:
@@ -79,12 +87,57 @@ async def get_clusters_from_citation_str(
             )
 
         if possible_match:
-            # There may be different page cite formats that aren't yet
-            # accounted for by this code.
-            clusters = OpinionCluster.objects.filter(
-                id=possible_match.id,
-                sub_opinions__html_with_citations__contains=f"*{page}",
-            ).select_related("docket__court")
-            cluster_count = 1 if await clusters.aexists() else 0
+            clusters, cluster_count = await get_pincite_cluster(
+                possible_match.id, page
+            )
+
+    return clusters, cluster_count
+
 
+async def get_pincite_cluster(
+    cluster_id: int, page: str
+) -> tuple[QuerySet[OpinionCluster], int]:
+    """
+    Confirm that the cluster cited immediately before the requested page
+    actually contains that page.
+
+    Args:
+        cluster_id (int): The id of the closest preceding cluster in the book.
+        page (str): The requested page.
+
+    Returns:
+        A tuple containing the clusters queryset and its count.
+    """
+    # There may be different page cite formats that aren't yet
+    # accounted for by this code.
+    clusters = OpinionCluster.objects.filter(
+        id=cluster_id,
+        sub_opinions__html_with_citations__contains=f"*{page}",
+    ).select_related("docket__court")
+    cluster_count = 1 if await clusters.aexists() else 0
     return clusters, cluster_count
+
+
+async def get_clusters_from_index_lookup(
+    indexed: CitationLookupResult, page: str
+) -> tuple[QuerySet[OpinionCluster] | None, int]:
+    """
+    Turn a citation lookup index result into the clusters queryset returned
+    by get_clusters_from_citation_str.
+
+    Args:
+        indexed (CitationLookupResult): The result from the lookup index.
+        page (str): The requested page.
+
+    Returns:
+        A tuple containing the clusters queryset or None and its count.
+    """
+    if indexed.exact_cluster_ids:
+        cluster_ids = set(indexed.exact_cluster_ids)
+        clusters = OpinionCluster.objects.filter(
+            id__in=cluster_ids
+        ).select_related("docket__court")
+        return clusters, len(cluster_ids)
+    if indexed.preceding_cluster_id is not None:
+        return await get_pincite_cluster(indexed.preceding_cluster_id, page)
+    return None, 0
@@ -1,12 +1,16 @@
 from django.conf import settings
-from django.db.models.signals import post_save
+from django.core.exceptions import ObjectDoesNotExist
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
 from django.dispatch import receiver
 
 from cl.audio.models import Audio
+from cl.citations.lookup_index import mark_citation_book_dirty
 from cl.citations.tasks import (
     find_citations_and_parantheticals_for_recap_documents,
 )
 from cl.favorites.utils import send_prayer_emails
+from cl.lib.docket_fields_cache import invalidate_docket_fields
 from cl.lib.es_signal_processor import ESSignalProcessor
 from cl.people_db.models import (
     ABARating,
@@ -16,6 +20,7 @@ from cl.people_db.models import (
     Position,
     School,
 )
+from cl.recap.docket_lookup import invalidate_docket_lookups
 from cl.search.documents import (
     AudioDocument,
     DocketDocument,
@@ -575,3 +580,64 @@ def handle_recap_doc_change(
         and instance.is_available == True
     ):
         send_prayer_emails(instance)
+
+
+@receiver(
+    [post_save, post_delete],
+    sender=Citation,
+    dispatch_uid="handle_citation_lookup_index_change_uid",
+)
+def handle_citation_lookup_index_change(sender, instance: Citation, **kwargs):
+    """Flag the book of a saved or deleted citation as dirty, so the citation
+    lookup API reads it from the DB until the lookup index is rebuilt.
+    """
+    mark_citation_book_dirty(instance.reporter, instance.volume)
+
+
+@receiver(
+    [post_save, post_delete],
+    sender=Docket,
+    dispatch_uid="handle_docket_lookup_cache_change_uid",
+)
+def handle_docket_lookup_cache_change(sender, instance: Docket, **kwargs):
+    """Delete the cached find_docket_object lookups that could match a saved
+    or deleted docket. Do it again on commit, in case a lookup cached the old
+    data before the change was visible to it.
+    """
+    invalidate_docket_lookups(instance)
+    transaction.on_commit(lambda: invalidate_docket_lookups(instance))
+
+
+@receiver(
+    [post_save, post_delete],
+    sender=Docket,
+    dispatch_uid="handle_docket_fields_cache_change_uid",
+)
+def handle_docket_fields_cache_change(sender, instance: Docket, **kwargs):
+    """Delete the cached search result fields of a saved or deleted docket,
+    now and on commit.
+    """
+    invalidate_docket_fields(instance.pk)
+    transaction.on_commit(lambda: invalidate_docket_fields(instance.pk))
+
+
+@receiver(
+    [post_save, post_delete],
+    sender=RECAPDocument,
+    dispatch_uid="handle_initial_document_cache_change_uid",
+)
+def handle_initial_document_cache_change(
+    sender, instance: RECAPDocument, **kwargs
+):
+    """Delete the cached search result fields of the docket of a saved or
+    deleted initial document, now and on commit.
+    """
+    if instance.document_number != "1":
+        return
+    try:
+        docket_id = instance.docket_entry.docket_id
+    except ObjectDoesNotExist:
+        # Deleted along with its docket entry. The cached fields expire.
+        return
+    invalidate_docket_fields(docket_id)
+    transaction.on_commit(lambda: invalidate_docket_fields(docket_id))
@@ -34,6 +34,7 @@ from scorched.exc import SolrError
 from cl.audio.models import Audio
 from cl.celery_init import app
 from cl.lib.elasticsearch_utils import build_daterange_query
+from cl.lib.es_update_buffer import pop_es_update_batches
 from cl.lib.search_index_utils import (
     InvalidDocumentError,
     get_parties_from_case_name,
@@ -681,6 +682,41 @@ def handle_ubq_retries(
     raise self.retry(exc=exc, countdown=countdown_sec)
 
 
+def children_fields_values(
+    parent_doc_class: ESDocumentClassType,
+    parent_instance: ESModelType,
+    fields_to_update: list[str],
+    fields_map: dict[str, str] | None,
+) -> dict[str, Any]:
+    """Get the values of the fields of child documents taken from their
+    parent instance.
+
+    :param parent_doc_class: The ES document class of the parent.
+    :param parent_instance: The parent instance containing the fields to
+    update.
+    :param fields_to_update: List of field names to be updated.
+    :param fields_map: A mapping from model fields to Elasticsearch document
+    fields.
+    :return: A dict mapping the ES fields to their values.
+    """
+    values = {}
+    for field_to_update in fields_to_update:
+        field_list = (
+            fields_map[field_to_update] if fields_map else [field_to_update]
+        )
+        for field_name in field_list:
+            prepare_method = getattr(
+                parent_doc_class(), f"prepare_{field_name}", None
+            )
+            if prepare_method:
+                # This work for DE but might not work for other types or fields that
+                # require some processing.
+                values[field_name] = prepare_method(parent_instance)
+            else:
+                values[field_name] = getattr(parent_instance, field_to_update)
+    return values
+
+
 @app.task(
     bind=True,
     max_retries=5,
@@ -775,26 +811,13 @@ def update_children_docs_by_query(
     )
 
     # Build the UpdateByQuery script and execute it
-    script_lines = []
-    params = {}
-    for field_to_update in fields_to_update:
-        field_list = (
-            fields_map[field_to_update] if fields_map else [field_to_update]
-        )
-        for field_name in field_list:
-            script_lines.append(
-                f"ctx._source.{field_name} = params.{field_name};"
-            )
-            prepare_method = getattr(
-                parent_doc_class(), f"prepare_{field_name}", None
-            )
-            if prepare_method:
-                # This work for DE but might not work for other types or fields that
-                # require some processing.
-                params[field_name] = prepare_method(parent_instance)
-            else:
-                params[field_name] = getattr(parent_instance, field_to_update)
-    script_source = "\n".join(script_lines)
+    params = children_fields_values(
+        parent_doc_class, parent_instance, fields_to_update, fields_map
+    )
+    script_source = "\n".join(
+        f"ctx._source.{field_name} = params.{field_name};"
+        for field_name in params
+    )
 
     ubq = ubq.script(source=script_source, params=params)
     try:
@@ -813,6 +836,268 @@ def update_children_docs_by_query(
         es_document._index.refresh()
 
 
+@app.task(
+    bind=True,
+    max_retries=5,
+    queue=settings.CELERY_ETL_TASK_QUEUE,
+    ignore_result=True,
+)
+def update_children_docs_by_query_in_bulk(
+    self: Task,
+    es_document_name: ESDocumentNameType,
+    parent_instance_ids: list[int],
+    fields_to_update: list[str],
+    fields_map: dict[str, str] | None = None,
+) -> None:
+    """Update the child documents of many parents in Elasticsearch using a
+    single sliced UpdateByQuery request, instead of one per parent.
+
+    The children are matched with a terms filter on their parent IDs, and
+    the script takes the values of every child from the params of its
+    parent, using the routing of the child, which is its parent ID.
+
+    :param self: The celery task
+    :param es_document_name: The Elasticsearch Document type name to update.
+    :param parent_instance_ids: The IDs of the parent instances containing
+    the fields to update.
+    :param fields_to_update: List of field names to be updated.
+    :param fields_map: A mapping from model fields to Elasticsearch document
+    fields.
+    :return: None
+    """
+
+    es_document = getattr(es_document_module, es_document_name)
+    if es_document is PositionDocument:
+        parent_doc_class = PersonDocument
+        parent_type = "person"
+        count_query = Position.objects.filter(
+            person_id__in=parent_instance_ids
+        )
+    elif es_document is ESRECAPDocument:
+        parent_doc_class = DocketDocument
+        parent_type = "docket"
+        count_query = RECAPDocument.objects.filter(
+            docket_entry__docket_id__in=parent_instance_ids
+        )
+    elif (
+        es_document is OpinionDocument or es_document is OpinionClusterDocument
+    ):
+        parent_doc_class = OpinionClusterDocument
+        parent_type = "opinion_cluster"
+        count_query = Opinion.objects.filter(
+            cluster_id__in=parent_instance_ids
+        )
+    else:
+        # Abort UBQ update for a not supported document
+        return
+
+    parent_instances = prefetch_es_document_related(
+        parent_doc_class.Django.model.objects.filter(
+            pk__in=parent_instance_ids
+        ),
+        parent_doc_class,
+    )
+    values = {
+        str(parent_instance.pk): children_fields_values(
+            parent_doc_class, parent_instance, fields_to_update, fields_map
+        )
+        for parent_instance in parent_instances
+    }
+    if not values:
+        return
+
+    # The fields to update are the same for every parent.
+    field_names = next(iter(values.values())).keys()
+    script_source = "\n".join(
+        [
+            "def values = params.values.get(ctx._routing);",
+            "if (values != null) {",
+            *(
+                f"ctx._source.{field_name} = values.{field_name};"
+                for field_name in field_names
+            ),
+            "}",
+        ]
+    )
+    # Children whose parent is not indexed are not matched.
+    query = Q(
+        "has_parent",
+        parent_type=parent_type,
+        query=Q("terms", _id=list(values.keys())),
+    )
+    client = connections.get_connection(alias="no_retry_connection")
+    ubq = (
+        UpdateByQuery(using=client, index=es_document._index._name)
+        .query(query)
+        .script(source=script_source, params={"values": values})
+        .params(
+            timeout=f"{settings.ELASTICSEARCH_TIMEOUT}s",
+            slices="auto",
+            requests_per_second=settings.ELASTICSEARCH_UBQ_REQUESTS_PER_SECOND,
+        )
+    )
+    try:
+        ubq.execute()
+    except (
+        ConnectionError,
+        ConflictError,
+        ConnectionTimeout,
+        NotFoundError,
+        ApiError,
+    ) as exc:
+        handle_ubq_retries(self, exc, count_query=count_query)
+
+    if settings.ELASTICSEARCH_DSL_AUTO_REFRESH:
+        # Set auto-refresh, used for testing.
+        es_document._index.refresh()
+
+
+def build_es_document_update(
+    es_document_name: ESDocumentNameType,
+    fields_to_update: list[str],
+    main_instance_data: tuple[str, int] | list,
+    related_instance_data: tuple[str, int] | list | None,
+    fields_map: dict | None,
+) -> tuple[ESDictDocument, ESModelType] | None:
+    """Build the bulk action to partially update a document in Elasticsearch,
+    taking the values of the fields from DB like update_es_document does.
+
+    :param es_document_name: The Elasticsearch document type name.
+    :param fields_to_update: A list containing the fields to update.
+    :param main_instance_data: A two tuple, the main instance app label and the
+    main instance ID to update.
+    :param related_instance_data: A two-tuple: the related instance's app label
+    and the related instance ID from which to extract field values. None if the
+    update doesn't involve a related instance.
+    :param fields_map: A dict containing fields that can be updated or None if
+    mapping is not required for the update.
+    :return: A two-tuple, the bulk action and the main instance, or None if
+    there is nothing to update.
+    """
+
+    es_document = getattr(es_document_module, es_document_name)
+    main_app_label, main_instance_id = main_instance_data
+    main_model_instance = get_instance_from_db(
+        main_instance_id, apps.get_model(main_app_label)
+    )
+    if not main_model_instance:
+        return None
+
+    related_instance = None
+    if related_instance_data:
+        related_instance_app_label, related_instance_id = related_instance_data
+        related_instance = get_instance_from_db(
+            related_instance_id, apps.get_model(related_instance_app_label)
+        )
+        if not related_instance:
+            return None
+
+    fields_values_to_update = document_fields_to_update(
+        es_document,
+        main_model_instance,
+        fields_to_update,
+        related_instance,
+        fields_map,
+    )
+    if not fields_values_to_update:
+        return None
+
+    # Serialize the values the way Document.update does.
+    values = es_document(**fields_values_to_update).to_dict(skip_empty=False)
+    doc_id, parent_id = get_es_doc_id_and_parent_id(
+        es_document, main_model_instance
+    )
+    action: ESDictDocument = {
+        "_op_type": "update",
+        "_index": es_document._index._name,
+        "_id": doc_id,
+        "doc": {field: values.get(field) for field in fields_values_to_update},
+    }
+    if parent_id:
+        action["_routing"] = parent_id
+    return action, main_model_instance
+
+
+@app.task(
+    bind=True,
+    autoretry_for=(ConnectionError, ConnectionTimeout),
+    max_retries=5,
+    retry_backoff=1 * 60,
+    retry_backoff_max=10 * 60,
+    retry_jitter=True,
+    queue=settings.CELERY_ETL_TASK_QUEUE,
+    ignore_result=True,
+)
+def update_es_documents_in_bulk(
+    self: Task,
+    updates: list[list[Any]],
+) -> None:
+    """Update documents in Elasticsearch in a single bulk request.
+
+    Documents not found in the index are indexed in full, as
+    update_es_document does.
+
+    :param self: The celery task
+    :param updates: A list of update_es_document params: the ES document
+    name, the fields to update, the main instance data, the related instance
+    data and the fields map.
+    :return: None
+    """
+
+    actions = []
+    instances = {}
+    for update in updates:
+        built_update = build_es_document_update(*update)
+        if not built_update:
+            continue
+        action, main_model_instance = built_update
+        actions.append(action)
+        instances[(action["_index"], str(action["_id"]))] = (
+            getattr(es_document_module, update[0]),
+            main_model_instance,
+        )
+    if not actions:
+        return
+
+    client = connections.get_connection()
+    for success, info in streaming_bulk(
+        client,
+        actions,
+        chunk_size=int(settings.ELASTICSEARCH_BULK_BATCH_SIZE),
+        raise_on_error=False,
+        refresh=settings.ELASTICSEARCH_DSL_AUTO_REFRESH,
+    ):
+        if success:
+            continue
+        result = info["update"]
+        es_document, instance = instances[
+            (result["_index"], str(result["_id"]))
+        ]
+        if result["status"] == 404:
+            # Index the whole document if it doesn't exist yet.
+            get_doc_from_es(es_document, instance)
+        else:
+            logger.error(
+                "Error updating the %s with ID: %s. Error was: %s",
+                es_document.Django.model.__name__,
+                result["_id"],
+                result.get("error"),
+            )
+
+
+@app.task(ignore_result=True)
+def flush_es_update_buffer() -> None:
+    """Send the ES updates buffered in Redis during the coalescing window.
+
+    :return: None
+    """
+    from cl.lib.es_signal_processor import send_es_update_batch
+
+    batch = pop_es_update_batches()
+    if batch:
+        send_es_update_batch(batch)
+
+
 @app.task(
     bind=True,
     autoretry_for=(
@@ -853,6 +1138,30 @@ def index_docket_parties_in_es(
     )
 
 
+def prefetch_es_document_related(
+    queryset: QuerySet, es_document: ESDocumentClassType
+) -> QuerySet:
+    """Load the related rows an ES document uses to prepare an instance along
+    with the instances of a queryset, to avoid querying them once per
+    instance.
+
+    ES document classes declare them in their index_select_related and
+    index_prefetch_related attributes.
+
+    :param queryset: The queryset of instances to be indexed.
+    :param es_document: The Elasticsearch document class corresponding to
+    the instance model.
+    :return: The queryset with the related lookups of the document applied.
+    """
+    select_related = getattr(es_document, "index_select_related", [])
+    prefetch_related = getattr(es_document, "index_prefetch_related", [])
+    if select_related:
+        queryset = queryset.select_related(*select_related)
+    if prefetch_related:
+        queryset = queryset.prefetch_related(*prefetch_related)
+    return queryset
+
+
 def bulk_indexing_generator(
     docs_query_set: QuerySet,
     es_document: ESDocumentClassType,
@@ -878,7 +1187,10 @@ def bulk_indexing_generator(
         "RECAP": lambda document: document.docket_entry.docket_id,
         "OPINION": lambda document: document.cluster_id,
     }
-    for doc in docs_query_set.iterator():
+    # Related rows are prefetched once per chunk of instances.
+    docs_query_set = prefetch_es_document_related(docs_query_set, es_document)
+    chunk_size = int(settings.ELASTICSEARCH_BULK_BATCH_SIZE)
+    for doc in docs_query_set.iterator(chunk_size=chunk_size):
         es_doc = es_document().prepare(doc)
         if child_id_property:
             if not parent_id:
@@ -3,6 +3,7 @@ import io
 import os
 from datetime import date
 from pathlib import Path
+from tempfile import NamedTemporaryFile, TemporaryDirectory
 from unittest import mock
 
 import pytz
@@ -14,8 +15,9 @@ from django.contrib.auth.hashers import make_password
 from django.core.exceptions import ValidationError
 from django.core.files.base import ContentFile
 from django.core.management import call_command
-from django.db import IntegrityError, transaction
+from django.db import IntegrityError, connection, transaction
 from django.test import override_settings
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
 from django.utils.timezone import now
 from elasticsearch_dsl import Q
@@ -26,7 +28,11 @@ from selenium.webdriver.support import expected_conditions as EC
 from selenium.webdriver.support.wait import WebDriverWait
 from timeout_decorator import timeout_decorator
 
-from cl.audio.factories import AudioFactory
+from cl.audio.factories import AudioFactory, AudioWithParentsFactory
+from cl.citations.utils import (
+    PAGERANK_DIRTY_OPINIONS_KEY,
+    mark_citing_opinion_for_pagerank,
+)
 from cl.lib.elasticsearch_utils import simplify_estimated_count
 from cl.lib.redis_utils import get_redis_interface
 from cl.lib.search_utils import make_fq
@@ -70,7 +76,11 @@ from cl.search.factories import (
     OpinionWithParentsFactory,
     RECAPDocumentFactory,
 )
-from cl.search.management.commands.cl_calculate_pagerank import Command
+from cl.search.management.commands.cl_calculate_pagerank import (
+    PROCESSING_DIRTY_OPINIONS_KEY,
+    Command,
+    make_sorted_pr_file,
+)
 from cl.search.management.commands.cl_index_parent_and_child_docs import (
     get_unique_oldest_history_rows,
     log_last_document_indexed,
@@ -89,11 +99,13 @@ from cl.search.models import (
     DocketEvent,
     Opinion,
     OpinionCluster,
+    OpinionsCited,
     RECAPDocument,
     sort_cites,
 )
 from cl.search.tasks import (
     add_docket_to_solr_by_rds,
+    bulk_indexing_generator,
     get_es_doc_id_and_parent_id,
     index_dockets_in_bulk,
 )
@@ -1119,6 +1131,59 @@ class PagerankTest(TestCase):
                 "%s" % (key, pr_results[key], answers[key]),
             )
 
+    def test_incremental_pagerank(self) -> None:
+        """Does an incremental run that applies the changed citations to the
+        saved state give the same scores as a full run?
+        """
+        r = get_redis_interface("CACHE")
+        r.delete(PAGERANK_DIRTY_OPINIONS_KEY, PROCESSING_DIRTY_OPINIONS_KEY)
+        with TemporaryDirectory() as state_dir:
+            Command.do_pagerank(Path(state_dir))
+
+            OpinionsCited.objects.filter(citing_opinion_id=1).delete()
+            OpinionsCited.objects.create(
+                citing_opinion_id=1, cited_opinion_id=2
+            )
+            OpinionsCited.objects.create(
+                citing_opinion_id=2, cited_opinion_id=1
+            )
+            mark_citing_opinion_for_pagerank(1)
+            mark_citing_opinion_for_pagerank(2)
+
+            incremental_results = Command.do_incremental_pagerank(
+                Path(state_dir)
+            )
+            self.assertEqual(r.scard(PROCESSING_DIRTY_OPINIONS_KEY), 0)
+
+        full_results = Command.do_pagerank()
+        self.assertEqual(len(incremental_results), len(full_results))
+        for pk, score in enumerate(full_results):
+            self.assertAlmostEqual(incremental_results[pk], score, places=8)
+
+    def test_make_sorted_pr_file(self) -> None:
+        """Is the pagerank file written sorted by opinion id, with the lowest
+        score for opinions outside the citation network?
+        """
+        pr_results = Command().do_pagerank()
+        opinion_pks = list(
+            Opinion.objects.order_by("pk").values_list("pk", flat=True)
+        )
+        with NamedTemporaryFile(mode="r") as f:
+            make_sorted_pr_file(pr_results, f.name)
+            lines = f.read().splitlines()
+
+        self.assertEqual(
+            [int(line.split("=")[0]) for line in lines], opinion_pks
+        )
+        for line in lines:
+            pk, score = line.split("=")
+            expected = (
+                pr_results[int(pk)]
+                if int(pk) < len(pr_results)
+                else pr_results.min()
+            )
+            self.assertAlmostEqual(float(score), expected)
+
 
 class OpinionSearchFunctionalTest(AudioTestCase, BaseSeleniumTest):
     """
@@ -2145,6 +2210,66 @@ class ESIndexingTasksUtils(TestCase):
         self.assertEqual(unique_event_ids, expected_event_ids)
 
 
+class ESDocumentPrefetchTest(TestCase):
+    """Preparing ES documents in bulk must not query the related rows of every
+    instance, see the index_select_related and index_prefetch_related
+    attributes of the ES documents.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.court = CourtFactory(id="canb", jurisdiction="FB")
+        for _ in range(3):
+            PositionFactory.create(court=cls.court, person=PersonFactory())
+            RECAPDocumentFactory(
+                docket_entry=DocketEntryWithParentsFactory(
+                    docket=DocketFactory(court=cls.court, source=Docket.RECAP)
+                ),
+            )
+            OpinionWithParentsFactory.create(
+                cluster__docket=DocketFactory(court=cls.court)
+            )
+            AudioWithParentsFactory.create(docket__court=cls.court)
+
+    @staticmethod
+    def count_prepare_queries(es_document, queryset) -> int:
+        with CaptureQueriesContext(connection) as queries:
+            list(bulk_indexing_generator(queryset, es_document, {}))
+        return len(queries)
+
+    def test_prepare_query_count_per_document_type(self) -> None:
+        """Do the queries to prepare ES documents in bulk stay the same no
+        matter how many instances are prepared?
+        """
+        # The parties of every docket are still queried per docket.
+        per_instance_queries = {DocketDocument: 3}
+        for es_document in [
+            AudioDocument,
+            DocketDocument,
+            ESRECAPDocument,
+            OpinionClusterDocument,
+            OpinionDocument,
+            PersonDocument,
+            PositionDocument,
+        ]:
+            with self.subTest(es_document=es_document.__name__):
+                queryset = es_document.Django.model.objects.order_by("pk")
+                pks = list(queryset.values_list("pk", flat=True))
+                self.assertGreater(len(pks), 1)
+                one_query_count = self.count_prepare_queries(
+                    es_document, queryset.filter(pk=pks[0])
+                )
+                all_query_count = self.count_prepare_queries(
+                    es_document, queryset.filter(pk__in=pks)
+                )
+                self.assertEqual(
+                    all_query_count - one_query_count,
+                    (len(pks) - 1) * per_instance_queries.get(es_document, 0),
+                    msg=f"Preparing {es_document.__name__} in bulk runs "
+                    "queries per instance.",
+                )
+
+
 @mock.patch(
     "cl.search.management.commands.sweep_indexer.compose_indexer_redis_key",
     return_value="es_sweep_indexer:log_test",
@@ -1,5 +1,8 @@
+import csv
 import datetime
+import json
 import math
+from http import HTTPStatus
 from unittest import mock
 
 import time_machine
@@ -22,6 +25,7 @@ from cl.lib.elasticsearch_utils import (
     build_es_main_query,
     fetch_es_results,
 )
+from cl.lib.redis_utils import get_redis_interface
 from cl.lib.test_helpers import (
     AudioESTestCase,
     audio_v3_fields,
@@ -30,6 +34,7 @@ from cl.lib.test_helpers import (
     v4_meta_keys,
 )
 from cl.search.documents import AudioDocument, AudioPercolator
+from cl.search.exception import ElasticBadRequestError
 from cl.search.factories import CourtFactory, DocketFactory, PersonFactory
 from cl.search.models import SEARCH_TYPES, Docket
 from cl.search.tasks import es_save_document, update_es_document
@@ -40,6 +45,7 @@ from cl.tests.cases import (
     TransactionTestCase,
     V4SearchAPIAssertions,
 )
+from cl.users.factories import UserProfileWithParentsFactory
 
 
 class OASearchAPICommonTests(AudioESTestCase):
@@ -939,6 +945,89 @@ class OAV4SearchAPITests(
                 msg="Results main query count didn't match.",
             )
 
+    def test_export_search_results(self) -> None:
+        """Confirm the V4 search export API streams all the results of a
+        search, and is throttled by the number of rows exported.
+        """
+        export_url = reverse("search-export", kwargs={"version": "v4"})
+        search_params = {"type": SEARCH_TYPES.ORAL_ARGUMENT}
+        r = self.client.get(export_url, search_params)
+        self.assertEqual(r.status_code, HTTPStatus.UNAUTHORIZED)
+
+        user_profile = UserProfileWithParentsFactory.create()
+        get_redis_interface("CACHE").delete(
+            f"throttle_export_rows_{user_profile.user.pk}"
+        )
+        self.client.force_login(user_profile.user)
+        expected_urls = {
+            audio.get_absolute_url() for audio in Audio.objects.all()
+        }
+
+        # Read the results in batches smaller than the result set.
+        with override_settings(SEARCH_EXPORT_BATCH_SIZE=2):
+            r = self.client.get(
+                export_url, {**search_params, "export_format": "jsonl"}
+            )
+            self.assertEqual(r["Content-Type"], "application/jsonl")
+            rows = [
+                json.loads(line)
+                for line in b"".join(r.streaming_content).splitlines()
+            ]
+            self.assertEqual(
+                {row["absolute_url"] for row in rows}, expected_urls
+            )
+
+            r = self.client.get(
+                export_url, {**search_params, "export_format": "csv"}
+            )
+            self.assertEqual(r["Content-Type"], "text/csv")
+            rows = list(
+                csv.DictReader(
+                    b"".join(r.streaming_content).decode().splitlines()
+                )
+            )
+            self.assertEqual(
+                {row["absolute_url"] for row in rows}, expected_urls
+            )
+
+        r = self.client.get(
+            export_url, {**search_params, "export_format": "xml"}
+        )
+        self.assertEqual(r.status_code, HTTPStatus.BAD_REQUEST)
+
+        # Errors of the first query are returned before the export starts
+        # streaming, with the status code of the search API.
+        with mock.patch(
+            "cl.search.api_utils.ESExportList.fetch_batch",
+            side_effect=ElasticBadRequestError(),
+        ):
+            r = self.client.get(export_url, search_params)
+        self.assertEqual(r.status_code, HTTPStatus.BAD_REQUEST)
+        self.assertFalse(r.streaming)
+
+        # The export stops when the user runs out of rows, and the next one
+        # is throttled. Exports started at the same time share the rows left.
+        rows_rate = f"{len(expected_urls) * 2 + 1}/day"
+        rest_framework_settings = {
+            **settings.REST_FRAMEWORK,
+            "EXPORT_ROWS_OVERRIDE_THROTTLE_RATES": {
+                user_profile.user.username: rows_rate
+            },
+        }
+        with override_settings(REST_FRAMEWORK=rest_framework_settings):
+            responses = [
+                self.client.get(export_url, search_params) for _ in range(2)
+            ]
+            self.assertEqual(
+                sum(
+                    len(b"".join(r.streaming_content).splitlines())
+                    for r in responses
+                ),
+                1,
+            )
+            r = self.client.get(export_url, search_params)
+            self.assertEqual(r.status_code, HTTPStatus.TOO_MANY_REQUESTS)
+
 
 class OASearchTestElasticSearch(ESIndexTestCase, AudioESTestCase, TestCase):
     """Oral argument search tests for Elasticsearch"""
@@ -10,7 +10,8 @@ from asgiref.sync import async_to_sync, sync_to_async
 from django.conf import settings
 from django.core.cache import cache
 from django.core.files.uploadedfile import SimpleUploadedFile
-from django.core.management import call_command
+from django.core.management import CommandError, call_command
+from django.db import transaction
 from django.test import AsyncClient, override_settings
 from django.urls import reverse
 from django.utils.timezone import now
@@ -27,6 +28,7 @@ from cl.lib.elasticsearch_utils import (
     set_results_highlights,
     simplify_estimated_count,
 )
+from cl.lib.es_update_buffer import get_es_update_stats
 from cl.lib.redis_utils import get_redis_interface
 from cl.lib.test_helpers import (
     RECAPSearchTestCase,
@@ -72,11 +74,19 @@ from cl.search.models import (
     OpinionsCitedByRECAPDocument,
     RECAPDocument,
 )
+from cl.search.parallel_indexer import (
+    compose_range_redis_key,
+    compose_ranges_redis_key,
+    get_pk_ranges,
+    index_in_parallel,
+)
 from cl.search.tasks import (
     es_save_document,
     index_docket_parties_in_es,
     index_related_cites_fields,
+    update_children_docs_by_query_in_bulk,
     update_es_document,
+    update_es_documents_in_bulk,
 )
 from cl.search.types import EventTable
 from cl.tests.cases import (
@@ -5606,6 +5616,89 @@ class IndexDocketRECAPDocumentsCommandTest(
         d_3.delete()
         d_4.delete()
 
+    def test_cl_index_parent_and_child_docs_in_parallel(self):
+        """Can the command index Dockets and their RECAPDocuments in pk
+        ranges, checkpointing every range?
+        """
+        r = get_redis_interface("CACHE")
+        ranges_key = compose_ranges_redis_key(SEARCH_TYPES.RECAP, None)
+        r.delete(ranges_key)
+
+        call_command(
+            "cl_index_parent_and_child_docs",
+            search_type=SEARCH_TYPES.RECAP,
+            workers=2,
+            chunk_size=1,
+            testing_mode=True,
+        )
+
+        s = DocketDocument.search()
+        s = s.query(Q("match", docket_child="docket"))
+        self.assertEqual(s.count(), 2, msg="Wrong number of Dockets returned.")
+        s = DocketDocument.search()
+        s = s.query(Q("match", docket_child="recap_document"))
+        self.assertEqual(
+            s.count(), 3, msg="Wrong number of RECAPDocuments returned."
+        )
+
+        # Every range is checkpointed up to its last docket.
+        pk_ranges = get_pk_ranges(SEARCH_TYPES.RECAP, None, 2, 0, resume=True)
+        self.assertEqual(
+            pk_ranges,
+            [
+                (self.de.docket.pk, self.de.docket.pk),
+                (self.de_1.docket.pk, self.de_1.docket.pk),
+            ],
+        )
+        checkpoints = [
+            int(
+                r.hget(
+                    compose_range_redis_key(
+                        SEARCH_TYPES.RECAP, None, *pk_range
+                    ),
+                    "last_document_id",
+                )
+            )
+            for pk_range in pk_ranges
+        ]
+        self.assertEqual(checkpoints, [self.de.docket.pk, self.de_1.docket.pk])
+
+        # Resuming doesn't index the ranges again.
+        results = index_in_parallel(
+            SEARCH_TYPES.RECAP, None, 2, 1, resume=True, testing_mode=True
+        )
+        self.assertEqual([result.documents for result in results], [0, 0])
+
+        r.delete(
+            ranges_key,
+            *(
+                compose_range_redis_key(SEARCH_TYPES.RECAP, None, *pk_range)
+                for pk_range in pk_ranges
+            ),
+        )
+
+    def test_cl_index_parent_and_child_docs_workers_options(self):
+        """Does the command reject --workers below 1 and combined with the
+        options that filter the documents to index?
+        """
+        for options in [
+            {"workers": 0},
+            {"workers": 2, "missing": True},
+            {"workers": 2, "update_from_event_tables": "search.Docket"},
+            {"workers": 2, "start_date": datetime.datetime(2024, 1, 1)},
+            {"workers": 2, "end_date": datetime.datetime(2024, 1, 1)},
+        ]:
+            with (
+                self.subTest(options=options),
+                self.assertRaises(CommandError),
+            ):
+                call_command(
+                    "cl_index_parent_and_child_docs",
+                    search_type=SEARCH_TYPES.RECAP,
+                    testing_mode=True,
+                    **options,
+                )
+
     def test_cl_index_only_parent_or_child_documents_command(self):
         """Confirm the command can properly index only RECAPDocuments or only
         Dockets into ES."""
@@ -7088,6 +7181,104 @@ class RECAPIndexingTest(
         docket_doc_no_parties.delete()
         docket_with_no_parties_no_separator.delete()
 
+    def test_coalesce_es_updates_in_a_transaction(self) -> None:
+        """Confirm the ES updates of the dockets saved in a transaction are
+        merged by docket and sent in a single bulk task once it's committed.
+        """
+        docket_1 = DocketFactory(
+            court=self.court,
+            case_name="Lorem v. Dolor",
+            docket_number="1:21-bk-4447",
+            source=Docket.RECAP,
+        )
+        docket_2 = DocketFactory(
+            court=self.court,
+            case_name="Bank v. Smith",
+            docket_number="1:21-bk-4448",
+            source=Docket.RECAP,
+        )
+        stats_before = get_es_update_stats()
+        with mock.patch(
+            "cl.lib.es_signal_processor.update_es_documents_in_bulk.delay",
+            side_effect=lambda *args, **kwargs: self.count_task_calls(
+                update_es_documents_in_bulk, *args, **kwargs
+            ),
+        ), mock.patch(
+            "cl.lib.es_signal_processor.update_es_document.delay"
+        ) as update_es_document_mock:
+            with transaction.atomic():
+                docket_1.case_name = "Lorem v. Ipsum"
+                docket_1.save()
+                docket_1.docket_number = "1:21-bk-4449"
+                docket_1.save()
+                docket_2.case_name = "America v. Smith"
+                docket_2.save()
+                # Nothing is sent before the transaction is committed.
+                self.assertEqual(self.task_call_count, 0)
+
+        # The three updates are sent in one bulk task, one per docket.
+        self.reset_and_assert_task_count(expected=1)
+        update_es_document_mock.assert_not_called()
+        stats = get_es_update_stats()
+        self.assertEqual(stats["queued"] - stats_before["queued"], 3)
+        self.assertEqual(stats["sent"] - stats_before["sent"], 2)
+        self.assertEqual(stats["saved"] - stats_before["saved"], 1)
+
+        docket_doc_1 = DocketDocument.get(docket_1.pk)
+        self.assertEqual(docket_doc_1.caseName, "Lorem v. Ipsum")
+        self.assertEqual(docket_doc_1.docketNumber, "1:21-bk-4449")
+        docket_doc_2 = DocketDocument.get(docket_2.pk)
+        self.assertEqual(docket_doc_2.caseName, "America v. Smith")
+
+        docket_1.delete()
+        docket_2.delete()
+
+    def test_update_children_of_many_parents_in_bulk(self) -> None:
+        """Confirm the RECAPDocuments of all the dockets assigned to a judge
+        are updated by a single UpdateByQuery task when the judge changes.
+        """
+        judge = PersonFactory.create(name_first="Thalassa", name_last="Miller")
+        rds = []
+        for docket_number in ["1:21-bk-4450", "1:21-bk-4451"]:
+            rds.append(
+                RECAPDocumentFactory(
+                    docket_entry=DocketEntryWithParentsFactory(
+                        docket=DocketFactory(
+                            court=self.court,
+                            docket_number=docket_number,
+                            assigned_to=judge,
+                            source=Docket.RECAP,
+                        ),
+                    ),
+                )
+            )
+        # A docket without entries is not updated.
+        DocketFactory(
+            court=self.court,
+            docket_number="1:21-bk-4452",
+            assigned_to=judge,
+            source=Docket.RECAP,
+        )
+
+        with mock.patch(
+            "cl.lib.es_signal_processor.update_children_docs_by_query_in_bulk.delay",
+            side_effect=lambda *args, **kwargs: self.count_task_calls(
+                update_children_docs_by_query_in_bulk, *args, **kwargs
+            ),
+        ) as bulk_task_mock:
+            judge.name_first = "William"
+            judge.name_last = "Anderson"
+            judge.save()
+
+        self.reset_and_assert_task_count(expected=1)
+        self.assertEqual(len(bulk_task_mock.call_args.args[1]), 2)
+        for rd in rds:
+            rd_doc = DocketDocument.get(id=ES_CHILD_ID(rd.pk).RECAP)
+            self.assertIn("William Anderson", rd_doc.assignedTo)
+
+        for rd in rds:
+            rd.docket_entry.docket.delete()
+
 
 class RECAPHistoryTablesIndexingTest(
     RECAPSearchTestCase, ESIndexTestCase, TestCase
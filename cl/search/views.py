@@ -1,5 +1,4 @@
 import logging
-import pickle
 import traceback
 from datetime import date, datetime, timedelta, timezone
 from urllib.parse import quote
@@ -33,15 +32,15 @@ from cl.audio.models import Audio
 from cl.citations.match_citations_queries import es_get_query_citation
 from cl.custom_filters.templatetags.text_filters import naturalduration
 from cl.lib.bot_detector import is_bot
-from cl.lib.crypto import sha256
 from cl.lib.elasticsearch_utils import (
     build_es_main_query,
     compute_lowest_possible_estimate,
     convert_str_date_fields_to_date_objects,
     fetch_es_results,
-    get_facet_dict_for_search_query,
     get_only_status_facets,
+    get_status_facet_counts,
     limit_inner_hits,
+    make_facet_fields,
     merge_courts_from_db,
     merge_unavailable_fields_on_parent_document,
     set_results_highlights,
@@ -49,6 +48,11 @@ from cl.lib.elasticsearch_utils import (
 )
 from cl.lib.paginators import ESPaginator
 from cl.lib.redis_utils import get_redis_interface
+from cl.lib.search_cache import (
+    get_cached_search_results,
+    make_search_cache_key,
+    set_cached_search_results,
+)
 from cl.lib.search_utils import (
     add_depth_counts,
     build_main_query,
@@ -746,6 +750,12 @@ def do_es_search(
     if search_form.is_valid() and document_type:
         # Copy cleaned_data to preserve the original data when displaying the form
         cd = search_form.cleaned_data.copy()
+        search_cache_key = facets_cache_key = None
+        if cache_key is None and settings.ELASTICSEARCH_MICRO_CACHE_ENABLED:
+            search_cache_key = make_search_cache_key(
+                get_params, get_params.get("page", 1)
+            )
+            facets_cache_key = make_search_cache_key(get_params, None)
         try:
             # Create necessary filters to execute ES query
             search_query = document_type.search()
@@ -780,6 +790,7 @@ def do_es_search(
                 child_docs_count_query,
                 rows_per_page=rows,
                 cache_key=cache_key,
+                search_cache_key=search_cache_key,
             )
             cited_cluster = async_to_sync(add_depth_counts)(
                 # Also returns cited cluster if found
@@ -820,11 +831,21 @@ def do_es_search(
                 # retrieve the correct number of opinions per status. Otherwise (if
                 # the query has errors), just provide a dictionary containing the
                 # search type to get the total number of opinions per status
-                facet_fields = get_facet_dict_for_search_query(
-                    search_query,
-                    cd if not error else {"type": cd["type"]},
-                    search_form,
-                )
+                facet_values = None
+                if facets_cache_key is not None:
+                    facet_values = get_cached_search_results(
+                        facets_cache_key, cd["type"]
+                    )
+                if facet_values is None:
+                    facet_values = get_status_facet_counts(
+                        search_query,
+                        cd if not error else {"type": cd["type"]},
+                    )
+                    if facets_cache_key is not None:
+                        set_cached_search_results(
+                            facets_cache_key, facet_values
+                        )
+                facet_fields = make_facet_fields(search_form, facet_values)
     else:
         error = True
 
@@ -865,40 +886,13 @@ def do_es_search(
     }
 
 
-def retrieve_cached_search_results(
-    get_params: QueryDict,
-) -> tuple[dict[str, Page | int] | None, str]:
-    """
-    Retrieve cached search results based on the GET parameters.
-
-    :param get_params: The GET parameters provided by the user.
-    :return: A two-tuple containing either the cached search results and the
-    cache key based ona prefix and the get parameters, or None and the cache key
-    if no cached results were found.
-    """
-
-    params = get_params.copy()
-    # If no page is present in the parameters, set it to 1 to generate the same
-    # hash for page 1, regardless of whether the page parameter is included.
-    # Apply the same to the q parameter when it is not present in params.
-    params.setdefault("page", "1")
-    params.setdefault("q", "")
-    sorted_params = dict(sorted(params.items()))
-    key_prefix = "search_results_cache:"
-    params_hash = sha256(pickle.dumps(sorted_params))
-    cache_key = f"{key_prefix}{params_hash}"
-    cached_results = cache.get(cache_key)
-    if cached_results:
-        return pickle.loads(cached_results), cache_key
-    return None, cache_key
-
-
 def fetch_and_paginate_results(
     get_params: QueryDict,
     search_query: Search,
     child_docs_count_query: Search | None,
     rows_per_page: int = settings.SEARCH_PAGE_SIZE,
     cache_key: str = None,
+    search_cache_key: str | None = None,
 ) -> tuple[Page | list, int, bool, int | None, int | None]:
     """Fetch and paginate elasticsearch results.
 
@@ -908,6 +902,8 @@ def fetch_and_paginate_results(
     child documents if required, otherwise None.
     :param rows_per_page: Number of records wanted per page
     :param cache_key: The cache key to use.
+    :param search_cache_key: The key of the search results micro-cache, from
+    make_search_cache_key, or None to skip it.
     :return: A five-tuple: the paginated results, the ES query time, whether
     there was an error, the total number of hits for the main document, and
     the total number of hits for the child document.
@@ -921,8 +917,12 @@ def fetch_and_paginate_results(
             return results, 0, False, None, None
 
     # Check micro-cache for all other search requests.
-    results_dict, micro_cache_key = retrieve_cached_search_results(get_params)
-    if results_dict:
+    results_dict = None
+    if search_cache_key is not None:
+        results_dict = get_cached_search_results(
+            search_cache_key, get_params.get("type", SEARCH_TYPES.OPINION)
+        )
+    if results_dict is not None:
         # Return results and counts. Set query time to 1ms.
         return (
             results_dict["results"],
@@ -966,18 +966,15 @@ def fetch_and_paginate_results(
     if cache_key is not None:
         # Cache only Page results for displaying insights on the Home Page.
         cache.set(cache_key, results, settings.QUERY_RESULTS_CACHE)
-    elif settings.ELASTICSEARCH_MICRO_CACHE_ENABLED:
+    elif search_cache_key is not None:
         # Cache Page results and counts for all other search requests.
-        results_dict = {
-            "results": results,
-            "main_total": main_total,
-            "child_total": child_total,
-        }
-        serialized_data = pickle.dumps(results_dict)
-        cache.set(
-            micro_cache_key,
-            serialized_data,
-            settings.SEARCH_RESULTS_MICRO_CACHE,
+        set_cached_search_results(
+            search_cache_key,
+            {
+                "results": results,
+                "main_total": main_total,
+                "child_total": child_total,
+            },
         )
 
     return results, query_time, error, main_total, child_total
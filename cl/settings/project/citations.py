@@ -1,4 +1,31 @@
 import environ
 
+from ..django import INSTALL_ROOT
+
 env = environ.FileAwareEnv()
 MAX_CITATIONS_PER_REQUEST = env.int("MAX_CITATIONS_PER_REQUEST", default=250)
+# Number of full citation lookups each worker process keeps in memory.
+CITATION_RESOLUTION_CACHE_SIZE = env.int(
+    "CITATION_RESOLUTION_CACHE_SIZE", default=50_000
+)
+# Directory where the citation lookup index is stored. Leave empty to disable
+# the index and look up every citation in the DB.
+CITATION_LOOKUP_INDEX_DIR = env("CITATION_LOOKUP_INDEX_DIR", default="")
+CITATION_LOOKUP_INDEX_RELOAD_INTERVAL = env.int(
+    "CITATION_LOOKUP_INDEX_RELOAD_INTERVAL", default=60
+)
+# Parenthetical groups of cited clusters are recomputed in the background.
+# The drain task runs this many seconds after a cluster is flagged, so the
+# changes of a citation run are coalesced, and regroups this many clusters
+# per batch.
+PARENTHETICAL_REGROUP_DELAY = env.int(
+    "PARENTHETICAL_REGROUP_DELAY", default=60
+)
+PARENTHETICAL_REGROUP_BATCH_SIZE = env.int(
+    "PARENTHETICAL_REGROUP_BATCH_SIZE", default=100
+)
+# Where the compiled Hyperscan database of the citation tokenizer is cached.
+# Use an absolute path, so every process finds it regardless of its cwd.
+HYPERSCAN_CACHE_DIR = env(
+    "HYPERSCAN_CACHE_DIR", default=INSTALL_ROOT / ".hyperscan"
+)
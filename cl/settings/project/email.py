@@ -32,6 +32,10 @@ EMAIL_EMERGENCY_THRESHOLD = env.int(
 )
 EMAIL_MAX_TEMP_COUNTER = env.int("EMAIL_MAX_TEMP_COUNTER", default=10)
 
+# The maximum rate emails are sent at by all processes together, e.g. the
+# SES maximum send rate, "14/s". Empty to send them as fast as possible.
+EMAIL_SEND_RATE = env("EMAIL_SEND_RATE", default="")
+
 SERVER_EMAIL = "CourtListener <noreply@courtlistener.com>"
 DEFAULT_FROM_EMAIL = "CourtListener <noreply@courtlistener.com>"
 DEFAULT_ALERTS_EMAIL = "CourtListener Alerts <alerts@courtlistener.com>"
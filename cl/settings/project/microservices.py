@@ -72,3 +72,22 @@ MICROSERVICE_URLS = {
         "timeout": 60 * 60 * 2,
     },
 }
+
+# Connection pooling of the microservice clients. The limits can be
+# overridden per service with max_connections and max_keepalive_connections
+# keys in MICROSERVICE_URLS.
+MICROSERVICE_MAX_CONNECTIONS = env.int(
+    "MICROSERVICE_MAX_CONNECTIONS", default=10
+)
+MICROSERVICE_MAX_KEEPALIVE_CONNECTIONS = env.int(
+    "MICROSERVICE_MAX_KEEPALIVE_CONNECTIONS", default=10
+)
+MICROSERVICE_KEEPALIVE_EXPIRY = env.int(
+    "MICROSERVICE_KEEPALIVE_EXPIRY", default=60
+)
+# The number of documents a RECAP extraction task sends to doctor at the same
+# time. Every worker already runs many tasks concurrently, so doctor gets up
+# to this many times more requests. Only raise it if doctor has room for them.
+RECAP_EXTRACTION_CONCURRENCY = env.int(
+    "RECAP_EXTRACTION_CONCURRENCY", default=1
+)
@@ -7,6 +7,9 @@ env = environ.FileAwareEnv()
 SOLR_HOST = env("SOLR_HOST", default="http://cl-solr:8983")
 SOLR_RECAP_HOST = env("SOLR_RECAP_HOST", default="http://cl-solr:8983")
 SOLR_PAGERANK_DEST_DIR = env("SOLR_PAGERANK_DEST_DIR", default="/tmp/")
+# Where the last PageRank scores and citation edges are kept for incremental
+# runs of cl_calculate_pagerank.
+PAGERANK_STATE_DIR = env("PAGERANK_STATE_DIR", default="/tmp/pagerank/")
 
 ########
 # Solr #
@@ -61,7 +64,14 @@ RELATED_MLT_MINWL = 3
 RELATED_MLT_MAXWL = 0
 RELATED_FILTER_BY_STATUS = "Precedential"
 QUERY_RESULTS_CACHE = 60 * 60 * 6
-SEARCH_RESULTS_MICRO_CACHE = 60 * 10
+SEARCH_RESULTS_MICRO_CACHE = env.int(
+    "SEARCH_RESULTS_MICRO_CACHE", default=60 * 10
+)
+# The minimum number of seconds between two invalidations of the cached
+# results of a search type.
+SEARCH_CACHE_INVALIDATION_INTERVAL = env.int(
+    "SEARCH_CACHE_INVALIDATION_INTERVAL", default=60
+)
 
 #####################
 # Search pagination #
@@ -74,6 +84,10 @@ OPINION_HITS_PER_RESULT = 20
 PEOPLE_HITS_PER_RESULT = 999
 VIEW_MORE_CHILD_HITS = 99
 SEARCH_API_PAGE_SIZE = 20
+# The number of results fetched at a time by the search export API, and how
+# long the point in time it reads them from is kept between batches.
+SEARCH_EXPORT_BATCH_SIZE = env.int("SEARCH_EXPORT_BATCH_SIZE", default=500)
+SEARCH_EXPORT_PIT_KEEP_ALIVE = "2m"
 # The amount of text to return from the beginning of the field if there are no
 # matching fragments to highlight.
 NO_MATCH_HL_SIZE = 500
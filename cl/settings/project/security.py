@@ -16,6 +16,24 @@ ALLOWED_HOSTS: list[str] = env(
 EGRESS_PROXY_HOSTS: list[str] = env.list(
     "EGRESS_PROXY_HOSTS", default=["http://cl-webhook-sentry:9090"]
 )
+# Send webhook events sent together, like search alert hits or retries,
+# concurrently with pooled async clients, one per egress proxy.
+WEBHOOK_ASYNC_DISPATCH = env.bool("WEBHOOK_ASYNC_DISPATCH", default=False)
+# The maximum number of connections of the client of every egress proxy.
+WEBHOOK_MAX_CONNECTIONS = env.int("WEBHOOK_MAX_CONNECTIONS", default=100)
+# The maximum number of requests sent at the same time to an endpoint.
+WEBHOOK_ENDPOINT_CONCURRENCY = env.int(
+    "WEBHOOK_ENDPOINT_CONCURRENCY", default=4
+)
+# Consecutive failed requests after which an endpoint stops getting events,
+# for WEBHOOK_CIRCUIT_BREAKER_COOLDOWN seconds. Its events are enqueued for
+# retry instead.
+WEBHOOK_CIRCUIT_BREAKER_THRESHOLD = env.int(
+    "WEBHOOK_CIRCUIT_BREAKER_THRESHOLD", default=5
+)
+WEBHOOK_CIRCUIT_BREAKER_COOLDOWN = env.int(
+    "WEBHOOK_CIRCUIT_BREAKER_COOLDOWN", default=60 * 3
+)
 
 SECURE_HSTS_SECONDS = 63_072_000
 SECURE_HSTS_INCLUDE_SUBDOMAINS = True
@@ -215,6 +215,18 @@ ELASTICSEARCH_DSL_AUTO_REFRESH = env(
 #############################################################
 ELASTICSEARCH_PAGINATION_BATCH_SIZE = 100
 
+###############################################################
+# Seconds to buffer the documents indexed to percolate them   #
+# together, and the documents percolated in a single request. #
+# 0 percolates every document as soon as it's indexed.        #
+###############################################################
+ELASTICSEARCH_PERCOLATOR_BATCH_WINDOW = env.int(
+    "ELASTICSEARCH_PERCOLATOR_BATCH_WINDOW", default=0
+)
+ELASTICSEARCH_PERCOLATOR_BATCH_SIZE = env.int(
+    "ELASTICSEARCH_PERCOLATOR_BATCH_SIZE", default=50
+)
+
 ###################################################
 # The maximum number of scheduled hits per alert. #
 ###################################################
@@ -227,6 +239,25 @@ ELASTICSEARCH_BULK_BATCH_SIZE = env(
     "ELASTICSEARCH_BULK_BATCH_SIZE", default=200
 )
 
+###########################################################
+# Seconds to buffer ES updates to merge them across DB    #
+# transactions. 0 sends them once every transaction ends. #
+###########################################################
+ELASTICSEARCH_UPDATES_COALESCING_WINDOW = env.int(
+    "ELASTICSEARCH_UPDATES_COALESCING_WINDOW", default=0
+)
+
+###############################################################
+# Parents whose children are updated by a single UpdateByQuery #
+# request, and the requests per second it's throttled to.      #
+###############################################################
+ELASTICSEARCH_UBQ_PARENTS_BATCH_SIZE = env.int(
+    "ELASTICSEARCH_UBQ_PARENTS_BATCH_SIZE", default=1000
+)
+ELASTICSEARCH_UBQ_REQUESTS_PER_SECOND = env.int(
+    "ELASTICSEARCH_UBQ_REQUESTS_PER_SECOND", default=1000
+)
+
 ######################################################
 # ES parallel bulk indexing number of threads to use #
 ######################################################
@@ -25,6 +25,7 @@ REST_FRAMEWORK = {
         "anon": "100/day",
         "user": "5000/hour",
         "citations": "60/min",
+        "export_rows": "100000/day",
     },
     "OVERRIDE_THROTTLE_RATES": {
         # Throttling down.
@@ -80,6 +81,7 @@ REST_FRAMEWORK = {
         "quevon24": "500000/hour",  # Perform tests, clone cases in local env
     },
     "CITATION_LOOKUP_OVERRIDE_THROTTLE_RATES": {},
+    "EXPORT_ROWS_OVERRIDE_THROTTLE_RATES": {},
     # Auth
     "DEFAULT_AUTHENTICATION_CLASSES": (
         "rest_framework.authentication.BasicAuthentication",
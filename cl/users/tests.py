@@ -39,7 +39,11 @@ from cl.favorites.models import (
     UserTag,
     UserTagEvent,
 )
-from cl.lib.email_backends import get_email_count
+from cl.lib.email_backends import (
+    EmergencyBrakeEngaged,
+    get_email_count,
+    wait_for_send_rate,
+)
 from cl.lib.redis_utils import get_redis_interface
 from cl.lib.test_helpers import SimpleUserDataMixin
 from cl.search.factories import DocketFactory
@@ -2299,6 +2303,39 @@ class CustomBackendEmailTest(RestartSentEmailQuotaMixin, TestCase):
         # No additional messsage should be stored.
         self.assertEqual(stored_email.count(), 5)
 
+        # A connection opened to send the messages is closed on failure.
+        with self.assertRaises(EmergencyBrakeEngaged):
+            connection.send_messages([email])
+        self.assertIsNone(connection.connection)
+
+    @override_settings(EMAIL_SEND_RATE="2/s")
+    def test_wait_for_send_rate(self) -> None:
+        """Does wait_for_send_rate block once the send rate is exceeded?"""
+        clock = [1000.0]
+
+        def sleep(seconds: float) -> None:
+            clock[0] += seconds
+
+        with (
+            mock.patch(
+                "cl.lib.email_backends.time.time",
+                side_effect=lambda: clock[0],
+            ),
+            mock.patch(
+                "cl.lib.email_backends.time.sleep", side_effect=sleep
+            ) as mock_sleep,
+        ):
+            # The bucket allows a burst of two emails.
+            for _ in range(2):
+                wait_for_send_rate()
+            mock_sleep.assert_not_called()
+
+            # The third one waits for a token to be refilled.
+            wait_for_send_rate()
+
+        mock_sleep.assert_called_once()
+        self.assertAlmostEqual(mock_sleep.call_args.args[0], 0.5)
+
 
 class DeleteOldEmailsTest(TestCase):
     @classmethod